@@ -0,0 +1,94 @@
+"""
+Benchmark the time to first token after a restart with the disk prefix cache.
+
+The same prompts are served by two engines started one after the other,
+each in a fresh process, sharing a new disk prefix cache directory. The
+first (cold) engine computes the prompts and persists their KV blocks, the
+second (warm) one loads them from disk instead of running the prefill.
+
+Example usage:
+    VLLM_CPU_KVCACHE_SPACE=4 python benchmark_disk_prefix_cache.py \
+        --model facebook/opt-125m \
+        --device cpu \
+        --num-prompts 16 \
+        --prompt-len 1024
+"""
+import multiprocessing
+import random
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from vllm import LLM, SamplingParams, TokensPrompt
+from vllm.utils import FlexibleArgumentParser
+
+
+def run_engine(args, cache_path: str, prompts: List[List[int]],
+               results) -> None:
+    llm = LLM(model=args.model,
+              device=args.device,
+              dtype=args.dtype,
+              block_size=args.block_size,
+              enforce_eager=True,
+              enable_prefix_caching=True,
+              disk_prefix_cache_path=cache_path,
+              disk_prefix_cache_gb=args.disk_prefix_cache_gb)
+    sampling_params = SamplingParams(temperature=0, max_tokens=1)
+
+    # Requests are sent one by one, so that the TTFT is not affected by
+    # batching with the other prompts.
+    ttfts = []
+    for prompt_token_ids in prompts:
+        start = time.perf_counter()
+        llm.generate(TokensPrompt(prompt_token_ids=prompt_token_ids),
+                     sampling_params=sampling_params,
+                     use_tqdm=False)
+        ttfts.append(time.perf_counter() - start)
+    results.put(ttfts)
+
+
+def main(args):
+    random.seed(args.seed)
+    prompts = [[
+        random.randint(100, 10000) for _ in range(args.prompt_len)
+    ] for _ in range(args.num_prompts)]
+    cache_path = tempfile.mkdtemp(prefix="disk_prefix_cache_",
+                                  dir=args.disk_prefix_cache_path)
+    print(f"Using disk prefix cache directory {cache_path}")
+
+    # Each engine runs in its own process, as after a restart.
+    ctx = multiprocessing.get_context("spawn")
+    for name in ("cold", "warm"):
+        results = ctx.Queue()
+        process = ctx.Process(target=run_engine,
+                              args=(args, cache_path, prompts, results))
+        process.start()
+        ttfts = np.array(results.get()) * 1000
+        process.join()
+        print(f"{name} start: mean TTFT {ttfts.mean():.2f} ms, "
+              f"median {np.median(ttfts):.2f} ms, "
+              f"p99 {np.percentile(ttfts, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the time to first token on a warm start with '
+        'the disk prefix cache against a cold start.')
+    parser.add_argument('--model', type=str, default='facebook/opt-125m')
+    parser.add_argument('--device', type=str, default='cpu')
+    parser.add_argument('--dtype', type=str, default='auto')
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--num-prompts', type=int, default=16)
+    parser.add_argument('--prompt-len', type=int, default=1024)
+    parser.add_argument('--disk-prefix-cache-path',
+                        type=str,
+                        default=None,
+                        help='Directory in which the cache directory of the '
+                        'benchmark is created. Defaults to the system '
+                        'temporary directory.')
+    parser.add_argument('--disk-prefix-cache-gb', type=float, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args)
@@ -23,6 +23,16 @@ ShareGPT example usage:
         --num-prompts 20 \
         --repeat-count 5 \
         --input-length-range 128:256
+
+Prefix index example usage:
+    # This command compares the cost and the hit length of prefix lookups
+    # with the radix tree index and with chained block hashes, over
+    # prompts made of a shared document and a question. No model is run.
+    python benchmark_prefix_caching.py \
+        --index-benchmark \
+        --num-prompts 1000 \
+        --num-documents 50 \
+        --input-length-range 1024:2048
 """
 
 import json
@@ -33,7 +43,9 @@ from typing import List, Optional, Tuple
 from transformers import PreTrainedTokenizerBase
 
 from vllm import LLM, SamplingParams
-from vllm.utils import FlexibleArgumentParser
+from vllm.core.block.prefix_caching_block import (PrefixCachingBlock,
+                                                  PrefixCachingBlockAllocator)
+from vllm.utils import Device, FlexibleArgumentParser
 
 try:
     from vllm.transformers_utils.tokenizer import get_tokenizer
@@ -110,7 +122,77 @@ def repeat_and_sort_requests(requests: List[Tuple[str, int, int]],
     return [req[0] for req in repeated_requests]
 
 
+def run_index_benchmark(args):
+    """Compares prefix lookups with the radix tree index of the allocator
+    against hashing each prompt block by block and looking up the chain."""
+    random.seed(args.seed)
+    block_size = args.block_size
+    min_len, max_len = map(int, args.input_length_range.split(':'))
+    documents = [[
+        random.randint(0, 50000) for _ in range(random.randint(
+            min_len, max_len))
+    ] for _ in range(args.num_documents)]
+
+    def sample_prompt(doc: List[int]) -> List[int]:
+        return doc + [
+            random.randint(0, 50000) for _ in range(args.question_len)
+        ]
+
+    # Cache one prompt per document. The cached prefix of a later prompt
+    # with the same document then usually ends within a block.
+    cached_prompts = [sample_prompt(doc) for doc in documents]
+    num_blocks = sum(len(prompt) // block_size for prompt in cached_prompts)
+    allocator = PrefixCachingBlockAllocator(num_blocks=num_blocks,
+                                            block_size=block_size)
+    for prompt in cached_prompts:
+        blocks = allocator.allocate_immutable_blocks(
+            prev_block=None,
+            block_token_ids=[
+                prompt[i * block_size:(i + 1) * block_size]
+                for i in range(len(prompt) // block_size)
+            ])
+        allocator.mark_blocks_as_computed([])
+        for block in blocks:
+            allocator.free(block)
+
+    prompts = [
+        sample_prompt(random.choice(documents))
+        for _ in range(args.num_prompts)
+    ]
+
+    start = time.perf_counter()
+    hash_hit_lens = []
+    for prompt in prompts:
+        block_hashes: List[int] = []
+        for i in range(len(prompt) // block_size):
+            block_hashes.append(
+                PrefixCachingBlock.hash_block_tokens(
+                    not block_hashes, block_hashes[-1] if block_hashes else
+                    None, prompt[i * block_size:(i + 1) * block_size]))
+        hash_hit_lens.append(
+            allocator.get_num_cached_prefix_blocks(block_hashes) *
+            block_size)
+    hash_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    radix_hit_lens = [
+        allocator.get_longest_cached_prefix(prompt)[1] for prompt in prompts
+    ]
+    radix_time = time.perf_counter() - start
+
+    print(f"{'lookup':>12} {'time/prompt (us)':>18} {'mean hit length':>16}")
+    for name, elapsed, hit_lens in (("hash chain", hash_time, hash_hit_lens),
+                                    ("radix tree", radix_time,
+                                     radix_hit_lens)):
+        print(f"{name:>12} {elapsed / len(prompts) * 1e6:>18.1f} "
+              f"{sum(hit_lens) / len(hit_lens):>16.1f}")
+
+
 def main(args):
+    if args.index_benchmark:
+        run_index_benchmark(args)
+        return
+
     tokenizer = get_tokenizer(args.model, trust_remote_code=True)
     input_length_range = tuple(map(int, args.input_length_range.split(':')))
     random.seed(args.seed)
@@ -134,7 +216,8 @@ def main(args):
               trust_remote_code=True,
               enforce_eager=True,
               tensor_parallel_size=args.tensor_parallel_size,
-              enable_prefix_caching=args.enable_prefix_caching)
+              enable_prefix_caching=args.enable_prefix_caching,
+              prefix_cache_eviction_policy=args.prefix_cache_eviction_policy)
 
     sampling_params = SamplingParams(temperature=0, max_tokens=args.output_len)
 
@@ -157,6 +240,12 @@ def main(args):
         sampling_params=sampling_params,
     )
 
+    if args.enable_prefix_caching:
+        hit_rate = llm.llm_engine.scheduler[0].get_prefix_cache_hit_rate(
+            Device.GPU)
+        print(f"GPU prefix cache hit rate "
+              f"({args.prefix_cache_eviction_policy}): {hit_rate:.2%}")
+
 
 if __name__ == "__main__":
     parser = FlexibleArgumentParser(
@@ -174,6 +263,11 @@ if __name__ == "__main__":
     parser.add_argument('--enable-prefix-caching',
                         action='store_true',
                         help='enable prefix caching')
+    parser.add_argument('--prefix-cache-eviction-policy',
+                        type=str,
+                        default='lru',
+                        choices=['lru', 'heap_lru', 'two_queue'],
+                        help='eviction policy of the prefix cache')
     parser.add_argument('--num-prompts',
                         type=int,
                         default=1,
@@ -190,6 +284,22 @@ if __name__ == "__main__":
                         default='128:256',
                         help='Range of input lengths for sampling prompts,'
                         'specified as "min:max" (e.g., "128:256").')
+    parser.add_argument('--index-benchmark',
+                        action='store_true',
+                        help='compare prefix lookups with the radix tree '
+                        'index and with chained block hashes, without '
+                        'running a model')
+    parser.add_argument('--num-documents',
+                        type=int,
+                        default=50,
+                        help='Number of cached documents shared by the '
+                        'prompts of the index benchmark')
+    parser.add_argument('--question-len',
+                        type=int,
+                        default=64,
+                        help='Number of uncached tokens following the '
+                        'document in each prompt of the index benchmark')
+    parser.add_argument('--block-size', type=int, default=16)
     parser.add_argument("--seed",
                         type=int,
                         default=0,
@@ -0,0 +1,448 @@
+"""
+Simulate the scheduler and the block manager without a model.
+
+An arrival trace is replayed against a Scheduler, whose scheduled sequence
+groups are run by a fake model step that emits one token per running
+sequence and finishes the sequences at their output length. The model step
+time is modelled from the number of batched tokens, which drives a virtual
+clock for the arrivals and the request latencies, while the scheduling
+latency is measured in wall-clock time.
+
+This helps tuning max_num_seqs and max_num_batched_tokens, which can be
+swept over, without GPUs.
+
+The trace is either synthetic or read from a JSON lines file with one
+request per line, e.g.:
+    {"arrival_time": 0.5, "prompt_len": 512, "output_len": 128,
+     "prefix_id": 3, "prefix_len": 256, "n": 1, "priority": 0}
+where only prompt_len and output_len are required. Requests with the same
+prefix_id share their first prefix_len prompt tokens.
+
+Example usage:
+    python benchmark_scheduler.py \
+        --num-gpu-blocks 2048 \
+        --num-requests 1000 \
+        --request-rate 20 \
+        --num-prefixes 8 \
+        --prefix-len 256 \
+        --enable-prefix-caching \
+        --max-num-seqs 64 128 256 \
+        --max-num-batched-tokens 2048 8192
+"""
+import dataclasses
+import itertools
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vllm.config import CacheConfig, SchedulerConfig
+from vllm.core.scheduler import Scheduler
+from vllm.inputs import token_inputs
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import Logprob, Sequence, SequenceGroup, SequenceStatus
+from vllm.utils import Device, FlexibleArgumentParser
+
+VOCAB_SIZE = 32000
+
+
+@dataclasses.dataclass
+class TraceRequest:
+    arrival_time: float
+    prompt_len: int
+    output_len: int
+    prefix_id: Optional[int] = None
+    prefix_len: int = 0
+    n: int = 1
+    priority: int = 0
+
+
+def sample_trace(args) -> List[TraceRequest]:
+    rng = random.Random(args.seed)
+
+    def sample_len(mean: int) -> int:
+        return max(
+            1,
+            rng.randint(int(mean * (1 - args.range_ratio)),
+                        int(mean * (1 + args.range_ratio))))
+
+    trace = []
+    arrival_time = 0.0
+    for _ in range(args.num_requests):
+        if args.request_rate != float("inf"):
+            # Gamma distributed inter-arrival times, Poisson arrivals if
+            # the burstiness is 1 and burstier arrivals below.
+            arrival_time += rng.gammavariate(
+                args.burstiness, 1.0 / (args.request_rate * args.burstiness))
+        prefix_id = (rng.randrange(args.num_prefixes)
+                     if args.num_prefixes > 0 else None)
+        prefix_len = args.prefix_len if prefix_id is not None else 0
+        trace.append(
+            TraceRequest(arrival_time=arrival_time,
+                         prompt_len=prefix_len + sample_len(args.input_len),
+                         output_len=sample_len(args.output_len),
+                         prefix_id=prefix_id,
+                         prefix_len=prefix_len,
+                         n=args.n,
+                         priority=rng.randrange(args.num_priorities)))
+    return trace
+
+
+def load_trace(path: str) -> List[TraceRequest]:
+    with open(path) as f:
+        trace = [TraceRequest(**json.loads(line)) for line in f if line]
+    return sorted(trace, key=lambda request: request.arrival_time)
+
+
+def save_trace(trace: List[TraceRequest], path: str) -> None:
+    with open(path, "w") as f:
+        for request in trace:
+            f.write(json.dumps(dataclasses.asdict(request)) + "\n")
+
+
+def get_prompt_token_ids(request: TraceRequest,
+                         rng: random.Random) -> List[int]:
+    prefix_token_ids: List[int] = []
+    if request.prefix_id is not None:
+        prefix_rng = random.Random(request.prefix_id)
+        prefix_token_ids = [
+            prefix_rng.randrange(VOCAB_SIZE)
+            for _ in range(request.prefix_len)
+        ]
+    return prefix_token_ids + [
+        rng.randrange(VOCAB_SIZE)
+        for _ in range(request.prompt_len - len(prefix_token_ids))
+    ]
+
+
+@dataclasses.dataclass
+class SimulationStats:
+    schedule_times: List[float] = dataclasses.field(default_factory=list)
+    num_batched_tokens: List[int] = dataclasses.field(default_factory=list)
+    num_running_seqs: List[int] = dataclasses.field(default_factory=list)
+    num_preempted: int = 0
+    num_blocks_swapped_out: int = 0
+    num_blocks_swapped_in: int = 0
+    num_tokens_recomputed: int = 0
+    num_mispredictions: int = 0
+    num_ignored: int = 0
+    num_output_tokens: int = 0
+    ttfts: List[float] = dataclasses.field(default_factory=list)
+    latencies: List[float] = dataclasses.field(default_factory=list)
+    # Times of the steps that run decodes.
+    itls: List[float] = dataclasses.field(default_factory=list)
+    duration: float = 0.0
+    gpu_prefix_hit_rate: float = -1.0
+
+
+class Simulator:
+    """Replays a trace against a scheduler, with a fake model step."""
+
+    def __init__(self, args, max_num_seqs: int, max_num_batched_tokens: int,
+                 admission_watermark: Optional[float],
+                 trace: List[TraceRequest]):
+        self.args = args
+        self.trace = trace
+        scheduler_config = SchedulerConfig(
+            "generate",
+            max_num_batched_tokens=max_num_batched_tokens,
+            max_num_seqs=max_num_seqs,
+            max_model_len=args.max_model_len,
+            enable_chunked_prefill=args.enable_chunked_prefill,
+            preemption_mode=args.preemption_mode,
+            policy=args.scheduling_policy,
+            target_inter_token_latency=args.target_inter_token_latency,
+            admission_watermark=admission_watermark)
+        cache_config = CacheConfig(
+            args.block_size,
+            1.0,
+            1,
+            "auto",
+            enable_prefix_caching=args.enable_prefix_caching)
+        cache_config.num_gpu_blocks = args.num_gpu_blocks
+        cache_config.num_cpu_blocks = args.num_cpu_blocks
+        self.scheduler = Scheduler(scheduler_config, cache_config, None)
+
+        self.rng = random.Random(args.seed)
+        self.seq_counter = itertools.count()
+        self.clock = 0.0
+        # Virtual arrival and first token times, by request id.
+        self.arrival_times: Dict[str, float] = {}
+        self.first_token_times: Dict[str, float] = {}
+        self.output_lens: Dict[str, int] = {}
+        self.stats = SimulationStats()
+
+    def add_request(self, request_id: str, request: TraceRequest) -> None:
+        seq = Sequence(next(self.seq_counter),
+                       token_inputs(
+                           get_prompt_token_ids(request, self.rng)),
+                       block_size=self.args.block_size)
+        seq_group = SequenceGroup(
+            request_id=request_id,
+            seqs=[seq],
+            arrival_time=time.time(),
+            sampling_params=SamplingParams(
+                n=request.n,
+                max_tokens=max(request.output_len, self.args.max_tokens or 0)),
+            priority=request.priority)
+        self.arrival_times[request_id] = request.arrival_time
+        self.output_lens[request_id] = request.output_len
+        self.scheduler.add_seq_group(seq_group)
+
+    def step_time(self, num_batched_tokens: int) -> float:
+        return (self.args.step_time_base_ms +
+                self.args.step_time_per_token_us * 1e-3 *
+                num_batched_tokens) * 1e-3
+
+    def swap_time(self, num_blocks: int) -> float:
+        return self.args.swap_time_per_block_us * 1e-6 * num_blocks
+
+    def emit_token(self, seq_group: SequenceGroup, seq: Sequence) -> None:
+        token_id = self.rng.randrange(VOCAB_SIZE)
+        seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+        self.stats.num_output_tokens += 1
+        if (seq.get_output_len() >= self.output_lens[seq_group.request_id]
+                or seq.get_len() >= self.args.max_model_len):
+            seq.status = SequenceStatus.FINISHED_LENGTH_CAPPED
+            self.scheduler.free_seq(seq)
+
+    def model_step(self, seq_groups: List[SequenceGroup],
+                   token_chunk_sizes: List[int]) -> None:
+        """Emits a token for each running sequence of the sequence groups
+        that are done with their prefill, like the output processor."""
+        for seq_group, token_chunk_size in zip(seq_groups,
+                                               token_chunk_sizes):
+            seq_group.update_num_computed_tokens(token_chunk_size)
+            if seq_group.is_prefill():
+                # Chunked prefill in progress, nothing is sampled.
+                continue
+
+            request_id = seq_group.request_id
+            if request_id not in self.first_token_times:
+                self.first_token_times[request_id] = self.clock
+                self.stats.ttfts.append(self.clock -
+                                        self.arrival_times[request_id])
+            parents = seq_group.get_seqs(status=SequenceStatus.RUNNING)
+            n = seq_group.sampling_params.n
+            if len(seq_group.seqs) == 1 and n > 1:
+                # Parallel sampling forks the sequence after the prefill.
+                parent = parents[0]
+                for _ in range(n - 1):
+                    child = parent.fork(next(self.seq_counter))
+                    seq_group.add(child)
+                    self.scheduler.fork_seq(parent, child)
+                    self.emit_token(seq_group, child)
+            for seq in parents:
+                self.emit_token(seq_group, seq)
+            if seq_group.is_finished():
+                self.stats.latencies.append(self.clock -
+                                            self.arrival_times[request_id])
+
+    def run(self) -> SimulationStats:
+        scheduler = self.scheduler
+        stats = self.stats
+        next_request = 0
+        while (next_request < len(self.trace)
+               or scheduler.has_unfinished_seqs()):
+            if not scheduler.has_unfinished_seqs():
+                # Idle until the next arrival.
+                self.clock = max(self.clock,
+                                 self.trace[next_request].arrival_time)
+            while (next_request < len(self.trace) and
+                   self.trace[next_request].arrival_time <= self.clock):
+                self.add_request(str(next_request), self.trace[next_request])
+                next_request += 1
+
+            start = time.perf_counter()
+            _, out, _ = scheduler.schedule()
+            stats.schedule_times.append(time.perf_counter() - start)
+
+            stats.num_batched_tokens.append(out.num_batched_tokens)
+            stats.num_running_seqs.append(
+                sum(
+                    scheduled.seq_group.num_seqs(SequenceStatus.RUNNING)
+                    for scheduled in out.scheduled_seq_groups))
+            stats.num_preempted += out.preempted
+            stats.num_blocks_swapped_out += (
+                out.num_preempted_blocks_swapped_out)
+            stats.num_blocks_swapped_in += out.num_preempted_blocks_swapped_in
+            stats.num_tokens_recomputed += out.num_preempted_tokens_recomputed
+            stats.num_mispredictions += out.num_preemption_mispredictions
+            stats.num_ignored += len(out.ignored_seq_groups)
+
+            step_time = self.step_time(out.num_batched_tokens)
+            num_swapped_blocks = (len(out.blocks_to_swap_out) +
+                                  len(out.blocks_to_swap_in))
+            swap_time = self.swap_time(num_swapped_blocks)
+            self.clock += step_time + swap_time
+            if out.num_batched_tokens > out.num_prefill_tokens:
+                stats.itls.append(step_time + swap_time)
+            # Like the engine, from the measured swap and step times.
+            scheduler.observe_step(out, step_time + swap_time,
+                                   num_swapped_blocks, swap_time)
+            self.model_step(
+                [scheduled.seq_group for scheduled in out.scheduled_seq_groups],
+                [
+                    scheduled.token_chunk_size
+                    for scheduled in out.scheduled_seq_groups
+                ])
+            scheduler.free_finished_seq_groups()
+
+        stats.duration = self.clock
+        stats.gpu_prefix_hit_rate = (
+            scheduler.block_manager.get_prefix_cache_hit_rate(Device.GPU))
+        return stats
+
+
+def print_stats(max_num_seqs: int, max_num_batched_tokens: int,
+                admission_watermark: Optional[float],
+                stats: SimulationStats) -> None:
+    schedule_times = np.array(stats.schedule_times) * 1000
+    ttfts = np.array(stats.ttfts or [0.0])
+    latencies = np.array(stats.latencies or [0.0])
+    itls = np.array(stats.itls or [0.0]) * 1000
+    print(f"max_num_seqs={max_num_seqs} "
+          f"max_num_batched_tokens={max_num_batched_tokens} "
+          f"admission_watermark={admission_watermark}")
+    print(f"  steps: {len(schedule_times)}, simulated duration: "
+          f"{stats.duration:.2f} s, output throughput: "
+          f"{stats.num_output_tokens / max(stats.duration, 1e-9):.1f} tok/s")
+    print(f"  scheduling latency (ms): mean {schedule_times.mean():.3f}, "
+          f"p50 {np.percentile(schedule_times, 50):.3f}, "
+          f"p90 {np.percentile(schedule_times, 90):.3f}, "
+          f"p99 {np.percentile(schedule_times, 99):.3f}, "
+          f"max {schedule_times.max():.3f}")
+    print(f"  batch: mean {np.mean(stats.num_running_seqs):.1f} seqs, "
+          f"mean {np.mean(stats.num_batched_tokens):.1f} tokens")
+    print(f"  preemptions: {stats.num_preempted}, swapped out blocks: "
+          f"{stats.num_blocks_swapped_out}, swapped in blocks: "
+          f"{stats.num_blocks_swapped_in}, recomputed tokens: "
+          f"{stats.num_tokens_recomputed}, ignored requests: "
+          f"{stats.num_ignored}")
+    if stats.num_mispredictions:
+        print(f"  preemption mode mispredictions: {stats.num_mispredictions}")
+    hit_rate = ("n/a" if stats.gpu_prefix_hit_rate < 0 else
+                f"{stats.gpu_prefix_hit_rate * 100:.2f}%")
+    print(f"  GPU prefix cache hit rate: {hit_rate}")
+    print(f"  simulated TTFT (s): mean {ttfts.mean():.3f}, "
+          f"p99 {np.percentile(ttfts, 99):.3f}; "
+          f"latency (s): mean {latencies.mean():.3f}, "
+          f"p99 {np.percentile(latencies, 99):.3f}")
+    print(f"  simulated inter-token latency (ms): mean {itls.mean():.2f}, "
+          f"p99 {np.percentile(itls, 99):.2f}, max {itls.max():.2f}")
+
+
+def main(args):
+    trace = load_trace(args.trace) if args.trace else sample_trace(args)
+    if args.save_trace:
+        save_trace(trace, args.save_trace)
+    print(f"Replaying {len(trace)} requests.")
+
+    # Without admission control, then with each of the watermarks.
+    admission_watermarks: List[Optional[float]] = [None]
+    admission_watermarks.extend(args.admission_watermark)
+    for max_num_seqs, max_num_batched_tokens, admission_watermark in (
+            itertools.product(args.max_num_seqs, args.max_num_batched_tokens,
+                              admission_watermarks)):
+        simulator = Simulator(args, max_num_seqs, max_num_batched_tokens,
+                              admission_watermark, trace)
+        print_stats(max_num_seqs, max_num_batched_tokens, admission_watermark,
+                    simulator.run())
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Simulate the scheduler and the block manager on an '
+        'arrival trace, without a model.')
+    parser.add_argument('--trace',
+                        type=str,
+                        default=None,
+                        help='JSON lines file of the trace to replay. A '
+                        'synthetic trace is sampled if not given.')
+    parser.add_argument('--save-trace',
+                        type=str,
+                        default=None,
+                        help='Path to write the replayed trace to.')
+
+    # Synthetic trace.
+    parser.add_argument('--num-requests', type=int, default=1000)
+    parser.add_argument('--request-rate',
+                        type=float,
+                        default=float('inf'),
+                        help='Poisson arrival rate in requests per '
+                        'simulated second. All the requests arrive at '
+                        'once if inf.')
+    parser.add_argument('--burstiness',
+                        type=float,
+                        default=1.0,
+                        help='Shape of the gamma distribution of the '
+                        'inter-arrival times. Poisson arrivals if 1, '
+                        'burstier arrivals below 1.')
+    parser.add_argument('--input-len', type=int, default=512)
+    parser.add_argument('--output-len', type=int, default=128)
+    parser.add_argument('--max-tokens',
+                        type=int,
+                        default=None,
+                        help='max_tokens of the requests, which still '
+                        'finish at their output length. The output length '
+                        'if not given.')
+    parser.add_argument('--range-ratio',
+                        type=float,
+                        default=0.5,
+                        help='Lengths are sampled uniformly within this '
+                        'ratio of --input-len and --output-len.')
+    parser.add_argument('--num-prefixes',
+                        type=int,
+                        default=0,
+                        help='Number of shared prompt prefixes, each '
+                        'request using one of them. No sharing if 0.')
+    parser.add_argument('--prefix-len', type=int, default=256)
+    parser.add_argument('--n', type=int, default=1)
+    parser.add_argument('--num-priorities', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+
+    # Scheduler and cache.
+    parser.add_argument('--max-num-seqs', type=int, nargs='+', default=[256])
+    parser.add_argument('--max-num-batched-tokens',
+                        type=int,
+                        nargs='+',
+                        default=[8192])
+    parser.add_argument('--max-model-len', type=int, default=4096)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--num-gpu-blocks', type=int, default=4096)
+    parser.add_argument('--num-cpu-blocks', type=int, default=4096)
+    parser.add_argument('--enable-prefix-caching', action='store_true')
+    parser.add_argument('--enable-chunked-prefill', action='store_true')
+    parser.add_argument('--preemption-mode',
+                        type=str,
+                        choices=['recompute', 'swap', 'partial_swap', 'auto'],
+                        default=None)
+    parser.add_argument('--target-inter-token-latency',
+                        type=float,
+                        default=None,
+                        help='Target time of the steps that run decodes, in '
+                        'seconds, to size the chunked prefills from.')
+    parser.add_argument('--admission-watermark',
+                        type=float,
+                        nargs='*',
+                        default=[],
+                        help='Also simulate with the admission control of '
+                        'new prefills at each of these watermarks, to '
+                        'compare the preemptions with and without it.')
+    parser.add_argument('--scheduling-policy',
+                        type=str,
+                        choices=['fcfs', 'priority', 'prefix_aware', 'srpt'],
+                        default='fcfs')
+
+    # Fake model step time.
+    parser.add_argument('--step-time-base-ms', type=float, default=10.0)
+    parser.add_argument('--step-time-per-token-us', type=float, default=50.0)
+    parser.add_argument('--swap-time-per-block-us',
+                        type=float,
+                        default=0.0,
+                        help='Time to swap a block in or out, added to the '
+                        'step time.')
+    args = parser.parse_args()
+    main(args)
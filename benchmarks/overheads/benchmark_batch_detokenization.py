@@ -0,0 +1,93 @@
+"""Microbenchmark of the incremental detokenization of the new tokens of the
+concurrent sequences of a step.
+
+Appends a token at a time to concurrent sequences with a byte-level fast
+tokenizer, and decodes them either one by one with
+Detokenizer.decode_sequence_inplace, as done by the output processor, or all
+together with Detokenizer.decode_sequences_inplace, as done with batch
+detokenization. Reports the decode throughput in tokens/s.
+"""
+import random
+import time
+from typing import List
+
+from tokenizers import Tokenizer, decoders, models
+from transformers import PreTrainedTokenizerFast
+
+from vllm.sequence import Logprob, SamplingParams, Sequence
+from vllm.transformers_utils.detokenizer import Detokenizer
+from vllm.transformers_utils.tokenizer import (AnyTokenizer,
+                                               get_cached_tokenizer)
+from vllm.utils import FlexibleArgumentParser
+
+VOCAB_SIZE = 32000
+
+
+class _TokenizerGroup:
+
+    def __init__(self, tokenizer: AnyTokenizer):
+        self.tokenizer = tokenizer
+
+    def get_lora_tokenizer(self, lora_request=None) -> AnyTokenizer:
+        return self.tokenizer
+
+
+def make_tokenizer() -> AnyTokenizer:
+    # Byte-level tokens, as those of the Llama 3 and GPT tokenizers.
+    vocab = {"</s>": 0}
+    for i in range(1, VOCAB_SIZE):
+        vocab[f"Ġw{i}" if i % 3 else f"w{i}"] = i
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="</s>"))
+    tokenizer.decoder = decoders.ByteLevel()
+    return get_cached_tokenizer(
+        PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="</s>"))
+
+
+def run(args, detokenizer: Detokenizer, num_seqs: int, batched: bool) -> float:
+    random.seed(0)
+    sampling_params = SamplingParams()
+    seqs: List[Sequence] = [
+        Sequence(i, {
+            "prompt": "",
+            "prompt_token_ids": random.choices(range(VOCAB_SIZE),
+                                               k=args.prompt_len)
+        },
+                 block_size=16) for i in range(num_seqs)
+    ]
+    params = [sampling_params] * num_seqs
+
+    elapsed = 0.0
+    for _ in range(args.output_len):
+        for seq in seqs:
+            token_id = random.randrange(1, VOCAB_SIZE)
+            seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+        start = time.perf_counter()
+        if batched:
+            detokenizer.decode_sequences_inplace(seqs, params)
+        else:
+            for seq in seqs:
+                detokenizer.decode_sequence_inplace(seq, sampling_params)
+        elapsed += time.perf_counter() - start
+    return num_seqs * args.output_len / elapsed
+
+
+def main(args):
+    detokenizer = Detokenizer(_TokenizerGroup(make_tokenizer()))
+    print(f"{args.prompt_len} prompt tokens, {args.output_len} output tokens")
+    print(f"{'sequences':>9} {'one by one (tokens/s)':>22} "
+          f"{'batched (tokens/s)':>19}")
+    for num_seqs in args.num_seqs:
+        sequential = run(args, detokenizer, num_seqs, batched=False)
+        batched = run(args, detokenizer, num_seqs, batched=True)
+        print(f"{num_seqs:>9} {sequential:>22.0f} {batched:>19.0f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the incremental detokenization of the new '
+        'tokens of concurrent sequences.')
+    parser.add_argument('--num-seqs', type=int, nargs='+', default=[256, 2048])
+    parser.add_argument('--prompt-len', type=int, default=64)
+    parser.add_argument('--output-len', type=int, default=64)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,164 @@
+"""Benchmark of the engine loop utilization with and without async
+detokenization, and with the synchronous batch detokenization it overlaps.
+
+Runs a real LLMEngine, with a fast tokenizer, on top of the dummy executor of
+benchmark_engine_step.py, whose execute_model sleeps for a fixed time to stand
+for the forward pass of the model, which does not hold the GIL. Reports the
+fraction of the wall time of the generation spent in execute_model, i.e., in
+the model, and the mean time of a step outside of it, as the medians of
+several runs.
+"""
+import json
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+from benchmark_engine_step import MODEL_CONFIG, DummyExecutor
+from tokenizers import Tokenizer, decoders, models
+from transformers import PreTrainedTokenizerFast
+
+from vllm.engine.arg_utils import EngineArgs
+from vllm.engine.llm_engine import LLMEngine
+from vllm.inputs import TokensPrompt
+from vllm.model_executor.layers.sampler import SamplerOutput
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import (CompletionSequenceGroupOutput, ExecuteModelRequest,
+                           Logprob, SequenceOutput)
+from vllm.utils import FlexibleArgumentParser
+
+VOCAB_SIZE = MODEL_CONFIG["vocab_size"]
+
+
+class SleepingExecutor(DummyExecutor):
+    """Samples a different token for every sequence and step, and sleeps for
+    model_time seconds."""
+
+    model_time = 0.0
+
+    def execute_model(
+        self, execute_model_req: ExecuteModelRequest
+    ) -> Optional[List[SamplerOutput]]:
+        start = time.perf_counter()
+        outputs = []
+        for seq_group_metadata in execute_model_req.seq_group_metadata_list:
+            samples = []
+            if seq_group_metadata.do_sample:
+                for seq_id, seq_data in seq_group_metadata.seq_data.items():
+                    token_id = (seq_id * 7919 +
+                                seq_data.get_len() * 104729) % VOCAB_SIZE
+                    samples.append(
+                        SequenceOutput(seq_id, token_id,
+                                       {token_id: Logprob(0.0)}))
+            outputs.append(CompletionSequenceGroupOutput(samples, None))
+        time.sleep(max(self.model_time - (time.perf_counter() - start), 0))
+        self.execute_time += time.perf_counter() - start
+        return [SamplerOutput(outputs=outputs)]
+
+
+def save_tokenizer(model_dir: str) -> None:
+    # Byte-level tokens, as those of the Llama 3 and GPT tokenizers.
+    vocab = {"</s>": 0}
+    for i in range(1, VOCAB_SIZE):
+        vocab[f"Ġw{i}" if i % 3 else f"w{i}"] = i
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="</s>"))
+    tokenizer.decoder = decoders.ByteLevel()
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer,
+                            eos_token="</s>").save_pretrained(model_dir)
+
+
+def run(args, model_dir: str, async_detokenization: bool,
+        batch_detokenization: bool) -> List[float]:
+    max_model_len = args.prompt_len + args.output_len + 1
+    engine_args = EngineArgs(
+        model=model_dir,
+        device="cpu",
+        max_model_len=max_model_len,
+        max_num_seqs=args.num_seqs,
+        max_num_batched_tokens=max(args.num_seqs * args.prompt_len,
+                                   max_model_len),
+        swap_space=0,
+        num_gpu_blocks_override=2 * args.num_seqs * (max_model_len // 16 + 1),
+        disable_log_stats=True,
+        async_detokenization=async_detokenization,
+        batch_detokenization=batch_detokenization)
+    engine_config = engine_args.create_engine_config()
+    engine = LLMEngine(**engine_config.to_dict(),
+                       executor_class=SleepingExecutor,
+                       log_stats=False)
+    executor = engine.model_executor
+    assert isinstance(executor, SleepingExecutor)
+    executor.model_time = args.model_time_ms / 1e3
+
+    sampling_params = SamplingParams(max_tokens=args.output_len,
+                                     ignore_eos=True,
+                                     stop=args.stop)
+    for i in range(args.num_seqs):
+        prompt_token_ids = [(i + j) % VOCAB_SIZE
+                            for j in range(args.prompt_len)]
+        engine.add_request(str(i),
+                           TokensPrompt(prompt_token_ids=prompt_token_ids),
+                           sampling_params)
+
+    num_steps = 0
+    num_tokens = 0
+    executor.execute_time = 0.0
+    start = time.perf_counter()
+    while engine.has_unfinished_requests():
+        for request_output in engine.step():
+            if request_output.finished:
+                num_tokens += len(request_output.outputs[0].token_ids)
+        num_steps += 1
+    elapsed = time.perf_counter() - start
+    assert num_tokens == args.num_seqs * args.output_len
+    return [
+        executor.execute_time / elapsed,
+        (elapsed - executor.execute_time) / num_steps * 1e3,
+        num_tokens / elapsed,
+    ]
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as model_dir:
+        with open(f"{model_dir}/config.json", "w") as f:
+            json.dump(MODEL_CONFIG, f)
+        save_tokenizer(model_dir)
+
+        print(f"{args.num_seqs} sequences, {args.output_len} output tokens, "
+              f"{args.model_time_ms} ms per forward pass, stop={args.stop!r}")
+        print(f"{'detokenization':<21} {'utilization':>11} "
+              f"{'overhead/step (ms)':>19} {'tokens/s':>10}")
+        for name, async_detokenization, batch_detokenization in (
+            ("sync", False, False),
+            ("sync batch", False, True),
+            ("async", True, False),
+        ):
+            results = [
+                run(args, model_dir, async_detokenization,
+                    batch_detokenization) for _ in range(args.num_iters)
+            ]
+            utilization, overhead, throughput = np.median(results, axis=0)
+            print(f"{name:<21} {utilization:>11.1%} "
+                  f"{overhead:>19.2f} {throughput:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the engine loop utilization with and without '
+        'async detokenization.')
+    parser.add_argument('--num-seqs', type=int, default=256)
+    parser.add_argument('--prompt-len', type=int, default=64)
+    parser.add_argument('--output-len', type=int, default=128)
+    parser.add_argument('--model-time-ms', type=float, default=10.0)
+    parser.add_argument('--num-iters',
+                        type=int,
+                        default=3,
+                        help='Number of runs of each mode.')
+    parser.add_argument('--stop',
+                        type=str,
+                        nargs='*',
+                        default=["\n\n"],
+                        help='Stop strings, which are checked but never '
+                        'emitted by default.')
+    args = parser.parse_args()
+    main(args)
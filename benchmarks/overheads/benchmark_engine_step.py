@@ -0,0 +1,182 @@
+"""Microbenchmark of the CPU overhead of LLMEngine.step().
+
+Runs a real LLMEngine, with its scheduler, block manager and output
+processing, on top of a dummy executor that samples a fixed token for every
+sequence without running any model. The configuration of a small Llama model
+is written to a temporary directory, so that no weights or tokenizer are
+needed. Reports the total time of the prefill steps and the median time of
+the decode steps per concurrency level, without the time spent in the dummy
+executor, which are all engine overhead.
+"""
+import json
+import statistics
+import tempfile
+import time
+from typing import List, Optional, Set, Tuple
+
+from vllm.engine.arg_utils import EngineArgs
+from vllm.engine.llm_engine import LLMEngine
+from vllm.executor.executor_base import ExecutorBase
+from vllm.inputs import TokensPrompt
+from vllm.model_executor.layers.sampler import SamplerOutput
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import (CompletionSequenceGroupOutput, ExecuteModelRequest,
+                           Logprob, SequenceOutput)
+from vllm.utils import FlexibleArgumentParser
+
+MODEL_CONFIG = {
+    "architectures": ["LlamaForCausalLM"],
+    "model_type": "llama",
+    "hidden_size": 64,
+    "intermediate_size": 128,
+    "num_attention_heads": 4,
+    "num_hidden_layers": 1,
+    "num_key_value_heads": 4,
+    "vocab_size": 32000,
+    "max_position_embeddings": 4096,
+    "torch_dtype": "float32",
+}
+
+
+class DummyExecutor(ExecutorBase):
+    """Samples token 0 for every running sequence."""
+
+    uses_ray = False
+
+    def _init_executor(self) -> None:
+        # Time spent in execute_model, excluded from the engine overhead.
+        self.execute_time = 0.0
+
+    def determine_num_available_blocks(self) -> Tuple[int, int]:
+        # Overridden by --num-gpu-blocks-override.
+        return 0, 0
+
+    def initialize_cache(self, num_gpu_blocks: int,
+                         num_cpu_blocks: int) -> None:
+        pass
+
+    def execute_model(
+        self, execute_model_req: ExecuteModelRequest
+    ) -> Optional[List[SamplerOutput]]:
+        start = time.perf_counter()
+        outputs = []
+        for seq_group_metadata in execute_model_req.seq_group_metadata_list:
+            samples = []
+            if seq_group_metadata.do_sample:
+                samples = [
+                    SequenceOutput(seq_id, 0, {0: Logprob(0.0)})
+                    for seq_id in seq_group_metadata.seq_data
+                ]
+            outputs.append(CompletionSequenceGroupOutput(samples, None))
+        self.execute_time += time.perf_counter() - start
+        return [SamplerOutput(outputs=outputs)]
+
+    def add_lora(self, lora_request) -> bool:
+        raise NotImplementedError
+
+    def remove_lora(self, lora_id: int) -> bool:
+        raise NotImplementedError
+
+    def pin_lora(self, lora_id: int) -> bool:
+        raise NotImplementedError
+
+    def list_loras(self) -> Set[int]:
+        return set()
+
+    def add_prompt_adapter(self, prompt_adapter_request) -> bool:
+        raise NotImplementedError
+
+    def remove_prompt_adapter(self, prompt_adapter_id: int) -> bool:
+        raise NotImplementedError
+
+    def pin_prompt_adapter(self, prompt_adapter_id: int) -> bool:
+        raise NotImplementedError
+
+    def list_prompt_adapters(self) -> Set[int]:
+        return set()
+
+    def check_health(self) -> None:
+        return
+
+
+def make_engine(args, model_dir: str, num_seqs: int) -> LLMEngine:
+    max_model_len = args.prompt_len + args.num_decode_steps + 1
+    engine_args = EngineArgs(
+        model=model_dir,
+        skip_tokenizer_init=True,
+        device="cpu",
+        max_model_len=max_model_len,
+        max_num_seqs=num_seqs,
+        max_num_batched_tokens=max(num_seqs * args.prompt_len,
+                                   max_model_len),
+        block_size=args.block_size,
+        swap_space=0,
+        num_gpu_blocks_override=2 * num_seqs *
+        (max_model_len // args.block_size + 1),
+        enable_prefix_caching=args.enable_prefix_caching,
+        enable_chunked_prefill=args.enable_chunked_prefill,
+        disable_async_output_proc=not args.async_output_proc,
+        disable_log_stats=not args.log_stats)
+    engine_config = engine_args.create_engine_config()
+    return LLMEngine(**engine_config.to_dict(),
+                     executor_class=DummyExecutor,
+                     log_stats=args.log_stats)
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as model_dir:
+        with open(f"{model_dir}/config.json", "w") as f:
+            json.dump(MODEL_CONFIG, f)
+
+        print(f"{'num_seqs':>10} {'prefill steps (ms)':>19} "
+              f"{'decode step (ms)':>17}")
+        for num_seqs in args.num_seqs:
+            engine = make_engine(args, model_dir, num_seqs)
+            sampling_params = SamplingParams(
+                max_tokens=args.num_decode_steps + 1,
+                ignore_eos=True,
+                detokenize=False)
+            for i in range(num_seqs):
+                prompt_token_ids = [(i + j) % 32000
+                                    for j in range(args.prompt_len)]
+                engine.add_request(
+                    str(i), TokensPrompt(prompt_token_ids=prompt_token_ids),
+                    sampling_params)
+
+            executor = engine.model_executor
+            assert isinstance(executor, DummyExecutor)
+            start = time.perf_counter()
+            while engine.scheduler[0].waiting:
+                engine.step()
+            prefill_time = (time.perf_counter() - start -
+                            executor.execute_time)
+            decode_times = []
+            for _ in range(args.num_decode_steps):
+                executor.execute_time = 0.0
+                start = time.perf_counter()
+                engine.step()
+                decode_times.append(time.perf_counter() - start -
+                                    executor.execute_time)
+            while engine.has_unfinished_requests():
+                engine.step()
+            print(f"{num_seqs:>10} {prefill_time * 1e3:>19.2f} "
+                  f"{statistics.median(decode_times) * 1e3:>17.2f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the CPU time of LLMEngine.step() against the '
+        'number of concurrent sequences, with a dummy executor.')
+    parser.add_argument('--num-seqs',
+                        type=int,
+                        nargs='+',
+                        default=[256, 1024, 4096])
+    parser.add_argument('--prompt-len', type=int, default=64)
+    parser.add_argument('--num-decode-steps', type=int, default=50)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--enable-prefix-caching', action='store_true')
+    parser.add_argument('--enable-chunked-prefill', action='store_true')
+    parser.add_argument('--async-output-proc', action='store_true')
+    parser.add_argument('--log-stats', action='store_true')
+    args = parser.parse_args()
+    main(args)
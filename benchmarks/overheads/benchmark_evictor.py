@@ -0,0 +1,82 @@
+"""Microbenchmark of the prefix caching evictors.
+
+Measures the per-call cost of `add`, `update` and `evict` for each
+EvictionPolicy as a function of the number of free blocks held by the
+evictor.
+"""
+import random
+import time
+
+from vllm.core.evictor_v2 import EvictionPolicy, make_evictor
+from vllm.utils import FlexibleArgumentParser
+
+
+def bench_policy(policy: EvictionPolicy, num_free_blocks: int,
+                 num_ops: int, block_size: int, seed: int) -> dict:
+    random.seed(seed)
+    evictor = make_evictor(policy)
+
+    # Fill the free pool.
+    start = time.perf_counter()
+    for block_id in range(num_free_blocks):
+        evictor.add(block_id, hash(block_id),
+                    random.randint(1, 512) * block_size,
+                    float(random.randint(0, num_free_blocks)))
+    add_us = (time.perf_counter() - start) / num_free_blocks * 1e6
+
+    # Touch random blocks, as mark_blocks_as_accessed does.
+    now = float(num_free_blocks)
+    update_ids = [random.randrange(num_free_blocks) for _ in range(num_ops)]
+    start = time.perf_counter()
+    for block_id in update_ids:
+        now += 1
+        evictor.update(block_id, now)
+    update_us = (time.perf_counter() - start) / num_ops * 1e6
+
+    # Steady state under memory pressure: evict one block and return
+    # another one to the pool, so the pool size stays constant.
+    next_block_id = num_free_blocks
+    start = time.perf_counter()
+    for _ in range(num_ops):
+        evictor.evict()
+        now += 1
+        evictor.add(next_block_id, hash(next_block_id), block_size, now)
+        next_block_id += 1
+    evict_us = (time.perf_counter() - start) / num_ops * 1e6
+
+    return dict(add_us=add_us, update_us=update_us, evict_us=evict_us)
+
+
+def main(args):
+    policies = [EvictionPolicy[name.upper()] for name in args.policies]
+    print(f"{'policy':>10} {'free_blocks':>12} {'add (us)':>10} "
+          f"{'update (us)':>12} {'evict+add (us)':>15}")
+    for num_free_blocks in args.num_free_blocks:
+        for policy in policies:
+            # The linear scan is too slow to run many ops on large pools.
+            num_ops = min(args.num_ops, max(1, 10**8 // num_free_blocks)) \
+                if policy == EvictionPolicy.LRU else args.num_ops
+            result = bench_policy(policy, num_free_blocks, num_ops,
+                                  args.block_size, args.seed)
+            print(f"{policy.name:>10} {num_free_blocks:>12} "
+                  f"{result['add_us']:>10.2f} {result['update_us']:>12.2f} "
+                  f"{result['evict_us']:>15.2f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the cost of evictor operations in '
+        'automatic prefix caching against the free pool size.')
+    parser.add_argument('--policies',
+                        nargs='+',
+                        default=['lru', 'heap_lru'],
+                        help='eviction policies to compare')
+    parser.add_argument('--num-free-blocks',
+                        type=int,
+                        nargs='+',
+                        default=[1000, 10000, 100000, 500000])
+    parser.add_argument('--num-ops', type=int, default=10000)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args)
@@ -1,8 +1,13 @@
 import cProfile
+import gc
 import pstats
+import random
+import time
 
 from vllm import LLM, SamplingParams
-from vllm.utils import FlexibleArgumentParser
+from vllm.core.block.prefix_caching_block import PrefixCachingBlock
+from vllm.sequence import Logprob, Sequence
+from vllm.utils import BLOCK_HASH_ALGORITHM, FlexibleArgumentParser
 
 # A very long prompt, total number of tokens is about 15k.
 LONG_PROMPT = ["You are an expert in large language models, aren't you?"
@@ -10,7 +15,84 @@ LONG_PROMPT = ["You are an expert in large language models, aren't you?"
 LONG_PROMPT = ' '.join(LONG_PROMPT)
 
 
+def hash_token_blocks(token_ids, block_size):
+    """Hashes every full block of the token ids from scratch, as was done
+    per sequence at each admission before block hashes were cached."""
+    prev_block_hash = None
+    for start in range(0, len(token_ids) - block_size + 1, block_size):
+        prev_block_hash = PrefixCachingBlock.hash_block_tokens(
+            prev_block_hash is None, prev_block_hash,
+            token_ids[start:start + block_size])
+
+
+def run_microbenchmark(args):
+    """Compares the rehashing of a sequence at each admission with the
+    incremental hash chain kept by `Sequence`, without a model."""
+    random.seed(0)
+    token_ids = [
+        random.randint(0, 50_000) for _ in range(args.num_prompt_tokens)
+    ]
+    print(f"Block hash: {BLOCK_HASH_ALGORITHM}, "
+          f"{args.num_prompt_tokens} prompt tokens, "
+          f"block size {args.block_size}")
+
+    def report(name, seconds, num_calls=1):
+        print(f"{name:<46} {seconds / num_calls * 1e3:10.3f} ms")
+
+    start = time.perf_counter()
+    for _ in range(args.num_iters):
+        hash_token_blocks(token_ids, args.block_size)
+    report("rehash all blocks (per admission)", time.perf_counter() - start,
+           args.num_iters)
+
+    seqs = [
+        Sequence(i, {"prompt_token_ids": token_ids},
+                 block_size=args.block_size) for i in range(args.num_iters)
+    ]
+    start = time.perf_counter()
+    for seq in seqs:
+        seq.get_block_hashes()
+    report("Sequence.get_block_hashes (first call)",
+           time.perf_counter() - start, args.num_iters)
+
+    # A preempted sequence is admitted again with its hashes cached.
+    start = time.perf_counter()
+    for seq in seqs:
+        seq.reset_state_for_recompute()
+        seq.get_block_hashes()
+    report("Sequence.get_block_hashes (readmission)",
+           time.perf_counter() - start, args.num_iters)
+
+    # Decode: rehashing the whole sequence per new block vs extending the
+    # chain by one block.
+    seq = seqs[0]
+    # Keep collections of the sampled logprobs out of the timings.
+    gc.collect()
+    gc.disable()
+    num_decode_blocks = max(1, args.output_len // args.block_size)
+    new_token_ids = list(range(num_decode_blocks * args.block_size))
+    start = time.perf_counter()
+    for i in range(num_decode_blocks):
+        hash_token_blocks(token_ids + new_token_ids[:(i + 1) * args.block_size],
+                          args.block_size)
+    report("rehash all blocks (per decoded block)",
+           time.perf_counter() - start, num_decode_blocks)
+    elapsed = 0.0
+    for token_id in new_token_ids:
+        seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+        start = time.perf_counter()
+        seq.get_block_hashes()
+        elapsed += time.perf_counter() - start
+    report("Sequence.get_block_hashes (per decoded block)", elapsed,
+           num_decode_blocks)
+    gc.enable()
+
+
 def main(args):
+    if args.microbenchmark:
+        run_microbenchmark(args)
+        return
+
     llm = LLM(
         model=args.model,
         enforce_eager=True,
@@ -37,7 +119,7 @@ def main(args):
     total_time = 0
     total_calls = 0
     for func in stats.stats:
-        if 'hash_of_block' in func[2]:
+        if 'hash_block_token_ids' in func[2]:
             total_time = stats.stats[func][3]
             total_calls = stats.stats[func][0]
     percentage = (total_time / stats.total_tt) * 100
@@ -55,5 +137,12 @@ if __name__ == "__main__":
     parser.add_argument('--enable-prefix-caching',
                         action='store_true',
                         help='enable prefix caching')
+    parser.add_argument('--microbenchmark',
+                        action='store_true',
+                        help='time the block hashing of a sequence without '
+                        'running a model')
+    parser.add_argument('--num-prompt-tokens', type=int, default=16384)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--num-iters', type=int, default=20)
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,99 @@
+"""Microbenchmark of the serialization of the sequence group metadata sent to
+workers in other processes at every step.
+
+Decodes a batch of sequences and, at every step, serializes the
+ExecuteModelRequest built from the full SequenceGroupMetadata, as with msgspec
+for the Ray SPMD workers and with pickle for the CPU workers, with and without
+the delta transfer of the metadata. Reports the mean number of bytes per step
+and the mean time to serialize and deserialize a step, including the encoding
+and the application of the deltas.
+"""
+import pickle
+import time
+from typing import Callable, Dict, List, Tuple
+
+import msgspec
+
+from vllm.executor.msgspec_utils import decode_hook, encode_hook
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import (ExecuteModelRequest, SequenceData,
+                           SequenceGroupMetadata)
+from vllm.utils import FlexibleArgumentParser
+from vllm.worker.seq_group_metadata_delta import (
+    SequenceGroupMetadataDecoder, SequenceGroupMetadataEncoder)
+
+Serializer = Tuple[Callable[[ExecuteModelRequest], bytes],
+                   Callable[[bytes], ExecuteModelRequest]]
+
+
+def get_serializers() -> Dict[str, Serializer]:
+    encoder = msgspec.msgpack.Encoder(enc_hook=encode_hook)
+    decoder = msgspec.msgpack.Decoder(ExecuteModelRequest,
+                                      dec_hook=decode_hook)
+    return {
+        "msgspec": (encoder.encode, decoder.decode),
+        "pickle": (pickle.dumps, pickle.loads),
+    }
+
+
+def run(args, serializer: Serializer, send_delta_data: bool) -> List[float]:
+    serialize, deserialize = serializer
+    metadata_encoder = SequenceGroupMetadataEncoder()
+    metadata_decoder = SequenceGroupMetadataDecoder()
+    block_size = 16
+    seq_data = [
+        SequenceData.from_seqs([(i + j) % 32000
+                                for j in range(args.prompt_len)])
+        for i in range(args.num_seqs)
+    ]
+    sampling_params = SamplingParams()
+
+    num_bytes = 0
+    elapsed = 0.0
+    for step in range(args.num_steps):
+        for data in seq_data:
+            data.append_token_id(step % 32000, 0.0)
+        seq_group_metadata_list = [
+            SequenceGroupMetadata(
+                request_id=str(i),
+                is_prompt=False,
+                seq_data={i: data},
+                sampling_params=sampling_params,
+                block_tables={i: list(range(data.get_len() // block_size))},
+            ) for i, data in enumerate(seq_data)
+        ]
+        req = ExecuteModelRequest(
+            seq_group_metadata_list=seq_group_metadata_list)
+
+        start = time.perf_counter()
+        if send_delta_data:
+            req = metadata_encoder.encode(req)
+        serialized_req = serialize(req)
+        received_req = deserialize(serialized_req)
+        metadata_decoder.decode(received_req)
+        elapsed += time.perf_counter() - start
+        num_bytes += len(serialized_req)
+    return [num_bytes / args.num_steps, elapsed / args.num_steps * 1e3]
+
+
+def main(args):
+    print(f"{args.num_seqs} sequences with {args.prompt_len}-token prompts, "
+          f"{args.num_steps} decode steps")
+    print(f"{'serializer':<10} {'delta':>6} {'bytes/step':>12} "
+          f"{'ms/step':>9}")
+    for name, serializer in get_serializers().items():
+        for send_delta_data in (False, True):
+            num_bytes, step_time = run(args, serializer, send_delta_data)
+            print(f"{name:<10} {str(send_delta_data):>6} {num_bytes:>12.0f} "
+                  f"{step_time:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the serialization of the sequence group '
+        'metadata per step, with and without delta transfer.')
+    parser.add_argument('--num-seqs', type=int, default=256)
+    parser.add_argument('--prompt-len', type=int, default=512)
+    parser.add_argument('--num-steps', type=int, default=50)
+    args = parser.parse_args()
+    main(args)
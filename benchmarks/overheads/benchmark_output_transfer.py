@@ -0,0 +1,112 @@
+"""Microbenchmark of the transfer of the RequestOutputs of a step from the
+MQLLMEngine to its client.
+
+Streams the cumulative RequestOutputs of concurrent requests, as the engine
+builds them at every decode step, and transfers them either pickled or as the
+compact deltas of RequestOutputEncoder, which the client rebuilds into
+RequestOutputs with a RequestOutputDecoder per request. Reports the mean
+number of bytes per step and the mean time to encode and to decode a step.
+"""
+import pickle
+import time
+from typing import Dict, List
+
+from vllm.engine.multiprocessing.request_output_delta import (
+    RequestOutputDecoder, RequestOutputEncoder, decode_request_output_deltas)
+from vllm.outputs import CompletionOutput, RequestOutput
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import Logprob, RequestMetrics
+from vllm.utils import FlexibleArgumentParser
+
+
+def create_outputs(args, step: int,
+                   token_ids: List[List[int]]) -> List[RequestOutput]:
+    outputs = []
+    for i, ids in enumerate(token_ids):
+        ids.append((i + step) % 32000)
+        logprobs = None
+        if args.logprobs:
+            logprobs = [{
+                token_id: Logprob(-1.0, 1, f" tok{token_id}")
+            } for token_id in ids]
+        outputs.append(
+            RequestOutput(
+                request_id=str(i),
+                prompt="x" * args.prompt_len * 4,
+                prompt_token_ids=list(range(args.prompt_len)),
+                prompt_logprobs=None,
+                outputs=[
+                    CompletionOutput(index=0,
+                                     text="".join(f" tok{t}" for t in ids),
+                                     token_ids=tuple(ids),
+                                     cumulative_logprob=-1.0 * len(ids),
+                                     logprobs=logprobs)
+                ],
+                finished=False,
+                metrics=RequestMetrics(arrival_time=0.0,
+                                       last_token_time=1.0,
+                                       first_scheduled_time=0.0,
+                                       first_token_time=1.0,
+                                       time_in_queue=0.0)))
+    return outputs
+
+
+def run(args, compact: bool) -> List[float]:
+    encoder = RequestOutputEncoder()
+    decoders: Dict[str, RequestOutputDecoder] = {}
+    for i in range(args.num_streams):
+        encoder.add_request(str(i), SamplingParams())
+        decoders[str(i)] = RequestOutputDecoder()
+    token_ids: List[List[int]] = [[] for _ in range(args.num_streams)]
+
+    num_bytes = 0
+    encode_time = 0.0
+    decode_time = 0.0
+    for step in range(args.num_steps):
+        request_outputs = create_outputs(args, step, token_ids)
+
+        start = time.perf_counter()
+        if compact:
+            data = encoder.encode(request_outputs)
+        else:
+            data = pickle.dumps(request_outputs)
+        encode_time += time.perf_counter() - start
+        num_bytes += len(data)
+
+        start = time.perf_counter()
+        if compact:
+            received = [
+                decoders[delta.request_id].decode(delta)
+                for delta in decode_request_output_deltas(data)
+            ]
+        else:
+            received = pickle.loads(data)
+        decode_time += time.perf_counter() - start
+        assert len(received) == args.num_streams
+    return [
+        num_bytes / args.num_steps, encode_time / args.num_steps * 1e3,
+        decode_time / args.num_steps * 1e3
+    ]
+
+
+def main(args):
+    print(f"{args.num_streams} streams with {args.prompt_len}-token prompts, "
+          f"{args.num_steps} decode steps, logprobs={args.logprobs}")
+    print(f"{'format':<8} {'bytes/step':>12} {'encode ms':>10} "
+          f"{'decode ms':>10}")
+    for compact in (False, True):
+        num_bytes, encode_time, decode_time = run(args, compact)
+        print(f"{'compact' if compact else 'pickle':<8} {num_bytes:>12.0f} "
+              f"{encode_time:>10.2f} {decode_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the transfer of the RequestOutputs of a step '
+        'from the MQLLMEngine to its client.')
+    parser.add_argument('--num-streams', type=int, default=512)
+    parser.add_argument('--prompt-len', type=int, default=256)
+    parser.add_argument('--num-steps', type=int, default=256)
+    parser.add_argument('--logprobs', action='store_true')
+    args = parser.parse_args()
+    main(args)
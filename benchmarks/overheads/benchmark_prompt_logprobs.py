@@ -0,0 +1,67 @@
+"""Microbenchmark of the detokenization of the prompt logprobs of a scoring
+request.
+
+Decodes the top-k candidate tokens of every prompt position of a long prompt
+with Detokenizer.decode_prompt_logprobs_inplace, with the byte-level fast
+tokenizer of benchmark_batch_detokenization.py. The first request fills the
+token string caches of the tokenizer, which the next ones reuse. Reports the
+time to decode the prompt logprobs of each request.
+"""
+import random
+import time
+from typing import Dict, List, Optional
+
+from benchmark_batch_detokenization import (VOCAB_SIZE, _TokenizerGroup,
+                                            make_tokenizer)
+
+from vllm.sequence import Logprob, SamplingParams, Sequence, SequenceGroup
+from vllm.transformers_utils.detokenizer import Detokenizer
+from vllm.utils import FlexibleArgumentParser
+
+
+def run(args, detokenizer: Detokenizer) -> float:
+    prompt_token_ids = random.choices(range(VOCAB_SIZE), k=args.prompt_len)
+    # Most candidates are among the frequent tokens.
+    frequent_token_ids = range(args.num_frequent_tokens)
+    prompt_logprobs: List[Optional[Dict[int, Logprob]]] = [None]
+    for token_id in prompt_token_ids[1:]:
+        logprobs = {token_id: Logprob(0.0)}
+        while len(logprobs) <= args.prompt_logprobs:
+            logprobs[random.choice(frequent_token_ids)] = Logprob(-1.0)
+        prompt_logprobs.append(logprobs)
+
+    seq = Sequence(0, {
+        "prompt": "",
+        "prompt_token_ids": prompt_token_ids
+    },
+                   block_size=16)
+    seq_group = SequenceGroup(
+        request_id="0",
+        seqs=[seq],
+        arrival_time=0.0,
+        sampling_params=SamplingParams(prompt_logprobs=args.prompt_logprobs))
+    start = time.perf_counter()
+    detokenizer.decode_prompt_logprobs_inplace(seq_group,
+                                               prompt_logprobs,
+                                               position_offset=0)
+    return time.perf_counter() - start
+
+
+def main(args):
+    random.seed(0)
+    detokenizer = Detokenizer(_TokenizerGroup(make_tokenizer()))
+    print(f"{args.prompt_len} prompt tokens, "
+          f"prompt_logprobs={args.prompt_logprobs}")
+    for i in range(args.num_requests):
+        print(f"request {i}: {run(args, detokenizer):.3f} s")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the detokenization of prompt logprobs.')
+    parser.add_argument('--prompt-len', type=int, default=8192)
+    parser.add_argument('--prompt-logprobs', type=int, default=20)
+    parser.add_argument('--num-frequent-tokens', type=int, default=4096)
+    parser.add_argument('--num-requests', type=int, default=3)
+    args = parser.parse_args()
+    main(args)
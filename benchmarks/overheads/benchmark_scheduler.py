@@ -0,0 +1,99 @@
+"""Microbenchmark of the CPU overhead of Scheduler.schedule().
+
+Drives the scheduler with synthetic sequence groups and a fake model step
+that appends one token per running sequence, without any model or GPU.
+Reports the time of the prefill step that admits all the requests and the
+mean time of the following decode steps, per concurrency level.
+"""
+import time
+
+from vllm.config import CacheConfig, SchedulerConfig
+from vllm.core.scheduler import Scheduler
+from vllm.inputs import token_inputs
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import Logprob, Sequence, SequenceGroup
+from vllm.utils import FlexibleArgumentParser, cdiv
+
+
+def make_scheduler(args, num_seqs: int) -> Scheduler:
+    max_model_len = args.prompt_len + args.num_decode_steps + 1
+    scheduler_config = SchedulerConfig(
+        "generate",
+        max_num_batched_tokens=max(num_seqs * args.prompt_len,
+                                   max_model_len),
+        max_num_seqs=num_seqs,
+        max_model_len=max_model_len,
+        enable_chunked_prefill=args.enable_chunked_prefill)
+    cache_config = CacheConfig(args.block_size,
+                               1.0,
+                               1,
+                               "auto",
+                               enable_prefix_caching=args.enable_prefix_caching)
+    # Enough blocks for all the sequences, above the allocation watermark.
+    cache_config.num_gpu_blocks = 2 * num_seqs * cdiv(max_model_len,
+                                                      args.block_size)
+    cache_config.num_cpu_blocks = 0
+    return Scheduler(scheduler_config, cache_config, None)
+
+
+def add_requests(scheduler: Scheduler, args, num_seqs: int) -> None:
+    for i in range(num_seqs):
+        prompt_token_ids = [(i + j) % 32000 for j in range(args.prompt_len)]
+        seq = Sequence(i,
+                       token_inputs(prompt_token_ids),
+                       block_size=args.block_size)
+        scheduler.add_seq_group(
+            SequenceGroup(request_id=str(i),
+                          seqs=[seq],
+                          arrival_time=time.time(),
+                          sampling_params=SamplingParams(
+                              max_tokens=args.num_decode_steps)))
+
+
+def step(scheduler: Scheduler) -> float:
+    """Schedules one step and emulates its model execution."""
+    start = time.perf_counter()
+    metas, out, _ = scheduler.schedule()
+    elapsed = time.perf_counter() - start
+    for scheduled_seq_group in out.scheduled_seq_groups:
+        seq_group = scheduled_seq_group.seq_group
+        seq_group.update_num_computed_tokens(
+            scheduled_seq_group.token_chunk_size)
+        if not seq_group.is_prefill():
+            for seq in seq_group.get_seqs():
+                seq.append_token_id(0, {0: Logprob(0.0)})
+    return elapsed
+
+
+def main(args):
+    print(f"{'num_seqs':>10} {'prefill step (ms)':>18} "
+          f"{'decode step (ms)':>17}")
+    for num_seqs in args.num_seqs:
+        scheduler = make_scheduler(args, num_seqs)
+        add_requests(scheduler, args, num_seqs)
+
+        prefill_time = 0.0
+        while scheduler.waiting:
+            prefill_time += step(scheduler)
+        decode_time = sum(
+            step(scheduler) for _ in range(args.num_decode_steps))
+        assert not scheduler.swapped and len(scheduler.running) == num_seqs
+        print(f"{num_seqs:>10} {prefill_time * 1e3:>18.2f} "
+              f"{decode_time / args.num_decode_steps * 1e3:>17.2f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the CPU time of Scheduler.schedule() against '
+        'the number of concurrent sequences.')
+    parser.add_argument('--num-seqs',
+                        type=int,
+                        nargs='+',
+                        default=[100, 1000, 10000])
+    parser.add_argument('--prompt-len', type=int, default=64)
+    parser.add_argument('--num-decode-steps', type=int, default=20)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--enable-prefix-caching', action='store_true')
+    parser.add_argument('--enable-chunked-prefill', action='store_true')
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,89 @@
+"""Microbenchmark of the stop string checks of the StopChecker.
+
+Appends the text of a token at a time to the output text of concurrent
+sequences, and checks them for stop strings which are never emitted, either
+with a str.find per stop string over the end of the output text, as done
+before, or with the StopStringMatcher of the stop strings, which is fed the
+new characters only. Reports the mean time to check a token.
+"""
+import random
+import string
+import time
+from typing import List, Optional, Tuple
+
+from vllm.engine.output_processor.stop_string_matcher import (
+    get_stop_string_matcher)
+from vllm.utils import FlexibleArgumentParser
+
+
+def find_stop_string(output_text: str, new_char_count: int,
+                     stop: List[str]) -> Optional[Tuple[str, int]]:
+    for stop_str in stop:
+        stop_index = output_text.find(stop_str,
+                                      -new_char_count - len(stop_str))
+        if stop_index != -1:
+            return stop_str, stop_index
+    return None
+
+
+def make_stop_strings(num_stop_strings: int) -> List[str]:
+    # Stop strings as used by structured prompts, which share prefixes and
+    # characters with the output text, but are not emitted.
+    stop = ["\n\nQuestion:", "</answer>", "\n###", "<|end|>"]
+    while len(stop) < num_stop_strings:
+        stop.append(f"\n{len(stop)}. " + "".join(
+            random.choices(string.ascii_letters, k=random.randint(3, 8))))
+    return stop[:num_stop_strings]
+
+
+def run(args, stop: List[str], use_matcher: bool) -> float:
+    words = ["".join(random.choices(string.ascii_lowercase, k=k))
+             for k in range(1, 9) for _ in range(64)] + ["\n", ". ", "\n1."]
+    tokens = [(" " + word) if word[0].isalpha() else word for word in words]
+    output_texts = [""] * args.num_seqs
+    states = [0] * args.num_seqs
+
+    elapsed = 0.0
+    for _ in range(args.num_steps):
+        new_texts = random.choices(tokens, k=args.num_seqs)
+        start = time.perf_counter()
+        for i, new_text in enumerate(new_texts):
+            output_text = output_texts[i] + new_text
+            output_texts[i] = output_text
+            if use_matcher:
+                matcher = get_stop_string_matcher(tuple(stop))
+                states[i], match = matcher.find(states[i], output_text,
+                                                len(new_text))
+            else:
+                match = find_stop_string(output_text, len(new_text), stop)
+            assert match is None
+        elapsed += time.perf_counter() - start
+    return elapsed / (args.num_steps * args.num_seqs) * 1e6
+
+
+def main(args):
+    print(f"{args.num_seqs} sequences, {args.num_steps} tokens each")
+    print(f"{'stop strings':>12} {'str.find (us/token)':>20} "
+          f"{'matcher (us/token)':>19}")
+    for num_stop_strings in args.num_stop_strings:
+        random.seed(0)
+        stop = make_stop_strings(num_stop_strings)
+        find_time = run(args, stop, use_matcher=False)
+        random.seed(0)
+        stop = make_stop_strings(num_stop_strings)
+        matcher_time = run(args, stop, use_matcher=True)
+        print(f"{num_stop_strings:>12} {find_time:>20.3f} "
+              f"{matcher_time:>19.3f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the stop string checks of the StopChecker.')
+    parser.add_argument('--num-seqs', type=int, default=256)
+    parser.add_argument('--num-steps', type=int, default=256)
+    parser.add_argument('--num-stop-strings',
+                        type=int,
+                        nargs='+',
+                        default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    main(args)
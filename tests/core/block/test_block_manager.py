@@ -259,6 +259,43 @@ def test_append_slots(block_size, prompt_len, num_slots_to_append,
     assert num_consumed_blocks == expected_consumed_blocks
 
 
+@pytest.mark.parametrize("block_size", [1, 8])
+@pytest.mark.parametrize("num_lookahead_slots", [0, 10])
+def test_get_num_blocks_touched_by_append_slots(block_size,
+                                                num_lookahead_slots):
+    """Verify the vectorized block counts match the ones of the block table
+    of each sequence.
+    """
+    block_manager = SelfAttnBlockSpaceManager(
+        block_size=block_size,
+        num_gpu_blocks=1024,
+        num_cpu_blocks=0,
+    )
+
+    seqs = []
+    for i, (prompt_len, num_slots_to_append) in enumerate([(1, 1), (7, 8),
+                                                           (8, 1), (8, 129)]):
+        seq_group = create_seq_group(seq_prompt_len=prompt_len,
+                                     seq_output_lens=[0],
+                                     request_id=str(i),
+                                     seq_id_start=i)
+        block_manager.allocate(seq_group)
+        seq = seq_group.get_seqs()[0]
+        seq.status = SequenceStatus.RUNNING
+        for token_id in range(num_slots_to_append):
+            seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+        seqs.append(seq)
+
+    expected = [
+        block_manager.block_tables[seq.seq_id].
+        get_num_blocks_touched_by_append_slots(
+            block_manager.block_tables[seq.seq_id].get_unseen_token_ids(
+                seq.get_token_ids()), num_lookahead_slots) for seq in seqs
+    ]
+    assert block_manager.get_num_blocks_touched_by_append_slots(
+        seqs, num_lookahead_slots).tolist() == expected
+
+
 @pytest.mark.parametrize("block_size", [8])
 @pytest.mark.parametrize("num_cpu_blocks", [4])
 @pytest.mark.parametrize("num_gpu_blocks", [4])
@@ -312,6 +349,59 @@ def test_swap(block_size, num_cpu_blocks, num_gpu_blocks, num_lookahead_slots,
     assert before_gpu_blocks == after_gpu_blocks + len(cpu_blocks)
 
 
+@pytest.mark.parametrize("block_size", [8])
+@pytest.mark.parametrize("num_swapped_out_blocks", [1, 2])
+@pytest.mark.parametrize("enable_caching", [False, True])
+def test_partial_swap(block_size, num_swapped_out_blocks, enable_caching):
+    """Verify that a partial swap out only moves the tail blocks to the CPU,
+        and that the swap in only moves them back.
+    """
+    block_manager = SelfAttnBlockSpaceManager(block_size,
+                                              num_cpu_blocks=8,
+                                              num_gpu_blocks=8,
+                                              watermark=0,
+                                              enable_caching=enable_caching)
+    prompt, seq_group = create_dummy_prompt("1",
+                                            prompt_length=3 * block_size + 1)
+    prompt.status = SequenceStatus.WAITING
+    block_manager.allocate(seq_group)
+    prompt.status = SequenceStatus.RUNNING
+
+    # Swap the tail of the seq group from GPU -> CPU.
+    gpu_blocks = block_manager.get_block_table(prompt)
+    assert len(gpu_blocks) == 4
+    assert block_manager.can_swap_out(seq_group, num_swapped_out_blocks)
+    before_cpu_blocks = block_manager.get_num_free_cpu_blocks()
+    before_gpu_blocks = block_manager.get_num_free_gpu_blocks()
+    mapping = block_manager.swap_out(seq_group, num_swapped_out_blocks)
+    assert [key for key, _ in mapping] == gpu_blocks[-num_swapped_out_blocks:]
+    assert block_manager.get_block_table(prompt)[:-num_swapped_out_blocks] \
+        == gpu_blocks[:-num_swapped_out_blocks]
+    assert before_cpu_blocks == (block_manager.get_num_free_cpu_blocks() +
+                                 num_swapped_out_blocks)
+    assert before_gpu_blocks + num_swapped_out_blocks == (
+        block_manager.get_num_free_gpu_blocks())
+    prompt.status = SequenceStatus.SWAPPED
+
+    # Only the tail is swapped back in.
+    assert block_manager.can_swap_in(seq_group, 0) == AllocStatus.OK
+    before_gpu_blocks = block_manager.get_num_free_gpu_blocks()
+    mapping = block_manager.swap_in(seq_group)
+    assert len(mapping) == num_swapped_out_blocks
+    assert block_manager.get_num_free_gpu_blocks() == (before_gpu_blocks -
+                                                       num_swapped_out_blocks)
+    assert block_manager.get_num_free_cpu_blocks() == 8
+    prompt.status = SequenceStatus.RUNNING
+    assert block_manager.get_block_table(prompt)[:-num_swapped_out_blocks] \
+        == gpu_blocks[:-num_swapped_out_blocks]
+
+    # A table with blocks on both devices is freed from both.
+    block_manager.swap_out(seq_group, 1)
+    block_manager.free(prompt)
+    assert block_manager.get_num_free_cpu_blocks() == 8
+    assert block_manager.get_num_free_gpu_blocks() == 8
+
+
 @pytest.mark.parametrize("block_size", [8])
 @pytest.mark.parametrize("num_gpu_blocks", [4])
 @pytest.mark.parametrize("num_lookahead_slots", [3, 8, 10])
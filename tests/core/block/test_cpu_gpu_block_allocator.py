@@ -1,6 +1,11 @@
+import os
+
+import numpy as np
 import pytest
 
 from vllm.core.block.cpu_gpu_block_allocator import CpuGpuBlockAllocator
+from vllm.core.block.disk_prefix_cache import (DISK_PREFIX_CACHE_INDEX_FILE,
+                                               INDEX_DTYPE)
 from vllm.utils import Device, chunk_list
 
 
@@ -91,3 +96,130 @@ def test_allocate_immutable_block(num_cpu_blocks: int, num_gpu_blocks: int,
     _ = [allocator.free(block) for block in gpu_blocks]
     assert allocator.get_num_free_blocks(Device.CPU) == num_cpu_blocks
     assert allocator.get_num_free_blocks(Device.GPU) == num_gpu_blocks
+
+
+@pytest.mark.parametrize("block_size", [16])
+def test_cpu_prefix_cache_offload_and_reload(block_size: int):
+    num_gpu_blocks = 2
+    num_cpu_blocks = 8
+    num_cpu_prefix_cache_blocks = 4
+    allocator = CpuGpuBlockAllocator.create(
+        allocator_type="prefix_caching",
+        num_gpu_blocks=num_gpu_blocks,
+        num_cpu_blocks=num_cpu_blocks,
+        block_size=block_size,
+        num_cpu_prefix_cache_blocks=num_cpu_prefix_cache_blocks,
+    )
+    # The tail of the CPU blocks is reserved for the prefix cache.
+    assert allocator.get_num_free_blocks(Device.CPU) == (
+        num_cpu_blocks - num_cpu_prefix_cache_blocks)
+
+    prompts = [
+        list(range(i * block_size, (i + 1) * block_size)) for i in range(3)
+    ]
+
+    # Fill the GPU cache with the first two prompts and release them.
+    blocks = [
+        allocator.allocate_immutable_block(prev_block=None,
+                                           token_ids=token_ids,
+                                           device=Device.GPU)
+        for token_ids in prompts[:2]
+    ]
+    first_gpu_block_id = blocks[0].block_id
+    for block in blocks:
+        allocator.free(block)
+    assert allocator.get_and_reset_cpu_prefix_cache_swaps() == ([], [])
+
+    # A third prompt evicts the first one, which is offloaded to the first
+    # CPU prefix cache block.
+    third = allocator.allocate_immutable_block(prev_block=None,
+                                               token_ids=prompts[2],
+                                               device=Device.GPU)
+    first_cache_block = num_cpu_blocks - num_cpu_prefix_cache_blocks
+    assert third.block_id == first_gpu_block_id
+    assert allocator.get_and_reset_cpu_prefix_cache_swaps() == ([
+        (first_gpu_block_id, first_cache_block)
+    ], [])
+
+    # The first prompt misses on GPU but is swapped back in from CPU and is
+    # already computed. Allocating it evicts the second prompt to CPU.
+    reloaded = allocator.allocate_immutable_block(prev_block=None,
+                                                  token_ids=prompts[0],
+                                                  device=Device.GPU)
+    assert reloaded.computed
+    swaps_out, swaps_in = allocator.get_and_reset_cpu_prefix_cache_swaps()
+    assert swaps_out == [(reloaded.block_id, first_cache_block + 1)]
+    assert swaps_in == [(first_cache_block, reloaded.block_id)]
+    # Three GPU misses before were also CPU misses.
+    assert allocator.get_prefix_cache_hit_rate(Device.CPU) == 0.25
+
+
+@pytest.mark.parametrize("block_size", [16])
+def test_disk_prefix_cache_survives_restart(tmp_path, block_size: int):
+
+    def create_allocator():
+        return CpuGpuBlockAllocator.create(
+            allocator_type="prefix_caching",
+            num_gpu_blocks=2,
+            num_cpu_blocks=0,
+            block_size=block_size,
+            disk_prefix_cache_dir=str(tmp_path),
+            num_disk_prefix_cache_blocks=2,
+        )
+
+    prompts = [
+        list(range(i * block_size, (i + 1) * block_size)) for i in range(3)
+    ]
+
+    allocator = create_allocator()
+    blocks = [
+        allocator.allocate_immutable_block(prev_block=None,
+                                           token_ids=token_ids,
+                                           device=Device.GPU)
+        for token_ids in prompts[:2]
+    ]
+    # Blocks are only saved once they are computed and unused.
+    allocator.free(blocks[1])
+    assert allocator.get_and_reset_disk_prefix_cache_copies() == ([], [])
+    allocator.mark_blocks_as_computed([])
+    block_id = blocks[0].block_id
+    allocator.free(blocks[0])
+    assert allocator.get_and_reset_disk_prefix_cache_copies() == ([
+        (block_id, 0)
+    ], [])
+    assert allocator.has_pending_disk_prefix_cache_copies()
+    # The save is committed by the next step, once it has been executed.
+    assert allocator.get_and_reset_disk_prefix_cache_copies() == ([], [])
+    assert not allocator.has_pending_disk_prefix_cache_copies()
+
+    # After a restart, the first prompt misses on GPU and is loaded from
+    # disk, while the uncomputed second prompt is not cached.
+    allocator = create_allocator()
+    reloaded = allocator.allocate_immutable_block(prev_block=None,
+                                                  token_ids=prompts[0],
+                                                  device=Device.GPU)
+    assert reloaded.computed
+    missed = allocator.allocate_immutable_block(prev_block=None,
+                                                token_ids=prompts[1],
+                                                device=Device.GPU)
+    assert not missed.computed
+    assert allocator.get_and_reset_disk_prefix_cache_copies() == ([], [
+        (0, reloaded.block_id)
+    ])
+
+    # Saving the second prompt fills the cache, a third one evicts the
+    # least recently used slot.
+    allocator.mark_blocks_as_computed([])
+    allocator.free(missed)
+    allocator.free(reloaded)
+    third = allocator.allocate_immutable_block(prev_block=None,
+                                               token_ids=prompts[2],
+                                               device=Device.GPU)
+    allocator.mark_blocks_as_computed([])
+    allocator.free(third)
+    saves, _ = allocator.get_and_reset_disk_prefix_cache_copies()
+    assert [slot for _, slot in saves] == [1, 0]
+    # The evicted slot is invalid on disk before its data is overwritten.
+    index = np.fromfile(os.path.join(tmp_path, DISK_PREFIX_CACHE_INDEX_FILE),
+                        dtype=INDEX_DTYPE)
+    assert index["valid"].tolist() == [0, 0]
@@ -8,6 +8,7 @@ import pytest
 from vllm.core.block.interfaces import Block, BlockAllocator
 from vllm.core.block.prefix_caching_block import (PrefixCachingBlock,
                                                   PrefixCachingBlockAllocator)
+from vllm.core.evictor_v2 import EvictionPolicy
 
 
 class TestPrefixCachingBlock:
@@ -615,7 +616,10 @@ class TestPrefixCachingBlockAllocator:
     @pytest.mark.parametrize("num_blocks", [1024])
     @pytest.mark.parametrize("block_size", [16])
     @pytest.mark.parametrize("seed", list(range(20)))
-    def test_eviction_order(num_blocks: int, block_size: int, seed: int):
+    @pytest.mark.parametrize("eviction_policy",
+                             [EvictionPolicy.LRU, EvictionPolicy.HEAP_LRU])
+    def test_eviction_order(num_blocks: int, block_size: int, seed: int,
+                            eviction_policy: EvictionPolicy):
         """This test case simulate the two chain created and free in order,
         and together they would exhaust the initial freed blocks.
 
@@ -626,8 +630,10 @@ class TestPrefixCachingBlockAllocator:
         """
 
         random.seed(seed)
-        allocator = PrefixCachingBlockAllocator(num_blocks=num_blocks,
-                                                block_size=block_size)
+        allocator = PrefixCachingBlockAllocator(
+            num_blocks=num_blocks,
+            block_size=block_size,
+            eviction_policy=eviction_policy)
         num_blocks_to_consume = num_blocks + 1
 
         token_ids = list(range(num_blocks_to_consume * block_size))
@@ -683,6 +689,111 @@ class TestPrefixCachingBlockAllocator:
 
         assert new_block[0].block_id == last_block_id
 
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [16])
+    def test_two_queue_eviction_keeps_hot_prefix(block_size: int):
+        """A burst of one-off prompts should not evict a reused prefix when
+        the frequency-aware policy is used."""
+        num_blocks = 4
+        allocator = PrefixCachingBlockAllocator(
+            num_blocks=num_blocks,
+            block_size=block_size,
+            eviction_policy=EvictionPolicy.TWO_QUEUE)
+        hot_token_ids = list(range(block_size))
+
+        # Use the hot prefix twice, so it serves one cache hit.
+        for _ in range(2):
+            hot = allocator.allocate_immutable_block(prev_block=None,
+                                                     token_ids=hot_token_ids)
+            hot_block_id = hot.block_id
+            allocator.mark_blocks_as_accessed([hot_block_id], 0)
+            allocator.free(hot)
+        assert allocator._block_tracker[hot_block_id].num_hits == 1
+
+        # A burst of newer one-off prompts fills and churns the cache.
+        for i in range(1, 3 * num_blocks):
+            token_ids = list(range(i * block_size, (i + 1) * block_size))
+            block = allocator.allocate_immutable_block(prev_block=None,
+                                                       token_ids=token_ids)
+            allocator.mark_blocks_as_accessed([block.block_id], i)
+            allocator.free(block)
+
+        hot = allocator.allocate_immutable_block(prev_block=None,
+                                                 token_ids=hot_token_ids)
+        assert hot.block_id == hot_block_id
+        assert hot.computed
+
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [16])
+    def test_allocate_immutable_blocks_with_block_hashes(block_size: int):
+        """Precomputed block hashes give the same blocks as hashing the
+        token ids in the allocator."""
+        allocator = PrefixCachingBlockAllocator(num_blocks=8,
+                                                block_size=block_size)
+        block_token_ids = [
+            list(range(i * block_size, (i + 1) * block_size))
+            for i in range(3)
+        ]
+        blocks = allocator.allocate_immutable_blocks(
+            prev_block=None, block_token_ids=block_token_ids)
+
+        block_hashes = []
+        for token_ids in block_token_ids:
+            block_hashes.append(
+                PrefixCachingBlock.hash_block_tokens(
+                    is_first_block=not block_hashes,
+                    prev_block_hash=block_hashes[-1]
+                    if block_hashes else None,
+                    cur_block_token_ids=token_ids))
+        assert [block.content_hash for block in blocks] == block_hashes
+
+        hashed_blocks = allocator.allocate_immutable_blocks(
+            prev_block=None,
+            block_token_ids=block_token_ids,
+            block_hashes=block_hashes)
+        assert [block.block_id for block in hashed_blocks
+                ] == [block.block_id for block in blocks]
+        assert [block.content_hash
+                for block in hashed_blocks] == block_hashes
+
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [16])
+    def test_eviction_drops_unused_subtree(block_size: int):
+        """Evicting a cached block also frees the unused cached blocks that
+        extend it, and longest-prefix lookups stop at the evicted block."""
+        num_blocks = 4
+        allocator = PrefixCachingBlockAllocator(num_blocks=num_blocks,
+                                                block_size=block_size)
+        token_ids = list(range(3 * block_size))
+        blocks = allocator.allocate_immutable_blocks(
+            prev_block=None,
+            block_token_ids=[
+                token_ids[i * block_size:(i + 1) * block_size]
+                for i in range(3)
+            ])
+        allocator.mark_blocks_as_computed([])
+        block_ids = [block.block_id for block in blocks]
+        assert allocator.get_longest_cached_prefix(
+            token_ids[:2 * block_size + 3]) == (block_ids[:2],
+                                                2 * block_size + 3)
+
+        # Free the chain, the first block being the least recently used.
+        for i, block in enumerate(blocks):
+            allocator.mark_blocks_as_accessed([block.block_id], i)
+        for block in blocks:
+            allocator.free(block)
+        assert allocator.evictor.num_blocks == 3
+
+        # Take the free block, then evict: the whole chain is dropped.
+        mutable_blocks = [
+            allocator.allocate_mutable_block(prev_block=None)
+            for _ in range(2)
+        ]
+        assert mutable_blocks[1].block_id == block_ids[0]
+        assert allocator.evictor.num_blocks == 0
+        assert allocator.get_num_free_blocks() == num_blocks - 2
+        assert allocator.get_longest_cached_prefix(token_ids) == ([], 0)
+
     # Test case for cache mertics
     @staticmethod
     def test_metric():
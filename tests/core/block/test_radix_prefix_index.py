@@ -0,0 +1,62 @@
+import pytest
+
+from vllm.core.block.radix_prefix_index import RadixPrefixIndex
+
+
+def insert_chain(index: RadixPrefixIndex, name: str, token_ids, block_size,
+                 first_block_id):
+    """Inserts the full blocks of the token ids, hashed by their prefix."""
+    prev_hash = None
+    for i in range(len(token_ids) // block_size):
+        content_hash = hash((name, i))
+        index.insert(content_hash, prev_hash,
+                     token_ids[i * block_size:(i + 1) * block_size],
+                     first_block_id + i)
+        prev_hash = content_hash
+
+
+@pytest.mark.parametrize("block_size", [4])
+def test_match_prefix(block_size: int):
+    index = RadixPrefixIndex(block_size)
+    insert_chain(index, "a", list(range(12)), block_size, first_block_id=0)
+    assert len(index) == 3
+    assert index[hash(("a", 1))] == 1
+
+    # Full match.
+    assert index.match_prefix(list(range(12))) == ([0, 1, 2], 12)
+    # Divergence in the third block, within the second token.
+    diverging = list(range(9)) + [100, 101, 102]
+    assert index.match_prefix(diverging) == ([0, 1], 9)
+    # Partial last block.
+    assert index.match_prefix(list(range(6))) == ([0], 6)
+    # No match.
+    assert index.match_prefix([100] * 8) == ([], 0)
+    # Unusable blocks end the prefix.
+    assert index.match_prefix(list(range(12)),
+                              lambda block_id: block_id != 1) == ([0], 4)
+
+
+@pytest.mark.parametrize("block_size", [4])
+def test_remove_subtree(block_size: int):
+    index = RadixPrefixIndex(block_size)
+    insert_chain(index, "a", list(range(12)), block_size, first_block_id=0)
+    # A branch sharing the first block.
+    index.insert(hash(("b", 1)), hash(("a", 0)), [40, 41, 42, 43], 10)
+    branch = list(range(4)) + [40, 41, 42, 43]
+
+    removed = index.remove_subtree(hash(("a", 1)), lambda block_id: True)
+    assert removed == [(hash(("a", 1)), 1), (hash(("a", 2)), 2)]
+    assert hash(("a", 2)) not in index
+    assert index.match_prefix(branch) == ([0, 10], 8)
+
+    # Referenced descendants are kept as orphans, found by hash only.
+    removed = index.remove_subtree(hash(("a", 0)),
+                                   lambda block_id: block_id != 10)
+    assert removed == [(hash(("a", 0)), 0)]
+    assert index.get(hash(("b", 1))) == 10
+    assert index.match_prefix(branch) == ([], 0)
+
+    # The orphan is attached back once its parent is cached again.
+    index.insert(hash(("a", 0)), None, list(range(4)), 20)
+    assert index.match_prefix(branch) == ([20, 10], 8)
+    assert sorted(index.values()) == [10, 20]
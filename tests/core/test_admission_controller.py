@@ -0,0 +1,56 @@
+import pytest
+
+from vllm.core.admission_controller import AdmissionController
+
+
+def test_project_remaining_len():
+    controller = AdmissionController(block_size=4,
+                                     watermark_blocks=0,
+                                     window_size=4,
+                                     min_num_observations=4)
+    for output_len in [10, 20, 30]:
+        controller.observe_output_len(output_len)
+    assert not controller.is_active
+    controller.observe_output_len(40)
+    assert controller.is_active
+
+    # The median of the output lengths beyond the current one.
+    assert controller.project_remaining_len(0, 100) == 20
+    assert controller.project_remaining_len(25, 100) == 5
+    # Capped by max_tokens.
+    assert controller.project_remaining_len(25, 28) == 3
+    # Outlived all the observed sequences.
+    assert controller.project_remaining_len(40, 100) == 60
+
+    # The oldest output length is dropped.
+    controller.observe_output_len(50)
+    assert controller.project_remaining_len(0, 100) == 30
+
+
+def test_num_blocks_growth():
+    controller = AdmissionController(block_size=4, watermark_blocks=2)
+    assert controller.get_num_blocks_growth([]) == 0
+    # The demand peaks just before the second sequence finishes, with 28
+    # tokens, rather than when both are alive. Partially filled blocks are
+    # counted as full.
+    seqs = [(4, 4), (8, 20)]
+    growth = controller.get_num_blocks_growth(seqs)
+    assert growth == pytest.approx((28 + 3) / 4 - (12 + 2 * 3) / 4)
+
+    num_free_blocks = int(growth) + 1 + 2
+    assert controller.can_admit(seqs, [], num_free_blocks)
+    assert not controller.can_admit(seqs, [], num_free_blocks - 1)
+    # A new sequence that finishes first does not raise the peak.
+    assert controller.can_admit(seqs, [(1, 0)], num_free_blocks)
+    # A new sequence that runs along the longest one does.
+    assert not controller.can_admit(seqs, [(4, 20)], num_free_blocks)
+    assert controller.can_admit(seqs, [(4, 20)], 12)
+    assert not controller.can_admit(seqs, [(4, 20)], 11)
+
+
+def test_admit_when_idle():
+    controller = AdmissionController(block_size=4, watermark_blocks=2)
+    # Without running sequences, a new sequence is admitted even if it is
+    # projected to outgrow the free blocks, as waiting would not free any.
+    assert controller.can_admit([], [(100, 4000)], 100)
+    assert not controller.can_admit([(4, 0)], [(100, 4000)], 100)
@@ -660,3 +660,140 @@ def test_perfix_caching():
     assert seq_group_meta[1].token_chunk_size == 12
     assert out.num_prefill_groups == 2
     assert out.num_batched_tokens == 62
+
+
+def test_observe_prefill_rate():
+    """Verify only the steps without decodes measure the prefill rate of the
+    preemption cost model."""
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       64,
+                                       16,
+                                       200,
+                                       enable_chunked_prefill=True,
+                                       preemption_mode="auto")
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 16
+    cache_config.num_gpu_blocks = 64
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+    cost_model = scheduler.preemption_cost_model
+    assert cost_model is not None
+
+    _, seq_group = create_dummy_prompt("0",
+                                       prompt_length=40,
+                                       block_size=block_size)
+    scheduler.add_seq_group(seq_group)
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    scheduler.observe_step(out, 0.4, 0, 0.0)
+    assert cost_model.prefill_seconds_per_token == pytest.approx(0.01)
+    append_new_token(seq_group, 1)
+
+    # A step with a decode and a prefill is not observed.
+    _, seq_group = create_dummy_prompt("1",
+                                       prompt_length=20,
+                                       block_size=block_size)
+    scheduler.add_seq_group(seq_group)
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert out.num_prefill_tokens == 20
+    assert out.num_batched_tokens == 21
+    scheduler.observe_step(out, 1.0, 0, 0.0)
+    assert cost_model.prefill_seconds_per_token == pytest.approx(0.01)
+
+
+def test_prefill_chunk_size_parallel_sampling():
+    """Verify every sequence of a parallel sampling request counts as a
+    decode token of the step."""
+    block_size = 16
+    max_num_batched_tokens = 64
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens,
+                                       16,
+                                       200,
+                                       enable_chunked_prefill=True)
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 0
+    cache_config.num_gpu_blocks = 64
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+
+    seq, seq_group = create_dummy_prompt("0",
+                                         prompt_length=block_size,
+                                         block_size=block_size,
+                                         best_of=3)
+    scheduler._allocate_and_set_running(seq_group)
+    seq_group.update_num_computed_tokens(block_size)
+    append_new_token(seq_group, 1)
+    for seq_id in range(10, 12):
+        child_seq = seq.fork(seq_id)
+        seq_group.add(child_seq)
+        scheduler.fork_seq(seq, child_seq)
+    scheduler._add_seq_group_to_running(seq_group)
+    _, seq_group = create_dummy_prompt("1",
+                                       prompt_length=100,
+                                       block_size=block_size)
+    scheduler.add_seq_group(seq_group)
+
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert out.num_prefill_tokens == max_num_batched_tokens - 3
+    assert out.prefill_chunk_size == max_num_batched_tokens - 3
+
+
+def test_target_inter_token_latency():
+    """Verify the prefill chunk shrinks to keep the step time of the decodes
+    within the target."""
+    block_size = 4
+    max_seqs = 16
+    max_model_len = 200
+    max_num_batched_tokens = 128
+    with pytest.raises(ValueError):
+        SchedulerConfig("generate",
+                        max_num_batched_tokens,
+                        max_seqs,
+                        max_model_len,
+                        target_inter_token_latency=0.05)
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens,
+                                       max_seqs,
+                                       max_model_len,
+                                       enable_chunked_prefill=True,
+                                       target_inter_token_latency=0.05)
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 0
+    cache_config.num_gpu_blocks = 128
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+
+    # 10ms per step + 1ms per token.
+    def step_time(out):
+        return 0.01 + 0.001 * out.num_batched_tokens
+
+    _, seq_group = create_dummy_prompt("0",
+                                       prompt_length=60,
+                                       block_size=block_size)
+    scheduler.add_seq_group(seq_group)
+    # Unfitted, the whole budget is used.
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert out.prefill_chunk_size == max_num_batched_tokens
+    assert out.num_prefill_tokens == 60
+    scheduler.observe_step(out, step_time(out), 0, 0.0)
+    append_new_token(seq_group, 1)
+
+    # Fit the model with steps of a decode and a prefill of varying size.
+    for i in range(1, 10):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=4 * (i % 3 + 1),
+                                           block_size=block_size)
+        scheduler.add_seq_group(seq_group)
+        _, out = schedule_and_update_computed_tokens(scheduler)
+        scheduler.observe_step(out, step_time(out), 0, 0.0)
+        for scheduled_seq_group in out.scheduled_seq_groups:
+            append_new_token(scheduled_seq_group.seq_group, 1)
+
+    # 10 decodes take 20ms, which leaves 30 prefill tokens.
+    _, seq_group = create_dummy_prompt("10",
+                                       prompt_length=60,
+                                       block_size=block_size)
+    scheduler.add_seq_group(seq_group)
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert out.num_prefill_groups == 1
+    assert out.prefill_chunk_size == 30
+    assert out.num_prefill_tokens == 30
+    assert out.num_batched_tokens == 40
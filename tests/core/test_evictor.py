@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from vllm.core.evictor_v2 import (EvictionPolicy, HeapLRUEvictor,
+                                  TwoQueueEvictor, make_evictor)
+
+
+def _expected_victim(table):
+    # Oldest access time first, then the block with the most hashed tokens.
+    return min(table,
+               key=lambda block_id:
+               (table[block_id][1], -table[block_id][0]))
+
+
+@pytest.mark.parametrize("seed", list(range(10)))
+def test_heap_lru_evictor_matches_reference(seed: int):
+    """Drive the heap evictor with a random mix of operations and check that
+    every eviction picks the same block as a brute-force scan."""
+    random.seed(seed)
+    evictor = make_evictor(EvictionPolicy.HEAP_LRU)
+    assert isinstance(evictor, HeapLRUEvictor)
+
+    # block_id -> (num_hashed_tokens, last_accessed)
+    reference = {}
+    next_block_id = 0
+    for _ in range(2000):
+        op = random.random()
+        if op < 0.4 or not reference:
+            num_hashed_tokens = random.randint(1, 64) * 16
+            last_accessed = float(random.randint(0, 100))
+            evictor.add(next_block_id, hash(next_block_id), num_hashed_tokens,
+                        last_accessed)
+            reference[next_block_id] = (num_hashed_tokens, last_accessed)
+            next_block_id += 1
+        elif op < 0.6:
+            block_id = random.choice(list(reference))
+            last_accessed = float(random.randint(0, 100))
+            evictor.update(block_id, last_accessed)
+            reference[block_id] = (reference[block_id][0], last_accessed)
+        elif op < 0.75:
+            block_id = random.choice(list(reference))
+            evictor.remove(block_id)
+            del reference[block_id]
+        else:
+            expected_block_id = _expected_victim(reference)
+            block_id, content_hash = evictor.evict()
+            assert reference[block_id] == reference[expected_block_id]
+            assert content_hash == hash(block_id)
+            del reference[block_id]
+
+        assert evictor.num_blocks == len(reference)
+        assert all(block_id in evictor for block_id in reference)
+
+
+def test_heap_lru_evictor_cleanup():
+    evictor = HeapLRUEvictor()
+    evictor.add(0, 0, 16, 0.0)
+    evictor.add(1, 1, 16, 1.0)
+
+    # Repeated updates leave stale entries behind, which must be compacted.
+    for ts in range(1000):
+        evictor.update(0, float(ts + 2))
+    assert len(evictor.priority_queue) <= (HeapLRUEvictor.CLEANUP_THRESHOLD *
+                                           evictor.num_blocks + 1)
+
+    assert evictor.evict() == (1, 1)
+    assert evictor.evict() == (0, 0)
+    with pytest.raises(ValueError):
+        evictor.evict()
+
+
+def test_two_queue_evictor_prefers_unreused_blocks():
+    evictor = make_evictor(EvictionPolicy.TWO_QUEUE)
+    assert isinstance(evictor, TwoQueueEvictor)
+
+    # A hot block that served hits, accessed long ago.
+    evictor.add(0, 0, 16, 0.0, num_hits=5)
+    # Many one-off blocks, all more recent than the hot block.
+    for block_id in range(1, 4):
+        evictor.add(block_id, block_id, 16, float(block_id), num_hits=0)
+    assert evictor.num_blocks == 4
+
+    # The one-off blocks go first, in LRU order, although they are newer.
+    assert [evictor.evict()[0] for _ in range(3)] == [1, 2, 3]
+    # Only the protected block is left.
+    assert evictor.evict() == (0, 0)
+    assert evictor.num_blocks == 0
+
+
+def test_two_queue_evictor_protected_ratio():
+    evictor = TwoQueueEvictor(max_protected_ratio=0.5)
+    evictor.add(0, 0, 16, 0.0, num_hits=1)
+    evictor.add(1, 1, 16, 1.0, num_hits=1)
+    evictor.add(2, 2, 16, 2.0, num_hits=0)
+
+    # Protected blocks hold more than half of the free pool, so the oldest
+    # protected block ages out first.
+    assert evictor.evict() == (0, 0)
+    # Now the queues are balanced and the probationary block goes.
+    assert evictor.evict() == (2, 2)
+
+    evictor.update(1, 10.0)
+    evictor.remove(1)
+    assert 1 not in evictor
+    assert evictor.num_blocks == 0
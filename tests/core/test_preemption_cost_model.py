@@ -0,0 +1,44 @@
+import pytest
+
+from vllm.core.preemption_cost_model import PreemptionCostModel
+
+
+def test_estimates():
+    cost_model = PreemptionCostModel(ema_weight=0.5)
+    assert cost_model.swap_cost(10) is None
+    assert cost_model.recompute_cost(10) is None
+    # Swap until the swap bandwidth is measured.
+    assert cost_model.should_swap(10, 100)
+
+    cost_model.observe_swap(num_blocks=10, seconds=1.0)
+    cost_model.observe_swap(num_blocks=0, seconds=1.0)
+    assert cost_model.swap_seconds_per_block == pytest.approx(0.1)
+    cost_model.observe_swap(num_blocks=10, seconds=3.0)
+    assert cost_model.swap_seconds_per_block == pytest.approx(0.2)
+    # Recompute is unknown.
+    assert not cost_model.should_swap(10, 100)
+
+    cost_model.observe_prefill(num_tokens=100, seconds=1.0)
+    assert cost_model.swap_cost(10) == pytest.approx(4.0)
+    assert cost_model.recompute_cost(100) == pytest.approx(1.0)
+    assert not cost_model.should_swap(10, 100)
+    assert cost_model.should_swap(10, 1000)
+
+
+def test_mispredictions():
+    cost_model = PreemptionCostModel(ema_weight=1.0)
+    cost_model.observe_swap(num_blocks=10, seconds=1.0)
+    cost_model.observe_prefill(num_tokens=100, seconds=1.0)
+    assert cost_model.should_swap(10, 1000)
+    cost_model.record_decision("0", True, 10, 1000)
+    cost_model.record_decision("1", True, 10, 1000)
+    cost_model.record_decision("2", True, 10, 1000)
+
+    assert cost_model.resolve_decision("0") is False
+    # Swapping got slower before the request resumed.
+    cost_model.observe_swap(num_blocks=1, seconds=10.0)
+    assert cost_model.resolve_decision("1") is True
+    # Aborted and unknown requests are not checked.
+    cost_model.discard_decision("2")
+    assert cost_model.resolve_decision("2") is None
+    assert cost_model.resolve_decision("3") is None
@@ -8,9 +8,9 @@ from torch import Use  # noqa
 
 from vllm.config import CacheConfig, LoRAConfig, SchedulerConfig
 from vllm.core.interfaces import AllocStatus
-from vllm.core.scheduler import Scheduler, SchedulingBudget
+from vllm.core.scheduler import PreemptionMode, Scheduler, SchedulingBudget
 from vllm.lora.request import LoRARequest
-from vllm.sequence import SequenceGroup, SequenceStatus
+from vllm.sequence import Logprob, SequenceGroup, SequenceStatus
 
 from .utils import (append_new_token, append_new_token_seq_group,
                     create_dummy_prompt, get_sequence_groups,
@@ -322,6 +322,9 @@ def test_swapped_out_prioritized():
 
     scheduler.block_manager.can_append_slots.side_effect = (
         cannot_append_second_group)
+    # Leave the decodes to the per-group path, which uses the mock.
+    scheduler.block_manager.get_num_free_gpu_blocks = MagicMock(
+        return_value=0)
 
     seq_group_meta, out = schedule_and_update_computed_tokens(scheduler)
     assert len(out.scheduled_seq_groups) == 2
@@ -602,6 +605,341 @@ def test_prefill_schedule_no_block_manager_capacity():
     assert len(remaining_waiting) == 0
 
 
+def test_prefill_schedule_admission_control():
+    """
+    Test new prefills are held back when the running sequences are projected
+    to run out of blocks.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=1000,
+                                       max_num_seqs=1000,
+                                       max_model_len=1000,
+                                       admission_watermark=0.0)
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 128
+    cache_config.num_gpu_blocks = 128
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+    for i in range(7):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=62,
+                                           block_size=block_size,
+                                           max_tokens=100)
+        scheduler.add_seq_group(seq_group)
+
+    # Until enough sequences finished, the admission is not controlled.
+    budget = create_token_budget()
+    output = scheduler._schedule_prefills(budget, None)
+    assert len(output.seq_groups) == 7
+    for scheduled_seq_group in output.seq_groups:
+        for seq in scheduled_seq_group.seq_group.get_seqs():
+            seq.status = SequenceStatus.FINISHED_ABORTED
+        scheduler._free_finished_seq_group(scheduled_seq_group.seq_group)
+    assert scheduler.block_manager.get_num_free_gpu_blocks() == 128
+
+    # Aborted sequences are not observed.
+    assert scheduler.admission_controller is not None
+    assert not scheduler.admission_controller.is_active
+    for _ in range(100):
+        scheduler.admission_controller.observe_output_len(40)
+    for i in range(7, 15):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=62,
+                                           block_size=block_size,
+                                           max_tokens=100)
+        scheduler.add_seq_group(seq_group)
+    # Each sequence is projected to reach 102 tokens, i.e. 26 blocks.
+    budget = create_token_budget()
+    output = scheduler._schedule_prefills(budget, None)
+    assert len(output.seq_groups) == 4
+    assert len(scheduler.waiting) == 4
+
+
+def test_prefill_schedule_admission_control_idle():
+    """
+    Test a new prefill is admitted when no sequence is running, even if it
+    is projected to outgrow the free blocks.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=1000,
+                                       max_num_seqs=1000,
+                                       max_model_len=1000,
+                                       admission_watermark=0.0)
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 128
+    cache_config.num_gpu_blocks = 128
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+    assert scheduler.admission_controller is not None
+    for _ in range(100):
+        scheduler.admission_controller.observe_output_len(40)
+
+    # A preempted sequence that outlived all the observed ones is projected
+    # to reach max_tokens, i.e. 562 tokens or 141 blocks.
+    seq, seq_group = create_dummy_prompt("0",
+                                         prompt_length=62,
+                                         block_size=block_size,
+                                         max_tokens=500)
+    for _ in range(50):
+        seq.append_token_id(1, {1: Logprob(0.0)})
+    scheduler.add_seq_group(seq_group)
+    budget = create_token_budget()
+    output = scheduler._schedule_prefills(budget, None)
+    assert [scheduled.seq_group
+            for scheduled in output.seq_groups] == [seq_group]
+
+
+@pytest.mark.parametrize("starved", [False, True])
+def test_prefill_schedule_prefix_aware(starved: bool):
+    """
+    Test the prefix_aware policy admits cache hits first, unless an earlier
+    request waited longer than prefix_aware_max_wait.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=1000,
+                                       max_num_seqs=1000,
+                                       max_model_len=1000,
+                                       policy="prefix_aware",
+                                       prefix_aware_max_wait=5.0)
+    cache_config = CacheConfig(block_size,
+                               1.0,
+                               1,
+                               "auto",
+                               enable_prefix_caching=True)
+    cache_config.num_cpu_blocks = 16
+    cache_config.num_gpu_blocks = 16
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+
+    # Compute a shared document, then release it into the prefix cache.
+    document = list(range(100, 100 + 2 * block_size))
+    _, seq_group = create_dummy_prompt("0",
+                                       prompt_length=3 * block_size,
+                                       block_size=block_size,
+                                       prompt_tokens=document +
+                                       list(range(block_size)))
+    scheduler.add_seq_group(seq_group)
+    schedule_and_update_computed_tokens(scheduler)
+    scheduler.abort_seq_group("0")
+    scheduler.free_finished_seq_groups()
+
+    now = time.time()
+    _, unrelated = create_dummy_prompt("1",
+                                       prompt_length=3 * block_size,
+                                       block_size=block_size)
+    _, hit = create_dummy_prompt("2",
+                                 prompt_length=3 * block_size,
+                                 block_size=block_size,
+                                 prompt_tokens=document +
+                                 list(range(200, 200 + block_size)))
+    unrelated.arrival_time = now - (10.0 if starved else 1.0)
+    hit.arrival_time = now
+    scheduler.add_seq_group(unrelated)
+    scheduler.add_seq_group(hit)
+
+    budget = create_token_budget(token_budget=3 * block_size)
+    output = scheduler._schedule_prefills(budget, None)
+    assert len(output.seq_groups) == 1
+    expected = unrelated if starved else hit
+    assert output.seq_groups[0].seq_group == expected
+    assert list(scheduler.waiting) == [hit if starved else unrelated]
+
+
+def test_prefix_aware_bounded_lookups():
+    """
+    Test the prefix_aware policy looks up the cached prompt tokens of at
+    most max_num_seqs waiting requests per step, new ones first.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=1000,
+                                       max_num_seqs=2,
+                                       max_model_len=1000,
+                                       policy="prefix_aware")
+    cache_config = CacheConfig(block_size,
+                               1.0,
+                               1,
+                               "auto",
+                               enable_prefix_caching=True)
+    cache_config.num_cpu_blocks = 16
+    cache_config.num_gpu_blocks = 16
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+    looked_up: List[str] = []
+    get_num_cached_prefix_tokens = (
+        scheduler.block_manager.get_num_cached_prefix_tokens)
+
+    def record_lookup(seq):
+        looked_up.append(str(seq.seq_id))
+        return get_num_cached_prefix_tokens(seq)
+
+    scheduler.block_manager.get_num_cached_prefix_tokens = record_lookup
+    for i in range(3):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=block_size,
+                                           block_size=block_size)
+        scheduler.add_seq_group(seq_group)
+
+    for expected in [["0", "1"], ["2", "0"], ["1", "2"]]:
+        looked_up.clear()
+        scheduler.policy.sort_waiting(scheduler.waiting, time.time())
+        assert looked_up == expected
+
+
+def test_policy_keeps_preempted_first():
+    """
+    Test the requests preempted by recomputation stay at the front of the
+    waiting queue when a policy orders it.
+    """
+    block_size = 4
+    scheduler = initialize_policy_scheduler("srpt", block_size)
+    _, preempted = create_dummy_prompt("0",
+                                       prompt_length=block_size,
+                                       block_size=block_size,
+                                       max_tokens=100)
+    _, short_request = create_dummy_prompt("1",
+                                           prompt_length=block_size,
+                                           block_size=block_size,
+                                           max_tokens=4)
+    preempted.maybe_set_first_scheduled_time(time.time())
+    scheduler.add_seq_group(short_request)
+    scheduler.waiting.appendleft(preempted)
+
+    budget = create_token_budget(token_budget=block_size)
+    output = scheduler._schedule_prefills(budget, None)
+    assert [scheduled.seq_group
+            for scheduled in output.seq_groups] == [preempted]
+    assert list(scheduler.waiting) == [short_request]
+
+
+def initialize_policy_scheduler(policy: str, block_size: int = 4):
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=1000,
+                                       max_num_seqs=1000,
+                                       max_model_len=1000,
+                                       policy=policy)
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 64
+    cache_config.num_gpu_blocks = 64
+    return Scheduler(scheduler_config, cache_config, None)
+
+
+def test_schedule_srpt():
+    """
+    Test the srpt policy schedules the requests with the least remaining
+    work first, and keeps them first in the running queue.
+    """
+    block_size = 4
+    scheduler = initialize_policy_scheduler("srpt", block_size)
+    _, long_request = create_dummy_prompt("0",
+                                          prompt_length=block_size,
+                                          block_size=block_size,
+                                          max_tokens=100)
+    _, short_request = create_dummy_prompt("1",
+                                           prompt_length=block_size,
+                                           block_size=block_size,
+                                           max_tokens=4)
+    scheduler.add_seq_group(long_request)
+    scheduler.add_seq_group(short_request)
+
+    budget = create_token_budget(token_budget=block_size)
+    output = scheduler._schedule_prefills(budget, None)
+    assert [scheduled.seq_group
+            for scheduled in output.seq_groups] == [short_request]
+    assert list(scheduler.waiting) == [long_request]
+
+    # The running queue is ordered too, so that the request with the most
+    # remaining work is the first one to be preempted.
+    scheduler.waiting.clear()
+    scheduler._allocate_and_set_running(long_request)
+    scheduler._add_seq_group_to_running(long_request)
+    scheduler._add_seq_group_to_running(short_request)
+    for seq_group in [long_request, short_request]:
+        append_new_token_seq_group(block_size, seq_group, 1)
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert [scheduled.seq_group for scheduled in out.scheduled_seq_groups
+            ] == [short_request, long_request]
+    assert list(scheduler.running) == [short_request, long_request]
+
+
+@pytest.mark.parametrize("srpt_max_wait", [10.0, float("inf")])
+def test_srpt_long_request_completes(srpt_max_wait: float):
+    """
+    Test the srpt policy eventually runs a long request to completion under
+    a steady load of short requests, once it waited srpt_max_wait.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=1000,
+                                       max_num_seqs=1,
+                                       max_model_len=1000,
+                                       policy="srpt",
+                                       srpt_max_wait=srpt_max_wait)
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 64
+    cache_config.num_gpu_blocks = 64
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+    _, long_request = create_dummy_prompt("0",
+                                          prompt_length=block_size,
+                                          block_size=block_size,
+                                          max_tokens=20)
+    scheduler.add_seq_group(long_request)
+
+    # A short request arrives every step, which lasts a second.
+    for step in range(1, 60):
+        _, short_request = create_dummy_prompt(str(step),
+                                               prompt_length=block_size,
+                                               block_size=block_size,
+                                               max_tokens=2)
+        scheduler.add_seq_group(short_request)
+        for seq_group in [*scheduler.waiting, *scheduler.running]:
+            seq_group.arrival_time -= 1.0
+        _, out = schedule_and_update_computed_tokens(scheduler)
+        append_new_token(out, 1)
+        for seq_group in get_sequence_groups(out):
+            seq = seq_group.seqs[0]
+            if seq.get_output_len() == seq_group.sampling_params.max_tokens:
+                seq.status = SequenceStatus.FINISHED_LENGTH_CAPPED
+        scheduler.free_finished_seq_groups()
+        if long_request.is_finished():
+            break
+    assert long_request.is_finished() == (srpt_max_wait < float("inf"))
+
+
+def test_schedule_slo():
+    """
+    Test the slo policy schedules the requests in order of the deadline of
+    their next token.
+    """
+    block_size = 4
+    scheduler = initialize_policy_scheduler("slo", block_size)
+    now = time.time()
+    seq_groups = []
+    for i, (arrival_delay, ttft_slo) in enumerate([(3.0, None), (2.0, 10.0),
+                                                   (0.0, 1.0)]):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=block_size,
+                                           block_size=block_size)
+        seq_group.arrival_time = now - arrival_delay
+        seq_group.sampling_params.ttft_slo = ttft_slo
+        scheduler.add_seq_group(seq_group)
+        seq_groups.append(seq_group)
+
+    budget = create_token_budget(token_budget=block_size)
+    output = scheduler._schedule_prefills(budget, None)
+    assert [scheduled.seq_group
+            for scheduled in output.seq_groups] == [seq_groups[2]]
+    # Requests without target come last.
+    assert list(scheduler.waiting) == [seq_groups[1], seq_groups[0]]
+
+    # The deadline of a decode follows from the first token time.
+    seq_group = seq_groups[2]
+    append_new_token_seq_group(block_size, seq_group, 1)
+    seq_group.maybe_set_first_token_time(now)
+    seq_group.sampling_params.tpot_slo = 0.05
+    assert scheduler.policy.get_priority(seq_group, now) == pytest.approx(
+        (now + 0.05, seq_group.arrival_time))
+
+
 def test_decode_schedule_preempted():
     """
     Test decodes cannot be scheduled and preempted.
@@ -625,6 +963,9 @@ def test_decode_schedule_preempted():
 
     scheduler.block_manager.can_append_slots.side_effect = (
         cannot_append_second_group)
+    # Leave the decodes to the per-group path, which uses the mock.
+    scheduler.block_manager.get_num_free_gpu_blocks = MagicMock(
+        return_value=0)
 
     # 1 cannot be scheduled, and the lowest priority (request 2)
     # should be preempted. 1 will also be preempted.
@@ -646,6 +987,47 @@ def test_decode_schedule_preempted():
     assert output.blocks_to_copy == []
 
 
+def test_decode_schedule_batched():
+    """
+    Test the batched decode path schedules the same decodes and preemptions
+    as the per-group path.
+    """
+    block_size = 4
+    outputs = []
+    for batched in [True, False]:
+        # Each decode needs a new block, and only 2 blocks are free.
+        scheduler = initialize_scheduler(block_size=block_size,
+                                         num_cpu_blocks=0,
+                                         num_gpu_blocks=5)
+        if not batched:
+            scheduler._schedule_running_batched = MagicMock()
+        for i in range(3):
+            _, seq_group = create_dummy_prompt(str(i),
+                                               prompt_length=block_size,
+                                               block_size=block_size)
+            scheduler._allocate_and_set_running(seq_group)
+            append_new_token_seq_group(block_size, seq_group, 1)
+            scheduler._add_seq_group_to_running(seq_group)
+
+        budget = create_token_budget()
+        output = scheduler._schedule_running(budget, None)
+        assert len(scheduler.running) == 0
+        assert [
+            scheduled.seq_group.request_id
+            for scheduled in output.decode_seq_groups
+        ] == ["0", "1"]
+        assert [seq_group.request_id
+                for seq_group in output.preempted] == ["2"]
+        assert budget.num_batched_tokens == 2
+        # The block of the preempted sequence group is freed.
+        assert scheduler.block_manager.get_num_free_gpu_blocks() == 1
+        outputs.append([
+            scheduler.block_manager.get_block_table(scheduled.seq_group.seqs[0])
+            for scheduled in output.decode_seq_groups
+        ])
+    assert outputs[0] == outputs[1]
+
+
 def test_decode_swap_beam_search():
     """
     Test best_of > 1 swap out blocks
@@ -677,6 +1059,9 @@ def test_decode_swap_beam_search():
 
     scheduler.block_manager.can_append_slots.side_effect = (
         cannot_append_second_group)
+    # Leave the decodes to the per-group path, which uses the mock.
+    scheduler.block_manager.get_num_free_gpu_blocks = MagicMock(
+        return_value=0)
     scheduler.block_manager.swap_out = MagicMock()
     expected_swap_mapping = [("5", "7")]
     scheduler.block_manager.swap_out.return_value = expected_swap_mapping
@@ -736,6 +1121,102 @@ def test_schedule_decode_blocks_to_copy_update():
     assert output.blocks_to_copy == [(2, 3)]
 
 
+def test_decode_partial_swap():
+    """
+    Test the partial_swap preemption mode only swaps out the tail blocks of
+    the victim that the other decodes need, and swaps them back in.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=64,
+                                       max_num_seqs=64,
+                                       max_model_len=64,
+                                       preemption_mode="partial_swap")
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 8
+    cache_config.num_gpu_blocks = 8
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+    seq_groups = []
+    for i in range(2):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=4 * block_size,
+                                           block_size=block_size)
+        scheduler.add_seq_group(seq_group)
+        seq_groups.append(seq_group)
+
+    # Both prompts fill the GPU.
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert len(out.scheduled_seq_groups) == 2
+    assert scheduler.block_manager.get_num_free_gpu_blocks() == 0
+    append_new_token(out, 1)
+
+    # Each decode needs a new block. The second group releases one tail
+    # block for the first one and keeps its other blocks on the GPU.
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert get_sequence_groups(out) == [seq_groups[0]]
+    assert list(scheduler.swapped) == [seq_groups[1]]
+    assert out.preempted == 1
+    assert len(out.blocks_to_swap_out) == 1
+    assert out.num_preempted_blocks_swapped_out == 1
+    assert out.num_preempted_tokens_recomputed == 0
+    assert scheduler.block_manager.get_num_free_cpu_blocks() == 7
+    assert scheduler.block_manager.get_num_free_gpu_blocks() == 0
+
+    # Once the first group is done, only the tail is swapped back in.
+    scheduler.abort_seq_group("0")
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert get_sequence_groups(out) == [seq_groups[1]]
+    assert len(out.blocks_to_swap_in) == 1
+    assert out.num_preempted_blocks_swapped_in == 1
+    assert scheduler.block_manager.get_num_free_cpu_blocks() == 8
+
+
+def test_decode_auto_preemption():
+    """
+    Test the auto preemption mode picks the cheaper mode from the measured
+    costs, and counts the decisions found wrong when the victim resumes.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig("generate",
+                                       max_num_batched_tokens=64,
+                                       max_num_seqs=64,
+                                       max_model_len=64,
+                                       preemption_mode="auto")
+    cache_config = CacheConfig(block_size, 1.0, 1, "auto")
+    cache_config.num_cpu_blocks = 8
+    cache_config.num_gpu_blocks = 8
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+    cost_model = scheduler.preemption_cost_model
+    assert cost_model is not None
+    seq_groups = []
+    for i in range(2):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=4 * block_size,
+                                           block_size=block_size)
+        scheduler.add_seq_group(seq_group)
+        seq_groups.append(seq_group)
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    append_new_token(out, 1)
+
+    # The swap bandwidth is unknown, so the victim is swapped.
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert out.preemption_modes == ["swap"]
+    assert list(scheduler.swapped) == [seq_groups[1]]
+    append_new_token(out, 1)
+
+    # Swapping turns out to be much slower than recomputing.
+    cost_model.observe_swap(num_blocks=1, seconds=1.0)
+    cost_model.observe_prefill(num_tokens=1000, seconds=1.0)
+    scheduler.abort_seq_group("0")
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert get_sequence_groups(out) == [seq_groups[1]]
+    assert out.num_preemption_mispredictions == 1
+
+    assert scheduler._preempt(seq_groups[1],
+                              []) == PreemptionMode.RECOMPUTE
+    assert seq_groups[1].is_prefill()
+
+
 def test_schedule_swapped_simple():
     block_size = 4
     scheduler = initialize_scheduler(block_size=block_size)
@@ -0,0 +1,30 @@
+import pytest
+
+from vllm.core.step_time_model import StepTimeModel
+
+
+def test_fit():
+    model = StepTimeModel(forgetting_factor=1.0, min_num_observations=3)
+    # 10ms + 0.1ms per decode token + 0.02ms per prefill token.
+    compositions = [(10, 0), (20, 100), (5, 400)]
+    for num_decode_tokens, num_prefill_tokens in compositions:
+        assert model.predict(1, 1) is None
+        model.observe(num_decode_tokens, num_prefill_tokens,
+                      0.01 + 1e-4 * num_decode_tokens +
+                      2e-5 * num_prefill_tokens)
+    model.observe(40, 50, 0.01 + 1e-4 * 40 + 2e-5 * 50)
+    assert model.predict(100, 1000) == pytest.approx(0.04, rel=1e-3)
+    # 50 decodes take 15ms of a 25ms target, leaving 500 prefill tokens.
+    assert model.get_max_num_prefill_tokens(50, 0.025) == pytest.approx(
+        500, abs=1)
+    # Decodes alone exceed the target.
+    assert model.get_max_num_prefill_tokens(200, 0.025) == 0
+
+
+def test_unknown_prefill_cost():
+    model = StepTimeModel(min_num_observations=1)
+    assert model.get_max_num_prefill_tokens(10, 0.05) is None
+    # Decode-only steps tell nothing about the prefill tokens.
+    for num_decode_tokens in range(1, 20):
+        model.observe(num_decode_tokens, 0, 0.01 + 1e-4 * num_decode_tokens)
+    assert model.get_max_num_prefill_tokens(10, 0.05) is None
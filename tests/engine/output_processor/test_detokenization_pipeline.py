@@ -0,0 +1,119 @@
+import threading
+from typing import List, Optional
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from vllm.engine.output_processor.detokenization_pipeline import (
+    DetokenizationPipeline)
+from vllm.engine.output_processor.stop_checker import StopChecker
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import Logprob, Sequence, SequenceGroup, SequenceStatus
+from vllm.transformers_utils.detokenizer import Detokenizer
+
+
+def create_seq_group(request_id: str,
+                     stop: Optional[List[str]] = None) -> SequenceGroup:
+    seq = Sequence(seq_id=int(request_id),
+                   inputs={"prompt_token_ids": [1, 2, 3]},
+                   block_size=16)
+    seq.append_token_id(4, {4: Logprob(0.0)})
+    seq.status = SequenceStatus.RUNNING
+    return SequenceGroup(request_id=request_id,
+                         seqs=[seq],
+                         arrival_time=0.0,
+                         sampling_params=SamplingParams(stop=stop))
+
+
+def create_detokenizer(text: str) -> Detokenizer:
+    detokenizer = MagicMock(spec=Detokenizer)
+
+    def decode_sequences(seqs, params, prefix_offsets, read_offsets):
+        for seq in seqs:
+            seq.output_text += text
+        prefix_offsets[:] = 1
+        read_offsets[:] = 2
+        return [len(text)] * len(seqs)
+
+    def decode_sequences_inplace(seqs, params):
+        return decode_sequences(seqs, params, np.zeros(len(seqs)),
+                                np.zeros(len(seqs)))
+
+    detokenizer.decode_sequences.side_effect = decode_sequences
+    detokenizer.decode_sequences_inplace.side_effect = decode_sequences_inplace
+    return detokenizer
+
+
+@pytest.mark.parametrize("overlap", [True, False])
+def test_defers_with_overlap(overlap: bool):
+    """With overlap, all the sequences are detokenized in the background
+    thread, with its own detokenizer, and have their outputs deferred."""
+    detokenizer = create_detokenizer(" stop")
+    background_detokenizer = create_detokenizer(" stop")
+    pipeline = DetokenizationPipeline(
+        detokenizer,
+        StopChecker(max_model_len=1024,
+                    get_tokenizer_for_seq=MagicMock()), [MagicMock()],
+        background_detokenizer=background_detokenizer if overlap else None)
+
+    plain = create_seq_group("0")
+    with_stop = create_seq_group("1", stop=["stop"])
+    for seq_group in (plain, with_stop):
+        pipeline.add(seq_group, seq_group.seqs[0])
+    pipeline.submit()
+
+    assert pipeline.has_seq_group(plain) == overlap
+    assert pipeline.has_seq_group(with_stop) == overlap
+    assert pipeline.has_pending() == overlap
+    if overlap:
+        assert pipeline.finish() == [plain, with_stop]
+        assert not pipeline.has_seq_group(with_stop)
+        background_detokenizer.decode_sequences.assert_called_once()
+        detokenizer.decode_sequences_inplace.assert_not_called()
+    else:
+        assert pipeline.finish() == []
+        background_detokenizer.decode_sequences.assert_not_called()
+    assert plain.seqs[0].output_text == " stop"
+    assert plain.seqs[0].status == SequenceStatus.RUNNING
+    assert with_stop.seqs[0].status == SequenceStatus.FINISHED_STOPPED
+    assert with_stop.seqs[0].output_text == " "
+
+
+def test_store_grows_during_background_detokenization():
+    """The background thread gets the detokenization offsets as arrays, which
+    are written back to the sequence store once finished, so the engine
+    thread can add sequences meanwhile."""
+    detokenizer = create_detokenizer(" text")
+    background_detokenizer = create_detokenizer(" text")
+    decode_sequences = background_detokenizer.decode_sequences.side_effect
+    started = threading.Event()
+    resume = threading.Event()
+
+    def blocking_decode_sequences(*args):
+        started.set()
+        resume.wait()
+        return decode_sequences(*args)
+
+    background_detokenizer.decode_sequences.side_effect = (
+        blocking_decode_sequences)
+    pipeline = DetokenizationPipeline(
+        detokenizer,
+        StopChecker(max_model_len=1024,
+                    get_tokenizer_for_seq=MagicMock()), [MagicMock()],
+        background_detokenizer=background_detokenizer)
+
+    seq_group = create_seq_group("0", stop=["stop"])
+    seq = seq_group.seqs[0]
+    pipeline.add(seq_group, seq)
+    pipeline.submit()
+    started.wait()
+    # Grows the store past its initial capacity.
+    more_seq_groups = [create_seq_group(str(i)) for i in range(1, 2048)]
+    resume.set()
+
+    assert pipeline.finish() == [seq_group]
+    assert (seq.prefix_offset, seq.read_offset) == (1, 2)
+    assert all((other.seqs[0].prefix_offset,
+                other.seqs[0].read_offset) == (0, 0)
+               for other in more_seq_groups)
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from unittest.mock import MagicMock
 
 import pytest
@@ -83,3 +84,40 @@ def test_stop_on_eos_token(text_wo_eos: str, eos_token: str, eos_token_id: int,
     else:
         assert seq.status == SequenceStatus.FINISHED_STOPPED
         assert seq.output_text == text_wo_eos
+
+
+@pytest.mark.parametrize("ignore_eos", [True, False])
+@pytest.mark.parametrize("include_stop_str_in_output", [True, False])
+@pytest.mark.parametrize("stop", [None, ["ends"], ["</s>"]])
+@pytest.mark.skip_global_cleanup
+def test_stop_before_and_after_detokenization(ignore_eos: bool,
+                                              include_stop_str_in_output: bool,
+                                              stop: Optional[List[str]]):
+    """
+    Test that the checks before and after the detokenization of the new token
+    stop the sequence as maybe_stop_sequence does.
+    """
+    get_tokenizer_for_seq = MagicMock(
+        return_value=MagicMock(spec=PreTrainedTokenizer))
+    stop_checker = StopChecker(max_model_len=1024,
+                               get_tokenizer_for_seq=get_tokenizer_for_seq)
+    sampling_params = SamplingParams(
+        min_tokens=1,
+        ignore_eos=ignore_eos,
+        stop=stop,
+        include_stop_str_in_output=include_stop_str_in_output)
+
+    expected_seq = sequence_with_eos("This text ends with EOS token", "</s>",
+                                     2)
+    stop_checker.maybe_stop_sequence(expected_seq, len("</s>"),
+                                     sampling_params)
+
+    seq = sequence_with_eos("This text ends with EOS token", "</s>", 2)
+    stop_checker.maybe_stop_sequence_before_detokenization(
+        seq, sampling_params)
+    stop_checker.maybe_stop_sequence_after_detokenization(
+        seq, len("</s>"), sampling_params)
+
+    assert seq.status == expected_seq.status
+    assert seq.stop_reason == expected_seq.stop_reason
+    assert seq.output_text == expected_seq.output_text
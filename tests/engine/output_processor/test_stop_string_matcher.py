@@ -0,0 +1,180 @@
+import random
+from typing import List, Optional, Tuple
+
+import pytest
+from tokenizers import Tokenizer, decoders, models
+from transformers import PreTrainedTokenizerFast
+
+from vllm.engine.output_processor.stop_checker import StopChecker
+from vllm.engine.output_processor.stop_string_matcher import (
+    StopStringMatcher, TokenStopStringMatcher, get_token_texts)
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import Logprob, Sequence, SequenceStatus
+from vllm.transformers_utils.detokenizer import get_token_strings
+
+
+def find_stop_string(text: str, new_char_count: int,
+                     stop: Tuple[str, ...]) -> Optional[Tuple[int, int]]:
+    for i, stop_str in enumerate(stop):
+        stop_index = text.find(stop_str, -new_char_count - len(stop_str))
+        if stop_index != -1:
+            return i, stop_index
+    return None
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.skip_global_cleanup
+def test_matcher_finds_as_str_find(seed: int):
+    """The matcher finds the same stop string at the same position as a
+    str.find per stop string, including for the stop strings which end at
+    the last character of the text fed without checking."""
+    rng = random.Random(seed)
+    for _ in range(200):
+        stop = tuple("".join(rng.choices("abc", k=rng.randint(1, 4)))
+                     for _ in range(rng.randint(1, 8)))
+        matcher = StopStringMatcher(stop)
+        num_unchecked_steps = rng.randint(0, 4)
+        text = ""
+        state = 0
+        for step in range(12):
+            new_text = "".join(rng.choices("abcd", k=rng.randint(0, 3)))
+            text += new_text
+            if step < num_unchecked_steps:
+                state = matcher.advance(state, text, len(new_text))
+                continue
+            if not new_text:
+                continue
+            state, match = matcher.find(state, text, len(new_text))
+            assert match == find_stop_string(text, len(new_text), stop)
+            if match is not None:
+                break
+
+
+def make_sequence() -> Sequence:
+    seq = Sequence(seq_id=0,
+                   inputs={"prompt_token_ids": [1]},
+                   block_size=16,
+                   eos_token_id=2)
+    seq.status = SequenceStatus.RUNNING
+    return seq
+
+
+@pytest.mark.parametrize("include_stop_str_in_output", [True, False])
+@pytest.mark.parametrize("min_tokens", [0, 4])
+@pytest.mark.skip_global_cleanup
+def test_stop_checker_with_many_stop_strings(include_stop_str_in_output: bool,
+                                             min_tokens: int):
+    stop = [f"<stop{i}>" for i in range(8)] + ["\n\n"]
+    sampling_params = SamplingParams(
+        stop=stop,
+        min_tokens=min_tokens,
+        include_stop_str_in_output=include_stop_str_in_output)
+    stop_checker = StopChecker(max_model_len=1024,
+                               get_tokenizer_for_seq=lambda seq: None)
+
+    seq = make_sequence()
+    new_texts: List[str] = ["Hello", "\n\n", "wor", "ld<st", "op7>!"]
+    for token_id, new_text in enumerate(new_texts):
+        seq.append_token_id(token_id + 3, {token_id + 3: Logprob(0.0)})
+        seq.output_text += new_text
+        stop_checker.maybe_stop_sequence(seq, len(new_text), sampling_params)
+        if seq.is_finished():
+            break
+
+    assert seq.status == SequenceStatus.FINISHED_STOPPED
+    if min_tokens:
+        # "\n\n" is emitted before min_tokens.
+        assert seq.stop_reason == "<stop7>"
+        expected_text = "Hello\n\nworld<stop7>"
+    else:
+        assert seq.stop_reason == "\n\n"
+        expected_text = "Hello\n\n"
+    if not include_stop_str_in_output:
+        expected_text = expected_text[:-len(seq.stop_reason)]
+    assert seq.output_text == expected_text
+
+
+def make_byte_level_tokenizer(
+        extra_tokens: Tuple[str, ...] = ()) -> PreTrainedTokenizerFast:
+    vocab = {"</s>": 0}
+    for token in ["a", "b", "c", "ab", "bc", "abc", "ca", "cc", "Ġ", "Ġa",
+                  "Ġb", "Ġab", *extra_tokens]:
+        vocab[token] = len(vocab)
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="</s>"))
+    tokenizer.decoder = decoders.ByteLevel()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer,
+                                   eos_token="</s>")
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.skip_global_cleanup
+def test_token_matcher_finds_in_decoded_text(seed: int):
+    """The token matcher finds the stop strings which end in the decoded text
+    of the last output token, whatever the tokens they span."""
+    tokenizer = make_byte_level_tokenizer()
+    vocab_size = len(tokenizer.get_vocab())
+    num_prompt_tokens = 3
+    rng = random.Random(seed)
+    for _ in range(200):
+        stop = tuple("".join(rng.choices("abc ", k=rng.randint(1, 4)))
+                     for _ in range(rng.randint(1, 3)))
+        matcher = TokenStopStringMatcher(tokenizer,
+                                         stop,
+                                         skip_special_tokens=True)
+        token_ids = rng.choices(range(1, vocab_size), k=num_prompt_tokens)
+        for _ in range(10):
+            token_ids.append(rng.randrange(vocab_size))
+            text = tokenizer.decode(token_ids[num_prompt_tokens:],
+                                    skip_special_tokens=True)
+            previous_text = tokenizer.decode(
+                token_ids[num_prompt_tokens:-1], skip_special_tokens=True)
+            expected = next(
+                (i for i, stop_str in enumerate(stop) if text.find(
+                    stop_str, max(len(previous_text) - len(stop_str) +
+                                  1, 0)) != -1), None)
+            assert matcher.find(token_ids, num_prompt_tokens) == expected
+            if expected is not None:
+                break
+
+
+@pytest.mark.parametrize("skip_special_tokens", [True, False])
+@pytest.mark.skip_global_cleanup
+def test_token_texts_are_those_of_token_strings(skip_special_tokens: bool):
+    """The token matcher uses the token texts cached for the logprobs, in
+    which a token that ends with a partial character adds no text."""
+    # "Ã" is the byte-level token of the first byte of "é".
+    tokenizer = make_byte_level_tokenizer(extra_tokens=("Ã", ))
+    token_strings = get_token_strings(tokenizer)
+    token_texts = get_token_texts(tokenizer, skip_special_tokens)
+
+    assert token_texts.texts == [
+        token_strings.get_text(token_id, skip_special_tokens)
+        for token_id in range(len(tokenizer))
+    ]
+    assert token_texts.get_text(tokenizer.get_vocab()["Ã"]) == ""
+    assert token_texts.get_text(tokenizer.get_vocab()["Ġab"]) == " ab"
+
+
+@pytest.mark.skip_global_cleanup
+def test_stop_checker_without_detokenization():
+    tokenizer = make_byte_level_tokenizer()
+    vocab = tokenizer.get_vocab()
+    sampling_params = SamplingParams(stop=["b a", "cc"],
+                                     ignore_eos=True,
+                                     detokenize=False)
+    stop_checker = StopChecker(max_model_len=1024,
+                               get_tokenizer_for_seq=lambda seq: tokenizer)
+
+    seq = make_sequence()
+    for token in ["ab", "Ġ", "b", "Ġab", "c"]:
+        token_id = vocab[token]
+        seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+        stop_checker.maybe_stop_sequence(seq, 0, sampling_params)
+        if seq.is_finished():
+            break
+
+    # "ab" + " " + "b" + " ab" emits "b a" in the last token.
+    assert seq.status == SequenceStatus.FINISHED_STOPPED
+    assert seq.stop_reason == "b a"
+    assert seq.get_output_len() == 4
+    assert seq.output_text == ""
@@ -2,6 +2,7 @@ from argparse import ArgumentTypeError
 
 import pytest
 
+from vllm.config import CacheConfig
 from vllm.engine.arg_utils import EngineArgs, nullable_kvs
 from vllm.utils import FlexibleArgumentParser
 
@@ -81,3 +82,15 @@ def test_composite_arg_parser(arg, expected, option):
     else:
         args = parser.parse_args([f"--{option}", arg])
     assert getattr(args, option.replace("-", "_")) == expected
+
+
+def test_disk_prefix_cache_gb_default():
+    """A CacheConfig built directly gets the disk prefix cache size of the
+    CLI."""
+    parser = EngineArgs.add_cli_args(FlexibleArgumentParser())
+    args = parser.parse_args([])
+    cache_config = CacheConfig(block_size=16,
+                               gpu_memory_utilization=0.9,
+                               swap_space=4,
+                               cache_dtype="auto")
+    assert args.disk_prefix_cache_gb == cache_config.disk_prefix_cache_gb
@@ -3,6 +3,9 @@ from typing import Any, List, Optional
 import pytest
 
 from vllm import CompletionOutput, LLMEngine, SamplingParams
+from vllm.engine.output_processor.detokenization_pipeline import (
+    DetokenizationPipeline)
+from vllm.transformers_utils.detokenizer import Detokenizer
 
 MODEL = "meta-llama/llama-2-7b-hf"
 MAX_TOKENS = 200
@@ -41,7 +44,12 @@ def _test_stopping(llm_engine: LLMEngine,
         llm_engine.step()
 
     while llm_engine.has_unfinished_requests():
-        (request_output, ) = llm_engine.step()
+        request_outputs = llm_engine.step()
+        if not request_outputs and (llm_engine.detokenization_pipeline
+                                    is not None):
+            # The output is deferred to the next step.
+            continue
+        (request_output, ) = request_outputs
         (output, ) = request_output.outputs
 
         # Ensure we don't backtrack
@@ -58,6 +66,18 @@ def _set_async_mode(llm_engine, is_async):
     llm_engine.scheduler[0].use_async_output_proc = is_async
 
 
+def _set_async_detokenization(llm_engine, enabled):
+    output_processor = llm_engine.output_processor
+    llm_engine.detokenization_pipeline = DetokenizationPipeline(
+        llm_engine.detokenizer,
+        output_processor.stop_checker,
+        llm_engine.scheduler,
+        background_detokenizer=Detokenizer(
+            llm_engine._init_tokenizer())) if enabled else None
+    output_processor.detokenization_pipeline = (
+        llm_engine.detokenization_pipeline)
+
+
 def _stop_basic(llm_engine, is_async):
     _test_stopping(llm_engine,
                    stop=["."],
@@ -161,3 +181,17 @@ def test_stop_token_id(vllm_model):
 
     _set_async_mode(vllm_model.model.llm_engine, False)
     _stop_token_id(vllm_model.model.llm_engine, is_async=False)
+
+
+@pytest.mark.skip_global_cleanup
+def test_stop_async_detokenization(vllm_model):
+    llm_engine = vllm_model.model.llm_engine
+    _set_async_mode(llm_engine, False)
+    _set_async_detokenization(llm_engine, True)
+    try:
+        _stop_basic(llm_engine, is_async=False)
+        _stop_multi_tokens(llm_engine, is_async=False)
+        _stop_partial_token(llm_engine, is_async=False)
+        _stop_token_id(llm_engine, is_async=False)
+    finally:
+        _set_async_detokenization(llm_engine, False)
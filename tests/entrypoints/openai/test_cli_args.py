@@ -129,3 +129,21 @@ def test_chat_template_validation_for_sad_paths(serve_parser):
     args = serve_parser.parse_args(args=["--chat-template", "does/not/exist"])
     with pytest.raises(ValueError):
         validate_parsed_serve_args(args)
+
+
+def test_api_server_count_validation(serve_parser):
+    """Ensure several API servers require the multiprocessing frontend"""
+    args = serve_parser.parse_args(args=["--api-server-count", "4"])
+    validate_parsed_serve_args(args)
+
+    args = serve_parser.parse_args(args=[
+        "--api-server-count",
+        "2",
+        "--disable-frontend-multiprocessing",
+    ])
+    with pytest.raises(ValueError):
+        validate_parsed_serve_args(args)
+
+    args = serve_parser.parse_args(args=["--api-server-count", "0"])
+    with pytest.raises(ValueError):
+        validate_parsed_serve_args(args)
@@ -151,6 +151,10 @@ EXPECTED_METRICS = [
     "vllm:request_params_n_bucket",
     "vllm:request_params_n_count",
     "vllm:num_preemptions_total",
+    "vllm:num_preempted_blocks_swapped_out_total",
+    "vllm:num_preempted_blocks_swapped_in_total",
+    "vllm:num_preempted_tokens_recomputed_total",
+    "vllm:preemption_mispredictions_total",
     "vllm:prompt_tokens_total",
     "vllm:generation_tokens_total",
     "vllm:request_success_total",
@@ -110,6 +110,29 @@ def test_metric_set_tag_model_name(vllm_runner, model: str, dtype: str,
             f"actual: {metrics_tag_content!r}")
 
 
+@pytest.mark.parametrize("model", MODELS)
+@pytest.mark.parametrize("eviction_policy", ["lru", "two_queue"])
+def test_metric_prefix_cache_hit_rate_by_policy(vllm_runner, model: str,
+                                                eviction_policy: str) -> None:
+    with vllm_runner(
+            model,
+            dtype="float",
+            disable_log_stats=False,
+            gpu_memory_utilization=0.3,
+            enable_prefix_caching=True,
+            prefix_cache_eviction_policy=eviction_policy) as vllm_model:
+        prompt = "The shared system prompt of the requests. " * 8
+        vllm_model.generate_greedy([prompt, prompt], 4)
+        stat_logger = vllm_model.model.llm_engine.stat_loggers['prometheus']
+        hit_rate = REGISTRY.get_sample_value(
+            "vllm:gpu_prefix_cache_hit_rate", {
+                **stat_logger.labels, "prefix_cache_eviction_policy":
+                eviction_policy
+            })
+
+    assert hit_rate is not None and hit_rate > 0
+
+
 @pytest.mark.parametrize("model", MODELS)
 @pytest.mark.parametrize("dtype", ["half"])
 @pytest.mark.parametrize("max_tokens", [4])
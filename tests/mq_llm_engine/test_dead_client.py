@@ -0,0 +1,50 @@
+"""Test that the engine gives up on one of several clients that stopped
+receiving its outputs, without a model."""
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from tests.mq_llm_engine.test_request_output_delta import create_output
+from vllm.engine.multiprocessing import (RPCProcessRequest,
+                                         get_engine_request_id)
+from vllm.engine.multiprocessing import engine as mq_engine
+from vllm.sampling_params import SamplingParams
+
+
+def test_abort_requests_of_dead_client(monkeypatch):
+    monkeypatch.setattr(mq_engine, "CLIENT_SEND_TIMEOUT_MS", 10)
+    with tempfile.TemporaryDirectory() as td, patch.object(
+            mq_engine, "LLMEngine", MagicMock()):
+        engine = mq_engine.MQLLMEngine(f"ipc://{td}/test",
+                                       use_async_sockets=False,
+                                       num_clients=2)
+        try:
+            request_ids = [
+                get_engine_request_id(client_index, "0")
+                for client_index in range(2)
+            ]
+            for request_id in request_ids:
+                engine._handle_process_request(
+                    RPCProcessRequest(prompt="prompt",
+                                      params=SamplingParams(),
+                                      request_id=request_id))
+
+            # No client is connected, so the send of client 1 times out.
+            engine._send_client_outputs(
+                1, [create_output(request_ids[1], [[1]], ["a"])])
+
+            assert engine.dead_clients == {1}
+            engine.engine.abort_request.assert_called_once_with(
+                [request_ids[1]])
+            assert engine.output_encoder.get_request_ids() == [
+                request_ids[0]
+            ]
+
+            # The new requests of the dead client are dropped.
+            engine.engine.add_request.reset_mock()
+            engine._handle_process_request(
+                RPCProcessRequest(prompt="prompt",
+                                  params=SamplingParams(),
+                                  request_id=get_engine_request_id(1, "1")))
+            engine.engine.add_request.assert_not_called()
+        finally:
+            engine.ctx.destroy(linger=0)
@@ -0,0 +1,70 @@
+"""Test that several clients can share one MQLLMEngine."""
+
+import asyncio
+import tempfile
+import uuid
+
+import pytest
+
+from tests.mq_llm_engine.utils import RemoteMQLLMEngine, generate
+from vllm.engine.arg_utils import AsyncEngineArgs
+
+MODEL = "google/gemma-1.1-2b-it"
+NUM_EXPECTED_TOKENS = 10
+NUM_CLIENTS = 3
+NUM_REQUESTS = 100
+
+ENGINE_ARGS = AsyncEngineArgs(model=MODEL, disable_log_requests=True)
+
+
+@pytest.fixture(scope="function")
+def tmp_socket():
+    with tempfile.TemporaryDirectory() as td:
+        yield f"ipc://{td}/{uuid.uuid4()}"
+
+
+@pytest.mark.asyncio
+async def test_multiple_clients(tmp_socket):
+    with RemoteMQLLMEngine(engine_args=ENGINE_ARGS,
+                           ipc_path=tmp_socket,
+                           num_clients=NUM_CLIENTS) as engine:
+
+        # The engine answers the clients once they are all connected.
+        clients = await asyncio.gather(
+            *(engine.make_client(i) for i in range(NUM_CLIENTS)))
+
+        # The clients use the same request ids.
+        request_ids = [f"request-{i}" for i in range(NUM_REQUESTS)]
+        tasks = [
+            asyncio.create_task(
+                generate(client, request_id, NUM_EXPECTED_TOKENS,
+                         return_output=True)) for client in clients
+            for request_id in request_ids
+        ]
+        outputs = await asyncio.gather(*tasks)
+
+        # Each client got the outputs of its own requests, with the request
+        # ids it used.
+        expected_text = outputs[0].outputs[0].text
+        for i, output in enumerate(outputs):
+            assert output.request_id == request_ids[i % NUM_REQUESTS]
+            assert output.finished
+            assert len(output.outputs[0].token_ids) == NUM_EXPECTED_TOKENS
+            assert output.outputs[0].text == expected_text
+
+        # Aborting a request of a client does not abort the requests of the
+        # other clients with the same id.
+        request_id = "request-abort"
+        abort_task = asyncio.create_task(
+            generate(clients[0], request_id, 1000))
+        other_task = asyncio.create_task(
+            generate(clients[1], request_id, NUM_EXPECTED_TOKENS))
+        await asyncio.sleep(0.5)
+        await clients[0].abort(request_id)
+        num_tokens, _ = await other_task
+        assert num_tokens == NUM_EXPECTED_TOKENS
+        abort_task.cancel()
+
+        # Shutdown.
+        for client in clients:
+            client.close()
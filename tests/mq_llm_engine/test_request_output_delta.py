@@ -0,0 +1,135 @@
+from typing import List
+
+from vllm.engine.multiprocessing.request_output_delta import (
+    RequestOutputDecoder, RequestOutputEncoder, decode_request_output_deltas)
+from vllm.outputs import CompletionOutput, RequestOutput
+from vllm.sampling_params import RequestOutputKind, SamplingParams
+from vllm.sequence import Logprob, RequestMetrics
+
+PROMPT_TOKEN_IDS = list(range(100))
+
+
+def create_output(request_id: str,
+                  token_ids: List[List[int]],
+                  texts: List[str],
+                  finished: bool = False,
+                  include_prompt: bool = True,
+                  with_logprobs: bool = False) -> RequestOutput:
+    outputs = [
+        CompletionOutput(
+            index=i,
+            text=text,
+            token_ids=ids,
+            cumulative_logprob=-float(len(ids)) if with_logprobs else None,
+            logprobs=[{
+                token_id: Logprob(-1.0, 1, str(token_id))
+            } for token_id in ids] if with_logprobs else None,
+            finish_reason="stop" if finished else None)
+        for i, (ids, text) in enumerate(zip(token_ids, texts))
+    ]
+    return RequestOutput(
+        request_id=request_id,
+        prompt="prompt" if include_prompt else None,
+        prompt_token_ids=PROMPT_TOKEN_IDS if include_prompt else None,
+        prompt_logprobs=[None, {
+            1: Logprob(-0.5)
+        }] if include_prompt and with_logprobs else None,
+        outputs=outputs,
+        finished=finished,
+        metrics=RequestMetrics(arrival_time=1.0,
+                               last_token_time=2.0,
+                               first_scheduled_time=1.5,
+                               first_token_time=None,
+                               time_in_queue=0.5),
+    )
+
+
+def assert_outputs_equal(actual: RequestOutput, expected: RequestOutput):
+    assert actual.request_id == expected.request_id
+    assert actual.prompt == expected.prompt
+    assert actual.prompt_token_ids == expected.prompt_token_ids
+    assert actual.prompt_logprobs == expected.prompt_logprobs
+    assert actual.finished == expected.finished
+    assert actual.metrics == expected.metrics
+    assert len(actual.outputs) == len(expected.outputs)
+    for output, expected_output in zip(actual.outputs, expected.outputs):
+        assert output.index == expected_output.index
+        assert output.text == expected_output.text
+        assert list(output.token_ids) == list(expected_output.token_ids)
+        assert output.cumulative_logprob == expected_output.cumulative_logprob
+        assert output.logprobs == expected_output.logprobs
+        assert output.finish_reason == expected_output.finish_reason
+
+
+def send(encoder: RequestOutputEncoder, decoder: RequestOutputDecoder,
+         request_output: RequestOutput) -> int:
+    data = encoder.encode([request_output])
+    deltas = decode_request_output_deltas(data)
+    assert len(deltas) == 1
+    assert_outputs_equal(decoder.decode(deltas[0]), request_output)
+    return len(data)
+
+
+def test_cumulative_outputs():
+    encoder = RequestOutputEncoder()
+    decoder = RequestOutputDecoder()
+    encoder.add_request("0", SamplingParams(logprobs=1))
+
+    token_ids: List[int] = []
+    first_bytes = 0
+    for step in range(50):
+        token_ids = token_ids + [step]
+        request_output = create_output("0", [token_ids],
+                                       ["".join(map(str, token_ids))],
+                                       with_logprobs=True)
+        num_bytes = send(encoder, decoder, request_output)
+        if step == 0:
+            first_bytes = num_bytes
+        else:
+            # The step only carries its new token, without the prompt.
+            assert num_bytes < min(first_bytes // 2, 128)
+
+    # The text is truncated, e.g., by a stop string.
+    send(
+        encoder, decoder,
+        create_output("0", [token_ids], ["012"],
+                      finished=True,
+                      with_logprobs=True))
+
+    # The state of the request is dropped once finished.
+    assert not encoder._sent
+
+
+def test_delta_outputs():
+    encoder = RequestOutputEncoder()
+    decoder = RequestOutputDecoder()
+    encoder.add_request("0",
+                        SamplingParams(output_kind=RequestOutputKind.DELTA))
+    send(encoder, decoder, create_output("0", [[1]], ["a"]))
+    for step in range(5):
+        send(encoder, decoder,
+             create_output("0", [[step]], ["b"], include_prompt=False))
+    send(encoder, decoder,
+         create_output("0", [[]], [""], finished=True, include_prompt=False))
+
+
+def test_reordered_outputs():
+    encoder = RequestOutputEncoder()
+    decoder = RequestOutputDecoder()
+    # With several sequences, the top-n ones can change order.
+    encoder.add_request("0", SamplingParams(n=2))
+    send(encoder, decoder, create_output("0", [[1, 2], [3, 4]], ["ab", "cd"]))
+    send(encoder, decoder,
+         create_output("0", [[3, 4, 5], [1, 2, 6]], ["cde", "abf"]))
+    send(
+        encoder, decoder,
+        create_output("0", [[1, 2, 6, 7], [3, 4, 5, 8]], ["abfg", "cdeh"],
+                      finished=True))
+
+    # The outputs of a request that the encoder does not know are sent in
+    # full.
+    decoder = RequestOutputDecoder()
+    send(encoder, decoder, create_output("1", [[1]], ["a"]))
+    send(encoder, decoder, create_output("1", [[1, 2]], ["ab"]))
+    encoder.abort_request("1")
+    assert not encoder._sent
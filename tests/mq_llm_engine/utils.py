@@ -1,6 +1,6 @@
 import asyncio
 import multiprocessing
-from typing import Callable, Tuple, Union
+from typing import Callable, Optional, Tuple, Union
 
 from vllm import SamplingParams
 from vllm.engine.arg_utils import AsyncEngineArgs
@@ -35,12 +35,15 @@ async def generate(
     return count, request_id
 
 
-def run_normal(engine_args: AsyncEngineArgs, ipc_path: str):
+def run_normal(engine_args: AsyncEngineArgs,
+               ipc_path: str,
+               num_clients: int = 1):
     # Make engine.
     engine = MQLLMEngine.from_engine_args(
         engine_args=engine_args,
         usage_context=UsageContext.UNKNOWN_CONTEXT,
-        ipc_path=ipc_path)
+        ipc_path=ipc_path,
+        num_clients=num_clients)
 
     # Run engine.
     engine.start()
@@ -51,13 +54,15 @@ class RemoteMQLLMEngine:
     def __init__(self,
                  engine_args: AsyncEngineArgs,
                  ipc_path: str,
-                 run_fn: Callable = run_normal) -> None:
+                 run_fn: Callable = run_normal,
+                 num_clients: int = 1) -> None:
 
         self.engine_args = engine_args
         self.ipc_path = ipc_path
         context = multiprocessing.get_context("spawn")
-        self.proc = context.Process(target=run_fn,
-                                    args=(engine_args, ipc_path))
+        args = (engine_args, ipc_path) if num_clients == 1 else (
+            engine_args, ipc_path, num_clients)
+        self.proc = context.Process(target=run_fn, args=args)
         self.proc.start()
 
     def __enter__(self):
@@ -66,9 +71,11 @@ class RemoteMQLLMEngine:
     def __exit__(self, exc_type, exc_value, traceback):
         self.proc.kill()
 
-    async def make_client(self) -> MQLLMEngineClient:
+    async def make_client(self,
+                          client_index: Optional[int] = None
+                          ) -> MQLLMEngineClient:
         engine_config = self.engine_args.create_engine_config()
-        client = MQLLMEngineClient(self.ipc_path, engine_config)
+        client = MQLLMEngineClient(self.ipc_path, engine_config, client_index)
         while True:
             try:
                 await client.setup()
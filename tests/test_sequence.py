@@ -1,8 +1,13 @@
+import pickle
+
+import numpy as np
 import pytest
 
+from vllm.core.block.prefix_caching_block import PrefixCachingBlock
 from vllm.model_executor.layers.sampler import SamplerOutput
-from vllm.sequence import (CompletionSequenceGroupOutput, SequenceData,
-                           SequenceOutput)
+from vllm.sequence import (CompletionSequenceGroupOutput, Logprob,
+                           PackedLogprobs, SequenceData, SequenceOutput,
+                           SequenceStatus, SequenceStore, get_sequence_store)
 
 from .core.utils import create_dummy_prompt
 
@@ -54,6 +59,30 @@ def test_sampler_output_eq(sample_outputs):
     assert sampler_output1 != sampler_output3
 
 
+def test_packed_logprobs():
+    logprobs = PackedLogprobs([7, 3, 5], [-0.5, -0.25, -1.0], [3, 1, 2])
+    expected = {
+        7: Logprob(-0.5, rank=3),
+        3: Logprob(-0.25, rank=1),
+        5: Logprob(-1.0, rank=2),
+    }
+    assert len(logprobs) == 3
+    assert list(logprobs) == [7, 3, 5]
+    assert 3 in logprobs and 4 not in logprobs
+    assert logprobs[5] == expected[5]
+    assert logprobs.get(4) is None
+    assert list(logprobs.items()) == list(expected.items())
+    assert list(logprobs.values()) == list(expected.values())
+    assert logprobs == expected
+    assert logprobs.to_dict() == expected
+    with pytest.raises(KeyError):
+        logprobs[4]
+
+    logprobs.decoded_tokens = ["a", "b", "c"]
+    assert logprobs[3].decoded_token == "b"
+    assert pickle.loads(pickle.dumps(logprobs)) == logprobs
+
+
 def test_sequence_data_prefill():
     seq_data = SequenceData.from_seqs([1, 2, 3, 4])
     assert seq_data.get_num_uncomputed_tokens() == 4
@@ -75,6 +104,21 @@ def test_sequence_data_prefill():
     assert seq_data.get_num_computed_tokens() == 0
 
 
+def test_sequence_data_token_ids_slice():
+    seq_data = SequenceData.from_seqs([1, 2, 3, 4], [5, 6])
+    for start in range(7):
+        for end in range(start, 7):
+            token_ids = seq_data.get_token_ids_slice(start, end)
+            assert token_ids.dtype == np.int64
+            assert token_ids.tolist() == seq_data.get_token_ids()[start:end]
+
+    # The slice is a copy, which does not keep the buffers exported.
+    token_ids = seq_data.get_token_ids_slice(2, 6)
+    seq_data.append_token_id(7, logprob=0.0)
+    assert token_ids.tolist() == [3, 4, 5, 6]
+    assert seq_data.get_token_ids_slice(5, 7).tolist() == [6, 7]
+
+
 def test_sequence_group_stage():
     _, seq_group = create_dummy_prompt("1", 12)
     assert seq_group.is_prefill() is True
@@ -96,3 +140,82 @@ def test_sequence_group_stage():
     assert seq_group.is_prefill() is True
     seq_group.update_num_computed_tokens(1)
     assert seq_group.is_prefill() is False
+
+
+@pytest.mark.parametrize("block_size", [1, 4, 16])
+@pytest.mark.parametrize("prompt_len", [3, 16, 21])
+def test_sequence_block_hashes(block_size: int, prompt_len: int):
+    seq, _ = create_dummy_prompt("1", prompt_len, block_size=block_size)
+
+    def expected_hashes():
+        token_ids = seq.get_token_ids()
+        hashes = []
+        for start in range(0, len(token_ids) - block_size + 1, block_size):
+            hashes.append(
+                PrefixCachingBlock.hash_block_tokens(
+                    is_first_block=not hashes,
+                    prev_block_hash=hashes[-1] if hashes else None,
+                    cur_block_token_ids=token_ids[start:start + block_size]))
+        return hashes
+
+    assert seq.get_block_hashes() == expected_hashes()
+
+    # Decode tokens, including blocks straddling the prompt and the output.
+    for token_id in range(100, 120):
+        seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+        assert seq.get_block_hashes() == expected_hashes()
+
+    # The chain is kept when the sequence is recomputed.
+    seq.reset_state_for_recompute()
+    assert seq.get_block_hashes() == expected_hashes()
+
+
+def test_sequence_store():
+    seq, seq_group = create_dummy_prompt("1", 12)
+    other_seq, _ = create_dummy_prompt("2", 4)
+    assert seq.status == SequenceStatus.WAITING
+    seq.status = SequenceStatus.RUNNING
+    assert seq.status == SequenceStatus.RUNNING
+
+    seq_group.update_num_computed_tokens(12)
+    seq.append_token_id(1, {1: Logprob(0.0)})
+    # The views agree with the data of the sequence.
+    assert seq.get_len() == seq.data.get_len() == 13
+    assert seq.get_output_len() == 1
+    assert not seq.is_prefill()
+    assert seq.get_num_new_tokens() == 1
+
+    # A forked sequence has its own slot.
+    child = seq.fork(3)
+    assert child.slot != seq.slot
+    child.status = SequenceStatus.FINISHED_STOPPED
+    assert seq.status == SequenceStatus.RUNNING
+    assert child.get_len() == 13
+
+    seq.reset_state_for_recompute()
+    assert seq.is_prefill()
+    assert seq.get_num_new_tokens() == 13
+
+    # Bulk reads, by slot.
+    slots = np.array([seq.slot, other_seq.slot, child.slot])
+    store = get_sequence_store()
+    assert store.get_lens(slots).tolist() == [13, 4, 13]
+    assert store.get_num_new_tokens(slots).tolist() == [13, 4, 1]
+    assert store.is_finished(slots).tolist() == [False, False, True]
+
+    # Unpickled sequences get a slot of their own.
+    unpickled_seq = pickle.loads(pickle.dumps(seq))
+    assert unpickled_seq.slot != seq.slot
+    assert unpickled_seq.status == SequenceStatus.RUNNING
+    assert unpickled_seq.get_num_new_tokens() == 13
+
+
+def test_sequence_store_growth():
+    store = SequenceStore(capacity=2)
+    data = SequenceData.from_seqs([1, 2, 3])
+    slots = [store.allocate(SequenceStatus.RUNNING, data) for _ in range(5)]
+    assert sorted(slots) == list(range(5))
+    store.free(slots[2])
+    assert store.allocate(SequenceStatus.WAITING, data) == slots[2]
+    assert store.get_statuses(np.array(slots)).tolist() == [1, 1, 0, 1, 1]
+    assert store.get_lens(np.array(slots)).tolist() == [3] * 5
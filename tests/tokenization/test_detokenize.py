@@ -184,6 +184,72 @@ def test_decode_sequence_logprobs(complete_sequence: str,
         assert sequential_result == complete_sequence
 
 
+@pytest.mark.parametrize("complete_sequence", TRUTH)
+@pytest.mark.parametrize("tokenizer_name", TOKENIZERS)
+@pytest.mark.parametrize("skip_special_tokens", [True, False])
+def test_decode_logprobs_cached_text(complete_sequence_token_ids: List[int],
+                                     detokenizer: Detokenizer,
+                                     skip_special_tokens: bool):
+    """Verify the cached texts of the logprob tokens are those decoded after
+    the previous tokens."""
+    sampling_params = SamplingParams(skip_special_tokens=skip_special_tokens,
+                                     logprobs=2)
+    seq = create_sequence()
+    tokenizer = detokenizer.get_tokenizer_for_seq(seq)
+    for token_id, logprobs in zip(
+            complete_sequence_token_ids,
+            create_dummy_logprobs(complete_sequence_token_ids)):
+        prev_tokens = None if seq.tokens is None else list(seq.tokens)
+        prefix_offset, read_offset = seq.prefix_offset, seq.read_offset
+        seq.append_token_id(token_id, logprobs)
+        detokenizer.decode_sequence_inplace(seq, sampling_params)
+        if prev_tokens is None:
+            continue
+        _, text, _, _ = detokenize_incrementally(
+            tokenizer,
+            seq.get_token_ids()[:-1] + [token_id + 1],
+            prev_tokens,
+            prefix_offset,
+            read_offset,
+            skip_special_tokens=skip_special_tokens)
+        assert seq.output_logprobs[-1][token_id + 1].decoded_token == text
+
+
+@pytest.mark.parametrize("tokenizer_name", TOKENIZERS)
+@pytest.mark.parametrize("skip_special_tokens", [True, False])
+def test_decode_sequences_batched(detokenizer: Detokenizer,
+                                  skip_special_tokens: bool):
+    """Verify the batch decoding of several sequences gives the same texts as
+    decoding them one by one."""
+    sequential_seqs = [create_sequence() for _ in TRUTH]
+    batched_seqs = [create_sequence() for _ in TRUTH]
+    tokenizer = detokenizer.get_tokenizer_for_seq(batched_seqs[0])
+    all_token_ids = [tokenizer(truth)["input_ids"] for truth in TRUTH]
+    sampling_params = SamplingParams(skip_special_tokens=skip_special_tokens)
+
+    for step in range(max(map(len, all_token_ids))):
+        seqs = []
+        for token_ids, sequential_seq, batched_seq in zip(
+                all_token_ids, sequential_seqs, batched_seqs):
+            if step >= len(token_ids):
+                continue
+            token_id = token_ids[step]
+            sequential_seq.append_token_id(token_id,
+                                           {token_id: Logprob(0.0)})
+            detokenizer.decode_sequence_inplace(sequential_seq,
+                                                sampling_params)
+            batched_seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+            seqs.append(batched_seq)
+        new_char_counts = detokenizer.decode_sequences_inplace(
+            seqs, [sampling_params] * len(seqs))
+        assert all(new_char_count == len(
+            seq.output_logprobs[-1][seq.get_last_token_id()].decoded_token)
+                   for seq, new_char_count in zip(seqs, new_char_counts))
+
+    for sequential_seq, batched_seq in zip(sequential_seqs, batched_seqs):
+        assert batched_seq.output_text == sequential_seq.output_text
+
+
 @pytest.mark.parametrize("complete_sequence", TRUTH)
 @pytest.mark.parametrize("tokenizer_name", TOKENIZERS)
 def test_decode_prompt_logprobs(complete_sequence_token_ids: List[int],
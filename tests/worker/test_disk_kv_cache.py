@@ -0,0 +1,56 @@
+from typing import Tuple
+
+import pytest
+import torch
+
+from vllm.worker.cache_engine import DiskKVCache
+
+
+class _BlockMajorBackend:
+
+    @staticmethod
+    def get_kv_cache_shape(num_blocks: int, block_size: int, num_kv_heads: int,
+                           head_size: int) -> Tuple[int, ...]:
+        return (num_blocks, 2, block_size, num_kv_heads, head_size)
+
+
+class _KVMajorBackend:
+
+    @staticmethod
+    def get_kv_cache_shape(num_blocks: int, block_size: int, num_kv_heads: int,
+                           head_size: int) -> Tuple[int, ...]:
+        return (2, num_blocks, block_size * num_kv_heads * head_size)
+
+
+@pytest.mark.parametrize("backend", [_BlockMajorBackend, _KVMajorBackend])
+@pytest.mark.parametrize("dtype", [torch.float16, torch.bfloat16])
+def test_disk_kv_cache_save_and_load(tmp_path, backend, dtype):
+    block_size, num_kv_heads, head_size = 4, 2, 8
+    num_blocks, num_layers, num_slots = 6, 3, 4
+    shape = backend.get_kv_cache_shape(num_blocks, block_size, num_kv_heads,
+                                       head_size)
+    kv_cache = [torch.randn(shape).to(dtype) for _ in range(num_layers)]
+    expected = [layer_cache.clone() for layer_cache in kv_cache]
+
+    def create_disk_cache(kv_cache):
+        return DiskKVCache(str(tmp_path), 0, num_slots, kv_cache, backend,
+                           block_size, num_kv_heads, head_size)
+
+    disk_cache = create_disk_cache(kv_cache)
+    disk_cache.save(torch.tensor([[1, 3], [4, 0]]))
+    # The saves are written in the background.
+    kv_cache[1].zero_()
+    disk_cache.wait_for_saves()
+    del disk_cache
+
+    # A new process maps the same file and loads the blocks back.
+    restored = [torch.zeros_like(layer_cache) for layer_cache in kv_cache]
+    disk_cache = create_disk_cache(restored)
+    disk_cache.load(torch.tensor([[3, 2], [0, 5]]))
+    block_dim = 0 if backend is _BlockMajorBackend else 1
+    for layer in range(num_layers):
+        for src, dst in [(1, 2), (4, 5)]:
+            assert torch.equal(
+                restored[layer].select(block_dim, dst),
+                expected[layer].select(block_dim, src))
+        assert not restored[layer].select(block_dim, 0).any()
@@ -0,0 +1,130 @@
+from typing import Dict, List
+
+import msgspec
+import pytest
+
+from vllm.executor.msgspec_utils import decode_hook, encode_hook
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import (ExecuteModelRequest, SequenceData,
+                           SequenceGroupMetadata, SequenceGroupMetadataDelta)
+from vllm.worker.seq_group_metadata_delta import (
+    SequenceGroupMetadataDecoder, SequenceGroupMetadataDivergenceError,
+    SequenceGroupMetadataEncoder)
+
+encoder = msgspec.msgpack.Encoder(enc_hook=encode_hook)
+decoder = msgspec.msgpack.Decoder(ExecuteModelRequest, dec_hook=decode_hook)
+
+
+def create_request(seq_data: Dict[str, Dict[int, SequenceData]],
+                   finished_requests_ids: List[str]) -> ExecuteModelRequest:
+    return ExecuteModelRequest(
+        seq_group_metadata_list=[
+            SequenceGroupMetadata(
+                request_id=request_id,
+                is_prompt=False,
+                seq_data=data,
+                sampling_params=SamplingParams(),
+                block_tables={seq_id: [seq_id]
+                              for seq_id in data},
+            ) for request_id, data in seq_data.items()
+        ],
+        finished_requests_ids=finished_requests_ids)
+
+
+def send(req: ExecuteModelRequest,
+         metadata_encoder: SequenceGroupMetadataEncoder) -> bytes:
+    return encoder.encode(metadata_encoder.encode(req))
+
+
+def receive(serialized_req: bytes, metadata_decoder:
+            SequenceGroupMetadataDecoder) -> List[SequenceGroupMetadata]:
+    req = decoder.decode(serialized_req)
+    metadata_decoder.decode(req)
+    return req.seq_group_metadata_list
+
+
+def test_delta_transfer():
+    metadata_encoder = SequenceGroupMetadataEncoder()
+    metadata_decoder = SequenceGroupMetadataDecoder()
+    seq_data = {
+        "0": {
+            0: SequenceData.from_seqs(list(range(100)))
+        },
+        "1": {
+            1: SequenceData.from_seqs(list(range(50))),
+            2: SequenceData.from_seqs(list(range(50)), [7]),
+        },
+    }
+    full_size = len(send(create_request(seq_data, []), metadata_encoder))
+
+    for step in range(3):
+        for data in seq_data.values():
+            for seq_id, seq in data.items():
+                seq.append_token_id(seq_id + step, -1.0)
+        serialized_req = send(create_request(seq_data, []), metadata_encoder)
+        # The deltas do not carry the prompts.
+        assert len(serialized_req) < full_size // 4
+        assert isinstance(
+            decoder.decode(serialized_req).seq_group_metadata_list[0],
+            SequenceGroupMetadataDelta)
+        if step == 0:
+            # The first message, which the worker did not get.
+            with pytest.raises(SequenceGroupMetadataDivergenceError):
+                receive(serialized_req, metadata_decoder)
+            metadata_encoder.reset()
+            serialized_req = send(create_request(seq_data, []),
+                                  metadata_encoder)
+        received = receive(serialized_req, metadata_decoder)
+        for metadata in received:
+            data = seq_data[metadata.request_id]
+            assert metadata.seq_data.keys() == data.keys()
+            for seq_id, seq in metadata.seq_data.items():
+                assert seq.get_token_ids() == data[seq_id].get_token_ids()
+                assert (seq.cumulative_logprob ==
+                        data[seq_id].cumulative_logprob)
+
+    # A finished beam is dropped from the cache.
+    del seq_data["1"][2]
+    received = receive(send(create_request(seq_data, []), metadata_encoder),
+                       metadata_decoder)
+    assert received[1].seq_data.keys() == {1}
+
+    # A finished request is dropped from the caches, and a new request with
+    # the same id is sent in full.
+    del seq_data["0"]
+    receive(send(create_request(seq_data, ["0"]), metadata_encoder),
+            metadata_decoder)
+    seq_data["0"] = {3: SequenceData.from_seqs([1, 2, 3])}
+    received = receive(send(create_request(seq_data, []), metadata_encoder),
+                       metadata_decoder)
+    assert received[1].seq_data[3].get_token_ids() == [1, 2, 3]
+
+
+def test_divergence():
+    metadata_encoder = SequenceGroupMetadataEncoder()
+    metadata_decoder = SequenceGroupMetadataDecoder()
+    seq_data = {"0": {0: SequenceData.from_seqs([1, 2, 3])}}
+    receive(send(create_request(seq_data, []), metadata_encoder),
+            metadata_decoder)
+
+    # A lost message.
+    seq_data["0"][0].append_token_id(4, 0.0)
+    send(create_request(seq_data, []), metadata_encoder)
+    seq_data["0"][0].append_token_id(5, 0.0)
+    with pytest.raises(SequenceGroupMetadataDivergenceError):
+        receive(send(create_request(seq_data, []), metadata_encoder),
+                metadata_decoder)
+
+    metadata_encoder.reset()
+    received = receive(send(create_request(seq_data, []), metadata_encoder),
+                       metadata_decoder)
+    assert received[0].seq_data[0].get_token_ids() == [1, 2, 3, 4, 5]
+
+    # Tokens that the cache does not have, with the right version.
+    seq_data["0"][0].append_token_id(6, 0.0)
+    req = metadata_encoder.encode(create_request(seq_data, []))
+    delta = req.seq_group_metadata_list[0]
+    assert isinstance(delta, SequenceGroupMetadataDelta)
+    delta.seq_data_delta[0].new_output_token_ids = [7]
+    with pytest.raises(SequenceGroupMetadataDivergenceError):
+        metadata_decoder.decode(req)
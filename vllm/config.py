@@ -1,5 +1,7 @@
 import enum
+import hashlib
 import json
+import os
 from dataclasses import dataclass, field, fields
 from typing import (TYPE_CHECKING, Any, ClassVar, Dict, Final, List, Literal,
                     Mapping, Optional, Set, Tuple, Type, Union)
@@ -16,8 +18,9 @@ from vllm.tracing import is_otel_available, otel_import_error_traceback
 from vllm.transformers_utils.config import (ConfigFormat, get_config,
                                             get_hf_image_processor_config,
                                             get_hf_text_config)
-from vllm.utils import (GiB_bytes, cuda_device_count_stateless, get_cpu_memory,
-                        is_hip, is_neuron, is_openvino, is_xpu,
+from vllm.utils import (BLOCK_HASH_ALGORITHM, STR_DTYPE_TO_TORCH_DTYPE,
+                        GiB_bytes, cuda_device_count_stateless, get_cpu_memory,
+                        get_dtype_size, is_hip, is_neuron, is_openvino, is_xpu,
                         print_warning_once)
 
 if TYPE_CHECKING:
@@ -113,6 +116,13 @@ class ModelConfig:
             Defaults to 'auto' which defaults to 'hf'.
         mm_processor_kwargs: Arguments to be forwarded to the model's processor
             for multi-modal data, e.g., image processor.
+        async_detokenization: Whether to detokenize the new tokens of a step
+            in a background thread, overlapped with the next step, which
+            holds the outputs back by a step. Only used when async output
+            processing is disabled.
+        batch_detokenization: Whether to detokenize the new tokens of all the
+            sequences of a step together, with a batch decode of the fast
+            tokenizer, before checking them for stop strings.
     """
 
     def __init__(self,
@@ -143,7 +153,9 @@ class ModelConfig:
                  use_async_output_proc: bool = True,
                  override_neuron_config: Optional[Dict[str, Any]] = None,
                  config_format: ConfigFormat = ConfigFormat.AUTO,
-                 mm_processor_kwargs: Optional[Dict[str, Any]] = None) -> None:
+                 mm_processor_kwargs: Optional[Dict[str, Any]] = None,
+                 async_detokenization: bool = False,
+                 batch_detokenization: bool = False) -> None:
         self.model = model
         self.tokenizer = tokenizer
         self.tokenizer_mode = tokenizer_mode
@@ -177,6 +189,8 @@ class ModelConfig:
             self.model, revision)
         self.dtype = _get_and_verify_dtype(self.hf_text_config, dtype)
         self.use_async_output_proc = use_async_output_proc
+        self.async_detokenization = async_detokenization
+        self.batch_detokenization = batch_detokenization
         self.mm_processor_kwargs = mm_processor_kwargs
 
         # Set enforce_eager to False if the value is unset.
@@ -451,6 +465,53 @@ class ModelConfig:
                            " speculative decoding currently.")
             self.use_async_output_proc = False
 
+    def verify_async_detokenization(
+            self, parallel_config: "ParallelConfig",
+            scheduler_config: "SchedulerConfig") -> None:
+        if not self.async_detokenization:
+            # Nothing to check
+            return
+
+        # The async output processor already overlaps the detokenization
+        # with the forward pass of the next step.
+        if self.use_async_output_proc:
+            logger.info("Async detokenization is not used with async output "
+                        "processing.")
+            self.async_detokenization = False
+            return
+
+        if self.skip_tokenizer_init or self.task == "embedding":
+            self.async_detokenization = False
+            return
+
+        if parallel_config.pipeline_parallel_size > 1:
+            logger.warning("Async detokenization can not be enabled with "
+                           "pipeline parallel")
+            self.async_detokenization = False
+            return
+
+        if (scheduler_config.is_multi_step
+                or scheduler_config.num_lookahead_slots > 0):
+            logger.warning("Async detokenization is only supported with "
+                           "single step decoding.")
+            self.async_detokenization = False
+
+    def verify_batch_detokenization(
+            self, scheduler_config: "SchedulerConfig") -> None:
+        if not self.batch_detokenization:
+            # Nothing to check
+            return
+
+        if self.skip_tokenizer_init or self.task == "embedding":
+            self.batch_detokenization = False
+            return
+
+        if (scheduler_config.is_multi_step
+                or scheduler_config.num_lookahead_slots > 0):
+            logger.warning("Batch detokenization is only supported with "
+                           "single step decoding.")
+            self.batch_detokenization = False
+
     def verify_with_parallel_config(
         self,
         parallel_config: "ParallelConfig",
@@ -638,6 +699,17 @@ class CacheConfig:
         cache_dtype: Data type for kv cache storage.
         num_gpu_blocks_override: Number of GPU blocks to use. This overrides the
             profiled num_gpu_blocks if specified. Does nothing if None.
+        prefix_cache_eviction_policy: Policy used to evict unused cached
+            blocks when prefix caching is enabled. One of "lru", "heap_lru"
+            or "two_queue".
+        cpu_prefix_cache_ratio: Fraction of the CPU swap space used to keep
+            blocks evicted from the GPU prefix cache, so that they can be
+            swapped back in instead of recomputed. 0 disables it.
+        disk_prefix_cache_path: Directory under which unused prefix cache
+            blocks are persisted, so that they survive restarts. None
+            disables the disk prefix cache.
+        disk_prefix_cache_gb: Size of the disk prefix cache per GPU (in GiB),
+            4 by default.
     """
 
     def __init__(
@@ -651,6 +723,10 @@ class CacheConfig:
         sliding_window: Optional[int] = None,
         enable_prefix_caching: bool = False,
         cpu_offload_gb: float = 0,
+        prefix_cache_eviction_policy: str = "lru",
+        cpu_prefix_cache_ratio: float = 0.0,
+        disk_prefix_cache_path: Optional[str] = None,
+        disk_prefix_cache_gb: float = 4,
     ) -> None:
         self.block_size = block_size
         self.gpu_memory_utilization = gpu_memory_utilization
@@ -661,6 +737,10 @@ class CacheConfig:
         self.sliding_window = sliding_window
         self.enable_prefix_caching = enable_prefix_caching
         self.cpu_offload_gb = cpu_offload_gb
+        self.prefix_cache_eviction_policy = prefix_cache_eviction_policy
+        self.cpu_prefix_cache_ratio = cpu_prefix_cache_ratio
+        self.disk_prefix_cache_path = disk_prefix_cache_path
+        self.disk_prefix_cache_gb = disk_prefix_cache_gb
 
         self._verify_args()
         self._verify_cache_dtype()
@@ -669,6 +749,9 @@ class CacheConfig:
         # Will be set after profiling.
         self.num_gpu_blocks: Optional[int] = None
         self.num_cpu_blocks: Optional[int] = None
+        # Will be set by verify_with_model_config.
+        self.disk_prefix_cache_dir: Optional[str] = None
+        self.num_disk_prefix_cache_blocks = 0
 
     def metrics_info(self):
         # convert cache_config to dict(key: str, value: str) for prometheus
@@ -694,6 +777,21 @@ class CacheConfig:
             raise ValueError(f"Unknown kv cache dtype: {self.cache_dtype}")
 
     def _verify_prefix_caching(self) -> None:
+        if self.prefix_cache_eviction_policy not in (
+                "lru", "heap_lru", "two_queue"):
+            raise ValueError("Unknown prefix cache eviction policy: "
+                             f"{self.prefix_cache_eviction_policy}.")
+        if not 0.0 <= self.cpu_prefix_cache_ratio <= 1.0:
+            raise ValueError("CPU prefix cache ratio must be between 0 and 1. "
+                             f"Got {self.cpu_prefix_cache_ratio}.")
+        if self.disk_prefix_cache_gb < 0:
+            raise ValueError("Disk prefix cache size must be non-negative. "
+                             f"Got {self.disk_prefix_cache_gb}.")
+        if (self.disk_prefix_cache_path is not None
+                and not self.enable_prefix_caching):
+            raise ValueError("The disk prefix cache requires prefix caching. "
+                             "Run with --enable-prefix-caching to use it.")
+
         if not self.enable_prefix_caching:
             return
 
@@ -720,6 +818,58 @@ class CacheConfig:
         elif cpu_memory_usage > 0.4 * total_cpu_memory:
             logger.warning("Possibly too large swap space. %s", msg)
 
+        if (self.disk_prefix_cache_path is not None
+                and parallel_config.pipeline_parallel_size > 1):
+            raise NotImplementedError(
+                "The disk prefix cache is not supported with pipeline "
+                "parallelism.")
+
+    def verify_with_model_config(
+        self,
+        model_config: "ModelConfig",
+        parallel_config: "ParallelConfig",
+    ) -> None:
+        """Sizes the disk prefix cache and picks its directory.
+
+        Blocks are only reused across restarts by engines whose fingerprint
+        matches: the model, its dtype and the KV cache layout must be the
+        same, as the cached content is only keyed by token ids.
+        """
+        if self.disk_prefix_cache_path is None:
+            return
+
+        num_heads = model_config.get_num_kv_heads(parallel_config)
+        head_size = model_config.get_head_size()
+        num_layers = model_config.get_num_attention_layers(parallel_config)
+        if self.cache_dtype == "auto":
+            dtype = model_config.dtype
+        else:
+            dtype = STR_DTYPE_TO_TORCH_DTYPE[self.cache_dtype]
+        block_bytes = (2 * num_layers * self.block_size * num_heads *
+                       head_size * get_dtype_size(dtype))
+        self.num_disk_prefix_cache_blocks = int(self.disk_prefix_cache_gb *
+                                                GiB_bytes // block_bytes)
+
+        fingerprint = json.dumps({
+            "model": model_config.model,
+            "revision": model_config.revision,
+            "quantization": model_config.quantization,
+            "dtype": str(model_config.dtype),
+            "cache_dtype": str(dtype),
+            "block_size": self.block_size,
+            "tensor_parallel_size": parallel_config.tensor_parallel_size,
+            "num_layers": num_layers,
+            "num_kv_heads": num_heads,
+            "head_size": head_size,
+            "block_hash": BLOCK_HASH_ALGORITHM,
+        })
+        self.disk_prefix_cache_dir = os.path.join(
+            self.disk_prefix_cache_path,
+            hashlib.sha256(fingerprint.encode()).hexdigest()[:16])
+        logger.info("Using a disk prefix cache of %d blocks at %s.",
+                    self.num_disk_prefix_cache_blocks,
+                    self.disk_prefix_cache_dir)
+
 
 @dataclass
 class TokenizerPoolConfig:
@@ -998,12 +1148,34 @@ class SchedulerConfig:
             We use recomputation by default since it incurs lower overhead than
             swapping. However, when the sequence group has multiple sequences
             (e.g., beam search), recomputation is not currently supported. In
-            such a case, we use swapping instead.
-        send_delta_data: Private API. If used, scheduler sends delta data to
-            workers instead of an entire data. It should be enabled only
-            when SPMD worker architecture is enabled. I.e.,
-            VLLM_USE_RAY_SPMD_WORKER=1
-        policy: The scheduling policy to use. "fcfs" (default) or "priority".
+            such a case, we use swapping instead. "partial_swap" only swaps
+            out the tail blocks of the preempted sequences that are needed to
+            continue the other running sequences, and keeps their leading
+            blocks on the GPU. "auto" chooses between swapping and
+            recomputation for each preempted sequence group, from the swap
+            bandwidth and the prefill throughput measured online.
+        send_delta_data: Private API. If used, the executors that send the
+            sequence group metadata to workers in other processes send the
+            full metadata of a request once, then only its changes at every
+            step. The executors that call the driver worker in the engine
+            process pass the metadata by reference either way.
+        policy: The scheduling policy to use. "fcfs" (default), "priority",
+            "prefix_aware", "srpt" or "slo".
+        prefix_aware_max_wait: With the "prefix_aware" policy, the time in
+            seconds after which a waiting request is scheduled in arrival
+            order, regardless of its prefix cache hits.
+        srpt_max_wait: With the "srpt" policy, the time in seconds since
+            arrival after which a request is handled in arrival order,
+            regardless of its remaining work.
+        target_inter_token_latency: With chunked prefill, the target time in
+            seconds of a step, which bounds the inter-token latency of the
+            decodes. If set, the token budget of the prefill chunks is chosen
+            every step from a model of the step time fitted online, instead
+            of filling max_num_batched_tokens.
+        admission_watermark: If set, new prefills are held back while the
+            KV cache blocks that the running sequences are projected to need,
+            from their max_tokens and the output lengths of the finished
+            sequences, leave less than this fraction of the GPU blocks free.
     """
 
     def __init__(self,
@@ -1018,8 +1190,12 @@ class SchedulerConfig:
                  preemption_mode: Optional[str] = None,
                  num_scheduler_steps: int = 1,
                  multi_step_stream_outputs: bool = False,
-                 send_delta_data: bool = False,
-                 policy: str = "fcfs") -> None:
+                 send_delta_data: bool = True,
+                 policy: str = "fcfs",
+                 prefix_aware_max_wait: float = 5.0,
+                 srpt_max_wait: float = 60.0,
+                 target_inter_token_latency: Optional[float] = None,
+                 admission_watermark: Optional[float] = None) -> None:
         if max_num_batched_tokens is None:
             if enable_chunked_prefill:
                 if num_scheduler_steps > 1:
@@ -1068,6 +1244,10 @@ class SchedulerConfig:
         self.multi_step_stream_outputs = multi_step_stream_outputs
         self.send_delta_data = send_delta_data
         self.policy = policy
+        self.prefix_aware_max_wait = prefix_aware_max_wait
+        self.srpt_max_wait = srpt_max_wait
+        self.target_inter_token_latency = target_inter_token_latency
+        self.admission_watermark = admission_watermark
         self._verify_args()
 
     def _verify_args(self) -> None:
@@ -1099,6 +1279,37 @@ class SchedulerConfig:
                 f"({self.num_scheduler_steps}) must be greater than or "
                 "equal to 1.")
 
+        if self.policy not in ("fcfs", "priority", "prefix_aware", "srpt",
+                               "slo"):
+            raise ValueError(f"Unknown scheduling policy: {self.policy}.")
+
+        if self.prefix_aware_max_wait < 0:
+            raise ValueError(
+                "prefix_aware_max_wait "
+                f"({self.prefix_aware_max_wait}) must be greater than or "
+                "equal to 0.")
+
+        if self.srpt_max_wait < 0:
+            raise ValueError(
+                f"srpt_max_wait ({self.srpt_max_wait}) must be greater than "
+                "or equal to 0.")
+
+        if self.target_inter_token_latency is not None:
+            if not self.chunked_prefill_enabled:
+                raise ValueError("target_inter_token_latency requires chunked "
+                                 "prefill to be enabled.")
+            if self.target_inter_token_latency <= 0:
+                raise ValueError(
+                    "target_inter_token_latency "
+                    f"({self.target_inter_token_latency}) must be greater "
+                    "than 0.")
+
+        if (self.admission_watermark is not None
+                and not 0.0 <= self.admission_watermark < 1.0):
+            raise ValueError(
+                "admission_watermark "
+                f"({self.admission_watermark}) must be in [0, 1).")
+
     @property
     def is_multi_step(self) -> bool:
         return self.num_scheduler_steps > 1
@@ -1920,8 +2131,18 @@ class EngineConfig:
         self.model_config.verify_async_output_proc(self.parallel_config,
                                                    self.speculative_config,
                                                    self.device_config)
+        self.model_config.verify_async_detokenization(self.parallel_config,
+                                                      self.scheduler_config)
+        self.model_config.verify_batch_detokenization(self.scheduler_config)
         self.model_config.verify_with_parallel_config(self.parallel_config)
         self.cache_config.verify_with_parallel_config(self.parallel_config)
+        self.cache_config.verify_with_model_config(self.model_config,
+                                                   self.parallel_config)
+        if (self.cache_config.disk_prefix_cache_path is not None
+                and self.device_config.device_type not in ("cuda", "cpu")):
+            raise NotImplementedError(
+                "The disk prefix cache is only supported on CUDA and CPU "
+                "devices.")
 
         if self.lora_config:
             self.lora_config.verify_with_model_config(self.model_config)
@@ -0,0 +1,122 @@
+"""Admission control of new prefills against the projected KV cache demand."""
+import bisect
+from collections import deque
+from typing import Deque, List, Tuple
+
+import numpy as np
+
+
+class AdmissionController:
+    """Holds new prefills back when the KV cache blocks that the running
+    sequences are projected to need would not fit.
+
+    The remaining output length of a sequence is projected from the
+    distribution of the output lengths of the recently finished sequences,
+    conditioned on the sequence having outlived its current output length,
+    and capped by its max_tokens. Since the sequences free their blocks as
+    they finish, the demand peaks just before one of them finishes: the peak
+    is taken over the projected finish times of the sequences.
+
+    A new prefill is admitted only if the projected growth of the blocks of
+    the running sequences and of the new one, plus a watermark, fits within
+    the free blocks, or if no sequence is running: no blocks would be freed
+    for it to fit later.
+
+    Args:
+        block_size (int): The number of tokens per block.
+        watermark_blocks (int): The number of free blocks to keep beyond the
+            projected demand.
+        window_size (int): The number of finished sequences whose output
+            lengths are kept.
+        min_num_observations (int): The number of finished sequences to
+            observe before admission is controlled.
+        quantile (float): The quantile of the conditional output length
+            distribution that the sequences are projected to finish at.
+    """
+
+    def __init__(self,
+                 block_size: int,
+                 watermark_blocks: int,
+                 window_size: int = 1000,
+                 min_num_observations: int = 100,
+                 quantile: float = 0.5):
+        assert 0.0 <= quantile <= 1.0
+        self.block_size = block_size
+        self.watermark_blocks = watermark_blocks
+        self.min_num_observations = min_num_observations
+        self.quantile = quantile
+        self._output_lens: Deque[int] = deque(maxlen=window_size)
+        # The same output lengths, sorted.
+        self._sorted_output_lens: List[int] = []
+
+    @property
+    def is_active(self) -> bool:
+        return len(self._output_lens) >= self.min_num_observations
+
+    def observe_output_len(self, output_len: int) -> None:
+        """Records the output length of a finished sequence."""
+        if len(self._output_lens) == self._output_lens.maxlen:
+            oldest = self._output_lens[0]
+            del self._sorted_output_lens[bisect.bisect_left(
+                self._sorted_output_lens, oldest)]
+        self._output_lens.append(output_len)
+        bisect.insort(self._sorted_output_lens, output_len)
+
+    def project_remaining_len(self, output_len: int,
+                              max_output_len: int) -> int:
+        """The projected number of tokens that a sequence with `output_len`
+        output tokens will still generate, out of at most `max_output_len`.
+        """
+        max_remaining_len = max(max_output_len - output_len, 0)
+        sorted_output_lens = self._sorted_output_lens
+        start = bisect.bisect_right(sorted_output_lens, output_len)
+        if start == len(sorted_output_lens):
+            # The sequence outlived all the observed ones.
+            return max_remaining_len
+        index = start + int(self.quantile *
+                            (len(sorted_output_lens) - 1 - start))
+        return min(sorted_output_lens[index] - output_len, max_remaining_len)
+
+    def get_num_blocks_growth(self, seqs: List[Tuple[int, int]]) -> float:
+        """The projected peak number of blocks of the sequences, minus their
+        current number of blocks.
+
+        Args:
+            seqs: The number of tokens and the projected remaining length of
+                each sequence.
+        """
+        if not seqs:
+            return 0.0
+        lens, remaining_lens = np.array(seqs, dtype=np.float64).T
+        order = np.argsort(-remaining_lens, kind="stable")
+        remaining_lens = remaining_lens[order]
+        # Just before the k-th longest sequence finishes, the k longest
+        # sequences are alive, each with remaining_lens[k] more tokens.
+        # Partially filled blocks are counted as full.
+        num_alive = np.arange(1, len(seqs) + 1)
+        num_blocks = (np.cumsum(lens[order]) + num_alive *
+                      (remaining_lens + self.block_size - 1)) / self.block_size
+        current_num_blocks = (lens.sum() + len(seqs) *
+                              (self.block_size - 1)) / self.block_size
+        return float(num_blocks.max()) - current_num_blocks
+
+    def can_admit(self, seqs: List[Tuple[int, int]],
+                  new_seqs: List[Tuple[int, int]],
+                  num_free_blocks: int) -> bool:
+        """Whether the new sequences fit next to the running ones.
+
+        Args:
+            seqs: The number of tokens and the projected remaining length of
+                each running sequence.
+            new_seqs: The same for the sequences to admit, which have no
+                blocks yet.
+            num_free_blocks: The number of free blocks.
+        """
+        if not seqs:
+            return True
+        num_new_blocks = (sum(num_tokens for num_tokens, _ in new_seqs) +
+                          len(new_seqs) *
+                          (self.block_size - 1)) / self.block_size
+        growth = self.get_num_blocks_growth(seqs + new_seqs)
+        return (growth + num_new_blocks + self.watermark_blocks
+                <= num_free_blocks)
@@ -1,5 +1,5 @@
 import math
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from vllm.core.block.common import BlockList
 from vllm.core.block.interfaces import Block, DeviceAwareBlockAllocator
@@ -36,6 +36,9 @@ class BlockTable:
             BlockTable.
         _num_full_slots (int): The number of tokens currently stored in the
             blocks.
+        _num_swapped_out_blocks (int): The number of trailing blocks that
+            were swapped out to the CPU, while the leading blocks stay on the
+            GPU (see `swap_out()`).
     """
 
     def __init__(
@@ -53,6 +56,7 @@ class BlockTable:
 
         self._max_block_sliding_window = max_block_sliding_window
         self._num_full_slots = self._get_num_token_ids()
+        self._num_swapped_out_blocks = 0
 
     @staticmethod
     def get_num_required_blocks(token_ids: List[int],
@@ -80,7 +84,8 @@ class BlockTable:
 
     def allocate(self,
                  token_ids: List[int],
-                 device: Device = Device.GPU) -> None:
+                 device: Device = Device.GPU,
+                 block_hashes: Optional[List[int]] = None) -> None:
         """Allocates memory blocks for storing the given sequence of token IDs.
 
         This method allocates the required number of blocks to store the given
@@ -90,12 +95,17 @@ class BlockTable:
             token_ids (List[int]): The sequence of token IDs to be stored.
             device (Device, optional): The device on which the blocks should be
                 allocated. Defaults to Device.GPU.
+            block_hashes (Optional[List[int]], optional): The chained content
+                hashes of the full blocks of the token IDs, as returned by
+                `Sequence.get_block_hashes()`. Saves rehashing the blocks
+                when prefix caching is enabled. Defaults to None.
         """
         assert not self._is_allocated
         assert token_ids
         blocks = self._allocate_blocks_for_token_ids(prev_block=None,
                                                      token_ids=token_ids,
-                                                     device=device)
+                                                     device=device,
+                                                     block_hashes=block_hashes)
         self.update(blocks)
         self._num_full_slots = len(token_ids)
 
@@ -223,6 +233,73 @@ class BlockTable:
         for block in self.blocks:
             self._allocator.free(block)
         self._blocks.reset()
+        self._num_swapped_out_blocks = 0
+
+    def get_blocks_to_swap_out(self,
+                               num_blocks: Optional[int] = None) -> List[Block]:
+        """Returns the blocks that `swap_out()` would move to the CPU: the
+        last `num_blocks` blocks that are still on the GPU, or all of them if
+        `num_blocks` is None.
+        """
+        num_gpu_blocks = len(self._blocks) - self._num_swapped_out_blocks
+        if num_blocks is None or num_blocks > num_gpu_blocks:
+            num_blocks = num_gpu_blocks
+        return self.blocks[num_gpu_blocks - num_blocks:num_gpu_blocks]
+
+    def get_swapped_out_blocks(self) -> List[Block]:
+        """Returns the blocks that are swapped out to the CPU."""
+        if self._num_swapped_out_blocks == 0:
+            return []
+        return self.blocks[-self._num_swapped_out_blocks:]
+
+    @property
+    def num_swapped_out_blocks(self) -> int:
+        return self._num_swapped_out_blocks
+
+    def swap_out(self, num_blocks: Optional[int] = None) -> Dict[int, int]:
+        """Swaps out the tail of the table to the CPU.
+
+        Only the last `num_blocks` blocks still on the GPU are swapped out,
+        so that a preempted sequence can keep the head of its KV cache on the
+        GPU and only swap the tail back in when it is resumed. All the blocks
+        are swapped out if `num_blocks` is None.
+
+        Args:
+            num_blocks (Optional[int]): The number of trailing blocks to swap
+                out. Defaults to None.
+
+        Returns:
+            Dict[int, int]: The mapping from the GPU block ids to the CPU block
+                ids of the swapped out blocks.
+        """
+        blocks = self.get_blocks_to_swap_out(num_blocks)
+        if not blocks:
+            return {}
+        mapping = self._allocator.swap(blocks=blocks,
+                                       src_device=Device.GPU,
+                                       dst_device=Device.CPU)
+        self._num_swapped_out_blocks += len(blocks)
+        # Refresh the block ids of the table (post-swap)
+        self.update(self.blocks)
+        return mapping
+
+    def swap_in(self) -> Dict[int, int]:
+        """Swaps the swapped out blocks back in to the GPU.
+
+        Returns:
+            Dict[int, int]: The mapping from the CPU block ids to the GPU block
+                ids of the swapped in blocks.
+        """
+        blocks = self.get_swapped_out_blocks()
+        if not blocks:
+            return {}
+        mapping = self._allocator.swap(blocks=blocks,
+                                       src_device=Device.CPU,
+                                       dst_device=Device.GPU)
+        self._num_swapped_out_blocks = 0
+        # Refresh the block ids of the table (post-swap)
+        self.update(self.blocks)
+        return mapping
 
     @property
     def physical_block_ids(self) -> List[int]:
@@ -259,9 +336,12 @@ class BlockTable:
         # ones after the appended ones.
         return sequence_token_ids[self.num_full_slots:]
 
-    def _allocate_blocks_for_token_ids(self, prev_block: Optional[Block],
-                                       token_ids: List[int],
-                                       device: Device) -> List[Block]:
+    def _allocate_blocks_for_token_ids(
+            self,
+            prev_block: Optional[Block],
+            token_ids: List[int],
+            device: Device,
+            block_hashes: Optional[List[int]] = None) -> List[Block]:
         blocks: List[Block] = []
 
         block_token_ids = []
@@ -275,8 +355,10 @@ class BlockTable:
         if block_token_ids:
             blocks.extend(
                 self._allocator.allocate_immutable_blocks(
-                    prev_block, block_token_ids=block_token_ids,
-                    device=device))
+                    prev_block,
+                    block_token_ids=block_token_ids,
+                    device=device,
+                    block_hashes=block_hashes))
             prev_block = blocks[-1]
 
         if tail_token_ids:
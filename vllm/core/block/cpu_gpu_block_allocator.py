@@ -1,9 +1,12 @@
 from typing import Dict, FrozenSet, List, Optional, Tuple
 
+from vllm.core.block.cpu_prefix_cache import CpuPrefixCache
+from vllm.core.block.disk_prefix_cache import DiskPrefixCache
 from vllm.core.block.interfaces import (Block, BlockAllocator, BlockId,
                                         DeviceAwareBlockAllocator)
 from vllm.core.block.naive_block import NaiveBlock, NaiveBlockAllocator
 from vllm.core.block.prefix_caching_block import PrefixCachingBlockAllocator
+from vllm.core.evictor_v2 import EvictionPolicy
 from vllm.utils import Device
 
 
@@ -25,6 +28,10 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
         num_gpu_blocks: int,
         num_cpu_blocks: int,
         block_size: int,
+        eviction_policy: EvictionPolicy = EvictionPolicy.LRU,
+        num_cpu_prefix_cache_blocks: int = 0,
+        disk_prefix_cache_dir: Optional[str] = None,
+        num_disk_prefix_cache_blocks: int = 0,
     ) -> DeviceAwareBlockAllocator:
         """Creates a CpuGpuBlockAllocator instance with the specified
         configuration.
@@ -43,6 +50,16 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
             num_cpu_blocks (int): The number of blocks to allocate for CPU
                 memory.
             block_size (int): The size of each block in number of tokens.
+            eviction_policy (EvictionPolicy): The eviction policy used by
+                "prefix_caching" allocators. Ignored by "naive" allocators.
+            num_cpu_prefix_cache_blocks (int): The number of CPU blocks set
+                aside as a second-tier cache for blocks evicted from the GPU
+                prefix cache. Only used by "prefix_caching" allocators.
+            disk_prefix_cache_dir (Optional[str]): The directory of the
+                persistent disk prefix cache. Only used by "prefix_caching"
+                allocators.
+            num_disk_prefix_cache_blocks (int): The number of blocks the disk
+                prefix cache can hold. 0 disables it.
 
         Returns:
             DeviceAwareBlockAllocator: A CpuGpuBlockAllocator instance with the
@@ -56,6 +73,28 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
         gpu_block_ids = block_ids[:num_gpu_blocks]
         cpu_block_ids = block_ids[num_gpu_blocks:]
 
+        cpu_prefix_cache: Optional[CpuPrefixCache] = None
+        if allocator_type == "prefix_caching" and num_cpu_prefix_cache_blocks:
+            assert 0 < num_cpu_prefix_cache_blocks <= num_cpu_blocks
+            # The tail of the CPU blocks is reserved for the CPU prefix cache,
+            # the rest stays available for swapping preempted sequences.
+            num_cpu_blocks -= num_cpu_prefix_cache_blocks
+            cpu_prefix_cache = CpuPrefixCache(
+                block_ids=cpu_block_ids[num_cpu_blocks:],
+                first_physical_block_id=num_cpu_blocks,
+                eviction_policy=eviction_policy,
+            )
+            cpu_block_ids = cpu_block_ids[:num_cpu_blocks]
+
+        disk_prefix_cache: Optional[DiskPrefixCache] = None
+        if allocator_type == "prefix_caching" and num_disk_prefix_cache_blocks:
+            assert disk_prefix_cache_dir is not None
+            disk_prefix_cache = DiskPrefixCache(
+                cache_dir=disk_prefix_cache_dir,
+                num_blocks=num_disk_prefix_cache_blocks,
+                eviction_policy=eviction_policy,
+            )
+
         if allocator_type == "naive":
             gpu_allocator: BlockAllocator = NaiveBlockAllocator(
                 create_block=NaiveBlock,  # type: ignore
@@ -75,12 +114,16 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
                 num_blocks=num_gpu_blocks,
                 block_size=block_size,
                 block_ids=gpu_block_ids,
+                eviction_policy=eviction_policy,
+                cpu_prefix_cache=cpu_prefix_cache,
+                disk_prefix_cache=disk_prefix_cache,
             )
 
             cpu_allocator = PrefixCachingBlockAllocator(
                 num_blocks=num_cpu_blocks,
                 block_size=block_size,
                 block_ids=cpu_block_ids,
+                eviction_policy=eviction_policy,
             )
         else:
             raise ValueError(f"Unknown allocator type {allocator_type=}")
@@ -88,10 +131,13 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
         return CpuGpuBlockAllocator(
             cpu_block_allocator=cpu_allocator,
             gpu_block_allocator=gpu_allocator,
+            cpu_prefix_cache=cpu_prefix_cache,
         )
 
-    def __init__(self, cpu_block_allocator: BlockAllocator,
-                 gpu_block_allocator: BlockAllocator):
+    def __init__(self,
+                 cpu_block_allocator: BlockAllocator,
+                 gpu_block_allocator: BlockAllocator,
+                 cpu_prefix_cache: Optional[CpuPrefixCache] = None):
         assert not (
             cpu_block_allocator.all_block_ids
             & gpu_block_allocator.all_block_ids
@@ -104,6 +150,7 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
 
         self._swap_mapping: Dict[int, int] = {}
         self._null_block: Optional[Block] = None
+        self._cpu_prefix_cache = cpu_prefix_cache
 
         self._block_ids_to_allocator: Dict[int, BlockAllocator] = {}
         for _, allocator in self._allocators.items():
@@ -130,9 +177,12 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
         """
         return self._allocators[device].allocate_mutable_block(prev_block)
 
-    def allocate_immutable_blocks(self, prev_block: Optional[Block],
-                                  block_token_ids: List[List[int]],
-                                  device: Device) -> List[Block]:
+    def allocate_immutable_blocks(
+            self,
+            prev_block: Optional[Block],
+            block_token_ids: List[List[int]],
+            device: Device,
+            block_hashes: Optional[List[int]] = None) -> List[Block]:
         """Allocates a new group of immutable blocks with the provided block 
         token IDs on the specified device.
 
@@ -142,13 +192,15 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
             block_token_ids (List[int]): The list of block token IDs to be 
                 stored in the new blocks.
             device (Device): The device on which to allocate the new block.
+            block_hashes (Optional[List[int]]): The precomputed content
+                hashes of the blocks, if known. Used for prefix hashing.
 
         Returns:
             List[Block]: The newly allocated list of immutable blocks 
                 containing the provided block token IDs.
         """
         return self._allocators[device].allocate_immutable_blocks(
-            prev_block, block_token_ids)
+            prev_block, block_token_ids, block_hashes=block_hashes)
 
     def allocate_immutable_block(self, prev_block: Optional[Block],
                                  token_ids: List[int],
@@ -321,10 +373,68 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
         return frozenset(self._block_ids_to_allocator.keys())
 
     def get_prefix_cache_hit_rate(self, device: Device) -> float:
-        """Prefix cache hit rate. -1 means not supported or disabled."""
+        """Prefix cache hit rate. -1 means not supported or disabled.
+
+        When the CPU prefix cache is enabled, the CPU hit rate is the rate of
+        GPU prefix cache misses that were served from CPU memory.
+        """
         assert device in self._allocators
+        if device == Device.CPU and self._cpu_prefix_cache is not None:
+            return self._cpu_prefix_cache.get_prefix_cache_hit_rate()
         return self._allocators[device].get_prefix_cache_hit_rate()
 
+    def get_and_reset_cpu_prefix_cache_swaps(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Returns and clears the copies between the GPU prefix cache and the
+        CPU prefix cache issued since the last call. It should be called
+        once per scheduling step.
+
+        Returns:
+            Tuple of the GPU -> CPU and CPU -> GPU physical block id
+            mappings. The swap outs must be executed before the swap ins.
+        """
+        if self._cpu_prefix_cache is None:
+            return [], []
+
+        gpu_allocator = self._allocators[Device.GPU]
+        assert isinstance(gpu_allocator, PrefixCachingBlockAllocator)
+        swaps_out, swaps_in = (
+            gpu_allocator.get_and_reset_cpu_prefix_cache_swaps())
+        # GPU block ids start at 0, so they are already physical ids.
+        cpu_cache = self._cpu_prefix_cache
+        return ([(gpu_block_id, cpu_cache.get_physical_block_id(cpu_block_id))
+                 for gpu_block_id, cpu_block_id in swaps_out],
+                [(cpu_cache.get_physical_block_id(cpu_block_id), gpu_block_id)
+                 for cpu_block_id, gpu_block_id in swaps_in])
+
+    def get_and_reset_disk_prefix_cache_copies(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Returns and clears the copies between the GPU prefix cache and the
+        disk prefix cache issued since the last call. It should be called
+        once per scheduling step, after the previous step was executed.
+
+        Returns:
+            Tuple of the GPU block -> disk slot saves and disk slot -> GPU
+            block loads. The saves must be executed before any other cache
+            operation of the step.
+        """
+        gpu_allocator = self._allocators[Device.GPU]
+        if not isinstance(gpu_allocator, PrefixCachingBlockAllocator):
+            return [], []
+        # GPU block ids start at 0, so they are already physical ids.
+        return gpu_allocator.get_and_reset_disk_prefix_cache_copies()
+
+    def has_pending_disk_prefix_cache_copies(self) -> bool:
+        gpu_allocator = self._allocators[Device.GPU]
+        return (isinstance(gpu_allocator, PrefixCachingBlockAllocator) and
+                gpu_allocator.has_pending_disk_prefix_cache_copies())
+
+    def get_num_cached_prefix_blocks(self, block_hashes: List[int]) -> int:
+        gpu_allocator = self._allocators[Device.GPU]
+        if not isinstance(gpu_allocator, PrefixCachingBlockAllocator):
+            return 0
+        return gpu_allocator.get_num_cached_prefix_blocks(block_hashes)
+
     def get_and_reset_swaps(self) -> List[Tuple[int, int]]:
         """Returns and clears the mapping of source to destination block IDs.
         Will be called after every swapping operations for now, and after every
@@ -0,0 +1,141 @@
+"""Second-tier prefix cache that keeps evicted KV blocks in CPU memory."""
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from vllm.core.block.common import CacheMetricData
+from vllm.core.block.interfaces import BlockId
+from vllm.core.evictor_v2 import EvictionPolicy, Evictor, make_evictor
+
+PrefixHash = int
+
+
+class CpuPrefixCache:
+    """A content-addressed cache of KV blocks in CPU memory.
+
+    When the GPU prefix caching allocator evicts an unused cached block, the
+    block is offloaded here (GPU -> CPU copy) and kept under its content hash.
+    A later prefix match that misses on GPU but hits here swaps the block back
+    in (CPU -> GPU copy) instead of recomputing the prefill.
+
+    All cached CPU blocks are unreferenced and live in an evictor, except for
+    the blocks that are the source of a swap in during the current scheduling
+    step. Those are pinned until `unpin_all()` is called at the end of the
+    step, so that they cannot be chosen as the destination of an offload
+    while their content is still to be read.
+
+    The copies themselves are issued by the caller; this class only does the
+    bookkeeping.
+
+    Args:
+        block_ids (List[int]): The absolute CPU block ids owned by the cache.
+        first_physical_block_id (int): The zero-offset CPU block id of
+            block_ids[0]. The ids are assumed to be contiguous.
+        eviction_policy (EvictionPolicy): Policy used to drop cached blocks
+            once the cache is full.
+    """
+
+    def __init__(
+        self,
+        block_ids: List[int],
+        first_physical_block_id: int,
+        eviction_policy: EvictionPolicy = EvictionPolicy.LRU,
+    ):
+        self._free_block_ids: Deque[BlockId] = deque(block_ids)
+        self._physical_block_ids: Dict[BlockId, int] = {
+            block_id: first_physical_block_id + i
+            for i, block_id in enumerate(block_ids)
+        }
+        self._cached_blocks: Dict[PrefixHash, BlockId] = {}
+        self._pinned_blocks: Dict[BlockId, PrefixHash] = {}
+        # Metadata needed to put pinned blocks back into the evictor.
+        self._block_num_hashed_tokens: Dict[BlockId, int] = {}
+        self._block_last_accessed: Dict[BlockId, float] = {}
+        self._evictor: Evictor = make_evictor(eviction_policy)
+        self.metric_data = CacheMetricData()
+
+    def __contains__(self, content_hash: PrefixHash) -> bool:
+        return content_hash in self._cached_blocks
+
+    @property
+    def num_blocks(self) -> int:
+        return len(self._physical_block_ids)
+
+    @property
+    def num_cached_blocks(self) -> int:
+        return len(self._cached_blocks)
+
+    def get_physical_block_id(self, block_id: BlockId) -> int:
+        return self._physical_block_ids[block_id]
+
+    def offload(self,
+                content_hash: PrefixHash,
+                last_accessed: float,
+                num_hashed_tokens: int = 0) -> Optional[BlockId]:
+        """Reserves a CPU block for the content of an evicted GPU block.
+
+        Returns:
+            Optional[BlockId]: The CPU block the GPU block should be copied
+                to, or None if no copy is needed (the content is already
+                cached) or possible (every CPU block is pinned).
+        """
+        block_id = self._cached_blocks.get(content_hash)
+        if block_id is not None:
+            if block_id in self._evictor:
+                self._evictor.update(block_id, last_accessed)
+            return None
+
+        block_id = self._allocate_block_id()
+        if block_id is None:
+            return None
+
+        self._cached_blocks[content_hash] = block_id
+        self._block_num_hashed_tokens[block_id] = num_hashed_tokens
+        self._block_last_accessed[block_id] = last_accessed
+        self._evictor.add(block_id, content_hash, num_hashed_tokens,
+                          last_accessed)
+        return block_id
+
+    def lookup(self, content_hash: PrefixHash,
+               now: float) -> Optional[BlockId]:
+        """Looks up a block by content hash and pins it on a hit.
+
+        Returns:
+            Optional[BlockId]: The CPU block holding the content, which
+                should be copied to GPU, or None on a miss.
+        """
+        block_id = self._cached_blocks.get(content_hash)
+        self.metric_data.query(hit=block_id is not None)
+        if block_id is None:
+            return None
+
+        self._block_last_accessed[block_id] = now
+        if block_id not in self._pinned_blocks:
+            self._evictor.remove(block_id)
+            self._pinned_blocks[block_id] = content_hash
+        return block_id
+
+    def unpin_all(self) -> None:
+        """Makes the blocks pinned during the current step evictable again.
+        """
+        for block_id, content_hash in self._pinned_blocks.items():
+            self._evictor.add(block_id, content_hash,
+                              self._block_num_hashed_tokens[block_id],
+                              self._block_last_accessed[block_id])
+        self._pinned_blocks.clear()
+
+    def get_prefix_cache_hit_rate(self) -> float:
+        return self.metric_data.get_hit_rate()
+
+    def _allocate_block_id(self) -> Optional[BlockId]:
+        if self._free_block_ids:
+            return self._free_block_ids.popleft()
+
+        if self._evictor.num_blocks == 0:
+            return None
+
+        block_id, content_hash = self._evictor.evict()
+        assert self._cached_blocks[content_hash] == block_id
+        del self._cached_blocks[content_hash]
+        del self._block_num_hashed_tokens[block_id]
+        del self._block_last_accessed[block_id]
+        return block_id
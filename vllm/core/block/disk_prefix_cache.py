@@ -0,0 +1,259 @@
+"""Persistent prefix cache tier that keeps KV blocks in files on local disk."""
+import json
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from vllm.core.block.common import CacheMetricData
+from vllm.core.evictor_v2 import EvictionPolicy, Evictor, make_evictor
+from vllm.logger import init_logger
+
+logger = init_logger(__name__)
+
+PrefixHash = int
+SlotId = int
+
+DISK_PREFIX_CACHE_INDEX_FILE = "index.bin"
+DISK_PREFIX_CACHE_METADATA_FILE = "index.json"
+
+# One index record per disk slot. A slot is only reused after the invalidation
+# of its record has been flushed, and a record is only marked valid once the
+# workers have written and flushed the KV data of the slot.
+INDEX_DTYPE = np.dtype([
+    ("content_hash", np.int64),
+    ("num_hashed_tokens", np.int64),
+    ("last_accessed", np.float64),
+    ("valid", np.uint8),
+])
+
+
+def get_disk_prefix_cache_data_file(cache_dir: str, rank: int) -> str:
+    """Returns the path of the KV data file written by the given worker."""
+    return os.path.join(cache_dir, f"rank{rank}.kv")
+
+
+def reset_disk_prefix_cache_index(cache_dir: str) -> None:
+    """Drops the persisted index, so that no slot is considered valid.
+
+    Called by the workers before they (re)create a KV data file, as the
+    content of the existing slots is lost then.
+    """
+    for name in (DISK_PREFIX_CACHE_METADATA_FILE,
+                 DISK_PREFIX_CACHE_INDEX_FILE):
+        path = os.path.join(cache_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class DiskPrefixCache:
+    """A content-addressed cache of KV blocks persisted on local disk.
+
+    Every unused cached GPU block is saved here when its refcount drops to
+    zero (a GPU -> disk copy), keyed by its content hash. A later prefix
+    match that misses on GPU but hits here loads the block (a disk -> GPU
+    copy) instead of recomputing the prefill. As the index is kept in a
+    memory-mapped file under `cache_dir`, the cache survives restarts of the
+    engine. `cache_dir` is expected to be specific to the model and the KV
+    cache layout, see `CacheConfig.disk_prefix_cache_dir`.
+
+    This class only does the bookkeeping and maintains the index file; the
+    KV data is stored by the workers in one file per rank (see
+    `vllm.worker.cache_engine.DiskKVCache`).
+
+    Slots saved or loaded during the current scheduling step are pinned
+    until `unpin_all()` is called at the end of the step, so that they cannot
+    be reused while their content is still to be written or read. The index
+    records of the slots saved during a step are only marked valid by the
+    `commit()` that follows the step, once the workers have written and
+    flushed the data. The same `commit()` flushes the invalidation of the
+    slots reused by the step before the workers overwrite their data.
+
+    Args:
+        cache_dir (str): The directory holding the index and data files.
+        num_blocks (int): The number of blocks the cache can hold.
+        eviction_policy (EvictionPolicy): Policy used to drop cached blocks
+            once the cache is full.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        num_blocks: int,
+        eviction_policy: EvictionPolicy = EvictionPolicy.LRU,
+    ):
+        assert num_blocks > 0
+        self._cache_dir = cache_dir
+        self._num_blocks = num_blocks
+        self._index = self._open_index()
+
+        self._free_slots: Deque[SlotId] = deque()
+        self._cached_blocks: Dict[PrefixHash, SlotId] = {}
+        self._pinned_slots: Dict[SlotId, PrefixHash] = {}
+        # Slots saved during the current step, to be marked valid on commit.
+        self._uncommitted_slots: List[SlotId] = []
+        # Slots saved during the previous step, whose data is now written.
+        self._committable_slots: List[SlotId] = []
+        # Whether records were invalidated since the last flush of the index.
+        self._has_invalidated_slots = False
+        self._evictor: Evictor = make_evictor(eviction_policy)
+        self.metric_data = CacheMetricData()
+
+        valid = self._index["valid"].astype(bool)
+        self._free_slots.extend(np.flatnonzero(~valid).tolist())
+        for slot, content_hash, num_hashed_tokens, last_accessed in zip(
+                np.flatnonzero(valid).tolist(),
+                self._index["content_hash"][valid].tolist(),
+                self._index["num_hashed_tokens"][valid].tolist(),
+                self._index["last_accessed"][valid].tolist()):
+            self._cached_blocks[content_hash] = slot
+            self._evictor.add(slot, content_hash, num_hashed_tokens,
+                              last_accessed)
+        if self._cached_blocks:
+            logger.info("Loaded %d blocks from the disk prefix cache at %s.",
+                        len(self._cached_blocks), cache_dir)
+
+    def _open_index(self) -> np.memmap:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        index_path = os.path.join(self._cache_dir,
+                                  DISK_PREFIX_CACHE_INDEX_FILE)
+        metadata_path = os.path.join(self._cache_dir,
+                                     DISK_PREFIX_CACHE_METADATA_FILE)
+        metadata = {"num_blocks": self._num_blocks}
+
+        reuse = False
+        if os.path.exists(index_path) and os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                reuse = json.load(f) == metadata
+            if not reuse:
+                logger.warning(
+                    "The disk prefix cache at %s was created with a "
+                    "different capacity. It is discarded.", self._cache_dir)
+
+        if reuse:
+            return np.memmap(index_path,
+                             dtype=INDEX_DTYPE,
+                             mode="r+",
+                             shape=(self._num_blocks, ))
+
+        reset_disk_prefix_cache_index(self._cache_dir)
+        index = np.memmap(index_path,
+                          dtype=INDEX_DTYPE,
+                          mode="w+",
+                          shape=(self._num_blocks, ))
+        index.flush()
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f)
+        return index
+
+    def __contains__(self, content_hash: PrefixHash) -> bool:
+        return content_hash in self._cached_blocks
+
+    @property
+    def num_blocks(self) -> int:
+        return self._num_blocks
+
+    @property
+    def num_cached_blocks(self) -> int:
+        return len(self._cached_blocks)
+
+    @property
+    def has_uncommitted_slots(self) -> bool:
+        return bool(self._uncommitted_slots or self._committable_slots)
+
+    def save(self,
+             content_hash: PrefixHash,
+             last_accessed: float,
+             num_hashed_tokens: int = 0) -> Optional[SlotId]:
+        """Reserves a slot for the content of a GPU block.
+
+        Returns:
+            Optional[SlotId]: The slot the GPU block should be copied to, or
+                None if no copy is needed (the content is already cached) or
+                possible (every slot is pinned).
+        """
+        slot = self._cached_blocks.get(content_hash)
+        if slot is not None:
+            if slot in self._evictor:
+                self._evictor.update(slot, last_accessed)
+            return None
+
+        slot = self._allocate_slot()
+        if slot is None:
+            return None
+
+        self._cached_blocks[content_hash] = slot
+        self._pinned_slots[slot] = content_hash
+        self._uncommitted_slots.append(slot)
+        self._index["content_hash"][slot] = content_hash
+        self._index["num_hashed_tokens"][slot] = num_hashed_tokens
+        self._index["last_accessed"][slot] = last_accessed
+        return slot
+
+    def lookup(self, content_hash: PrefixHash,
+               now: float) -> Optional[SlotId]:
+        """Looks up a block by content hash and pins it on a hit.
+
+        Returns:
+            Optional[SlotId]: The slot holding the content, which should be
+                copied to GPU, or None on a miss.
+        """
+        slot = self._cached_blocks.get(content_hash)
+        self.metric_data.query(hit=slot is not None)
+        if slot is None:
+            return None
+
+        self._index["last_accessed"][slot] = now
+        if slot not in self._pinned_slots:
+            self._evictor.remove(slot)
+            self._pinned_slots[slot] = content_hash
+        return slot
+
+    def unpin_all(self) -> None:
+        """Makes the slots pinned during the current step evictable again.
+        """
+        for slot, content_hash in self._pinned_slots.items():
+            self._evictor.add(slot, content_hash,
+                              int(self._index["num_hashed_tokens"][slot]),
+                              float(self._index["last_accessed"][slot]))
+        self._pinned_slots.clear()
+        self._committable_slots.extend(self._uncommitted_slots)
+        self._uncommitted_slots = []
+
+    def commit(self) -> None:
+        """Marks the slots saved before the last `unpin_all()` as valid in
+        the persisted index, and flushes the index.
+
+        Must only be called once the workers have written and flushed the
+        data of the saves of that step, and before they execute the saves of
+        the current step, which may overwrite the slots invalidated by it.
+        """
+        if not (self._committable_slots or self._has_invalidated_slots):
+            return
+        self._index["valid"][self._committable_slots] = 1
+        self._committable_slots = []
+        self._has_invalidated_slots = False
+        self._index.flush()
+
+    def get_prefix_cache_hit_rate(self) -> float:
+        return self.metric_data.get_hit_rate()
+
+    def _allocate_slot(self) -> Optional[SlotId]:
+        if self._free_slots:
+            return self._free_slots.popleft()
+
+        if self._evictor.num_blocks == 0:
+            return None
+
+        slot, content_hash = self._evictor.evict()
+        assert self._cached_blocks[content_hash] == slot
+        del self._cached_blocks[content_hash]
+        if slot in self._committable_slots:
+            self._committable_slots.remove(slot)
+        # Invalidate the record before the slot is overwritten. It is flushed
+        # by the next commit(), before the workers execute the save.
+        self._index["valid"][slot] = 0
+        self._has_invalidated_slots = True
+        return slot
+
@@ -109,8 +109,10 @@ class BlockAllocator(ABC):
 
     @abstractmethod
     def allocate_immutable_blocks(
-            self, prev_block: Optional[Block],
-            block_token_ids: List[List[int]]) -> List[Block]:
+            self,
+            prev_block: Optional[Block],
+            block_token_ids: List[List[int]],
+            block_hashes: Optional[List[int]] = None) -> List[Block]:
         pass
 
     @abstractmethod
@@ -207,9 +209,12 @@ class DeviceAwareBlockAllocator(ABC):
         pass
 
     @abstractmethod
-    def allocate_immutable_blocks(self, prev_block: Optional[Block],
-                                  block_token_ids: List[List[int]],
-                                  device: Device) -> List[Block]:
+    def allocate_immutable_blocks(
+            self,
+            prev_block: Optional[Block],
+            block_token_ids: List[List[int]],
+            device: Device,
+            block_hashes: Optional[List[int]] = None) -> List[Block]:
         pass
 
     @abstractmethod
@@ -284,3 +289,28 @@ class DeviceAwareBlockAllocator(ABC):
     def get_prefix_cache_hit_rate(self, device: Device) -> float:
         """Prefix cache hit rate. -1 means not supported or disabled."""
         pass
+
+    @abstractmethod
+    def get_and_reset_cpu_prefix_cache_swaps(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Returns and clears the (swap out, swap in) physical block id
+        mappings issued by the CPU prefix cache."""
+        pass
+
+    @abstractmethod
+    def get_and_reset_disk_prefix_cache_copies(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Returns and clears the (save, load) block id to disk slot
+        mappings issued by the disk prefix cache."""
+        pass
+
+    @abstractmethod
+    def has_pending_disk_prefix_cache_copies(self) -> bool:
+        """Whether the disk prefix cache has copies to issue or commit."""
+        pass
+
+    @abstractmethod
+    def get_num_cached_prefix_blocks(self, block_hashes: List[int]) -> int:
+        """Number of leading blocks of the hash chain that are cached and
+        computed on GPU."""
+        pass
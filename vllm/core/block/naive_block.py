@@ -85,7 +85,8 @@ class NaiveBlockAllocator(BlockAllocator):
             self,
             prev_block: Optional[Block],
             block_token_ids: List[List[int]],
-            device: Optional[Device] = None) -> List[Block]:
+            device: Optional[Device] = None,
+            block_hashes: Optional[List[int]] = None) -> List[Block]:
         assert device is None
         num_blocks = len(block_token_ids)
 
@@ -143,6 +144,12 @@ class NaiveBlockAllocator(BlockAllocator):
 
         block.block_id = None
 
+    def free_block_id(self, block_id: BlockId) -> None:
+        """Returns an unreferenced block id, e.g. one dropped from a prefix
+        cache, to the free blocks."""
+        assert self._refcounter.get(block_id) == 0
+        self._free_block_indices.appendleft(block_id)
+
     def free(self, block: Block, keep_block_object: bool = False) -> None:
         # Release the physical block id
         self._free_block_id(block)
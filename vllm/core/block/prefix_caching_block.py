@@ -1,13 +1,18 @@
 """Token blocks."""
+import time
 from os.path import commonprefix
 from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
 from vllm.core.block.common import (CacheMetricData, CopyOnWriteTracker,
                                     get_all_blocks_recursively)
+from vllm.core.block.cpu_prefix_cache import CpuPrefixCache
+from vllm.core.block.disk_prefix_cache import DiskPrefixCache
 from vllm.core.block.interfaces import Block, BlockAllocator, BlockId, Device
 from vllm.core.block.naive_block import (BlockPool, NaiveBlock,
                                          NaiveBlockAllocator)
+from vllm.core.block.radix_prefix_index import RadixPrefixIndex
 from vllm.core.evictor_v2 import EvictionPolicy, Evictor, make_evictor
+from vllm.utils import hash_block_token_ids
 
 PrefixHash = int
 
@@ -20,7 +25,7 @@ _DEFAULT_LAST_ACCESSED_TIME = -1
 class BlockTracker:
     """Used to track the status of a block inside the prefix caching allocator
     """
-    __slots__ = ("active", "last_accessed", "computed")
+    __slots__ = ("active", "last_accessed", "computed", "num_hits")
 
     def reset(self):
         self.last_accessed: float = _DEFAULT_LAST_ACCESSED_TIME
@@ -28,6 +33,10 @@ class BlockTracker:
 
     def __init__(self):
         self.active: bool = False
+        # Number of prefix cache hits served by the block's current content.
+        # Unlike the other fields, it survives the block being parked in the
+        # evictor and is only cleared when the block id gets new content.
+        self.num_hits: int = 0
         self.reset()
 
     def enable(self):
@@ -54,6 +63,15 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         block_ids(Optional[Iterable[int]], optional): An optional iterable of
             block IDs. If not provided, block IDs will be assigned sequentially
             from 0 to num_blocks - 1.
+        eviction_policy (EvictionPolicy): The policy used to pick which
+            unused cached block to evict under memory pressure.
+        cpu_prefix_cache (Optional[CpuPrefixCache]): A second-tier cache in
+            CPU memory. If given, evicted blocks are offloaded to it and
+            prefix matches that miss this allocator are swapped in from it.
+        disk_prefix_cache (Optional[DiskPrefixCache]): A persistent cache
+            on local disk. If given, computed blocks are saved to it once
+            unused, and prefix matches that miss both this allocator and the
+            CPU prefix cache are loaded from it.
     """
 
     def __init__(
@@ -62,6 +80,8 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         block_size: int,
         block_ids: Optional[Iterable[int]] = None,
         eviction_policy: EvictionPolicy = EvictionPolicy.LRU,
+        cpu_prefix_cache: Optional[CpuPrefixCache] = None,
+        disk_prefix_cache: Optional[DiskPrefixCache] = None,
     ):
         if block_ids is None:
             block_ids = range(num_blocks)
@@ -69,8 +89,9 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         self._block_size = block_size
 
         # A mapping of prefix hash to block index. All blocks which have a
-        # prefix hash will be in this dict, even if they have refcount 0.
-        self._cached_blocks: Dict[PrefixHash, BlockId] = {}
+        # prefix hash will be in this index, even if they have refcount 0.
+        # The index also arranges them in a radix tree of block tokens.
+        self._cached_blocks = RadixPrefixIndex(block_size)
 
         # A list of immutable block IDs that have been touched by scheduler
         # and should be marked as computed after an entire batch of sequences
@@ -100,6 +121,7 @@ class PrefixCachingBlockAllocator(BlockAllocator):
 
         # Evitor used to maintain how we want to handle those computed blocks
         # if we find memory pressure is high.
+        self.eviction_policy = eviction_policy
         self.evictor: Evictor = make_evictor(eviction_policy)
 
         # We share the refcounter between allocators. This allows us to promote
@@ -112,6 +134,20 @@ class PrefixCachingBlockAllocator(BlockAllocator):
 
         self.metric_data = CacheMetricData()
 
+        # Copies between this allocator and the CPU prefix cache issued since
+        # the last call to get_and_reset_cpu_prefix_cache_swaps(), as
+        # (src, dst) absolute block ids.
+        self._cpu_prefix_cache = cpu_prefix_cache
+        self._cpu_prefix_cache_swaps_out: List[Tuple[BlockId, BlockId]] = []
+        self._cpu_prefix_cache_swaps_in: List[Tuple[BlockId, BlockId]] = []
+
+        # Copies between this allocator and the disk prefix cache issued
+        # since the last call to get_and_reset_disk_prefix_cache_copies(), as
+        # (block id, slot) saves and (slot, block id) loads.
+        self._disk_prefix_cache = disk_prefix_cache
+        self._disk_prefix_cache_saves: List[Tuple[BlockId, int]] = []
+        self._disk_prefix_cache_loads: List[Tuple[int, BlockId]] = []
+
     # Implements Block.Factory.
     def _create_block(
         self,
@@ -137,13 +173,16 @@ class PrefixCachingBlockAllocator(BlockAllocator):
     def allocate_immutable_block(self,
                                  prev_block: Optional[Block],
                                  token_ids: List[int],
-                                 device: Optional[Device] = None) -> Block:
+                                 device: Optional[Device] = None,
+                                 block_hash: Optional[int] = None) -> Block:
         """Allocates an immutable block with the given token IDs, reusing cached
         blocks if possible.
 
         Args:
             prev_block (Optional[Block]): The previous block in the sequence.
             token_ids (List[int]): The token IDs to be stored in the block.
+            block_hash (Optional[int]): The precomputed content hash of the
+                block, if known.
 
         Returns:
             Block: The allocated immutable block.
@@ -156,32 +195,65 @@ class PrefixCachingBlockAllocator(BlockAllocator):
                                             token_ids=token_ids,
                                             block_size=self._block_size,
                                             physical_block_id=None)
+        if block_hash is not None:
+            block.content_hash = block_hash
         assert block.content_hash is not None
 
-        cached_block_id = self._cached_blocks.get(block.content_hash, None)
+        content_hash = block.content_hash
+        cached_block_id = self._cached_blocks.get(content_hash, None)
         if cached_block_id is not None:
             self.metric_data.query(hit=True)
             block.block_id = cached_block_id
             self._incr_refcount_cached_block(block)
             return block
         self.metric_data.query(hit=False)
-        self._block_pool.free_block(block)
 
-        # No cached block => Allocate a new block
-        block = self.allocate_mutable_block(prev_block)
-        block.append_token_ids(token_ids)
+        # Look for the content in the CPU prefix cache before allocating, so
+        # that the allocation cannot offload over the block we swap in.
+        cpu_block_id = None
+        if self._cpu_prefix_cache is not None:
+            cpu_block_id = self._cpu_prefix_cache.lookup(
+                content_hash, time.time())
+        disk_slot = None
+        if cpu_block_id is None and self._disk_prefix_cache is not None:
+            disk_slot = self._disk_prefix_cache.lookup(content_hash,
+                                                       time.time())
+
+        # No cached block => Allocate a new block. The block already holds
+        # the token ids and the hash, so it is promoted without rehashing.
+        block.block_id = self._allocate_block_id()
+        block.block_id = self.promote_to_immutable_block(block)
+
+        if cpu_block_id is not None or disk_slot is not None:
+            # The block content is copied in before the next model step, so
+            # it is computed for this batch already.
+            assert block.block_id is not None
+            if cpu_block_id is not None:
+                self._cpu_prefix_cache_swaps_in.append(
+                    (cpu_block_id, block.block_id))
+            else:
+                self._disk_prefix_cache_loads.append(
+                    (disk_slot, block.block_id))
+            self._touched_blocks.discard(block.block_id)
+            self._block_tracker[block.block_id].computed = True
+            block.computed = True
         return block
 
     def allocate_immutable_blocks(
             self,
             prev_block: Optional[Block],
             block_token_ids: List[List[int]],
-            device: Optional[Device] = None) -> List[Block]:
+            device: Optional[Device] = None,
+            block_hashes: Optional[List[int]] = None) -> List[Block]:
+        assert block_hashes is None or len(block_hashes) == len(
+            block_token_ids)
         blocks = []
-        for token_ids in block_token_ids:
-            prev_block = self.allocate_immutable_block(prev_block=prev_block,
-                                                       token_ids=token_ids,
-                                                       device=device)
+        for i, token_ids in enumerate(block_token_ids):
+            prev_block = self.allocate_immutable_block(
+                prev_block=prev_block,
+                token_ids=token_ids,
+                device=device,
+                block_hash=None if block_hashes is None else block_hashes[i])
             blocks.append(prev_block)
         return blocks
 
@@ -218,6 +290,8 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         block_id = block.block_id
         assert block_id is not None
 
+        self._block_tracker[block_id].num_hits += 1
+
         refcount = self._refcounter.incr(block_id)
         if refcount == 1:
             # In case a cached block was evicted, restore its tracking
@@ -243,10 +317,22 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         # No longer used
         assert block.content_hash in self._cached_blocks
 
+        if (self._disk_prefix_cache is not None
+                and self._block_tracker[block_id].computed):
+            # Persist the content now that it is final. The copy is issued
+            # before the model step, so before the block can be overwritten.
+            disk_slot = self._disk_prefix_cache.save(
+                block.content_hash,
+                self._block_tracker[block_id].last_accessed,
+                block.num_tokens_total)
+            if disk_slot is not None:
+                self._disk_prefix_cache_saves.append((block_id, disk_slot))
+
         # Add the cached block to the evictor
         # (This keeps the cached block around so it can be reused)
         self.evictor.add(block_id, block.content_hash, block.num_tokens_total,
-                         self._block_tracker[block_id].last_accessed)
+                         self._block_tracker[block_id].last_accessed,
+                         self._block_tracker[block_id].num_hits)
 
         # Stop tracking the block
         self._untrack_block_id(block_id)
@@ -311,7 +397,22 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         assert self._refcounter.get(_block_id) == 0
         assert _block_id == block_id
 
-        self._cached_blocks.pop(content_hash_to_evict)
+        # The unused cached blocks extending the evicted one can only be
+        # reused once it is recomputed, so they are evicted along with it.
+        evicted_blocks = self._cached_blocks.remove_subtree(
+            content_hash_to_evict, self.evictor.__contains__)
+        for content_hash, evicted_block_id in evicted_blocks:
+            if self._cpu_prefix_cache is not None:
+                # Keep the evicted content around in CPU memory. The copy
+                # is issued before the model step that overwrites the block.
+                cpu_block_id = self._cpu_prefix_cache.offload(
+                    content_hash, time.time())
+                if cpu_block_id is not None:
+                    self._cpu_prefix_cache_swaps_out.append(
+                        (evicted_block_id, cpu_block_id))
+            if evicted_block_id != block_id:
+                self.evictor.remove(evicted_block_id)
+                self._hashless_allocator.free_block_id(evicted_block_id)
 
         self._refcounter.incr(block_id)
         self._track_block_id(block_id, computed=False)
@@ -414,6 +515,92 @@ class PrefixCachingBlockAllocator(BlockAllocator):
     def get_prefix_cache_hit_rate(self) -> float:
         return self.metric_data.get_hit_rate()
 
+    def get_and_reset_cpu_prefix_cache_swaps(
+        self
+    ) -> Tuple[List[Tuple[BlockId, BlockId]], List[Tuple[BlockId, BlockId]]]:
+        """Returns and clears the copies to and from the CPU prefix cache.
+
+        Swap outs must be executed before swap ins: a GPU block evicted in
+        this step may be the destination of a swap in, and a block offloaded
+        in this step may be swapped back in right away.
+
+        Returns:
+            Tuple of the (GPU, CPU) swap out and (CPU, GPU) swap in absolute
+            block id mappings.
+        """
+        swaps_out = self._cpu_prefix_cache_swaps_out
+        swaps_in = self._cpu_prefix_cache_swaps_in
+        self._cpu_prefix_cache_swaps_out = []
+        self._cpu_prefix_cache_swaps_in = []
+        if self._cpu_prefix_cache is not None:
+            self._cpu_prefix_cache.unpin_all()
+        return swaps_out, swaps_in
+
+    def get_and_reset_disk_prefix_cache_copies(
+        self
+    ) -> Tuple[List[Tuple[BlockId, int]], List[Tuple[int, BlockId]]]:
+        """Returns and clears the copies to and from the disk prefix cache.
+
+        Saves must be executed before any other cache operation of the step,
+        as the saved blocks may be overwritten by swap ins or loads. The
+        saves of the previous step are committed to the persisted index,
+        which assumes that the previous step has been executed and its saves
+        flushed to disk (see `DiskKVCache.wait_for_saves`).
+
+        Returns:
+            Tuple of the (block id, slot) saves and (slot, block id) loads.
+        """
+        saves = self._disk_prefix_cache_saves
+        loads = self._disk_prefix_cache_loads
+        self._disk_prefix_cache_saves = []
+        self._disk_prefix_cache_loads = []
+        if self._disk_prefix_cache is not None:
+            self._disk_prefix_cache.commit()
+            self._disk_prefix_cache.unpin_all()
+        return saves, loads
+
+    def has_pending_disk_prefix_cache_copies(self) -> bool:
+        """Whether copies to or from the disk prefix cache are yet to be
+        returned or committed to the persisted index."""
+        return (bool(self._disk_prefix_cache_saves
+                     or self._disk_prefix_cache_loads)
+                or (self._disk_prefix_cache is not None
+                    and self._disk_prefix_cache.has_uncommitted_slots))
+
+    def get_longest_cached_prefix(
+            self, token_ids: List[int]) -> Tuple[List[BlockId], int]:
+        """Finds the longest prefix of the token ids whose KV cache is
+        cached and computed on this device, down to the token.
+
+        Returns:
+            Tuple[List[BlockId], int]: The ids of the cached blocks holding
+                the full blocks of the prefix, and the number of tokens of
+                the prefix, which may end within a block.
+        """
+        return self._cached_blocks.match_prefix(token_ids,
+                                                self._is_cached_block_computed)
+
+    def get_num_cached_prefix_blocks(self,
+                                     block_hashes: List[PrefixHash]) -> int:
+        """Returns the number of leading blocks of a chain of block hashes
+        whose content is cached and computed on this device, i.e. the number
+        of blocks a new sequence with these hashes would not need to
+        prefill.
+        """
+        num_cached_blocks = 0
+        for block_hash in block_hashes:
+            block_id = self._cached_blocks.get(block_hash)
+            if block_id is None or not self._is_cached_block_computed(
+                    block_id):
+                break
+            num_cached_blocks += 1
+        return num_cached_blocks
+
+    def _is_cached_block_computed(self, block_id: BlockId) -> bool:
+        # Unused cached blocks live in the evictor, untracked.
+        return (block_id in self.evictor
+                or self._block_tracker[block_id].computed)
+
     def is_block_cached(self, block: Block) -> bool:
         assert block.content_hash is not None
         return block.content_hash in self._cached_blocks
@@ -444,7 +631,11 @@ class PrefixCachingBlockAllocator(BlockAllocator):
             # Note that this block cannot be marked as computed yet
             # because other sequences in the same batch cannot reuse
             # this block.
-            self._cached_blocks[block.content_hash] = block.block_id
+            prev_block = block.prev_block
+            self._cached_blocks.insert(
+                block.content_hash,
+                None if prev_block is None else prev_block.content_hash,
+                block.token_ids, block.block_id)
             # Mark this block as touched so that it can be marked as
             # computed after the entire batch of sequences are scheduled.
             self._touched_blocks.add(block.block_id)
@@ -523,6 +714,10 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         assert block_id is not None
         self._block_tracker[block_id].enable()
         self._block_tracker[block_id].computed = computed
+        if not computed:
+            # Freshly allocated block id, its previous content (if any) and
+            # the hits it served are gone.
+            self._block_tracker[block_id].num_hits = 0
 
     def _untrack_block_id(self, block_id: Optional[BlockId]) -> None:
         assert block_id is not None
@@ -818,6 +1013,14 @@ class PrefixCachingBlock(Block):
             cur_block_token_ids=self.token_ids)
         return self._cached_content_hash
 
+    @content_hash.setter
+    def content_hash(self, value: int) -> None:
+        """Sets a content hash computed ahead of time, e.g. by
+        `Sequence.get_block_hashes()`, so that the block is not rehashed.
+        """
+        assert self.is_full and self._cached_content_hash is None
+        self._cached_content_hash = value
+
     @staticmethod
     def hash_block_tokens(is_first_block: bool, prev_block_hash: Optional[int],
                           cur_block_token_ids: List[int]) -> int:
@@ -839,7 +1042,7 @@ class PrefixCachingBlock(Block):
         - int: The computed hash value for the block.
         """
         assert (prev_block_hash is None) == is_first_block
-        return hash((is_first_block, prev_block_hash, *cur_block_token_ids))
+        return hash_block_token_ids(prev_block_hash, cur_block_token_ids)
 
 
 class ComputedBlocksTracker:
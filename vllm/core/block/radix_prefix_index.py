@@ -0,0 +1,200 @@
+"""Radix tree index over the cached blocks of the prefix caching allocator."""
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from vllm.core.block.interfaces import BlockId
+
+PrefixHash = int
+
+# Token ids are stored in the tree as the bytes of an array of this type.
+_TOKEN_ID_ARRAY_TYPE = "l"
+
+
+def _block_key(token_ids: List[int]) -> bytes:
+    return array(_TOKEN_ID_ARRAY_TYPE, token_ids).tobytes()
+
+
+class RadixNode:
+    """A cached full block. The edge from the parent node is labelled with
+    the token ids of the block, so the path from the root spells out the
+    prefix whose KV cache the block completes."""
+    __slots__ = ("content_hash", "prev_content_hash", "block_id", "key",
+                 "parent", "children")
+
+    def __init__(self, content_hash: Optional[PrefixHash],
+                 prev_content_hash: Optional[PrefixHash], block_id: BlockId,
+                 key: bytes, parent: Optional["RadixNode"]):
+        self.content_hash = content_hash
+        self.prev_content_hash = prev_content_hash
+        self.block_id = block_id
+        self.key = key
+        self.parent = parent
+        self.children: Dict[bytes, "RadixNode"] = {}
+
+    @property
+    def token_ids(self) -> array:
+        token_ids = array(_TOKEN_ID_ARRAY_TYPE)
+        token_ids.frombytes(self.key)
+        return token_ids
+
+
+class RadixPrefixIndex:
+    """Maps the content hash of every cached block to its block id, like a
+    dict, and additionally arranges the cached blocks in a radix tree keyed
+    by block tokens.
+
+    The tree answers longest-prefix queries over raw token ids, including a
+    partially matching last block, without hashing the query. It also keeps
+    the cache prefix-closed: `remove_subtree()` drops a block together with
+    the unreferenced blocks that extend it, which could only be reused
+    after the block is recomputed.
+
+    Blocks whose parent block is not cached (e.g. the parent was evicted
+    while they were still referenced) are kept as orphans. They are still
+    found by content hash, and are attached back to the tree once a block
+    with their parent's content is cached again.
+    """
+
+    def __init__(self, block_size: int):
+        self._block_size = block_size
+        self._root = RadixNode(None, None, -1, b"", None)
+        self._nodes: Dict[PrefixHash, RadixNode] = {}
+        # Orphans, by the content hash of their missing parent.
+        self._orphans: Dict[PrefixHash, Dict[bytes, RadixNode]] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, content_hash: PrefixHash) -> bool:
+        return content_hash in self._nodes
+
+    def __getitem__(self, content_hash: PrefixHash) -> BlockId:
+        return self._nodes[content_hash].block_id
+
+    def __iter__(self) -> Iterator[PrefixHash]:
+        return iter(self._nodes)
+
+    def values(self) -> List[BlockId]:
+        """The block ids of the cached blocks, in insertion order."""
+        return [node.block_id for node in self._nodes.values()]
+
+    def get(self,
+            content_hash: PrefixHash,
+            default: Optional[BlockId] = None) -> Optional[BlockId]:
+        node = self._nodes.get(content_hash)
+        return default if node is None else node.block_id
+
+    def insert(self, content_hash: PrefixHash,
+               prev_content_hash: Optional[PrefixHash],
+               token_ids: List[int], block_id: BlockId) -> None:
+        """Adds a cached full block, following the block with content hash
+        `prev_content_hash` (None for the first block of a sequence)."""
+        assert content_hash not in self._nodes
+        assert len(token_ids) == self._block_size
+        key = _block_key(token_ids)
+        if prev_content_hash is None:
+            parent: Optional[RadixNode] = self._root
+        else:
+            parent = self._nodes.get(prev_content_hash)
+
+        node = RadixNode(content_hash, prev_content_hash, block_id, key,
+                         parent)
+        if parent is not None:
+            assert key not in parent.children
+            parent.children[key] = node
+        else:
+            assert prev_content_hash is not None
+            self._orphans.setdefault(prev_content_hash, {})[key] = node
+        self._nodes[content_hash] = node
+
+        orphans = self._orphans.pop(content_hash, None)
+        if orphans is not None:
+            for orphan in orphans.values():
+                orphan.parent = node
+            node.children = orphans
+
+    def remove_subtree(
+        self, content_hash: PrefixHash,
+        is_evictable: Callable[[BlockId], bool]
+    ) -> List[Tuple[PrefixHash, BlockId]]:
+        """Removes a block and the blocks extending it for which
+        `is_evictable` holds. Descendants that are not evictable are kept as
+        orphans, along with their own subtrees.
+
+        Returns:
+            List[Tuple[PrefixHash, BlockId]]: The removed blocks, parents
+                first, starting with the given block.
+        """
+        node = self._nodes[content_hash]
+        self._detach(node)
+
+        removed: List[Tuple[PrefixHash, BlockId]] = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            assert node.content_hash is not None
+            del self._nodes[node.content_hash]
+            removed.append((node.content_hash, node.block_id))
+            for child in node.children.values():
+                if is_evictable(child.block_id):
+                    stack.append(child)
+                else:
+                    child.parent = None
+                    self._orphans.setdefault(node.content_hash,
+                                             {})[child.key] = child
+            node.children = {}
+        return removed
+
+    def match_prefix(
+        self,
+        token_ids: List[int],
+        is_usable: Optional[Callable[[BlockId], bool]] = None
+    ) -> Tuple[List[BlockId], int]:
+        """Finds the longest cached prefix of the token ids, only made of
+        the blocks for which `is_usable` holds, if given.
+
+        Returns:
+            Tuple[List[BlockId], int]: The ids of the cached blocks holding
+                the full blocks of the prefix, and the number of tokens of
+                the prefix. The latter includes the leading tokens of the
+                first unmatched block that a cached block starts with.
+        """
+        block_ids: List[BlockId] = []
+        node = self._root
+        num_full_blocks = len(token_ids) // self._block_size
+        for block_idx in range(num_full_blocks):
+            start = block_idx * self._block_size
+            child = node.children.get(
+                _block_key(token_ids[start:start + self._block_size]))
+            if child is None or (is_usable is not None
+                                 and not is_usable(child.block_id)):
+                break
+            block_ids.append(child.block_id)
+            node = child
+
+        num_matched_tokens = len(block_ids) * self._block_size
+        remaining = token_ids[num_matched_tokens:num_matched_tokens +
+                              self._block_size]
+        num_partial_tokens = 0
+        for child in node.children.values():
+            if is_usable is not None and not is_usable(child.block_id):
+                continue
+            child_token_ids = child.token_ids
+            num_common = 0
+            for token_id, child_token_id in zip(remaining, child_token_ids):
+                if token_id != child_token_id:
+                    break
+                num_common += 1
+            num_partial_tokens = max(num_partial_tokens, num_common)
+        return block_ids, num_matched_tokens + num_partial_tokens
+
+    def _detach(self, node: RadixNode) -> None:
+        if node.parent is not None:
+            del node.parent.children[node.key]
+            node.parent = None
+            return
+        assert node.prev_content_hash is not None
+        orphans = self._orphans[node.prev_content_hash]
+        del orphans[node.key]
+        if not orphans:
+            del self._orphans[node.prev_content_hash]
@@ -3,14 +3,18 @@ from typing import Dict, List, Optional
 from typing import Sequence as GenericSequence
 from typing import Tuple
 
+import numpy as np
+
 from vllm.core.block.block_table import BlockTable
 from vllm.core.block.cpu_gpu_block_allocator import CpuGpuBlockAllocator
 from vllm.core.block.interfaces import Block
 from vllm.core.block.prefix_caching_block import (ComputedBlocksTracker,
                                                   LastAccessBlocksTracker)
 from vllm.core.block.utils import check_no_caching_or_swa_for_blockmgr_encdec
+from vllm.core.evictor_v2 import EvictionPolicy
 from vllm.core.interfaces import AllocStatus, BlockSpaceManager
-from vllm.sequence import Sequence, SequenceGroup, SequenceStatus
+from vllm.sequence import (Sequence, SequenceGroup, SequenceStatus,
+                           get_sequence_store)
 from vllm.utils import Device
 
 SeqId = int
@@ -55,6 +59,16 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
             window. Defaults to None.
         enable_caching (bool, optional): Flag indicating whether caching is
             enabled. Defaults to False.
+        eviction_policy (EvictionPolicy, optional): Eviction policy of the
+            prefix cache. Defaults to EvictionPolicy.LRU.
+        num_cpu_prefix_cache_blocks (int, optional): Number of CPU blocks
+            used to keep blocks evicted from the GPU prefix cache. Only used
+            when caching is enabled. Defaults to 0 (disabled).
+        disk_prefix_cache_dir (Optional[str], optional): Directory of the
+            persistent disk prefix cache. Defaults to None.
+        num_disk_prefix_cache_blocks (int, optional): Number of blocks kept
+            in the disk prefix cache. Only used when caching is enabled.
+            Defaults to 0 (disabled).
     """
 
     def __init__(
@@ -65,6 +79,10 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
         watermark: float = 0.01,
         sliding_window: Optional[int] = None,
         enable_caching: bool = False,
+        eviction_policy: EvictionPolicy = EvictionPolicy.LRU,
+        num_cpu_prefix_cache_blocks: int = 0,
+        disk_prefix_cache_dir: Optional[str] = None,
+        num_disk_prefix_cache_blocks: int = 0,
     ) -> None:
         self.block_size = block_size
         self.num_total_gpu_blocks = num_gpu_blocks
@@ -95,6 +113,10 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
             num_gpu_blocks=num_gpu_blocks,
             num_cpu_blocks=num_cpu_blocks,
             block_size=block_size,
+            eviction_policy=eviction_policy,
+            num_cpu_prefix_cache_blocks=num_cpu_prefix_cache_blocks,
+            disk_prefix_cache_dir=disk_prefix_cache_dir,
+            num_disk_prefix_cache_blocks=num_disk_prefix_cache_blocks,
         )
 
         self.block_tables: Dict[SeqId, BlockTable] = {}
@@ -152,7 +174,13 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
         )
         if seq.get_token_ids():
             # Add blocks to the block table only if the sequence is non empty.
-            block_table.allocate(seq.get_token_ids())
+            # Reuse the hash chain of the sequence for prefix caching, as
+            # long as it was built with the same block size.
+            block_hashes = None
+            if self.enable_caching and seq.block_size == self.block_size:
+                block_hashes = seq.get_block_hashes()
+            block_table.allocate(seq.get_token_ids(),
+                                 block_hashes=block_hashes)
 
         return block_table
 
@@ -228,6 +256,27 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
             Device.GPU)
         return num_touched_blocks <= num_free_gpu_blocks
 
+    def get_num_blocks_touched_by_append_slots(
+            self, seqs: List[Sequence], num_lookahead_slots: int) -> np.ndarray:
+        """Vectorized version of the block count of `can_append_slots()`:
+        the number of blocks touched by appending the unseen tokens and the
+        lookahead slots of each of the given running sequences."""
+        block_size = self.block_size
+        num_seqs = len(seqs)
+        block_tables = self.block_tables
+        seq_lens = get_sequence_store().get_lens(
+            np.fromiter((seq.slot for seq in seqs),
+                        dtype=np.int64,
+                        count=num_seqs))
+        num_full_slots = np.fromiter(
+            (block_tables[seq.seq_id].num_full_slots for seq in seqs),
+            dtype=np.int64,
+            count=num_seqs)
+        # Same math as BlockTable.get_num_blocks_touched_by_append_slots.
+        num_token_ids = seq_lens - num_full_slots + num_lookahead_slots
+        first_chunk_size = block_size - num_full_slots % block_size
+        return 1 - (first_chunk_size - num_token_ids) // block_size
+
     def append_slots(
         self,
         seq: Sequence,
@@ -364,16 +413,9 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
         """
         physical_block_id_mapping = []
         for seq in seq_group.get_seqs(status=SequenceStatus.SWAPPED):
-            blocks = self.block_tables[seq.seq_id].blocks
-            if len(blocks) == 0:
-                continue
-
-            seq_swap_mapping = self.block_allocator.swap(blocks=blocks,
-                                                         src_device=Device.CPU,
-                                                         dst_device=Device.GPU)
-
-            # Refresh the block ids of the table (post-swap)
-            self.block_tables[seq.seq_id].update(blocks)
+            # Only the swapped out tail of the table moves, the head of a
+            # partially swapped out sequence is still on the GPU.
+            seq_swap_mapping = self.block_tables[seq.seq_id].swap_in()
 
             seq_physical_block_id_mapping = {
                 self.block_allocator.get_physical_block_id(
@@ -388,28 +430,38 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
 
         return physical_block_id_mapping
 
-    def can_swap_out(self, seq_group: SequenceGroup) -> bool:
+    def can_swap_out(self,
+                     seq_group: SequenceGroup,
+                     num_blocks: Optional[int] = None) -> bool:
         """Returns whether we can swap out the given sequence_group 
         with num_lookahead_slots.
 
         Args:
             seq_group (SequenceGroup): The sequence group to swap in.
-            num_lookahead_slots (int): Number of lookahead slots used in 
-                speculative decoding, default to 0.
+            num_blocks (Optional[int]): The number of trailing blocks to swap
+                out per sequence, or None to swap out all the blocks.
 
         Returns:
             bool: Whether it's possible to swap out current sequence group.
         """
-        alloc_status = self._can_swap(seq_group, Device.CPU,
-                                      SequenceStatus.RUNNING)
+        alloc_status = self._can_swap(seq_group,
+                                      Device.CPU,
+                                      SequenceStatus.RUNNING,
+                                      num_blocks=num_blocks)
         return alloc_status == AllocStatus.OK
 
-    def swap_out(self, seq_group: SequenceGroup) -> List[Tuple[int, int]]:
+    def swap_out(self,
+                 seq_group: SequenceGroup,
+                 num_blocks: Optional[int] = None) -> List[Tuple[int, int]]:
         """Returns the block id mapping (from GPU to CPU) generated by
         swapping out the given sequence_group with num_lookahead_slots.
 
         Args:
             sequence_group (SequenceGroup): The sequence group to swap in.
+            num_blocks (Optional[int]): The number of trailing blocks to swap
+                out per sequence, or None to swap out all the blocks. The
+                leading blocks of a partially swapped out sequence stay on the
+                GPU until the sequence is swapped back in or freed.
 
         Returns:
             List[Tuple[int, int]]: The mapping of swapping block from 
@@ -417,16 +469,8 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
         """
         physical_block_id_mapping = []
         for seq in seq_group.get_seqs(status=SequenceStatus.RUNNING):
-            blocks = self.block_tables[seq.seq_id].blocks
-            if len(blocks) == 0:
-                continue
-
-            seq_swap_mapping = self.block_allocator.swap(blocks=blocks,
-                                                         src_device=Device.GPU,
-                                                         dst_device=Device.CPU)
-
-            # Refresh the block ids of the table (post-swap)
-            self.block_tables[seq.seq_id].update(blocks)
+            seq_swap_mapping = self.block_tables[seq.seq_id].swap_out(
+                num_blocks)
 
             seq_physical_block_id_mapping = {
                 self.block_allocator.get_physical_block_id(
@@ -450,11 +494,30 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
     def get_prefix_cache_hit_rate(self, device: Device) -> float:
         return self.block_allocator.get_prefix_cache_hit_rate(device)
 
+    def get_and_reset_cpu_prefix_cache_swaps(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        return self.block_allocator.get_and_reset_cpu_prefix_cache_swaps()
+
+    def get_and_reset_disk_prefix_cache_copies(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        return self.block_allocator.get_and_reset_disk_prefix_cache_copies()
+
+    def has_pending_disk_prefix_cache_copies(self) -> bool:
+        return self.block_allocator.has_pending_disk_prefix_cache_copies()
+
+    def get_num_cached_prefix_tokens(self, seq: Sequence) -> int:
+        if not self.enable_caching or seq.block_size != self.block_size:
+            return 0
+        num_cached_blocks = self.block_allocator.get_num_cached_prefix_blocks(
+            seq.get_block_hashes())
+        return num_cached_blocks * self.block_size
+
     def _can_swap(self,
                   seq_group: SequenceGroup,
                   device: Device,
                   status: SequenceStatus,
-                  num_lookahead_slots: int = 0) -> AllocStatus:
+                  num_lookahead_slots: int = 0,
+                  num_blocks: Optional[int] = None) -> AllocStatus:
         """Returns the AllocStatus for swapping in/out the given sequence_group 
         on to the 'device'.
 
@@ -465,6 +528,9 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
                 for action. RUNNING for swap out and SWAPPED for swap in
             num_lookahead_slots (int): Number of lookahead slots used in 
                 speculative decoding, default to 0.
+            num_blocks (Optional[int]): The number of trailing blocks swapped
+                out per sequence, or None for all the blocks. Only used for
+                swap out.
 
         Returns:
             AllocStatus: The AllocStatus for swapping in/out the given 
@@ -485,7 +551,11 @@ class SelfAttnBlockSpaceManager(BlockSpaceManager):
                     block_table.get_num_blocks_touched_by_append_slots(
                         block_table.get_unseen_token_ids(seq.get_token_ids()),
                         num_lookahead_slots=num_lookahead_slots)
-                blocks.extend(block_table.blocks)
+                if status == SequenceStatus.SWAPPED:
+                    blocks.extend(block_table.get_swapped_out_blocks())
+                else:
+                    blocks.extend(
+                        block_table.get_blocks_to_swap_out(num_blocks))
         # Compute the number of full blocks to touch and add it to the
         # existing count of blocks to touch.
         num_blocks_touched += self.block_allocator.get_num_full_blocks_touched(
@@ -1,6 +1,7 @@
 import enum
+import heapq
 from abc import ABC, abstractmethod
-from typing import OrderedDict, Tuple
+from typing import Dict, List, OrderedDict, Tuple
 
 
 class EvictionPolicy(enum.Enum):
@@ -8,6 +9,8 @@ class EvictionPolicy(enum.Enum):
        Evictor subclass.
     """
     LRU = enum.auto()
+    HEAP_LRU = enum.auto()
+    TWO_QUEUE = enum.auto()
 
 
 class Evictor(ABC):
@@ -31,9 +34,16 @@ class Evictor(ABC):
         pass
 
     @abstractmethod
-    def add(self, block_id: int, content_hash: int, num_hashed_tokens: int,
-            last_accessed: float):
-        """Adds block to the evictor, making it a candidate for eviction"""
+    def add(self,
+            block_id: int,
+            content_hash: int,
+            num_hashed_tokens: int,
+            last_accessed: float,
+            num_hits: int = 0):
+        """Adds block to the evictor, making it a candidate for eviction.
+        num_hits is the number of prefix cache hits the block has served
+        since its content was computed; recency-only policies ignore it.
+        """
         pass
 
     @abstractmethod
@@ -104,28 +114,182 @@ class LRUEvictor(Evictor):
 
         return evicted_block_id, evicted_block.content_hash
 
-    def add(self, block_id: int, content_hash: int, num_hashed_tokens: int,
-            last_accessed: float):
+    def add(self,
+            block_id: int,
+            content_hash: int,
+            num_hashed_tokens: int,
+            last_accessed: float,
+            num_hits: int = 0):
+        self.free_table[block_id] = BlockMetaData(content_hash,
+                                                  num_hashed_tokens,
+                                                  last_accessed)
+
+    def update(self, block_id: int, last_accessed: float):
+        self.free_table[block_id].last_accessed = last_accessed
+
+    def remove(self, block_id: int):
+        if block_id not in self.free_table:
+            raise ValueError(
+                "Attempting to remove block that's not in the evictor")
+        self.free_table.pop(block_id)
+
+    @property
+    def num_blocks(self) -> int:
+        return len(self.free_table)
+
+
+class HeapLRUEvictor(Evictor):
+    """Evicts blocks in the same order as LRUEvictor, but keeps the candidates
+    in a binary heap keyed on (last_accessed, -num_hashed_tokens) so that
+    evict() runs in O(log n) instead of scanning the free table.
+
+    Updates and removals are handled with lazy invalidation: every add/update
+    pushes a fresh heap entry and bumps the block's version in free_table, and
+    stale entries are discarded when they reach the top of the heap. Once the
+    number of stale entries grows past CLEANUP_THRESHOLD times the number of
+    live blocks, the heap is rebuilt from free_table.
+    """
+
+    # Rebuild the heap when it holds this many times more entries than
+    # there are blocks in the free table.
+    CLEANUP_THRESHOLD = 50
+
+    def __init__(self):
+        self.free_table: Dict[int, BlockMetaData] = {}
+        # Entries are (last_accessed, -num_hashed_tokens, version, block_id).
+        # The version is a monotonically increasing counter, which both
+        # identifies stale entries and breaks ties in insertion order.
+        self.priority_queue: List[Tuple[float, int, int, int]] = []
+        self._versions: Dict[int, int] = {}
+        self._counter = 0
+
+    def __contains__(self, block_id: int) -> bool:
+        return block_id in self.free_table
+
+    def evict(self) -> Tuple[int, int]:
+        if len(self.free_table) == 0:
+            raise ValueError("No usable cache memory left")
+
+        while self.priority_queue:
+            _, _, version, block_id = heapq.heappop(self.priority_queue)
+            if self._versions.get(block_id) != version:
+                # Stale entry, the block was updated or removed since.
+                continue
+            block = self.free_table.pop(block_id)
+            del self._versions[block_id]
+            return block_id, block.content_hash
+
+        raise AssertionError("Evictor heap is out of sync with free table")
+
+    def add(self,
+            block_id: int,
+            content_hash: int,
+            num_hashed_tokens: int,
+            last_accessed: float,
+            num_hits: int = 0):
         self.free_table[block_id] = BlockMetaData(content_hash,
                                                   num_hashed_tokens,
                                                   last_accessed)
+        self._push(block_id)
 
     def update(self, block_id: int, last_accessed: float):
         self.free_table[block_id].last_accessed = last_accessed
+        self._push(block_id)
 
     def remove(self, block_id: int):
         if block_id not in self.free_table:
             raise ValueError(
                 "Attempting to remove block that's not in the evictor")
         self.free_table.pop(block_id)
+        del self._versions[block_id]
 
     @property
     def num_blocks(self) -> int:
         return len(self.free_table)
 
+    def _push(self, block_id: int) -> None:
+        block = self.free_table[block_id]
+        self._counter += 1
+        self._versions[block_id] = self._counter
+        heapq.heappush(self.priority_queue,
+                       (block.last_accessed, -block.num_hashed_tokens,
+                        self._counter, block_id))
+        if len(self.priority_queue) > self.CLEANUP_THRESHOLD * max(
+                len(self.free_table), 1):
+            self._cleanup()
+
+    def _cleanup(self) -> None:
+        """Drops all stale entries by rebuilding the heap from free_table."""
+        self.priority_queue = [
+            (block.last_accessed, -block.num_hashed_tokens,
+             self._versions[block_id], block_id)
+            for block_id, block in self.free_table.items()
+        ]
+        heapq.heapify(self.priority_queue)
+
+
+class TwoQueueEvictor(Evictor):
+    """A frequency-aware evictor in the spirit of 2Q/ARC.
+
+    Free blocks are split into two LRU queues: a probationary queue for blocks
+    that never served a prefix cache hit, and a protected queue for blocks
+    that were reused at least once. Eviction takes from the probationary queue
+    first, so a burst of one-off prompts cannot flush hot shared prefixes.
+    To let stale hot blocks age out, the protected queue is evicted from once
+    it holds more than max_protected_ratio of all free blocks.
+    """
+
+    def __init__(self, max_protected_ratio: float = 0.75):
+        assert 0.0 <= max_protected_ratio <= 1.0
+        self.max_protected_ratio = max_protected_ratio
+        self.probation = HeapLRUEvictor()
+        self.protected = HeapLRUEvictor()
+
+    def __contains__(self, block_id: int) -> bool:
+        return block_id in self.probation or block_id in self.protected
+
+    def evict(self) -> Tuple[int, int]:
+        if self.num_blocks == 0:
+            raise ValueError("No usable cache memory left")
+
+        if self.probation.num_blocks == 0 or (
+                self.protected.num_blocks >
+                self.max_protected_ratio * self.num_blocks):
+            return self.protected.evict()
+        return self.probation.evict()
+
+    def add(self,
+            block_id: int,
+            content_hash: int,
+            num_hashed_tokens: int,
+            last_accessed: float,
+            num_hits: int = 0):
+        queue = self.protected if num_hits > 0 else self.probation
+        queue.add(block_id, content_hash, num_hashed_tokens, last_accessed)
+
+    def update(self, block_id: int, last_accessed: float):
+        if block_id in self.protected:
+            self.protected.update(block_id, last_accessed)
+        else:
+            self.probation.update(block_id, last_accessed)
+
+    def remove(self, block_id: int):
+        if block_id in self.protected:
+            self.protected.remove(block_id)
+        else:
+            self.probation.remove(block_id)
+
+    @property
+    def num_blocks(self) -> int:
+        return self.probation.num_blocks + self.protected.num_blocks
+
 
 def make_evictor(eviction_policy: EvictionPolicy) -> Evictor:
     if eviction_policy == EvictionPolicy.LRU:
         return LRUEvictor()
+    elif eviction_policy == EvictionPolicy.HEAP_LRU:
+        return HeapLRUEvictor()
+    elif eviction_policy == EvictionPolicy.TWO_QUEUE:
+        return TwoQueueEvictor()
     else:
         raise ValueError(f"Unknown cache eviction policy: {eviction_policy}")
@@ -1,9 +1,11 @@
 import enum
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 from typing import Sequence as GenericSequence
 from typing import Tuple
 
+import numpy as np
+
 from vllm.sequence import Sequence, SequenceGroup
 from vllm.utils import Device
 
@@ -54,6 +56,13 @@ class BlockSpaceManager(ABC):
                          num_lookahead_slots: int) -> bool:
         pass
 
+    @abstractmethod
+    def get_num_blocks_touched_by_append_slots(
+            self, seqs: List[Sequence], num_lookahead_slots: int) -> np.ndarray:
+        """Number of blocks that `can_append_slots()` accounts for each of
+        the given running sequences, as an array."""
+        pass
+
     @abstractmethod
     def append_slots(
         self,
@@ -76,11 +85,15 @@ class BlockSpaceManager(ABC):
         pass
 
     @abstractmethod
-    def can_swap_out(self, seq_group: SequenceGroup) -> bool:
+    def can_swap_out(self,
+                     seq_group: SequenceGroup,
+                     num_blocks: Optional[int] = None) -> bool:
         pass
 
     @abstractmethod
-    def swap_out(self, seq_group: SequenceGroup) -> List[Tuple[int, int]]:
+    def swap_out(self,
+                 seq_group: SequenceGroup,
+                 num_blocks: Optional[int] = None) -> List[Tuple[int, int]]:
         pass
 
     @abstractmethod
@@ -121,3 +134,31 @@ class BlockSpaceManager(ABC):
     def get_prefix_cache_hit_rate(self, device: Device) -> float:
         """Prefix cache hit rate. -1 means not supported or disabled."""
         pass
+
+    @abstractmethod
+    def get_and_reset_cpu_prefix_cache_swaps(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Returns and clears the (GPU -> CPU, CPU -> GPU) block mappings
+        issued by the CPU prefix cache during the current scheduling step.
+        """
+        pass
+
+    @abstractmethod
+    def get_and_reset_disk_prefix_cache_copies(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Returns and clears the (GPU -> disk, disk -> GPU) block mappings
+        issued by the disk prefix cache during the current scheduling step.
+        """
+        pass
+
+    @abstractmethod
+    def has_pending_disk_prefix_cache_copies(self) -> bool:
+        """Whether the disk prefix cache has copies to issue or commit, which
+        takes further scheduling steps."""
+        pass
+
+    @abstractmethod
+    def get_num_cached_prefix_tokens(self, seq: Sequence) -> int:
+        """Number of leading tokens of a sequence without a block table
+        whose KV cache is cached on GPU. 0 if prefix caching is disabled."""
+        pass
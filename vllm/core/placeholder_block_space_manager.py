@@ -1,4 +1,6 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 from vllm.core.interfaces import AllocStatus, BlockSpaceManager
 from vllm.sequence import Sequence, SequenceGroup
@@ -36,6 +38,10 @@ class PlaceholderBlockSpaceManager(BlockSpaceManager):
                          num_lookahead_slots: int) -> bool:
         return True
 
+    def get_num_blocks_touched_by_append_slots(
+            self, seqs: List[Sequence], num_lookahead_slots: int) -> np.ndarray:
+        return np.zeros(len(seqs), dtype=np.int64)
+
     def append_slots(
         self,
         seq: Sequence,
@@ -53,10 +59,14 @@ class PlaceholderBlockSpaceManager(BlockSpaceManager):
     def swap_in(self, seq_group: SequenceGroup) -> List[Tuple[int, int]]:
         return None  # type: ignore
 
-    def can_swap_out(self, seq_group: SequenceGroup) -> bool:
+    def can_swap_out(self,
+                     seq_group: SequenceGroup,
+                     num_blocks: Optional[int] = None) -> bool:
         return True
 
-    def swap_out(self, seq_group: SequenceGroup) -> List[Tuple[int, int]]:
+    def swap_out(self,
+                 seq_group: SequenceGroup,
+                 num_blocks: Optional[int] = None) -> List[Tuple[int, int]]:
         return None  # type: ignore
 
     def free(self, seq: Sequence) -> None:
@@ -89,3 +99,17 @@ class PlaceholderBlockSpaceManager(BlockSpaceManager):
 
     def get_prefix_cache_hit_rate(self, device: Device) -> float:
         return -1
+
+    def get_and_reset_cpu_prefix_cache_swaps(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        return [], []
+
+    def get_and_reset_disk_prefix_cache_copies(
+            self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        return [], []
+
+    def has_pending_disk_prefix_cache_copies(self) -> bool:
+        return False
+
+    def get_num_cached_prefix_tokens(self, seq: Sequence) -> int:
+        return 0
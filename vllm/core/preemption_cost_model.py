@@ -0,0 +1,111 @@
+"""Online cost model of the preemption modes of the scheduler."""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class PreemptionDecision:
+    """A preemption decision, kept until the victim is resumed."""
+    # Whether the victim was swapped out (or recomputed).
+    swapped: bool
+    # The number of blocks a swap moves each way.
+    num_blocks: int
+    # The number of tokens a recompute prefills again.
+    num_tokens: int
+
+
+class PreemptionCostModel:
+    """Estimates the cost of resuming a preempted sequence group by swapping
+    and by recomputation, from the swap bandwidth and the prefill throughput
+    measured online.
+
+    A swap costs the transfer of the blocks of the victim out to the CPU and
+    back in, at the measured time per swapped block. A recompute costs the
+    prefill of all the tokens of the victim, at the measured time per token of
+    the steps that run prefills. Both rates are exponential moving averages,
+    so that they follow the load.
+
+    Until a swap has been measured, victims are swapped so that the swap
+    bandwidth gets measured. The prefill throughput is measured by any prompt.
+
+    Each decision is checked when its victim is resumed, against the estimates
+    of that time: the decision is counted as a misprediction if the other mode
+    turns out to be the cheaper one.
+
+    Args:
+        ema_weight (float): The weight of a new measurement in the moving
+            averages.
+    """
+
+    def __init__(self, ema_weight: float = 0.2):
+        assert 0.0 < ema_weight <= 1.0
+        self.ema_weight = ema_weight
+        self.swap_seconds_per_block: Optional[float] = None
+        self.prefill_seconds_per_token: Optional[float] = None
+        self._decisions: Dict[str, PreemptionDecision] = {}
+
+    def _update(self, estimate: Optional[float], value: float) -> float:
+        if estimate is None:
+            return value
+        return estimate + self.ema_weight * (value - estimate)
+
+    def observe_swap(self, num_blocks: int, seconds: float) -> None:
+        """Records the time taken by swapping `num_blocks` blocks in or out."""
+        if num_blocks > 0 and seconds > 0:
+            self.swap_seconds_per_block = self._update(
+                self.swap_seconds_per_block, seconds / num_blocks)
+
+    def observe_prefill(self, num_tokens: int, seconds: float) -> None:
+        """Records the time taken by a model step of `num_tokens` tokens that
+        runs prefills."""
+        if num_tokens > 0 and seconds > 0:
+            self.prefill_seconds_per_token = self._update(
+                self.prefill_seconds_per_token, seconds / num_tokens)
+
+    def swap_cost(self, num_blocks: int) -> Optional[float]:
+        """The estimated time to swap the blocks out and back in."""
+        if self.swap_seconds_per_block is None:
+            return None
+        return 2 * num_blocks * self.swap_seconds_per_block
+
+    def recompute_cost(self, num_tokens: int) -> Optional[float]:
+        """The estimated time to prefill the tokens again."""
+        if self.prefill_seconds_per_token is None:
+            return None
+        return num_tokens * self.prefill_seconds_per_token
+
+    def should_swap(self, num_blocks: int, num_tokens: int) -> bool:
+        """Whether swapping is estimated to be cheaper than recomputation."""
+        swap_cost = self.swap_cost(num_blocks)
+        recompute_cost = self.recompute_cost(num_tokens)
+        if swap_cost is None:
+            return True
+        if recompute_cost is None:
+            return False
+        return swap_cost < recompute_cost
+
+    def record_decision(self, request_id: str, swapped: bool, num_blocks: int,
+                        num_tokens: int) -> None:
+        self._decisions[request_id] = PreemptionDecision(
+            swapped, num_blocks, num_tokens)
+
+    def resolve_decision(self, request_id: str) -> Optional[bool]:
+        """Checks the decision taken for the preempted request, which is
+        resumed.
+
+        Returns:
+            Optional[bool]: Whether the decision was a misprediction, or None
+                if no decision was recorded for the request or the costs of
+                both modes cannot be estimated yet.
+        """
+        decision = self._decisions.pop(request_id, None)
+        if decision is None:
+            return None
+        swap_cost = self.swap_cost(decision.num_blocks)
+        recompute_cost = self.recompute_cost(decision.num_tokens)
+        if swap_cost is None or recompute_cost is None:
+            return None
+        return (swap_cost < recompute_cost) != decision.swapped
+
+    def discard_decision(self, request_id: str) -> None:
+        self._decisions.pop(request_id, None)
@@ -1,22 +1,30 @@
 import enum
+import itertools
 import os
 import random
 import time
+from abc import ABC, abstractmethod
 from collections import deque
 from dataclasses import dataclass, field
 from typing import Callable, Deque, Dict, Iterable, List, Optional
 from typing import Sequence as GenericSequence
-from typing import Set, Tuple, Union
+from typing import Set, Tuple, Type, Union
+
+import numpy as np
 
 from vllm.config import CacheConfig, LoRAConfig, SchedulerConfig
+from vllm.core.admission_controller import AdmissionController
+from vllm.core.evictor_v2 import EvictionPolicy
 from vllm.core.interfaces import AllocStatus, BlockSpaceManager
+from vllm.core.preemption_cost_model import PreemptionCostModel
+from vllm.core.step_time_model import StepTimeModel
 from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
 from vllm.prompt_adapter.request import PromptAdapterRequest
 from vllm.sequence import (Sequence, SequenceData, SequenceGroup,
-                           SequenceGroupMetadata, SequenceGroupMetadataDelta,
-                           SequenceStatus)
-from vllm.utils import Device, PyObjectCache
+                           SequenceGroupMetadata, SequenceStatus,
+                           get_sequence_store)
+from vllm.utils import Device, PyObjectCache, cdiv
 
 logger = init_logger(__name__)
 
@@ -36,9 +44,13 @@ class PreemptionMode(enum.Enum):
     2. Recomputation: Discard the blocks of the preempted sequences and
     recompute them when the sequences are resumed, treating the sequences as
     new prompts.
+    3. Partial swapping: Swap out only the tail blocks of the preempted
+    sequences to CPU memory, keeping the leading blocks on the GPU, and swap
+    the tail back in when the sequences are resumed.
     """
     SWAP = enum.auto()
     RECOMPUTE = enum.auto()
+    PARTIAL_SWAP = enum.auto()
 
 
 @dataclass
@@ -75,6 +87,14 @@ class SchedulingBudget:
         self._request_ids_num_batched_tokens.add(req_id)
         self._num_batched_tokens += num_batched_tokens
 
+    def add_num_batched_tokens_of_requests(self, req_ids: List[str],
+                                           num_batched_tokens: int):
+        """Adds the total number of batched tokens of requests that are not
+        accounted for yet."""
+        assert self._request_ids_num_batched_tokens.isdisjoint(req_ids)
+        self._request_ids_num_batched_tokens.update(req_ids)
+        self._num_batched_tokens += num_batched_tokens
+
     def subtract_num_batched_tokens(self, req_id: str,
                                     num_batched_tokens: int):
         if req_id in self._request_ids_num_batched_tokens:
@@ -134,9 +154,32 @@ class SchedulerOutputs:
     # The number of requests in the running queue
     running_queue_size: int
     preempted: int
+    # Blocks to save to the disk prefix cache. GPU block -> disk slot.
+    blocks_to_save_to_disk: List[Tuple[int, int]] = field(
+        default_factory=list)
+    # Blocks to load from the disk prefix cache. Disk slot -> GPU block.
+    blocks_to_load_from_disk: List[Tuple[int, int]] = field(
+        default_factory=list)
+    # Preemption costs of the step: the blocks swapped out by preemptions,
+    # the blocks of preempted sequences swapped back in, and the computed
+    # tokens discarded by recompute preemptions.
+    num_preempted_blocks_swapped_out: int = 0
+    num_preempted_blocks_swapped_in: int = 0
+    num_preempted_tokens_recomputed: int = 0
+    # The mode of each preemption of the step, and the number of preemption
+    # decisions of the cost model found to be wrong when their victims were
+    # resumed.
+    preemption_modes: List[str] = field(default_factory=list)
+    num_preemption_mispredictions: int = 0
+    # Number of batched tokens of the prefill groups.
+    num_prefill_tokens: int = 0
+    # With chunked prefill, the token budget of the step left for prefills
+    # after the decodes.
+    prefill_chunk_size: Optional[int] = None
 
     def __post_init__(self):
-        # Swap in and swap out should never happen at the same time.
+        # Swap in and swap out of preempted sequences should never happen at
+        # the same time. (Copies of the CPU prefix cache are added later.)
         assert not (self.blocks_to_swap_in and self.blocks_to_swap_out)
 
         self.num_loras: int = len(self.lora_requests)
@@ -148,7 +191,9 @@ class SchedulerOutputs:
     def is_empty(self) -> bool:
         # NOTE: We do not consider the ignored sequence groups.
         return (not self.scheduled_seq_groups and not self.blocks_to_swap_in
-                and not self.blocks_to_swap_out and not self.blocks_to_copy)
+                and not self.blocks_to_swap_out and not self.blocks_to_copy
+                and not self.blocks_to_save_to_disk
+                and not self.blocks_to_load_from_disk)
 
     def _sort_by_lora_ids(self):
         self.scheduled_seq_groups = sorted(
@@ -295,6 +340,175 @@ def scheduled_seq_group_builder():
     # return ScheduledSequenceGroup(seq_group=None, token_chunk_size=0)
 
 
+class SchedulingPolicy(ABC):
+    """Orders the queues of the scheduler for a scheduling policy.
+
+    Sequence groups are scheduled in increasing order of their priority, and
+    the running ones are preempted in decreasing order.
+    """
+
+    # Whether the running and swapped queues are ordered, in addition to the
+    # waiting queue.
+    orders_running: bool = True
+
+    def __init__(self, scheduler_config: SchedulerConfig,
+                 block_manager: BlockSpaceManager):
+        self.scheduler_config = scheduler_config
+        self.block_manager = block_manager
+
+    @abstractmethod
+    def get_priority(self, seq_group: SequenceGroup, now: float) -> Tuple:
+        """Get the priority of the sequence group, lower values first."""
+        pass
+
+    def sort(self, queue: Deque[SequenceGroup],
+             now: float) -> Deque[SequenceGroup]:
+        if len(queue) <= 1:
+            return queue
+        return deque(
+            sorted(queue,
+                   key=lambda seq_group: self.get_priority(seq_group, now)))
+
+    def sort_waiting(self, waiting: Deque[SequenceGroup],
+                     now: float) -> Deque[SequenceGroup]:
+        """Orders the waiting queue. The sequence groups preempted by
+        recomputation, which the scheduler puts back at the front of the
+        queue, stay there in their order."""
+        preempted: List[SequenceGroup] = []
+        new: Deque[SequenceGroup] = deque()
+        for seq_group in waiting:
+            if seq_group.metrics.first_scheduled_time is None:
+                new.append(seq_group)
+            else:
+                preempted.append(seq_group)
+        new = self.sort(new, now)
+        new.extendleft(reversed(preempted))
+        return new
+
+
+class PrefixAwarePolicy(SchedulingPolicy):
+    """Admits the waiting requests hitting the prefix cache first, before
+    the blocks they reuse get evicted.
+
+    Highest preference to the requests that waited longer than
+    `prefix_aware_max_wait`, in arrival order, so that no request starves.
+    Then to the requests with the most prompt tokens cached on GPU, followed
+    by arrival time.
+
+    Looking up the cached prompt tokens walks the block hashes of a prompt,
+    so it is not repeated for the whole queue at every step: the last count
+    of a request is kept, and at most `max_num_seqs` requests are looked up
+    per step, new requests first, then the least recently looked up ones.
+    """
+
+    orders_running = False
+
+    def __init__(self, scheduler_config: SchedulerConfig,
+                 block_manager: BlockSpaceManager):
+        super().__init__(scheduler_config, block_manager)
+        # The number of cached prompt tokens of the waiting requests, by
+        # request id, from the least to the most recently looked up.
+        self._num_cached_tokens: Dict[str, int] = {}
+
+    def get_priority(self, seq_group: SequenceGroup,
+                     now: float) -> Tuple[bool, int, float]:
+        if (now - seq_group.arrival_time >=
+                self.scheduler_config.prefix_aware_max_wait):
+            return False, 0, seq_group.arrival_time
+        num_cached_tokens = self._num_cached_tokens.get(
+            seq_group.request_id, 0)
+        return True, -num_cached_tokens, seq_group.arrival_time
+
+    def sort(self, queue: Deque[SequenceGroup],
+             now: float) -> Deque[SequenceGroup]:
+        queued = {seq_group.request_id: seq_group for seq_group in queue}
+        num_cached_tokens = self._num_cached_tokens
+        for request_id in [
+                request_id for request_id in num_cached_tokens
+                if request_id not in queued
+        ]:
+            del num_cached_tokens[request_id]
+
+        to_look_up = [
+            request_id for request_id in queued
+            if request_id not in num_cached_tokens
+        ]
+        to_look_up.extend(num_cached_tokens)
+        for request_id in to_look_up[:self.scheduler_config.max_num_seqs]:
+            seq = queued[request_id].get_seqs(
+                status=SequenceStatus.WAITING)[0]
+            num_cached_tokens.pop(request_id, None)
+            num_cached_tokens[request_id] = (
+                self.block_manager.get_num_cached_prefix_tokens(seq))
+        return super().sort(queue, now)
+
+
+class ShortestRemainingWorkPolicy(SchedulingPolicy):
+    """Schedules the requests with the least remaining work first, which
+    lowers the median latency of mixed interactive and batch traffic.
+
+    The remaining work is estimated in model steps: the uncomputed prompt
+    tokens take a share of a step, relative to `max_num_batched_tokens`,
+    and each output token that is left up to `max_tokens` takes a step.
+    Ties are broken by arrival time.
+
+    Highest preference to the requests that arrived more than
+    `srpt_max_wait` ago, in arrival order, so that long requests are not
+    deferred or preempted indefinitely under a steady load of short ones.
+    """
+
+    def get_priority(self, seq_group: SequenceGroup,
+                     now: float) -> Tuple[bool, float, float]:
+        if (now - seq_group.arrival_time >=
+                self.scheduler_config.srpt_max_wait):
+            return False, 0, seq_group.arrival_time
+        seq = seq_group.seqs[0]
+        max_tokens = (seq_group.sampling_params.max_tokens
+                      if seq_group.sampling_params else None)
+        if max_tokens is None:
+            num_remaining_output_tokens = (
+                self.scheduler_config.max_model_len - seq.get_len())
+        else:
+            num_remaining_output_tokens = max_tokens - seq.get_output_len()
+        remaining_work = (seq.data.get_num_uncomputed_tokens() /
+                          self.scheduler_config.max_num_batched_tokens +
+                          max(num_remaining_output_tokens, 0))
+        return True, remaining_work, seq_group.arrival_time
+
+
+class SLOPolicy(SchedulingPolicy):
+    """Schedules the requests in order of the deadline of their next token
+    (earliest deadline first), so that the requests at risk of missing their
+    latency targets are favored.
+
+    The first token is due `ttft_slo` after arrival, and every later token
+    `tpot_slo` after the previous one, counting from the first token. The
+    requests without the corresponding target come last, in arrival order.
+    """
+
+    def get_priority(self, seq_group: SequenceGroup,
+                     now: float) -> Tuple[float, float]:
+        sampling_params = seq_group.sampling_params
+        first_token_time = seq_group.metrics.first_token_time
+        deadline = float("inf")
+        if sampling_params is not None:
+            if first_token_time is None:
+                if sampling_params.ttft_slo is not None:
+                    deadline = (seq_group.arrival_time +
+                                sampling_params.ttft_slo)
+            elif sampling_params.tpot_slo is not None:
+                deadline = (first_token_time + sampling_params.tpot_slo *
+                            seq_group.seqs[0].get_output_len())
+        return deadline, seq_group.arrival_time
+
+
+_SCHEDULING_POLICIES: Dict[str, Type[SchedulingPolicy]] = {
+    "prefix_aware": PrefixAwarePolicy,
+    "srpt": ShortestRemainingWorkPolicy,
+    "slo": SLOPolicy,
+}
+
+
 class Scheduler:
 
     def __init__(
@@ -328,13 +542,36 @@ class Scheduler:
         if num_cpu_blocks:
             num_cpu_blocks //= pipeline_parallel_size
 
+        num_cpu_prefix_cache_blocks = 0
+        if self.cache_config.enable_prefix_caching and num_cpu_blocks:
+            num_cpu_prefix_cache_blocks = int(
+                num_cpu_blocks * self.cache_config.cpu_prefix_cache_ratio)
+
         # Create the block space manager.
         self.block_manager = BlockSpaceManagerImpl(
             block_size=self.cache_config.block_size,
             num_gpu_blocks=num_gpu_blocks,
             num_cpu_blocks=num_cpu_blocks,
             sliding_window=self.cache_config.sliding_window,
-            enable_caching=self.cache_config.enable_prefix_caching)
+            enable_caching=self.cache_config.enable_prefix_caching,
+            eviction_policy=EvictionPolicy[
+                self.cache_config.prefix_cache_eviction_policy.upper()],
+            num_cpu_prefix_cache_blocks=num_cpu_prefix_cache_blocks,
+            disk_prefix_cache_dir=self.cache_config.disk_prefix_cache_dir,
+            num_disk_prefix_cache_blocks=(
+                self.cache_config.num_disk_prefix_cache_blocks))
+
+        # Orders the queues for the policies other than fcfs and priority.
+        policy_cls = _SCHEDULING_POLICIES.get(self.scheduler_config.policy)
+        self.policy: Optional[SchedulingPolicy] = (
+            policy_cls(self.scheduler_config, self.block_manager)
+            if policy_cls is not None else None)
+
+        if (self.scheduler_config.policy == "prefix_aware"
+                and not self.cache_config.enable_prefix_caching):
+            logger.warning("The prefix_aware scheduling policy has no effect "
+                           "without prefix caching. Requests are scheduled "
+                           "in order of arrival.")
 
         # Sequence groups in the WAITING state.
         # Contain new prefill or preempted requests.
@@ -358,6 +595,24 @@ class Scheduler:
         self.last_prompt_latency = 0.0
         # preemption mode, RECOMPUTE or SWAP
         self.user_specified_preemption_mode = scheduler_config.preemption_mode
+        # Chooses between RECOMPUTE and SWAP in the "auto" preemption mode.
+        # The engine feeds it with the measured swap and prefill times.
+        self.preemption_cost_model: Optional[PreemptionCostModel] = None
+        if self.user_specified_preemption_mode == "auto":
+            self.preemption_cost_model = PreemptionCostModel()
+        # Sizes the prefill chunks to hold the target inter-token latency.
+        # The engine feeds it with the measured step times.
+        self.step_time_model: Optional[StepTimeModel] = None
+        if self.scheduler_config.target_inter_token_latency is not None:
+            self.step_time_model = StepTimeModel()
+        # Holds new prefills back when the running sequences are projected
+        # to run out of blocks.
+        self.admission_controller: Optional[AdmissionController] = None
+        if self.scheduler_config.admission_watermark is not None:
+            self.admission_controller = AdmissionController(
+                self.cache_config.block_size,
+                int(self.scheduler_config.admission_watermark *
+                    self.cache_config.num_gpu_blocks))
 
         # The following field is test-only. It is used to inject artificial
         # preemption.
@@ -366,6 +621,11 @@ class Scheduler:
                                        if self.enable_artificial_preemption
                                        else 0)
         self.num_cumulative_preemption: int = 0
+        # The computed tokens discarded by recompute preemptions in the
+        # current step.
+        self._num_preempted_tokens_recomputed = 0
+        self._preemption_modes: List[str] = []
+        self._num_preemption_mispredictions = 0
 
         # Used to cache python objects
         self._seq_group_metadata_cache: List[PyObjectCache] = []
@@ -461,6 +721,9 @@ class Scheduler:
                     self.free_seq(seq)
 
                 self._free_seq_group_cross_attn_blocks(aborted_group)
+                if self.preemption_cost_model is not None:
+                    self.preemption_cost_model.discard_decision(
+                        aborted_group.request_id)
 
     def _free_seq_group_cross_attn_blocks(
         self,
@@ -474,8 +737,11 @@ class Scheduler:
             self.block_manager.free_cross(seq_group)
 
     def has_unfinished_seqs(self) -> bool:
+        # Blocks saved to the disk prefix cache when the last sequences
+        # finished take up to two more steps to be written and committed.
         return len(self.waiting) != 0 or len(self.running) != 0 or len(
-            self.swapped) != 0
+            self.swapped) != 0 or (
+                self.block_manager.has_pending_disk_prefix_cache_copies())
 
     def get_prefix_cache_hit_rate(self, device: Device) -> float:
         return self.block_manager.get_prefix_cache_hit_rate(device)
@@ -539,6 +805,8 @@ class Scheduler:
 
         running_queue = self.running
         assert len(self._async_stopped) == 0
+        if not enable_chunking and not self.enable_artificial_preemption:
+            self._schedule_running_batched(ret, budget, curr_loras)
         while running_queue:
             seq_group = running_queue[0]
             num_running_tokens = self._get_num_new_tokens(
@@ -601,8 +869,15 @@ class Scheduler:
 
                 # Do preemption
                 if do_preempt:
-                    preempted_mode = self._preempt(victim_seq_group,
-                                                   blocks_to_swap_out)
+                    num_blocks_to_free = None
+                    if (self.user_specified_preemption_mode == "partial_swap"
+                            and victim_seq_group is not seq_group):
+                        num_blocks_to_free = self._get_num_blocks_to_free(
+                            seq_group, running_queue, enable_chunking)
+                    preempted_mode = self._preempt(
+                        victim_seq_group,
+                        blocks_to_swap_out,
+                        num_blocks_to_free=num_blocks_to_free)
                     if preempted_mode == PreemptionMode.RECOMPUTE:
                         preempted.append(victim_seq_group)
                     else:
@@ -643,6 +918,101 @@ class Scheduler:
 
         return ret
 
+    def _schedule_running_batched(
+        self,
+        ret: SchedulerRunningOutputs,
+        budget: SchedulingBudget,
+        curr_loras: Optional[Set[int]],
+    ) -> None:
+        """Fast path of `_schedule_running` without chunked prefill.
+
+        Computes the token and block needs of the running decodes as arrays,
+        and schedules at once the longest prefix of the running queue whose
+        worst-case block needs add up to at most the free GPU blocks. Every
+        sequence group of the prefix would pass `_can_append_slots` in the
+        per-group path, which is left with the rest of the queue and
+        preempts sequence groups as needed.
+        """
+        running_queue = self.running
+        num_lookahead_slots = ret.num_lookahead_slots
+        max_model_len = self.scheduler_config.max_model_len
+        check_max_model_len = self.use_async_output_proc
+
+        seq_groups = list(running_queue)
+        # The scalars of all the sequences of the queue, read from the
+        # sequence store at once.
+        all_seqs = [seq for seq_group in seq_groups for seq in seq_group.seqs]
+        slots = np.fromiter((seq.slot for seq in all_seqs),
+                            dtype=np.int64,
+                            count=len(all_seqs))
+        num_seqs = np.fromiter(
+            (len(seq_group.seqs) for seq_group in seq_groups),
+            dtype=np.int64,
+            count=len(seq_groups))
+        group_starts = np.zeros_like(num_seqs)
+        np.cumsum(num_seqs[:-1], out=group_starts[1:])
+        store = get_sequence_store()
+        is_running = (store.get_statuses(slots) == SequenceStatus.RUNNING)
+        num_running_seqs = np.add.reduceat(is_running.astype(np.int64),
+                                           group_starts)
+        # Prefills, sequence groups without running sequences and the ones
+        # stopped by the async postprocessor are left to the per-group path.
+        first_slots = slots[group_starts]
+        is_decode = (num_running_seqs > 0) & ~store.is_prefill(first_slots)
+        if check_max_model_len:
+            is_decode &= store.get_lens(first_slots) <= max_model_len
+        num_groups = (len(seq_groups)
+                      if is_decode.all() else int(np.argmin(is_decode)))
+        if num_groups == 0:
+            return
+
+        cum_num_seqs = np.cumsum(num_running_seqs[:num_groups])
+        num_queue_seqs = (int(group_starts[num_groups])
+                          if num_groups < len(seq_groups) else len(all_seqs))
+        running_indices = np.flatnonzero(is_running[:num_queue_seqs])
+        seqs = [all_seqs[i] for i in running_indices.tolist()]
+        num_touched_blocks = np.cumsum(
+            self.block_manager.get_num_blocks_touched_by_append_slots(
+                seqs, num_lookahead_slots))[cum_num_seqs - 1]
+        num_groups = int(
+            np.searchsorted(num_touched_blocks,
+                            self.block_manager.get_num_free_gpu_blocks(),
+                            side="right"))
+        if num_groups == 0:
+            return
+
+        scheduled_seq_group_cache = self._scheduled_seq_group_cache[
+            self.cache_id]
+        num_scheduler_steps = self.scheduler_config.num_scheduler_steps
+        is_multi_step = self.scheduler_config.is_multi_step
+        for seq_group in seq_groups[:num_groups]:
+            running_queue.popleft()
+            seq_group.init_multi_step_from_lookahead_slots(
+                num_lookahead_slots,
+                num_scheduler_steps=num_scheduler_steps,
+                is_multi_step=is_multi_step,
+                enable_chunking=False)
+
+            scheduled_seq_group: ScheduledSequenceGroup = \
+                scheduled_seq_group_cache.get_object()
+            scheduled_seq_group.seq_group = seq_group
+            scheduled_seq_group.token_chunk_size = 1
+            ret.decode_seq_groups.append(scheduled_seq_group)
+            ret.decode_seq_groups_list.append(seq_group)
+            if curr_loras is not None and seq_group.lora_int_id > 0:
+                curr_loras.add(seq_group.lora_int_id)
+
+        blocks_to_copy = ret.blocks_to_copy
+        for seq in seqs[:cum_num_seqs[num_groups - 1]]:
+            cows = self.block_manager.append_slots(seq, num_lookahead_slots)
+            if len(cows) > 0:
+                blocks_to_copy.extend(cows)
+
+        # Each decode sequence schedules a single token.
+        budget.add_num_batched_tokens_of_requests(
+            [seq_group.request_id for seq_group in seq_groups[:num_groups]],
+            int(cum_num_seqs[num_groups - 1]))
+
     def _schedule_swapped(
         self,
         budget: SchedulingBudget,
@@ -846,6 +1216,7 @@ class Scheduler:
         budget: SchedulingBudget,
         curr_loras: Optional[Set[int]],
         enable_chunking: bool = False,
+        running_seq_groups: Optional[Iterable[SequenceGroup]] = None,
     ) -> SchedulerPrefillOutputs:
         """Schedule sequence groups that are in prefill stage.
 
@@ -866,6 +1237,9 @@ class Scheduler:
                 chunked number of tokens are scheduled  if
                 `budget.num_batched_tokens` has not enough capacity to schedule
                 all tokens.
+            running_seq_groups: The sequence groups that hold blocks, whose
+                projected demand is checked by the admission control. The
+                running queue if None.
 
         Returns:
             SchedulerPrefillOutputs.
@@ -873,6 +1247,20 @@ class Scheduler:
         ignored_seq_groups: List[SequenceGroup] = []
         seq_groups: List[ScheduledSequenceGroup] = []
 
+        # The tokens and projected remaining lengths of the sequences that
+        # hold blocks, if the admission is controlled.
+        admitted_seqs: Optional[List[Tuple[int, int]]] = None
+        if (self.admission_controller is not None
+                and self.admission_controller.is_active):
+            admitted_seqs = []
+            for running_seq_group in (self.running if running_seq_groups
+                                      is None else running_seq_groups):
+                admitted_seqs.extend(
+                    self._project_seqs(running_seq_group,
+                                       SequenceStatus.RUNNING))
+
+        if self.policy is not None:
+            self.waiting = self.policy.sort_waiting(self.waiting, time.time())
         waiting_queue = self.waiting
 
         leftover_waiting_sequences: Deque[SequenceGroup] = deque()
@@ -922,6 +1310,15 @@ class Scheduler:
                 waiting_queue.popleft()
                 continue
 
+            if admitted_seqs is not None:
+                new_seqs = self._project_seqs(seq_group,
+                                              SequenceStatus.WAITING)
+                assert self.admission_controller is not None
+                if not self.admission_controller.can_admit(
+                        admitted_seqs, new_seqs,
+                        self.block_manager.get_num_free_gpu_blocks()):
+                    break
+
             lora_int_id = 0
             if self.lora_enabled:
                 lora_int_id = seq_group.lora_int_id
@@ -947,6 +1344,10 @@ class Scheduler:
                 curr_loras.add(lora_int_id)
             waiting_queue.popleft()
             self._allocate_and_set_running(seq_group)
+            if self.preemption_cost_model is not None:
+                self._resolve_preemption_decision(seq_group)
+            if admitted_seqs is not None:
+                admitted_seqs.extend(new_seqs)
 
             if enable_chunking and self.scheduler_config.is_multi_step:
                 blocks_to_copy: List[Tuple[int, int]] = []
@@ -1101,7 +1502,7 @@ class Scheduler:
         by prefill requests.
         """
         budget = SchedulingBudget(
-            token_budget=self.scheduler_config.max_num_batched_tokens,
+            token_budget=self._get_chunked_prefill_token_budget(),
             max_num_seqs=self.scheduler_config.max_num_seqs,
         )
         curr_loras: Set[int] = set()
@@ -1121,9 +1522,19 @@ class Scheduler:
             swapped_in = self._schedule_swapped(budget, curr_loras)
 
         # Schedule new prefills.
-        prefills = self._schedule_prefills(budget,
-                                           curr_loras,
-                                           enable_chunking=True)
+        prefills = self._schedule_prefills(
+            budget,
+            curr_loras,
+            enable_chunking=True,
+            # The running sequence groups that are not scheduled in this
+            # step, left in the running queue, hold blocks as well.
+            running_seq_groups=[
+                *self.running, *(s.seq_group for s in itertools.chain(
+                    running_scheduled.decode_seq_groups,
+                    running_scheduled.prefill_seq_groups,
+                    swapped_in.decode_seq_groups,
+                    swapped_in.prefill_seq_groups))
+            ])
 
         assert (budget.num_batched_tokens <=
                 self.scheduler_config.max_num_batched_tokens)
@@ -1148,7 +1559,14 @@ class Scheduler:
 
         # Update swapped requests.
         self.swapped.extend(running_scheduled.swapped_out)
+        # Sequence groups with several sequences decode a token for each.
+        num_decode_tokens = sum(
+            scheduled_seq_group.seq_group.num_seqs(
+                status=SequenceStatus.RUNNING)
+            for scheduled_seq_group in (running_scheduled.decode_seq_groups +
+                                        swapped_in.decode_seq_groups))
         return SchedulerOutputs(
+            prefill_chunk_size=budget.token_budget - num_decode_tokens,
             scheduled_seq_groups=(prefills.seq_groups +
                                   running_scheduled.prefill_seq_groups +
                                   swapped_in.prefill_seq_groups +
@@ -1172,10 +1590,125 @@ class Scheduler:
 
     def _schedule(self) -> SchedulerOutputs:
         """Schedule queued requests."""
+        if self.policy is not None and self.policy.orders_running:
+            now = time.time()
+            self.running = self.policy.sort(self.running, now)
+            self.swapped = self.policy.sort(self.swapped, now)
+
+        self._num_preempted_tokens_recomputed = 0
+        self._preemption_modes = []
+        self._num_preemption_mispredictions = 0
         if self.scheduler_config.chunked_prefill_enabled:
-            return self._schedule_chunked_prefill()
+            scheduler_outputs = self._schedule_chunked_prefill()
         else:
-            return self._schedule_default()
+            scheduler_outputs = self._schedule_default()
+        scheduler_outputs.num_preempted_blocks_swapped_out = len(
+            scheduler_outputs.blocks_to_swap_out)
+        scheduler_outputs.num_preempted_blocks_swapped_in = len(
+            scheduler_outputs.blocks_to_swap_in)
+        scheduler_outputs.num_preempted_tokens_recomputed = (
+            self._num_preempted_tokens_recomputed)
+        scheduler_outputs.preemption_modes = self._preemption_modes
+        scheduler_outputs.num_preemption_mispredictions = (
+            self._num_preemption_mispredictions)
+        scheduler_outputs.num_prefill_tokens = sum(
+            scheduled_seq_group.token_chunk_size for scheduled_seq_group in
+            scheduler_outputs.scheduled_seq_groups[:scheduler_outputs.
+                                                   num_prefill_groups])
+
+        # Blocks evicted from / reloaded into the GPU prefix cache by the
+        # allocations above. The worker runs swap outs before swap ins, which
+        # is the order these copies rely on.
+        cpu_cache_swaps_out, cpu_cache_swaps_in = (
+            self.block_manager.get_and_reset_cpu_prefix_cache_swaps())
+        scheduler_outputs.blocks_to_swap_out.extend(cpu_cache_swaps_out)
+        scheduler_outputs.blocks_to_swap_in.extend(cpu_cache_swaps_in)
+        (scheduler_outputs.blocks_to_save_to_disk,
+         scheduler_outputs.blocks_to_load_from_disk) = (
+             self.block_manager.get_and_reset_disk_prefix_cache_copies())
+        return scheduler_outputs
+
+    def _project_seqs(self, seq_group: SequenceGroup,
+                      status: SequenceStatus) -> List[Tuple[int, int]]:
+        """The number of tokens and the projected remaining length of the
+        sequences of the group with the given status, for the admission
+        control. A waiting group counts all the sequences it forks into.
+
+        The sequences of a group share the blocks of their prompt, which are
+        counted once.
+        """
+        assert self.admission_controller is not None
+        sampling_params = seq_group.sampling_params
+        seqs = seq_group.get_seqs(status=status)
+        projected_seqs: List[Tuple[int, int]] = []
+        for i, seq in enumerate(seqs):
+            max_output_len = 0
+            if sampling_params is not None:
+                max_output_len = (self.scheduler_config.max_model_len -
+                                  seq.get_prompt_len())
+                if sampling_params.max_tokens is not None:
+                    max_output_len = min(max_output_len,
+                                         sampling_params.max_tokens)
+            remaining_len = self.admission_controller.project_remaining_len(
+                seq.get_output_len(), max_output_len)
+            num_tokens = seq.get_len() if i == 0 else seq.get_output_len()
+            projected_seqs.append((num_tokens, remaining_len))
+        if status == SequenceStatus.WAITING:
+            num_forks = seq_group.get_max_num_running_seqs() - len(seqs)
+            projected_seqs.extend([(0, projected_seqs[0][1])] * num_forks)
+        return projected_seqs
+
+    def _get_chunked_prefill_token_budget(self) -> int:
+        """The token budget of a chunked prefill step: the decodes of the
+        running queue plus the prefill tokens that the step time model
+        expects to fit within the target inter-token latency."""
+        max_num_batched_tokens = self.scheduler_config.max_num_batched_tokens
+        if self.step_time_model is None:
+            return max_num_batched_tokens
+        target = self.scheduler_config.target_inter_token_latency
+        assert target is not None
+        num_decode_tokens = sum(
+            seq_group.num_seqs(status=SequenceStatus.RUNNING)
+            for seq_group in self.running if not seq_group.is_prefill())
+        num_prefill_tokens = self.step_time_model.get_max_num_prefill_tokens(
+            num_decode_tokens, target)
+        if num_prefill_tokens is None:
+            return max_num_batched_tokens
+        # At least a block of prefill per step, so that prompts keep making
+        # progress. The budget stays a multiple of the block size, as
+        # required by prefix caching.
+        block_size = self.cache_config.block_size
+        token_budget = num_decode_tokens + max(num_prefill_tokens, block_size)
+        return min(cdiv(token_budget, block_size) * block_size,
+                   max_num_batched_tokens)
+
+    def observe_step(self, scheduler_outputs: SchedulerOutputs,
+                     execute_time: float, num_swapped_blocks: int,
+                     swap_time: float) -> None:
+        """Feeds the cost models of the scheduler with the measured time of
+        the model step of the scheduler outputs, and with the time of the
+        swaps that completed since the previous step."""
+        if self.preemption_cost_model is not None:
+            self.preemption_cost_model.observe_swap(num_swapped_blocks,
+                                                    swap_time)
+        # Multi-step runs several steps per model execution, of which only
+        # the first may run prefills.
+        if (scheduler_outputs.is_empty()
+                or self.scheduler_config.is_multi_step):
+            return
+        # Only the steps without decodes measure the prefill rate, as the
+        # decodes of a mixed step take a share of its time.
+        if (self.preemption_cost_model is not None
+                and scheduler_outputs.num_prefill_groups > 0
+                and scheduler_outputs.num_prefill_tokens
+                == scheduler_outputs.num_batched_tokens):
+            self.preemption_cost_model.observe_prefill(
+                scheduler_outputs.num_prefill_tokens, execute_time)
+        if self.step_time_model is not None:
+            self.step_time_model.observe(
+                scheduler_outputs.num_batched_tokens -
+                scheduler_outputs.num_prefill_tokens,
+                scheduler_outputs.num_prefill_tokens, execute_time)
 
     def _can_append_slots(self, seq_group: SequenceGroup,
                           enable_chunking: bool) -> bool:
@@ -1268,15 +1801,11 @@ class Scheduler:
 
             do_sample = True
             is_prompt = seq_group.is_prefill()
-            # We should send the metadata to workers when the first prefill
-            # is sent. Subsequent requests could be chunked prefill or decode.
-            is_first_prefill = False
             if is_prompt:
                 seqs = seq_group.get_seqs()
                 # Prefill has only 1 sequence.
                 assert len(seqs) == 1
                 num_computed_tokens = seqs[0].data.get_num_computed_tokens()
-                is_first_prefill = num_computed_tokens == 0
                 # In the next iteration, all prompt tokens are not computed.
                 # It means the prefill is chunked, and we don't need sampling.
                 # NOTE: We use get_len instead of get_prompt_len because when
@@ -1286,47 +1815,29 @@ class Scheduler:
                         seqs[0].data.get_len()):
                     do_sample = False
 
-            # It assumes the scheduled_seq_groups is ordered by
-            # prefill < decoding.
-            if is_first_prefill or not self.scheduler_config.send_delta_data:
-                seq_group_metadata = SequenceGroupMetadata(
-                    request_id=seq_group.request_id,
-                    is_prompt=is_prompt,
-                    seq_data=seq_data,
-                    sampling_params=seq_group.sampling_params,
-                    block_tables=block_tables,
-                    do_sample=do_sample,
-                    pooling_params=seq_group.pooling_params,
-                    token_chunk_size=token_chunk_size,
-                    lora_request=seq_group.lora_request,
-                    computed_block_nums=common_computed_block_nums,
-                    encoder_seq_data=encoder_seq_data,
-                    cross_block_table=cross_block_table,
-                    state=seq_group.state,
-                    # `multi_modal_data` will only be present for the 1st comm
-                    # between engine and worker.
-                    # the subsequent comms can still use delta, but
-                    # `multi_modal_data` will be None.
-                    multi_modal_data=seq_group.multi_modal_data
-                    if scheduler_outputs.num_prefill_groups > 0 else None,
-                    mm_processor_kwargs=seq_group.mm_processor_kwargs,
-                    prompt_adapter_request=seq_group.prompt_adapter_request,
-                )
-            else:
-                # When SPMD mode is enabled, we only send delta data except for
-                # the first request to reduce serialization cost.
-                seq_data_delta = {}
-                for id, data in seq_data.items():
-                    seq_data_delta[id] = data.get_delta_and_reset()
-                seq_group_metadata = SequenceGroupMetadataDelta(
-                    seq_data_delta,
-                    seq_group.request_id,
-                    block_tables,
-                    is_prompt,
-                    do_sample=do_sample,
-                    token_chunk_size=token_chunk_size,
-                    computed_block_nums=common_computed_block_nums,
-                )
+            seq_group_metadata = SequenceGroupMetadata(
+                request_id=seq_group.request_id,
+                is_prompt=is_prompt,
+                seq_data=seq_data,
+                sampling_params=seq_group.sampling_params,
+                block_tables=block_tables,
+                do_sample=do_sample,
+                pooling_params=seq_group.pooling_params,
+                token_chunk_size=token_chunk_size,
+                lora_request=seq_group.lora_request,
+                computed_block_nums=common_computed_block_nums,
+                encoder_seq_data=encoder_seq_data,
+                cross_block_table=cross_block_table,
+                state=seq_group.state,
+                # `multi_modal_data` will only be present for the 1st comm
+                # between engine and worker.
+                # the subsequent comms can still use delta, but
+                # `multi_modal_data` will be None.
+                multi_modal_data=seq_group.multi_modal_data
+                if scheduler_outputs.num_prefill_groups > 0 else None,
+                mm_processor_kwargs=seq_group.mm_processor_kwargs,
+                prompt_adapter_request=seq_group.prompt_adapter_request,
+            )
             seq_group_metadata_list.append(seq_group_metadata)
 
             if allow_async_output_proc:
@@ -1385,6 +1896,13 @@ class Scheduler:
             # next step.
             self._finished_requests_ids.append(seq_group.request_id)
 
+            if self.admission_controller is not None:
+                for seq in seq_group.get_seqs():
+                    if seq.status in (SequenceStatus.FINISHED_STOPPED,
+                                      SequenceStatus.FINISHED_LENGTH_CAPPED):
+                        self.admission_controller.observe_output_len(
+                            seq.get_output_len())
+
         # Free finished seqs
         self._free_finished_seqs(seq_group)
 
@@ -1456,6 +1974,7 @@ class Scheduler:
         seq_group: SequenceGroup,
         blocks_to_swap_out: List[Tuple[int, int]],
         preemption_mode: Optional[PreemptionMode] = None,
+        num_blocks_to_free: Optional[int] = None,
     ) -> PreemptionMode:
         # If preemption mode is not specified, we determine the mode as follows:
         # We use recomputation by default since it incurs lower overhead than
@@ -1476,6 +1995,19 @@ class Scheduler:
 
         elif self.user_specified_preemption_mode == "swap":
             preemption_mode = PreemptionMode.SWAP
+        elif self.user_specified_preemption_mode == "partial_swap":
+            # Only a known number of blocks to free on behalf of another
+            # sequence group makes the tail worth splitting off. The blocks
+            # of a group with several sequences may be shared between them,
+            # so swapping their tails out would not free them.
+            if (num_blocks_to_free is not None
+                    and seq_group.get_max_num_running_seqs() == 1):
+                preemption_mode = PreemptionMode.PARTIAL_SWAP
+            else:
+                preemption_mode = PreemptionMode.SWAP
+        elif self.user_specified_preemption_mode == "auto":
+            if preemption_mode is None:
+                preemption_mode = self._get_cheaper_preemption_mode(seq_group)
         else:
             preemption_mode = PreemptionMode.RECOMPUTE
 
@@ -1488,15 +2020,45 @@ class Scheduler:
                 "total_num_cumulative_preemption=%d", seq_group.request_id,
                 preemption_mode, self.num_cumulative_preemption + 1)
         self.num_cumulative_preemption += 1
+        self._preemption_modes.append(preemption_mode.name.lower())
 
         if preemption_mode == PreemptionMode.RECOMPUTE:
             self._preempt_by_recompute(seq_group)
         elif preemption_mode == PreemptionMode.SWAP:
             self._preempt_by_swap(seq_group, blocks_to_swap_out)
+        elif preemption_mode == PreemptionMode.PARTIAL_SWAP:
+            assert num_blocks_to_free is not None
+            self._preempt_by_swap(seq_group, blocks_to_swap_out,
+                                  num_blocks_to_free)
         else:
             raise AssertionError("Invalid preemption mode.")
         return preemption_mode
 
+    def _get_cheaper_preemption_mode(
+            self, seq_group: SequenceGroup) -> PreemptionMode:
+        """Chooses the preemption mode of the victim with the lower estimated
+        cost, and records the decision to check it when the victim resumes.
+        """
+        assert self.preemption_cost_model is not None
+        # Recomputation only supports a single sequence.
+        if seq_group.get_max_num_running_seqs() > 1:
+            return PreemptionMode.SWAP
+        seq = seq_group.get_seqs(status=SequenceStatus.RUNNING)[0]
+        num_blocks = len(self.block_manager.get_block_table(seq))
+        num_tokens = seq.get_len()
+        swap = self.preemption_cost_model.should_swap(num_blocks, num_tokens)
+        if swap and not self.block_manager.can_swap_out(seq_group):
+            # Not a decision of the cost model.
+            return PreemptionMode.RECOMPUTE
+        self.preemption_cost_model.record_decision(seq_group.request_id, swap,
+                                                   num_blocks, num_tokens)
+        return PreemptionMode.SWAP if swap else PreemptionMode.RECOMPUTE
+
+    def _resolve_preemption_decision(self, seq_group: SequenceGroup) -> None:
+        assert self.preemption_cost_model is not None
+        if self.preemption_cost_model.resolve_decision(seq_group.request_id):
+            self._num_preemption_mispredictions += 1
+
     def _preempt_by_recompute(
         self,
         seq_group: SequenceGroup,
@@ -1504,6 +2066,8 @@ class Scheduler:
         seqs = seq_group.get_seqs(status=SequenceStatus.RUNNING)
         assert len(seqs) == 1
         for seq in seqs:
+            self._num_preempted_tokens_recomputed += (
+                seq.data.get_num_computed_tokens())
             seq.status = SequenceStatus.WAITING
             self.free_seq(seq)
             seq.reset_state_for_recompute()
@@ -1512,8 +2076,39 @@ class Scheduler:
         self,
         seq_group: SequenceGroup,
         blocks_to_swap_out: List[Tuple[int, int]],
+        num_blocks: Optional[int] = None,
     ) -> None:
-        self._swap_out(seq_group, blocks_to_swap_out)
+        self._swap_out(seq_group, blocks_to_swap_out, num_blocks)
+
+    def _get_num_blocks_to_free(self, seq_group: SequenceGroup,
+                                running_queue: Deque[SequenceGroup],
+                                enable_chunking: bool) -> int:
+        """The number of GPU blocks missing for the sequence group and the
+        decodes still in the running queue to continue in this step, i.e. the
+        tail blocks a partial swap preemption releases. Freeing only the
+        blocks of the current sequence group would preempt again for each of
+        the following decodes.
+        """
+        num_lookahead_slots = self._get_num_lookahead_slots(
+            seq_group.is_prefill(), enable_chunking)
+        num_blocks_touched = int(
+            self.block_manager.get_num_blocks_touched_by_append_slots(
+                seq_group.get_seqs(status=SequenceStatus.RUNNING),
+                num_lookahead_slots).sum())
+        decode_seqs = [
+            seq for queued_seq_group in running_queue
+            if not queued_seq_group.is_prefill()
+            for seq in queued_seq_group.get_seqs(status=SequenceStatus.RUNNING)
+        ]
+        if decode_seqs:
+            num_blocks_touched += int(
+                self.block_manager.get_num_blocks_touched_by_append_slots(
+                    decode_seqs,
+                    self._get_num_lookahead_slots(False,
+                                                  enable_chunking)).sum())
+        return max(
+            num_blocks_touched - self.block_manager.get_num_free_gpu_blocks(),
+            1)
 
     def _swap_in(
         self,
@@ -1522,6 +2117,8 @@ class Scheduler:
     ) -> None:
         mapping = self.block_manager.swap_in(seq_group)
         blocks_to_swap_in.extend(mapping)
+        if self.preemption_cost_model is not None:
+            self._resolve_preemption_decision(seq_group)
         for seq in seq_group.get_seqs(status=SequenceStatus.SWAPPED):
             seq.status = SequenceStatus.RUNNING
 
@@ -1529,14 +2126,15 @@ class Scheduler:
         self,
         seq_group: SequenceGroup,
         blocks_to_swap_out: List[Tuple[int, int]],
+        num_blocks: Optional[int] = None,
     ) -> None:
-        if not self.block_manager.can_swap_out(seq_group):
+        if not self.block_manager.can_swap_out(seq_group, num_blocks):
             # FIXME(woosuk): Abort the sequence group instead of aborting the
             # entire engine.
             raise RuntimeError(
                 "Aborted due to the lack of CPU swap space. Please increase "
                 "the swap space to avoid this error.")
-        mapping = self.block_manager.swap_out(seq_group)
+        mapping = self.block_manager.swap_out(seq_group, num_blocks)
         blocks_to_swap_out.extend(mapping)
         for seq in seq_group.get_seqs(status=SequenceStatus.RUNNING):
             seq.status = SequenceStatus.SWAPPED
@@ -0,0 +1,73 @@
+"""Online model of the time of a model step against its batch composition."""
+from typing import Optional
+
+import numpy as np
+
+
+class StepTimeModel:
+    """Models the time of a model step as
+
+        base + per_decode_token * num_decode_tokens
+             + per_prefill_token * num_prefill_tokens,
+
+    fitted by least squares over the measured steps. Older steps are
+    forgotten exponentially, so that the model follows changes of the load
+    (e.g. longer contexts making the decodes slower).
+
+    Args:
+        forgetting_factor (float): The weight of the previous steps in the
+            fit, relative to the new one.
+        min_num_observations (int): The number of steps to observe before
+            the model is used.
+    """
+
+    def __init__(self,
+                 forgetting_factor: float = 0.99,
+                 min_num_observations: int = 10):
+        assert 0.0 < forgetting_factor <= 1.0
+        self.forgetting_factor = forgetting_factor
+        self.min_num_observations = min_num_observations
+        self.num_observations = 0
+        # Normal equations of the weighted least squares fit.
+        self._xtx = np.zeros((3, 3))
+        self._xty = np.zeros(3)
+        self.coefficients: Optional[np.ndarray] = None
+
+    def observe(self, num_decode_tokens: int, num_prefill_tokens: int,
+                seconds: float) -> None:
+        x = np.array([1.0, num_decode_tokens, num_prefill_tokens])
+        self._xtx = self.forgetting_factor * self._xtx + np.outer(x, x)
+        self._xty = self.forgetting_factor * self._xty + seconds * x
+        self.num_observations += 1
+        if self.num_observations >= self.min_num_observations:
+            # Regularized, as the steps may all have the same composition.
+            self.coefficients = np.linalg.solve(
+                self._xtx + 1e-6 * np.eye(3), self._xty)
+
+    def predict(self, num_decode_tokens: int,
+                num_prefill_tokens: int) -> Optional[float]:
+        """The estimated time of a step in seconds, or None if the model has
+        not observed enough steps yet."""
+        if self.coefficients is None:
+            return None
+        base, per_decode_token, per_prefill_token = self.coefficients
+        return float(base + per_decode_token * num_decode_tokens +
+                     per_prefill_token * num_prefill_tokens)
+
+    def get_max_num_prefill_tokens(self, num_decode_tokens: int,
+                                   target_seconds: float) -> Optional[int]:
+        """The number of prefill tokens that a step with the given decodes
+        can run within the target time.
+
+        Returns:
+            Optional[int]: The number of prefill tokens, 0 if the decodes
+                alone exceed the target, or None if the cost of the prefill
+                tokens is not known yet.
+        """
+        if self.coefficients is None:
+            return None
+        base, per_decode_token, per_prefill_token = self.coefficients
+        if per_prefill_token <= 0:
+            return None
+        slack = target_seconds - base - per_decode_token * num_decode_tokens
+        return max(int(slack / per_prefill_token), 0)
@@ -7,7 +7,6 @@ from typing import (TYPE_CHECKING, Any, Dict, List, Literal, Mapping, Optional,
 
 import torch
 
-import vllm.envs as envs
 from vllm.config import (CacheConfig, ConfigFormat, DecodingConfig,
                          DeviceConfig, EngineConfig, LoadConfig, LoadFormat,
                          LoRAConfig, ModelConfig, ObservabilityConfig,
@@ -107,6 +106,10 @@ class EngineArgs:
     max_parallel_loading_workers: Optional[int] = None
     block_size: int = 16
     enable_prefix_caching: bool = False
+    prefix_cache_eviction_policy: str = "lru"
+    cpu_prefix_cache_ratio: float = 0.0
+    disk_prefix_cache_path: Optional[str] = None
+    disk_prefix_cache_gb: float = 4  # GiB
     disable_sliding_window: bool = False
     use_v2_block_manager: bool = True
     swap_space: float = 4  # GiB
@@ -177,9 +180,16 @@ class EngineArgs:
     otlp_traces_endpoint: Optional[str] = None
     collect_detailed_traces: Optional[str] = None
     disable_async_output_proc: bool = False
+    async_detokenization: bool = False
+    batch_detokenization: bool = False
     override_neuron_config: Optional[Dict[str, Any]] = None
     mm_processor_kwargs: Optional[Dict[str, Any]] = None
-    scheduling_policy: Literal["fcfs", "priority"] = "fcfs"
+    scheduling_policy: Literal["fcfs", "priority", "prefix_aware", "srpt",
+                               "slo"] = "fcfs"
+    prefix_aware_max_wait: float = 5.0
+    srpt_max_wait: float = 60.0
+    target_inter_token_latency: Optional[float] = None
+    admission_watermark: Optional[float] = None
 
     def __post_init__(self):
         if not self.tokenizer:
@@ -379,6 +389,38 @@ class EngineArgs:
         parser.add_argument('--enable-prefix-caching',
                             action='store_true',
                             help='Enables automatic prefix caching.')
+        parser.add_argument(
+            '--prefix-cache-eviction-policy',
+            type=str,
+            default=EngineArgs.prefix_cache_eviction_policy,
+            choices=['lru', 'heap_lru', 'two_queue'],
+            help='Eviction policy for unused prefix cache blocks. "lru" and '
+            '"heap_lru" evict the least recently used block ("heap_lru" '
+            'scales better with large caches). "two_queue" is frequency '
+            'aware and evicts blocks that were never reused before blocks '
+            'that served prefix cache hits.')
+        parser.add_argument(
+            '--cpu-prefix-cache-ratio',
+            type=float,
+            default=EngineArgs.cpu_prefix_cache_ratio,
+            help='Fraction of the CPU swap space used as a second-tier '
+            'prefix cache. Blocks evicted from the GPU prefix cache are '
+            'copied there and swapped back in on a later prefix match '
+            'instead of being recomputed. Requires --enable-prefix-caching.')
+        parser.add_argument(
+            '--disk-prefix-cache-path',
+            type=nullable_str,
+            default=EngineArgs.disk_prefix_cache_path,
+            help='Directory in which unused prefix cache blocks are '
+            'persisted, so that they can be loaded instead of recomputed, '
+            'also after a restart of the engine. Requires '
+            '--enable-prefix-caching. Disabled by default.')
+        parser.add_argument(
+            '--disk-prefix-cache-gb',
+            type=float,
+            default=EngineArgs.disk_prefix_cache_gb,
+            help='The size (GiB) of the disk prefix cache per GPU. Defaults to '
+            f'{EngineArgs.disk_prefix_cache_gb}.')
         parser.add_argument('--disable-sliding-window',
                             action='store_true',
                             help='Disables sliding window, '
@@ -779,7 +821,12 @@ class EngineArgs:
             default=None,
             help='If \'recompute\', the engine performs preemption by '
             'recomputing; If \'swap\', the engine performs preemption by '
-            'block swapping.')
+            'block swapping; If \'partial_swap\', the engine only swaps out '
+            'the tail blocks of the preempted sequences that are needed to '
+            'continue the running ones, and keeps their other blocks on '
+            'the GPU; If \'auto\', the engine picks the cheaper of swapping '
+            'and recomputing for each preempted request, from the measured '
+            'swap bandwidth and prefill throughput.')
 
         parser.add_argument(
             "--served-model-name",
@@ -822,6 +869,21 @@ class EngineArgs:
             default=EngineArgs.disable_async_output_proc,
             help="Disable async output processing. This may result in "
             "lower performance.")
+        parser.add_argument(
+            '--async-detokenization',
+            action='store_true',
+            default=EngineArgs.async_detokenization,
+            help="Detokenize the new tokens of a step and check them for "
+            "stop strings in a background thread, overlapped with the next "
+            "step, which holds the outputs back by a step. Only used when "
+            "async output processing is disabled.")
+        parser.add_argument(
+            '--batch-detokenization',
+            action='store_true',
+            default=EngineArgs.batch_detokenization,
+            help="Detokenize the new tokens of all the sequences of a step "
+            "together, with a batch decode of the fast tokenizer, before "
+            "checking them for stop strings.")
         parser.add_argument(
             '--override-neuron-config',
             type=json.loads,
@@ -831,13 +893,56 @@ class EngineArgs:
 
         parser.add_argument(
             '--scheduling-policy',
-            choices=['fcfs', 'priority'],
+            choices=['fcfs', 'priority', 'prefix_aware', 'srpt', 'slo'],
             default="fcfs",
             help='The scheduling policy to use. "fcfs" (first come first served'
-            ', i.e. requests are handled in order of arrival; default) '
-            'or "priority" (requests are handled based on given '
+            ', i.e. requests are handled in order of arrival; default), '
+            '"priority" (requests are handled based on given '
             'priority (lower value means earlier handling) and time of '
-            'arrival deciding any ties).')
+            'arrival deciding any ties), "prefix_aware" (waiting requests '
+            'with the longest cached prefix are handled first, so that they '
+            'hit the prefix cache before their blocks are evicted; requires '
+            '--enable-prefix-caching), "srpt" (requests with the least '
+            'remaining work, estimated from their prompt length and '
+            'max_tokens, are handled first and preempted last) or "slo" '
+            '(requests are handled in order of the deadline of their next '
+            'token, derived from their ttft_slo and tpot_slo sampling '
+            'parameters; requests without targets are handled last).')
+        parser.add_argument(
+            '--prefix-aware-max-wait',
+            type=float,
+            default=EngineArgs.prefix_aware_max_wait,
+            help='With the "prefix_aware" scheduling policy, the time in '
+            'seconds after which a waiting request is handled in order of '
+            'arrival regardless of its prefix cache hits. Bounds the '
+            'starvation of requests without cached prefix.')
+        parser.add_argument(
+            '--srpt-max-wait',
+            type=float,
+            default=EngineArgs.srpt_max_wait,
+            help='With the "srpt" scheduling policy, the time in seconds '
+            'since arrival after which a request is handled in order of '
+            'arrival regardless of its remaining work. Bounds the '
+            'starvation of long requests.')
+        parser.add_argument(
+            '--target-inter-token-latency',
+            type=float,
+            default=EngineArgs.target_inter_token_latency,
+            help='With chunked prefill, the target time in seconds of a '
+            'step. If set, the size of the prefill chunks is adapted every '
+            'step from the measured step times, to hold the inter-token '
+            'latency of the running requests around the target, instead of '
+            'filling --max-num-batched-tokens.')
+        parser.add_argument(
+            '--admission-watermark',
+            type=float,
+            default=EngineArgs.admission_watermark,
+            help='If set, enables the admission control of new requests: '
+            'their prefills are held back while the KV cache blocks that '
+            'the running requests are projected to need, from their '
+            'max_tokens and the output lengths of the finished requests, '
+            'would leave less than this fraction of the GPU KV cache free. '
+            'Avoids the preemptions of running requests under bursty load.')
 
         return parser
 
@@ -879,6 +984,8 @@ class EngineArgs:
             override_neuron_config=self.override_neuron_config,
             config_format=self.config_format,
             mm_processor_kwargs=self.mm_processor_kwargs,
+            async_detokenization=self.async_detokenization,
+            batch_detokenization=self.batch_detokenization,
         )
 
     def create_load_config(self) -> LoadConfig:
@@ -936,6 +1043,10 @@ class EngineArgs:
             sliding_window=model_config.get_sliding_window(),
             enable_prefix_caching=self.enable_prefix_caching,
             cpu_offload_gb=self.cpu_offload_gb,
+            prefix_cache_eviction_policy=self.prefix_cache_eviction_policy,
+            cpu_prefix_cache_ratio=self.cpu_prefix_cache_ratio,
+            disk_prefix_cache_path=self.disk_prefix_cache_path,
+            disk_prefix_cache_gb=self.disk_prefix_cache_gb,
         )
         parallel_config = ParallelConfig(
             pipeline_parallel_size=self.pipeline_parallel_size,
@@ -1052,9 +1163,11 @@ class EngineArgs:
             preemption_mode=self.preemption_mode,
             num_scheduler_steps=self.num_scheduler_steps,
             multi_step_stream_outputs=self.multi_step_stream_outputs,
-            send_delta_data=(envs.VLLM_USE_RAY_SPMD_WORKER
-                             and parallel_config.use_ray),
             policy=self.scheduling_policy,
+            prefix_aware_max_wait=self.prefix_aware_max_wait,
+            srpt_max_wait=self.srpt_max_wait,
+            target_inter_token_latency=self.target_inter_token_latency,
+            admission_watermark=self.admission_watermark,
         )
         lora_config = LoRAConfig(
             max_lora_rank=self.max_lora_rank,
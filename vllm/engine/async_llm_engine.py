@@ -330,6 +330,9 @@ class _AsyncLLMEngine(LLMEngine):
                 blocks_to_swap_in=scheduler_outputs.blocks_to_swap_in,
                 blocks_to_swap_out=scheduler_outputs.blocks_to_swap_out,
                 blocks_to_copy=scheduler_outputs.blocks_to_copy,
+                blocks_to_save_to_disk=scheduler_outputs.blocks_to_save_to_disk,
+                blocks_to_load_from_disk=scheduler_outputs.
+                blocks_to_load_from_disk,
                 virtual_engine=virtual_engine,
                 num_lookahead_slots=scheduler_outputs.num_lookahead_slots,
                 running_queue_size=scheduler_outputs.running_queue_size,
@@ -343,8 +346,12 @@ class _AsyncLLMEngine(LLMEngine):
                     virtual_engine]
 
             # Execute the model.
+            execute_start_time = time.perf_counter()
             outputs = await self.model_executor.execute_model_async(
                 execute_model_req)
+            self._observe_step(
+                virtual_engine, scheduler_outputs, outputs,
+                time.perf_counter() - execute_start_time)
 
             # we need to do this here so that last step's sampled_token_ids can
             # be passed to the next iteration for PP.
@@ -405,6 +412,7 @@ class _AsyncLLMEngine(LLMEngine):
             if len(ctx.output_queue) > 0:
                 self._process_model_outputs(ctx=ctx)
             assert len(ctx.output_queue) == 0
+            self._drain_detokenization(ctx)
 
         return ctx.request_outputs
 
@@ -22,9 +22,13 @@ from vllm.core.scheduler import (ScheduledSequenceGroup, Scheduler,
                                  SchedulerOutputs)
 from vllm.engine.arg_utils import EngineArgs
 from vllm.engine.metrics_types import StatLoggerBase, Stats
+from vllm.engine.output_processor.detokenization_pipeline import (
+    DetokenizationPipeline)
 from vllm.engine.output_processor.interfaces import (
     SequenceGroupOutputProcessor)
 from vllm.engine.output_processor.stop_checker import StopChecker
+from vllm.engine.output_processor.stop_string_matcher import (
+    get_token_texts)
 from vllm.engine.output_processor.util import create_output_by_sequence_group
 from vllm.entrypoints.openai.logits_processors import get_logits_processors
 from vllm.executor.executor_base import ExecutorBase
@@ -309,6 +313,10 @@ class LLMEngine:
             self.tokenizer = self._init_tokenizer()
             self.detokenizer = Detokenizer(self.tokenizer)
             tokenizer_group = self.get_tokenizer_group()
+            # Decode the vocab for the stop strings of the requests which are
+            # not detokenized now, rather than in the step of the first one.
+            get_token_texts(tokenizer_group.get_lora_tokenizer(None),
+                            skip_special_tokens=True)
         else:
             self.tokenizer = None
             self.detokenizer = None
@@ -459,6 +467,28 @@ class LLMEngine:
                 "vllm.llm_engine",
                 self.observability_config.otlp_traces_endpoint)
 
+        stop_checker = StopChecker(
+            self.scheduler_config.max_model_len,
+            get_tokenizer_for_seq,
+        )
+
+        # Detokenize the new tokens of a step together, while the next step
+        # runs with async detokenization.
+        self.detokenization_pipeline: Optional[DetokenizationPipeline] = None
+        if ((self.model_config.async_detokenization
+             or self.model_config.batch_detokenization)
+                and self.detokenizer is not None):
+            # The background thread detokenizes with tokenizers of its own,
+            # as the fast tokenizers are not thread-safe.
+            background_detokenizer = (Detokenizer(self._init_tokenizer())
+                                      if self.model_config.async_detokenization
+                                      else None)
+            self.detokenization_pipeline = DetokenizationPipeline(
+                self.detokenizer,
+                stop_checker,
+                self.scheduler,
+                background_detokenizer=background_detokenizer)
+
         # Create sequence output processor, e.g. for beam search or
         # speculative decoding.
         self.output_processor = (
@@ -468,10 +498,8 @@ class LLMEngine:
                 self.scheduler,
                 self.seq_counter,
                 get_tokenizer_for_seq,
-                stop_checker=StopChecker(
-                    self.scheduler_config.max_model_len,
-                    get_tokenizer_for_seq,
-                ),
+                stop_checker=stop_checker,
+                detokenization_pipeline=self.detokenization_pipeline,
             ))
 
     def _initialize_kv_caches(self) -> None:
@@ -849,6 +877,11 @@ class LLMEngine:
                     and sampling_params.prompt_logprobs > max_logprobs):
             raise ValueError(f"Cannot request more than "
                              f"{max_logprobs} logprobs.")
+        if (sampling_params.stop and not sampling_params.detokenize
+                and self.tokenizer is None):
+            raise ValueError("stop strings cannot be found without "
+                             "detokenization when skip_tokenizer_init is "
+                             "True.")
 
         sampling_params = self._build_logits_processors(
             sampling_params, lora_request)
@@ -1034,6 +1067,10 @@ class LLMEngine:
              is_last_step, is_first_step_output,
              skip) = ctx.output_queue.popleft()
 
+        # Stop the sequences on the stop strings of the previous step, before
+        # its tokens are followed by those of this step.
+        finished_deferred = self._finish_detokenization(ctx)
+
         # Sanity check
         assert len(seq_group_metadata_list) == len(
             scheduler_outputs.scheduled_seq_groups)
@@ -1128,12 +1165,25 @@ class LLMEngine:
             if seq_group.is_finished():
                 finished_now.append(i)
 
+        if self.detokenization_pipeline is not None:
+            # Stop the sequences on the stop strings of this step, unless
+            # their detokenization overlaps the next step.
+            self.detokenization_pipeline.submit()
+            scheduled_seq_groups = scheduler_outputs.scheduled_seq_groups
+            finished_now = [
+                i for i in indices if i not in skip
+                and i not in finished_before
+                and scheduled_seq_groups[i].seq_group.is_finished()
+            ]
+
         # Generate outputs for the requests that finished this iteration
         for i in finished_now:
             scheduled_seq_group = scheduler_outputs.scheduled_seq_groups[i]
 
             seq_group = scheduled_seq_group.seq_group
             seq_group.maybe_set_first_token_time(now)
+            if self._is_detokenization_pending(seq_group):
+                continue
             request_output = RequestOutputFactory.create(
                 seq_group, use_cache=self.use_cached_outputs)
             if request_output:
@@ -1152,7 +1202,7 @@ class LLMEngine:
             return
 
         # Free currently finished requests
-        if finished_now:
+        if finished_now or finished_deferred:
             for scheduler in self.scheduler:
                 scheduler.free_finished_seq_groups()
 
@@ -1174,6 +1224,8 @@ class LLMEngine:
 
             seq_group = scheduled_seq_group.seq_group
             seq_group.maybe_set_first_token_time(now)
+            if self._is_detokenization_pending(seq_group):
+                continue
             request_output = RequestOutputFactory.create(
                 seq_group, use_cache=self.use_cached_outputs)
             if request_output:
@@ -1217,6 +1269,43 @@ class LLMEngine:
 
         return None
 
+    def _finish_detokenization(self, ctx: SchedulerContext) -> bool:
+        """Wait for the detokenization of the previous step (if pending) and
+        add the outputs of its sequence groups to the context.
+
+        Returns whether any of them finished.
+        """
+        if self.detokenization_pipeline is None:
+            return False
+
+        finished = False
+        for seq_group in self.detokenization_pipeline.finish():
+            finished = finished or seq_group.is_finished()
+            request_output = RequestOutputFactory.create(
+                seq_group, use_cache=self.use_cached_outputs)
+            if request_output:
+                ctx.request_outputs.append(request_output)
+        return finished
+
+    def _is_detokenization_pending(self, seq_group: SequenceGroup) -> bool:
+        return (self.detokenization_pipeline is not None
+                and self.detokenization_pipeline.has_seq_group(seq_group))
+
+    def _drain_detokenization(self, ctx: SchedulerContext) -> None:
+        """Finish the detokenization of the last step, once there is no
+        next step to overlap it with."""
+        if (self.detokenization_pipeline is None
+                or not self.detokenization_pipeline.has_pending()):
+            return
+
+        if self._finish_detokenization(ctx):
+            for scheduler in self.scheduler:
+                scheduler.free_finished_seq_groups()
+        if (ctx.request_outputs
+                and self.process_request_outputs_callback is not None):
+            self.process_request_outputs_callback(ctx.request_outputs)
+            ctx.request_outputs.clear()
+
     def _advance_to_next_step(
             self, output: List[SamplerOutput],
             seq_group_metadata_list: List[SequenceGroupMetadata],
@@ -1376,6 +1465,9 @@ class LLMEngine:
                 blocks_to_swap_in=scheduler_outputs.blocks_to_swap_in,
                 blocks_to_swap_out=scheduler_outputs.blocks_to_swap_out,
                 blocks_to_copy=scheduler_outputs.blocks_to_copy,
+                blocks_to_save_to_disk=scheduler_outputs.blocks_to_save_to_disk,
+                blocks_to_load_from_disk=scheduler_outputs.
+                blocks_to_load_from_disk,
                 num_lookahead_slots=scheduler_outputs.num_lookahead_slots,
                 running_queue_size=scheduler_outputs.running_queue_size,
                 finished_requests_ids=finished_requests_ids,
@@ -1387,8 +1479,12 @@ class LLMEngine:
                 execute_model_req.async_callback = self.async_callbacks[
                     virtual_engine]
 
+            execute_start_time = time.perf_counter()
             outputs = self.model_executor.execute_model(
                 execute_model_req=execute_model_req)
+            self._observe_step(
+                virtual_engine, scheduler_outputs, outputs,
+                time.perf_counter() - execute_start_time)
 
             # We need to do this here so that last step's sampled_token_ids can
             # be passed to the next iteration for PP.
@@ -1452,6 +1548,7 @@ class LLMEngine:
             if len(ctx.output_queue) > 0:
                 self._process_model_outputs(ctx=ctx)
             assert len(ctx.output_queue) == 0
+            self._drain_detokenization(ctx)
 
             # Stop the execute model loop in parallel workers until there are
             # more requests to process. This avoids waiting indefinitely in
@@ -1508,6 +1605,23 @@ class LLMEngine:
             self.cached_scheduler_outputs[
                 virtual_engine].last_output = last_output
 
+    def _observe_step(self, virtual_engine: int,
+                      scheduler_outputs: SchedulerOutputs,
+                      output: List[Optional[SamplerOutput]],
+                      execute_time: float) -> None:
+        """Feeds the scheduler with the execute time of the step and with the
+        swap times measured by the workers."""
+        num_swapped_blocks, swap_time = 0, 0.0
+        if (len(output) > 0 and output[0] is not None
+                and output[0].swap_time is not None):
+            assert output[0].num_swapped_blocks is not None
+            num_swapped_blocks = output[0].num_swapped_blocks
+            swap_time = output[0].swap_time
+        self.scheduler[virtual_engine].observe_step(scheduler_outputs,
+                                                    execute_time,
+                                                    num_swapped_blocks,
+                                                    swap_time)
+
     def _get_last_sampled_token_ids(
             self, virtual_engine: int) -> Optional[torch.Tensor]:
         cached_last_output = self.cached_scheduler_outputs[
@@ -1608,6 +1722,24 @@ class LLMEngine:
         time_per_output_tokens_iter: List[float] = []
         num_preemption_iter = (0 if scheduler_outputs is None else
                                scheduler_outputs.preempted)
+        #   Preemption costs
+        num_preempted_blocks_swapped_out_iter = 0
+        num_preempted_blocks_swapped_in_iter = 0
+        num_preempted_tokens_recomputed_iter = 0
+        preemption_modes_iter: List[str] = []
+        num_preemption_mispredictions_iter = 0
+        prefill_chunk_size_iter: Optional[int] = None
+        if scheduler_outputs is not None:
+            num_preempted_blocks_swapped_out_iter = (
+                scheduler_outputs.num_preempted_blocks_swapped_out)
+            num_preempted_blocks_swapped_in_iter = (
+                scheduler_outputs.num_preempted_blocks_swapped_in)
+            num_preempted_tokens_recomputed_iter = (
+                scheduler_outputs.num_preempted_tokens_recomputed)
+            preemption_modes_iter = scheduler_outputs.preemption_modes
+            num_preemption_mispredictions_iter = (
+                scheduler_outputs.num_preemption_mispredictions)
+            prefill_chunk_size_iter = scheduler_outputs.prefill_chunk_size
 
         # Request stats
         #   Latency
@@ -1741,6 +1873,8 @@ class LLMEngine:
             #   Prefix Cache Hit Rate
             cpu_prefix_cache_hit_rate=cpu_prefix_cache_hit_rate,
             gpu_prefix_cache_hit_rate=gpu_prefix_cache_hit_rate,
+            prefix_cache_eviction_policy=(
+                self.cache_config.prefix_cache_eviction_policy),
 
             # Iteration stats
             num_prompt_tokens_iter=num_prompt_tokens_iter,
@@ -1749,6 +1883,16 @@ class LLMEngine:
             time_per_output_tokens_iter=time_per_output_tokens_iter,
             spec_decode_metrics=spec_decode_metrics,
             num_preemption_iter=num_preemption_iter,
+            num_preempted_blocks_swapped_out_iter=(
+                num_preempted_blocks_swapped_out_iter),
+            num_preempted_blocks_swapped_in_iter=(
+                num_preempted_blocks_swapped_in_iter),
+            num_preempted_tokens_recomputed_iter=(
+                num_preempted_tokens_recomputed_iter),
+            preemption_modes_iter=preemption_modes_iter,
+            num_preemption_mispredictions_iter=(
+                num_preemption_mispredictions_iter),
+            prefill_chunk_size_iter=prefill_chunk_size_iter,
 
             # Request stats
             #   Latency
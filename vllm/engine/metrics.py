@@ -36,6 +36,8 @@ class Metrics:
     """
 
     labelname_finish_reason = "finished_reason"
+    labelname_preemption_mode = "preemption_mode"
+    labelname_prefix_cache_eviction_policy = "prefix_cache_eviction_policy"
     labelname_waiting_lora_adapters = "waiting_lora_adapters"
     labelname_running_lora_adapters = "running_lora_adapters"
     labelname_max_lora = "max_lora"
@@ -85,15 +87,23 @@ class Metrics:
             documentation="CPU KV-cache usage. 1 means 100 percent usage.",
             labelnames=labelnames,
             multiprocess_mode="sum")
-        #   Prefix caching block hit rate
+        #   Prefix caching block hit rate, by eviction policy
         self.gauge_cpu_prefix_cache_hit_rate = self._gauge_cls(
             name="vllm:cpu_prefix_cache_hit_rate",
             documentation="CPU prefix cache block hit rate.",
-            labelnames=labelnames,
+            labelnames=labelnames +
+            [Metrics.labelname_prefix_cache_eviction_policy],
             multiprocess_mode="sum")
         self.gauge_gpu_prefix_cache_hit_rate = self._gauge_cls(
             name="vllm:gpu_prefix_cache_hit_rate",
             documentation="GPU prefix cache block hit rate.",
+            labelnames=labelnames +
+            [Metrics.labelname_prefix_cache_eviction_policy],
+            multiprocess_mode="sum")
+        self.gauge_prefill_chunk_size = self._gauge_cls(
+            name="vllm:prefill_chunk_size",
+            documentation="Token budget left for the prefill chunks by the "
+            "decodes of the last step, with chunked prefill.",
             labelnames=labelnames,
             multiprocess_mode="sum")
 
@@ -102,6 +112,31 @@ class Metrics:
             name="vllm:num_preemptions_total",
             documentation="Cumulative number of preemption from the engine.",
             labelnames=labelnames)
+        self.counter_num_preempted_blocks_swapped_out = self._counter_cls(
+            name="vllm:num_preempted_blocks_swapped_out_total",
+            documentation="Number of KV cache blocks swapped out to the CPU "
+            "by preemptions.",
+            labelnames=labelnames)
+        self.counter_num_preempted_blocks_swapped_in = self._counter_cls(
+            name="vllm:num_preempted_blocks_swapped_in_total",
+            documentation="Number of KV cache blocks of preempted sequences "
+            "swapped back in to the GPU.",
+            labelnames=labelnames)
+        self.counter_num_preempted_tokens_recomputed = self._counter_cls(
+            name="vllm:num_preempted_tokens_recomputed_total",
+            documentation="Number of computed tokens discarded by recompute "
+            "preemptions.",
+            labelnames=labelnames)
+        self.counter_preemption_decisions = self._counter_cls(
+            name="vllm:preemption_decisions_total",
+            documentation="Number of preemptions by preemption mode.",
+            labelnames=labelnames + [Metrics.labelname_preemption_mode])
+        self.counter_preemption_mispredictions = self._counter_cls(
+            name="vllm:preemption_mispredictions_total",
+            documentation="Number of preemption modes chosen by the cost "
+            "model that turned out to be the more expensive one when the "
+            "request was resumed.",
+            labelnames=labelnames)
         self.counter_prompt_tokens = self._counter_cls(
             name="vllm:prompt_tokens_total",
             documentation="Number of prefill tokens processed.",
@@ -377,7 +412,9 @@ class LoggingStatLogger(StatLoggerBase):
             if (stats.cpu_prefix_cache_hit_rate >= 0
                     or stats.gpu_prefix_cache_hit_rate >= 0):
                 logger.info(
-                    "Prefix cache hit rate: GPU: %.2f%%, CPU: %.2f%%",
+                    "Prefix cache hit rate (%s eviction): GPU: %.2f%%, "
+                    "CPU: %.2f%%",
+                    stats.prefix_cache_eviction_policy,
                     stats.gpu_prefix_cache_hit_rate * 100,
                     stats.cpu_prefix_cache_hit_rate * 100,
                 )
@@ -455,10 +492,19 @@ class PrometheusStatLogger(StatLoggerBase):
                         stats.gpu_cache_usage_sys)
         self._log_gauge(self.metrics.gauge_cpu_cache_usage,
                         stats.cpu_cache_usage_sys)
-        self._log_gauge(self.metrics.gauge_cpu_prefix_cache_hit_rate,
-                        stats.cpu_prefix_cache_hit_rate)
-        self._log_gauge(self.metrics.gauge_gpu_prefix_cache_hit_rate,
-                        stats.gpu_prefix_cache_hit_rate)
+        eviction_policy = {
+            Metrics.labelname_prefix_cache_eviction_policy:
+            stats.prefix_cache_eviction_policy
+        }
+        self.metrics.gauge_cpu_prefix_cache_hit_rate.labels(
+            **self.labels,
+            **eviction_policy).set(stats.cpu_prefix_cache_hit_rate)
+        self.metrics.gauge_gpu_prefix_cache_hit_rate.labels(
+            **self.labels,
+            **eviction_policy).set(stats.gpu_prefix_cache_hit_rate)
+        if stats.prefill_chunk_size_iter is not None:
+            self._log_gauge(self.metrics.gauge_prefill_chunk_size,
+                            stats.prefill_chunk_size_iter)
         # Including max-lora in metric, in future this property of lora
         # config maybe extended to be dynamic.
         lora_info = {
@@ -473,6 +519,19 @@ class PrometheusStatLogger(StatLoggerBase):
         # Iteration level data
         self._log_counter(self.metrics.counter_num_preemption,
                           stats.num_preemption_iter)
+        self._log_counter(
+            self.metrics.counter_num_preempted_blocks_swapped_out,
+            stats.num_preempted_blocks_swapped_out_iter)
+        self._log_counter(self.metrics.counter_num_preempted_blocks_swapped_in,
+                          stats.num_preempted_blocks_swapped_in_iter)
+        self._log_counter(self.metrics.counter_num_preempted_tokens_recomputed,
+                          stats.num_preempted_tokens_recomputed_iter)
+        self._log_counter_labels(self.metrics.counter_preemption_decisions,
+                                 CollectionsCounter(
+                                     stats.preemption_modes_iter),
+                                 Metrics.labelname_preemption_mode)
+        self._log_counter(self.metrics.counter_preemption_mispredictions,
+                          stats.num_preemption_mispredictions_iter)
         self._log_counter(self.metrics.counter_prompt_tokens,
                           stats.num_prompt_tokens_iter)
         self._log_counter(self.metrics.counter_generation_tokens,
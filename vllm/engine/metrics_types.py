@@ -35,6 +35,7 @@ class Stats:
     #   Prefix caching block hit rate
     cpu_prefix_cache_hit_rate: float
     gpu_prefix_cache_hit_rate: float
+    prefix_cache_eviction_policy: str
 
     # Iteration stats (should have _iter suffix)
     num_prompt_tokens_iter: int
@@ -42,6 +43,14 @@ class Stats:
     time_to_first_tokens_iter: List[float]
     time_per_output_tokens_iter: List[float]
     num_preemption_iter: int
+    #   Preemption costs
+    num_preempted_blocks_swapped_out_iter: int
+    num_preempted_blocks_swapped_in_iter: int
+    num_preempted_tokens_recomputed_iter: int
+    preemption_modes_iter: List[str]
+    num_preemption_mispredictions_iter: int
+    #   Token budget of the prefill chunks (only with chunked prefill)
+    prefill_chunk_size_iter: Optional[int]
 
     # Request stats (should have _requests suffix)
     #   Latency
@@ -17,6 +17,35 @@ IPC_OUTPUT_EXT = "_output_socket"
 IPC_HEALTH_EXT = "_health_socket"
 IPC_DATA_EXT = "_data_socket"
 
+# First frame of the messages of the output socket that carry the compact
+# deltas of the RequestOutputs of a step, instead of a pickled
+# REQUEST_OUTPUTS_T.
+REQUEST_OUTPUT_DELTAS_FRAME = b"deltas"
+
+# Separates the index of the client from the request id of the client in the
+# request ids of the engine, when it is shared by several clients.
+CLIENT_REQUEST_ID_SEPARATOR = "|"
+
+
+def get_client_ipc_path(ipc_path: str, ext: str,
+                        client_index: Optional[int]) -> str:
+    """Path of a socket from the engine to one of its clients. The engine
+    has a socket per client when it is shared by several clients."""
+    if client_index is None:
+        return f"{ipc_path}{ext}"
+    return f"{ipc_path}{ext}_{client_index}"
+
+
+def get_engine_request_id(client_index: int, request_id: str) -> str:
+    """Namespaces the request id of a client, which other clients may also
+    use, in the engine."""
+    return f"{client_index}{CLIENT_REQUEST_ID_SEPARATOR}{request_id}"
+
+
+def get_client_index(engine_request_id: str) -> int:
+    """Index of the client of a namespaced request id of the engine."""
+    return int(engine_request_id.split(CLIENT_REQUEST_ID_SEPARATOR, 1)[0])
+
 
 class MQEngineDeadError(RuntimeError):
     pass
@@ -21,11 +21,17 @@ from vllm.engine.async_llm_engine import (
     build_guided_decoding_logits_processor_async)
 from vllm.engine.multiprocessing import (ENGINE_DEAD_ERROR, IPC_DATA_EXT,
                                          IPC_HEALTH_EXT, IPC_INPUT_EXT,
-                                         IPC_OUTPUT_EXT, RPC_REQUEST_T,
+                                         IPC_OUTPUT_EXT,
+                                         REQUEST_OUTPUT_DELTAS_FRAME,
+                                         RPC_REQUEST_T,
                                          VLLM_RPC_SUCCESS_STR, RPCAbortRequest,
                                          RPCError, RPCProcessRequest,
                                          RPCStartupRequest, RPCStartupResponse,
-                                         RPCUProfileRequest)
+                                         RPCUProfileRequest,
+                                         get_client_ipc_path,
+                                         get_engine_request_id)
+from vllm.engine.multiprocessing.request_output_delta import (
+    RequestOutputDecoder, RequestOutputDelta, decode_request_output_deltas)
 from vllm.engine.protocol import EngineClient
 # yapf: enable
 from vllm.envs import VLLM_RPC_TIMEOUT
@@ -75,11 +81,20 @@ class MQLLMEngineClient(EngineClient):
             consumed by the .generate() method.
         - health_loop: the health loop queries the health socket
             every N seconds, confirming the engine is healthy
+
+    Several clients, e.g., in different API server processes, can share one
+    MQLLMEngine started with num_clients > 1. Each then has its own
+    client_index, which namespaces its request ids in the engine and selects
+    its output and health sockets.
     """
 
-    def __init__(self, ipc_path: str, engine_config: EngineConfig):
+    def __init__(self,
+                 ipc_path: str,
+                 engine_config: EngineConfig,
+                 client_index: Optional[int] = None):
         self.context = zmq.asyncio.Context()
         self._errored_with: Optional[BaseException] = None
+        self.client_index = client_index
 
         # Get the configs.
         self.model_config = engine_config.model_config
@@ -99,11 +114,13 @@ class MQLLMEngineClient(EngineClient):
 
         # Receive streams of RequestOutput from the MQLLMEngine.
         self.output_socket: Socket = self.context.socket(zmq.constants.PULL)
-        self.output_socket.connect(f"{ipc_path}{IPC_OUTPUT_EXT}")
+        self.output_socket.connect(
+            get_client_ipc_path(ipc_path, IPC_OUTPUT_EXT, client_index))
 
         # IPC path for acking heartbeats.
         self.heartbeat_socket: Socket = self.context.socket(zmq.constants.PULL)
-        self.heartbeat_socket.connect(f"{ipc_path}{IPC_HEALTH_EXT}")
+        self.heartbeat_socket.connect(
+            get_client_ipc_path(ipc_path, IPC_HEALTH_EXT, client_index))
 
         # IPC path for the data socket.
         self.data_ipc_path = f"{ipc_path}{IPC_DATA_EXT}"
@@ -124,6 +141,10 @@ class MQLLMEngineClient(EngineClient):
     @contextmanager
     def get_data_socket(self) -> Iterator[Socket]:
         socket = self.context.socket(zmq.constants.DEALER)
+        if self.client_index is not None:
+            # The engine answers the startup query of each client once.
+            socket.setsockopt(zmq.constants.IDENTITY,
+                              f"client-{self.client_index}".encode())
         try:
             socket.connect(self.data_ipc_path)
             yield socket
@@ -176,8 +197,16 @@ class MQLLMEngineClient(EngineClient):
                                 ENGINE_DEAD_ERROR(self._errored_with))
                         return
 
-                message: Frame = await self.output_socket.recv(copy=False)
-                request_outputs = pickle.loads(message.buffer)
+                frames: List[Frame] = await self.output_socket.recv_multipart(
+                    copy=False)
+                if len(frames) > 1:
+                    assert frames[0].bytes == REQUEST_OUTPUT_DELTAS_FRAME
+                    # The RequestOutputs are rebuilt from the deltas when the
+                    # requests consume them.
+                    request_outputs = decode_request_output_deltas(
+                        frames[1].buffer)
+                else:
+                    request_outputs = pickle.loads(frames[0].buffer)
 
                 is_error = isinstance(request_outputs,
                                       (BaseException, RPCError))
@@ -337,12 +366,19 @@ class MQLLMEngineClient(EngineClient):
             error_message="Unable to start RPC Server",
             socket=socket)
 
+    def _get_engine_request_id(self, request_id: str) -> str:
+        if self.client_index is None:
+            return request_id
+        return get_engine_request_id(self.client_index, request_id)
+
     async def abort(self, request_id: str):
         """Send an ABORT_REQUEST signal to the RPC Server"""
 
         with suppress(MQClientClosedError):
             await self._send_one_way_rpc_request(
-                request=RPCAbortRequest(request_id), socket=self.input_socket)
+                request=RPCAbortRequest(
+                    self._get_engine_request_id(request_id)),
+                socket=self.input_socket)
 
     async def do_log_stats(
         self,
@@ -554,9 +590,12 @@ class MQLLMEngineClient(EngineClient):
                 )
 
         # 1) Create output queue for this requests.
-        queue: asyncio.Queue[Union[RequestOutput,
+        engine_request_id = self._get_engine_request_id(request_id)
+        queue: asyncio.Queue[Union[RequestOutput, EmbeddingRequestOutput,
+                                   RequestOutputDelta,
                                    BaseException]] = asyncio.Queue()
-        self.output_queues[request_id] = queue
+        output_decoder = RequestOutputDecoder()
+        self.output_queues[engine_request_id] = queue
 
         try:
             # 2) Detach logits processors so that they can be pickled
@@ -574,7 +613,7 @@ class MQLLMEngineClient(EngineClient):
                 RPCProcessRequest(
                     prompt=prompt,
                     params=params,
-                    request_id=request_id,
+                    request_id=engine_request_id,
                     lora_request=lora_request,
                     trace_headers=trace_headers,
                     prompt_adapter_request=prompt_adapter_request,
@@ -596,15 +635,18 @@ class MQLLMEngineClient(EngineClient):
 
                     if isinstance(request_output, BaseException):
                         raise request_output
+                    if isinstance(request_output, RequestOutputDelta):
+                        request_output = output_decoder.decode(request_output)
 
                     finished = request_output.finished
+                    request_output.request_id = request_id
                     yield request_output
             finally:
                 # Request was canceled by the client.
                 if not finished and not self.errored:
                     await self.abort(request_id)
         finally:
-            self.output_queues.pop(request_id)
+            self.output_queues.pop(engine_request_id)
 
     async def start_profile(self) -> None:
         """Start profiling the engine"""
@@ -3,7 +3,7 @@ import signal
 import threading
 import time
 from contextlib import contextmanager
-from typing import Iterator, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Set, Union
 
 import cloudpickle
 import zmq
@@ -15,11 +15,16 @@ from vllm.config import (DecodingConfig, LoRAConfig, ModelConfig,
 # yapf: disable
 from vllm.engine.multiprocessing import (ENGINE_DEAD_ERROR, IPC_DATA_EXT,
                                          IPC_HEALTH_EXT, IPC_INPUT_EXT,
-                                         IPC_OUTPUT_EXT, REQUEST_OUTPUTS_T,
+                                         IPC_OUTPUT_EXT,
+                                         REQUEST_OUTPUT_DELTAS_FRAME,
+                                         REQUEST_OUTPUTS_T,
                                          VLLM_RPC_SUCCESS_STR, RPCAbortRequest,
                                          RPCError, RPCProcessRequest,
                                          RPCStartupRequest, RPCStartupResponse,
-                                         RPCUProfileRequest)
+                                         RPCUProfileRequest, get_client_index,
+                                         get_client_ipc_path)
+from vllm.engine.multiprocessing.request_output_delta import (
+    RequestOutputEncoder)
 # yapf: enable
 from vllm.envs import VLLM_RPC_TIMEOUT
 from vllm.executor.gpu_executor import GPUExecutor
@@ -33,6 +38,9 @@ CONFIG_TYPE = Union[ModelConfig, DecodingConfig, ParallelConfig,
 logger = init_logger(__name__)
 
 POLLING_TIMEOUT_MS = 10000
+# How long a send to one of several clients may block before the client is
+# given up on, so that a dead client does not stall the others.
+CLIENT_SEND_TIMEOUT_MS = 10000
 HEALTHY_RESPONSE = (pickle.dumps(VLLM_RPC_SUCCESS_STR), )
 
 
@@ -49,17 +57,25 @@ class MQLLMEngine:
     The self.engine_loop checks the input_socket for new requests,
     adds them to the LLMEngine if there are any, calls the internal
     :class:`LLMEngine.step()`, and sends the RequestOutputs back over
-    the output_socket.
+    the output_socket, as the compact deltas of
+    :class:`RequestOutputEncoder`.
 
     If use_async_sockets is set, the logic associated with reading new
     requests from the socket and sending data to the socket is passed
     as a callback to the llm_engine, which calls the logic asynchronously
     such that the IPC can be overlapped with the GPU.
 
+    If num_clients > 1, the engine is shared by that many clients, e.g., API
+    server processes. They all send requests to the same input_socket, with
+    request ids namespaced by the index of the client, and each has its own
+    output_socket and heartbeat_socket, to which the engine routes the
+    RequestOutputs of its requests.
+
     Args:
         ipc_path: Base path for zeromq interprocess messaging
         use_async_sockets: Whether to make send/recv async with GPU
         log_requests: Whether to log the requests.
+        num_clients: Number of MQLLMEngineClients sharing the engine.
         *args: Arguments for :class:`LLMEngine`.
         **kwargs: Arguments for :class:`LLMEngine`.
     """
@@ -69,6 +85,7 @@ class MQLLMEngine:
                  use_async_sockets: bool,
                  *args,
                  log_requests: bool = True,
+                 num_clients: int = 1,
                  **kwargs) -> None:
         # For MQLLMEngine, we can use cached outputs, since each new request
         # output is immediately pickled and send over the socket, which frees
@@ -89,17 +106,38 @@ class MQLLMEngine:
         self.input_socket = self.ctx.socket(zmq.constants.PULL)
         self.input_socket.bind(f"{ipc_path}{IPC_INPUT_EXT}")
 
-        # Send output stream back to client.
-        self.output_socket = self.ctx.socket(zmq.constants.PUSH)
-        self.output_socket.bind(f"{ipc_path}{IPC_OUTPUT_EXT}")
-
-        # Send heartbeats back to client.
-        self.heartbeat_socket = self.ctx.socket(zmq.constants.PUSH)
-        self.heartbeat_socket.bind(f"{ipc_path}{IPC_HEALTH_EXT}")
+        # Send output stream back to each client, and heartbeats. A single
+        # client uses the unsuffixed paths.
+        self.num_clients = num_clients
+        client_indices = ([None] if num_clients == 1 else list(
+            range(num_clients)))
+        self.output_sockets = []
+        self.heartbeat_sockets = []
+        # The clients whose output sockets timed out, whose requests are
+        # aborted. A single client is never given up on: the sends to it
+        # block instead.
+        self.dead_clients: Set[int] = set()
+        for client_index in client_indices:
+            output_socket = self.ctx.socket(zmq.constants.PUSH)
+            if num_clients > 1:
+                output_socket.setsockopt(zmq.constants.SNDTIMEO,
+                                         CLIENT_SEND_TIMEOUT_MS)
+            output_socket.bind(
+                get_client_ipc_path(ipc_path, IPC_OUTPUT_EXT, client_index))
+            self.output_sockets.append(output_socket)
+
+            heartbeat_socket = self.ctx.socket(zmq.constants.PUSH)
+            heartbeat_socket.bind(
+                get_client_ipc_path(ipc_path, IPC_HEALTH_EXT, client_index))
+            self.heartbeat_sockets.append(heartbeat_socket)
 
         # IPC path for the data socket.
         self.data_ipc_path = f"{ipc_path}{IPC_DATA_EXT}"
 
+        # Encodes the RequestOutputs as the changes since the previous
+        # outputs of their requests.
+        self.output_encoder = RequestOutputEncoder()
+
         # Error state.
         self._errored_with: Optional[BaseException] = None
 
@@ -125,8 +163,11 @@ class MQLLMEngine:
             return ENGINE_DEAD_ERROR()
 
     @classmethod
-    def from_engine_args(cls, engine_args: AsyncEngineArgs,
-                         usage_context: UsageContext, ipc_path: str):
+    def from_engine_args(cls,
+                         engine_args: AsyncEngineArgs,
+                         usage_context: UsageContext,
+                         ipc_path: str,
+                         num_clients: int = 1):
         """Creates an MQLLMEngine from the engine arguments."""
         # Setup plugins for each process
         from vllm.plugins import load_general_plugins
@@ -143,7 +184,8 @@ class MQLLMEngine:
             executor_class=executor_class,
             log_requests=not engine_args.disable_log_requests,
             log_stats=not engine_args.disable_log_stats,
-            usage_context=usage_context)
+            usage_context=usage_context,
+            num_clients=num_clients)
 
     def start(self):
         try:
@@ -173,6 +215,9 @@ class MQLLMEngine:
     def make_data_socket(
             self) -> Iterator[zmq.Socket]:  # type: ignore[name-defined]
         socket = self.ctx.socket(zmq.constants.ROUTER)
+        # A client that retries its startup query reconnects with the same
+        # identity.
+        socket.setsockopt(zmq.constants.ROUTER_HANDOVER, 1)
         try:
             socket.bind(self.data_ipc_path)
             yield socket
@@ -180,25 +225,34 @@ class MQLLMEngine:
             socket.close(linger=0)
 
     def run_startup_loop(self) -> None:
-        """Startup loop for sending data from Engine -> Client."""
+        """Startup loop for sending data from Engine -> Client.
+
+        Waits for the startup query of each client and answers them all at
+        once, so that their health checks start together with the heartbeats
+        of the engine loop."""
 
         with self.make_data_socket() as socket:
             response: Union[RPCStartupResponse, BaseException]
+            identities = set()
             try:
-                identity, message = socket.recv_multipart(copy=False)
-                request: RPCStartupRequest = pickle.loads(message.buffer)
+                while len(identities) < self.num_clients:
+                    identity, message = socket.recv_multipart(copy=False)
+                    request: RPCStartupRequest = pickle.loads(message.buffer)
 
-                # Handle the query from the Client.
-                if request == RPCStartupRequest.IS_SERVER_READY:
-                    tracing_enabled = self.engine.is_tracing_enabled()
-                    response = RPCStartupResponse(
-                        tracing_enabled=tracing_enabled)
+                    # Handle the query from the Client.
+                    if request == RPCStartupRequest.IS_SERVER_READY:
+                        identities.add(identity.bytes)
+                tracing_enabled = self.engine.is_tracing_enabled()
+                response = RPCStartupResponse(tracing_enabled=tracing_enabled)
 
             except Exception as e:
+                identities.add(identity.bytes)
                 response = e
 
-            socket.send_multipart((identity, pickle.dumps(response)),
-                                  copy=False)
+            response_bytes = pickle.dumps(response)
+            for identity_bytes in identities:
+                socket.send_multipart((identity_bytes, response_bytes),
+                                      copy=False)
 
     def run_engine_loop(self):
         """Core busy loop of the LLMEngine."""
@@ -270,6 +324,12 @@ class MQLLMEngine:
         """Handle RPCProcessRequest by adding it to the LLMEngine."""
         request_id = request.request_id
 
+        if (self.dead_clients
+                and get_client_index(request_id) in self.dead_clients):
+            # Its outputs could not be sent.
+            logger.warning("Dropped request %s of a dead client.", request_id)
+            return
+
         if self._errored_with is not None:
             rpc_err = RPCError(request_id=request_id,
                                is_engine_errored=True,
@@ -277,6 +337,7 @@ class MQLLMEngine:
             self._send_outputs(rpc_err)
 
         try:
+            self.output_encoder.add_request(request_id, request.params)
             self.engine.add_request(
                 request_id=request_id,
                 prompt=request.prompt,
@@ -301,9 +362,11 @@ class MQLLMEngine:
 
             # Remove request from the engine.
             self.engine.abort_request(request_id)
+            self.output_encoder.abort_request(request_id)
 
     def _handle_abort_request(self, request: RPCAbortRequest):
         self.engine.abort_request(request.request_id)
+        self.output_encoder.abort_request(request.request_id)
         if self.log_requests:
             logger.info("Aborted request %s.", request.request_id)
 
@@ -336,20 +399,81 @@ class MQLLMEngine:
 
     def _send_outputs(self, outputs: REQUEST_OUTPUTS_T):
         """Send List of RequestOutput to RPCClient."""
-        if outputs:
-            output_bytes = pickle.dumps(outputs)
-            self.output_socket.send_multipart((output_bytes, ), copy=False)
+        if not outputs:
+            return
+        if self.num_clients == 1:
+            self._send_client_outputs(0, outputs)
+        elif isinstance(outputs, RPCError):
+            if outputs.request_id is None:
+                # An engine error, which all the clients need.
+                for client_index in range(self.num_clients):
+                    self._send_client_outputs(client_index, outputs)
+            else:
+                self._send_client_outputs(
+                    get_client_index(outputs.request_id), outputs)
+        else:
+            # Route the outputs of each request to its client.
+            client_outputs: Dict[int, List[RequestOutput]] = {}
+            for output in outputs:
+                client_outputs.setdefault(get_client_index(output.request_id),
+                                          []).append(output)
+            for client_index, outputs_i in client_outputs.items():
+                self._send_client_outputs(client_index, outputs_i)
+
+    def _send_client_outputs(self, client_index: int,
+                             outputs: REQUEST_OUTPUTS_T):
+        if client_index in self.dead_clients:
+            return
+        if isinstance(outputs, list) and isinstance(outputs[0],
+                                                    RequestOutput):
+            frames = (REQUEST_OUTPUT_DELTAS_FRAME,
+                      self.output_encoder.encode(outputs))
+        else:
+            # Errors and EmbeddingRequestOutputs.
+            frames = (pickle.dumps(outputs), )
+        try:
+            self.output_sockets[client_index].send_multipart(frames,
+                                                             copy=False)
+        except zmq.error.Again:
+            # Only raised with several clients, see CLIENT_SEND_TIMEOUT_MS.
+            logger.error(
+                "Client %d did not receive outputs within %d ms, aborting "
+                "its requests.", client_index, CLIENT_SEND_TIMEOUT_MS)
+            self._abort_client_requests(client_index)
+
+    def _abort_client_requests(self, client_index: int) -> None:
+        """Give up on a client: abort its requests, and drop its new ones."""
+        self.dead_clients.add(client_index)
+        request_ids = [
+            request_id
+            for request_id in self.output_encoder.get_request_ids()
+            if get_client_index(request_id) == client_index
+        ]
+        self.engine.abort_request(request_ids)
+        for request_id in request_ids:
+            self.output_encoder.abort_request(request_id)
+
+    def _send_heartbeat(self, frames):
+        # With several clients, heartbeats are dropped rather than block on a
+        # client that stopped receiving them, which then times out waiting
+        # for them.
+        flags = zmq.NOBLOCK if self.num_clients > 1 else 0
+        for heartbeat_socket in self.heartbeat_sockets:
+            if not heartbeat_socket.closed:
+                try:
+                    heartbeat_socket.send_multipart(frames,
+                                                    flags=flags,
+                                                    copy=False)
+                except zmq.error.Again:
+                    pass
 
     def _send_healthy(self):
         """Send HEALTHY message to RPCClient."""
-        if not self.heartbeat_socket.closed:
-            self.heartbeat_socket.send_multipart(HEALTHY_RESPONSE, copy=False)
+        self._send_heartbeat(HEALTHY_RESPONSE)
 
     def _send_unhealthy(self, error: BaseException):
         """Send UNHEALTHY message to RPCClient."""
-        if not self.heartbeat_socket.closed:
-            error_bytes = pickle.dumps(error)
-            self.heartbeat_socket.send_multipart((error_bytes, ), copy=False)
+        self._send_heartbeat((pickle.dumps(error), ))
 
     def _async_socket_engine_callback(self,
                                       request_outputs: REQUEST_OUTPUTS_T):
@@ -378,8 +502,10 @@ class MQLLMEngine:
             self.engine.model_executor._run_workers("stop_profile")
 
 
-def run_mp_engine(engine_args: AsyncEngineArgs, usage_context: UsageContext,
-                  ipc_path: str):
+def run_mp_engine(engine_args: AsyncEngineArgs,
+                  usage_context: UsageContext,
+                  ipc_path: str,
+                  num_clients: int = 1):
 
     def signal_handler(*_) -> None:
         # Interrupt server on sigterm
@@ -389,5 +515,6 @@ def run_mp_engine(engine_args: AsyncEngineArgs, usage_context: UsageContext,
 
     engine = MQLLMEngine.from_engine_args(engine_args=engine_args,
                                           usage_context=usage_context,
-                                          ipc_path=ipc_path)
+                                          ipc_path=ipc_path,
+                                          num_clients=num_clients)
     engine.start()
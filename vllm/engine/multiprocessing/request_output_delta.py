@@ -0,0 +1,283 @@
+"""Compact wire format of the RequestOutputs sent by the MQLLMEngine.
+
+A RequestOutput of a request with RequestOutputKind.CUMULATIVE carries all its
+output token ids, text and logprobs, as well as its prompt, so pickling the
+outputs of a step costs time and bytes linear in the total length of the
+streams. Instead, the engine sends, for each RequestOutput, only what changed
+since its previous output: the new token ids, the new text and the new
+logprobs, with the finish info. The prompt is sent with the first output of a
+request only. The client keeps the state of each of its requests, and rebuilds
+a RequestOutput from it when the request consumes the output.
+"""
+import dataclasses
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+import msgspec
+
+from vllm.lora.request import LoRARequest
+from vllm.outputs import CompletionOutput, RequestOutput
+from vllm.pooling_params import PoolingParams
+from vllm.sampling_params import RequestOutputKind, SamplingParams
+from vllm.sequence import (Logprob, PackedLogprobs, PromptLogprobs,
+                           RequestMetrics, SampleLogprobs)
+
+# (token_ids, logprobs, ranks, decoded_tokens), as in PackedLogprobs
+_LogprobsLists = Tuple[List[int], List[float], List[Optional[int]],
+                       List[Optional[str]]]
+
+_METRICS_FIELDS = tuple(field.name
+                        for field in dataclasses.fields(RequestMetrics))
+
+
+class CompletionOutputDelta(
+        msgspec.Struct,
+        array_like=True,  # type: ignore[call-arg]
+        omit_defaults=True):  # type: ignore[call-arg]
+    """The changes to a CompletionOutput since the previous output of the
+    request. The new token ids, text and logprobs replace those from the
+    offsets on."""
+    index: int
+    token_offset: int
+    new_token_ids: List[int]
+    text_offset: int
+    new_text: str
+    logprobs_offset: int = 0
+    new_logprobs: Optional[List[_LogprobsLists]] = None
+    cumulative_logprob: Optional[float] = None
+    finish_reason: Optional[str] = None
+    stop_reason: Union[int, str, None] = None
+
+
+class RequestOutputDelta(
+        msgspec.Struct,
+        array_like=True,  # type: ignore[call-arg]
+        omit_defaults=True):  # type: ignore[call-arg]
+    """The changes to a RequestOutput since the previous output of the
+    request."""
+    request_id: str
+    outputs: List[CompletionOutputDelta]
+    finished: bool
+    metrics: Optional[Tuple[Optional[float], ...]] = None
+    # Whether the RequestOutput has the prompt. The prompt is only sent with
+    # the first output, or when the prompt logprobs change.
+    has_prompt: bool = True
+    prompt: Optional[str] = None
+    prompt_token_ids: Optional[List[int]] = None
+    prompt_logprobs: Optional[List[Optional[_LogprobsLists]]] = None
+    encoder_prompt: Optional[str] = None
+    encoder_prompt_token_ids: Optional[List[int]] = None
+    lora_request: Optional[LoRARequest] = None
+
+
+def _encode_logprobs(logprobs: Mapping[int, Logprob]) -> _LogprobsLists:
+    if isinstance(logprobs, PackedLogprobs):
+        return (logprobs.token_ids, logprobs.logprobs, logprobs.ranks,
+                logprobs.decoded_tokens)
+    values = logprobs.values()
+    return (list(logprobs), [logprob.logprob for logprob in values],
+            [logprob.rank for logprob in values],
+            [logprob.decoded_token for logprob in values])
+
+
+def _decode_logprobs(logprobs: _LogprobsLists) -> PackedLogprobs:
+    return PackedLogprobs(*logprobs)
+
+
+class _SentRequest:
+    """What the client of a request received, as known by the engine."""
+
+    def __init__(self, has_stable_outputs: bool):
+        # Whether each CompletionOutput of the request always comes from the
+        # same sequence and carries all its tokens, so that only the new ones
+        # need to be sent.
+        self.has_stable_outputs = has_stable_outputs
+        self.prompt_sent = False
+        self.num_prompt_logprobs = 0
+        # index -> (number of token ids, length of the text, number of
+        # logprobs)
+        self.outputs: Dict[int, Tuple[int, int, int]] = {}
+
+
+class RequestOutputEncoder:
+    """Engine side of the compact wire format: encodes the RequestOutputs of a
+    step as the changes since the previous outputs of their requests."""
+
+    def __init__(self) -> None:
+        self._encoder = msgspec.msgpack.Encoder()
+        # request_id -> what the client received
+        self._sent: Dict[str, _SentRequest] = {}
+
+    def add_request(self, request_id: str,
+                    params: Union[SamplingParams, PoolingParams]) -> None:
+        # The top-n sequences of a request with several sequences can change
+        # order from one step to the next, and the outputs of a
+        # RequestOutputKind.DELTA request are already deltas.
+        self._sent[request_id] = _SentRequest(
+            isinstance(params, SamplingParams) and params.n == 1
+            and params.output_kind != RequestOutputKind.DELTA)
+
+    def abort_request(self, request_id: str) -> None:
+        self._sent.pop(request_id, None)
+
+    def get_request_ids(self) -> List[str]:
+        """The requests added and not yet finished or aborted."""
+        return list(self._sent)
+
+    def encode(self, request_outputs: List[RequestOutput]) -> bytes:
+        return self._encoder.encode([
+            self._encode_request_output(output) for output in request_outputs
+        ])
+
+    def _encode_request_output(
+            self, request_output: RequestOutput) -> RequestOutputDelta:
+        request_id = request_output.request_id
+        sent = self._sent.get(request_id)
+        if sent is None:
+            sent = _SentRequest(has_stable_outputs=False)
+            self._sent[request_id] = sent
+        if request_output.finished:
+            del self._sent[request_id]
+
+        outputs = []
+        for output in request_output.outputs:
+            token_ids = output.token_ids
+            text = output.text
+            logprobs = output.logprobs
+            if sent.has_stable_outputs and output.index in sent.outputs:
+                num_token_ids, text_len, num_logprobs = sent.outputs[
+                    output.index]
+                token_offset = min(num_token_ids, len(token_ids))
+                text_offset = min(text_len, len(text))
+                logprobs_offset = min(num_logprobs,
+                                      len(logprobs)) if logprobs else 0
+            else:
+                token_offset = text_offset = logprobs_offset = 0
+            sent.outputs[output.index] = (len(token_ids), len(text),
+                                          len(logprobs) if logprobs else 0)
+            outputs.append(
+                CompletionOutputDelta(
+                    index=output.index,
+                    token_offset=token_offset,
+                    new_token_ids=token_ids[token_offset:],
+                    text_offset=text_offset,
+                    new_text=text[text_offset:],
+                    logprobs_offset=logprobs_offset,
+                    new_logprobs=None if logprobs is None else [
+                        _encode_logprobs(token_logprobs)
+                        for token_logprobs in logprobs[logprobs_offset:]
+                    ],
+                    cumulative_logprob=output.cumulative_logprob,
+                    finish_reason=output.finish_reason,
+                    stop_reason=output.stop_reason,
+                ))
+
+        metrics = request_output.metrics
+        delta = RequestOutputDelta(
+            request_id=request_id,
+            outputs=outputs,
+            finished=request_output.finished,
+            metrics=None if metrics is None else tuple(
+                getattr(metrics, field) for field in _METRICS_FIELDS),
+            has_prompt=request_output.prompt_token_ids is not None,
+        )
+        prompt_logprobs = request_output.prompt_logprobs
+        num_prompt_logprobs = len(prompt_logprobs) if prompt_logprobs else 0
+        if delta.has_prompt and (
+                not sent.prompt_sent
+                or num_prompt_logprobs != sent.num_prompt_logprobs):
+            sent.prompt_sent = True
+            sent.num_prompt_logprobs = num_prompt_logprobs
+            delta.prompt = request_output.prompt
+            delta.prompt_token_ids = request_output.prompt_token_ids
+            if prompt_logprobs is not None:
+                delta.prompt_logprobs = [
+                    None if token_logprobs is None else
+                    _encode_logprobs(token_logprobs)
+                    for token_logprobs in prompt_logprobs
+                ]
+            delta.encoder_prompt = request_output.encoder_prompt
+            delta.encoder_prompt_token_ids = (
+                request_output.encoder_prompt_token_ids)
+            delta.lora_request = request_output.lora_request
+        return delta
+
+
+class RequestOutputDecoder:
+    """Client side of the compact wire format, for one request: applies the
+    changes to the state of the request and rebuilds its RequestOutputs."""
+
+    def __init__(self) -> None:
+        self._prompt: Optional[str] = None
+        self._prompt_token_ids: Optional[List[int]] = None
+        self._prompt_logprobs: Optional[PromptLogprobs] = None
+        self._encoder_prompt: Optional[str] = None
+        self._encoder_prompt_token_ids: Optional[List[int]] = None
+        self._lora_request: Optional[LoRARequest] = None
+        # index -> (token ids, text, logprobs)
+        self._outputs: Dict[int, Tuple[List[int], str,
+                                       Optional[SampleLogprobs]]] = {}
+
+    def decode(self, delta: RequestOutputDelta) -> RequestOutput:
+        if delta.prompt_token_ids is not None:
+            self._prompt = delta.prompt
+            self._prompt_token_ids = delta.prompt_token_ids
+            self._encoder_prompt = delta.encoder_prompt
+            self._encoder_prompt_token_ids = delta.encoder_prompt_token_ids
+            self._lora_request = delta.lora_request
+            if delta.prompt_logprobs is not None:
+                self._prompt_logprobs = [
+                    None if token_logprobs is None else
+                    _decode_logprobs(token_logprobs)
+                    for token_logprobs in delta.prompt_logprobs
+                ]
+
+        outputs = []
+        for output_delta in delta.outputs:
+            token_ids, text, logprobs = self._outputs.get(
+                output_delta.index, ([], "", None))
+            token_ids = (token_ids[:output_delta.token_offset] +
+                         output_delta.new_token_ids)
+            text = text[:output_delta.text_offset] + output_delta.new_text
+            if output_delta.new_logprobs is None:
+                logprobs = None
+            else:
+                logprobs = (logprobs or [])[:output_delta.logprobs_offset] + [
+                    _decode_logprobs(token_logprobs)
+                    for token_logprobs in output_delta.new_logprobs
+                ]
+            self._outputs[output_delta.index] = (token_ids, text, logprobs)
+            outputs.append(
+                CompletionOutput(
+                    index=output_delta.index,
+                    text=text,
+                    token_ids=token_ids,
+                    cumulative_logprob=output_delta.cumulative_logprob,
+                    logprobs=logprobs,
+                    finish_reason=output_delta.finish_reason,
+                    stop_reason=output_delta.stop_reason,
+                ))
+
+        has_prompt = delta.has_prompt
+        return RequestOutput(
+            request_id=delta.request_id,
+            prompt=self._prompt if has_prompt else None,
+            prompt_token_ids=self._prompt_token_ids if has_prompt else None,
+            prompt_logprobs=self._prompt_logprobs if has_prompt else None,
+            outputs=outputs,
+            finished=delta.finished,
+            metrics=None
+            if delta.metrics is None else RequestMetrics(*delta.metrics),
+            lora_request=self._lora_request,
+            encoder_prompt=self._encoder_prompt if has_prompt else None,
+            encoder_prompt_token_ids=self._encoder_prompt_token_ids
+            if has_prompt else None,
+        )
+
+
+_step_decoder = msgspec.msgpack.Decoder(List[RequestOutputDelta])
+
+
+def decode_request_output_deltas(data: bytes) -> List[RequestOutputDelta]:
+    """Decodes the deltas of the RequestOutputs of a step, which the client
+    routes to the RequestOutputDecoders of their requests."""
+    return _step_decoder.decode(data)
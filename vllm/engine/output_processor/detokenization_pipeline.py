@@ -0,0 +1,140 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from vllm.core.scheduler import Scheduler
+from vllm.engine.output_processor.stop_checker import StopChecker
+from vllm.sequence import (Sequence, SequenceGroup, SequenceStatus,
+                           get_sequence_store)
+from vllm.transformers_utils.detokenizer import Detokenizer
+
+
+class DetokenizationPipeline:
+    """Detokenizes the new tokens of the sequences of a step together, see
+    Detokenizer.decode_sequences_inplace, before checking them for stop
+    strings.
+
+    The output processor checks the stop conditions which do not depend on the
+    output text when it appends the new tokens, and adds the sequences to the
+    pipeline. submit() detokenizes them once the step is processed, in the
+    engine thread, and stops the sequences which emitted a stop string.
+
+    With overlap, they are instead detokenized in a background thread, while
+    the engine schedules and executes the next step, so that the
+    detokenization is off the engine loop. At the start of the output
+    processing of the next step, finish() waits for them, stops the sequences
+    which emitted a stop string, and returns their sequence groups, whose
+    RequestOutputs are due. The outputs of all the sequences are thus held
+    back by a step, and a sequence which emitted a stop string is scheduled
+    for one more step, whose token is discarded.
+
+    The sequences of the pending step must not be modified by the engine,
+    other than aborted, until finish() returns.
+    """
+
+    def __init__(self,
+                 detokenizer: Detokenizer,
+                 stop_checker: StopChecker,
+                 scheduler: List[Scheduler],
+                 background_detokenizer: Optional[Detokenizer] = None):
+        """The background thread, and overlap, are used with a
+        background_detokenizer, whose tokenizers must not be used by the
+        engine thread, as the fast tokenizers are not thread-safe."""
+        self.detokenizer = detokenizer
+        self.stop_checker = stop_checker
+        self.scheduler = scheduler
+        self.background_detokenizer = background_detokenizer
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if background_detokenizer is not None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="vllm_detokenizer")
+        # The sequences added in the current step.
+        self._seqs: List[Tuple[SequenceGroup, Sequence]] = []
+        # The requests of the current and pending steps, with overlap.
+        self._request_ids: Set[str] = set()
+        # The sequences of the pending step.
+        self._pending_seqs: List[Tuple[SequenceGroup, Sequence]] = []
+        # The slots of the pending sequences, and their detokenization
+        # offsets, which the background thread updates.
+        self._pending_offsets: Optional[Tuple[np.ndarray, np.ndarray,
+                                              np.ndarray]] = None
+        self._future: Optional[Future] = None
+
+    def add(self, seq_group: SequenceGroup, seq: Sequence) -> None:
+        """Add a sequence whose new token is to be detokenized."""
+        self._seqs.append((seq_group, seq))
+        if self._executor is not None:
+            self._request_ids.add(seq_group.request_id)
+
+    def has_seq_group(self, seq_group: SequenceGroup) -> bool:
+        """Whether the RequestOutput of the sequence group is deferred until
+        its new tokens are detokenized."""
+        return seq_group.request_id in self._request_ids
+
+    def has_pending(self) -> bool:
+        return self._future is not None
+
+    def submit(self) -> None:
+        """Detokenize the sequences added in the current step, or start their
+        detokenization in the background thread with overlap."""
+        assert self._future is None, "finish() the pending step first"
+        if not self._seqs:
+            return
+        seqs = self._seqs
+        self._seqs = []
+        if self._executor is None:
+            self._stop_sequences(
+                seqs,
+                self.detokenizer.decode_sequences_inplace(
+                    [seq for _, seq in seqs],
+                    [seq_group.sampling_params for seq_group, _ in seqs]))
+        else:
+            assert self.background_detokenizer is not None
+            self._pending_seqs = seqs
+            # The store is only accessed by the engine thread, as it may grow
+            # meanwhile: the detokenization offsets are read here, and
+            # written back by finish().
+            slots = np.fromiter((seq.slot for _, seq in seqs),
+                                dtype=np.int64,
+                                count=len(seqs))
+            prefix_offsets, read_offsets = (
+                get_sequence_store().get_detokenization_offsets(slots))
+            self._pending_offsets = (slots, prefix_offsets, read_offsets)
+            self._future = self._executor.submit(
+                self.background_detokenizer.decode_sequences,
+                [seq for _, seq in seqs],
+                [seq_group.sampling_params for seq_group, _ in seqs],
+                prefix_offsets, read_offsets)
+
+    def finish(self) -> List[SequenceGroup]:
+        """Wait for the pending step, stop the sequences which emitted a stop
+        string, and return the sequence groups of the pending step."""
+        if self._future is None:
+            return []
+        new_char_counts = self._future.result()
+        assert self._pending_offsets is not None
+        get_sequence_store().set_detokenization_offsets(*self._pending_offsets)
+        seqs = self._pending_seqs
+        self._future = None
+        self._pending_seqs = []
+        self._pending_offsets = None
+        self._request_ids = set()
+        return self._stop_sequences(seqs, new_char_counts)
+
+    def _stop_sequences(self, seqs: List[Tuple[SequenceGroup, Sequence]],
+                        new_char_counts: List[int]) -> List[SequenceGroup]:
+        """Stop the sequences which emitted a stop string, and return their
+        sequence groups."""
+        seq_groups: Dict[str, SequenceGroup] = {}
+        for (seq_group, seq), new_char_count in zip(seqs, new_char_counts):
+            if seq.status == SequenceStatus.FINISHED_ABORTED:
+                continue
+            was_finished = seq.is_finished()
+            self.stop_checker.maybe_stop_sequence_after_detokenization(
+                seq, new_char_count, seq_group.sampling_params)
+            if seq.is_finished() and not was_finished:
+                for scheduler in self.scheduler:
+                    scheduler.free_seq(seq)
+            seq_groups[seq_group.request_id] = seq_group
+        return list(seq_groups.values())
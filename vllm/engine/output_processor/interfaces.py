@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, List
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 from vllm.config import SchedulerConfig
 from vllm.core.scheduler import Scheduler
@@ -9,6 +9,10 @@ from vllm.transformers_utils.detokenizer import Detokenizer
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 from vllm.utils import Counter
 
+if TYPE_CHECKING:
+    from vllm.engine.output_processor.detokenization_pipeline import (
+        DetokenizationPipeline)
+
 
 class SequenceGroupOutputProcessor(ABC):
     """Interface for logic that processes new token ids in sequence groups,
@@ -30,6 +34,7 @@ class SequenceGroupOutputProcessor(ABC):
         seq_counter: Counter,
         get_tokenizer_for_seq: Callable[[Sequence], AnyTokenizer],
         stop_checker: "StopChecker",
+        detokenization_pipeline: Optional["DetokenizationPipeline"] = None,
     ):
         """Create an output processor.
 
@@ -42,7 +47,8 @@ class SequenceGroupOutputProcessor(ABC):
                 SingleStepOutputProcessor)
             return SingleStepOutputProcessor(scheduler_config, detokenizer,
                                              scheduler, seq_counter,
-                                             stop_checker)
+                                             stop_checker,
+                                             detokenization_pipeline)
         else:
             # Importing here to avoid cycle.
             from vllm.engine.output_processor.multi_step import (
@@ -193,7 +193,7 @@ class MultiStepOutputProcessor(SequenceGroupOutputProcessor):
             else:
                 # Update num_computed_tokens iff the sampled token is not from
                 # a prefill step.
-                seq.data.update_num_computed_tokens(1)
+                seq.update_num_computed_tokens(1)
 
             self._process_decode_and_stop(seq, sampling_params)
 
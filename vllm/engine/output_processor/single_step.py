@@ -1,9 +1,11 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from vllm.config import SchedulerConfig
 from vllm.core.scheduler import Scheduler
 from vllm.engine.output_processor.interfaces import (
     SequenceGroupOutputProcessor)
+from vllm.engine.output_processor.detokenization_pipeline import (
+    DetokenizationPipeline)
 from vllm.engine.output_processor.stop_checker import StopChecker
 from vllm.logger import init_logger
 from vllm.sequence import (CompletionSequenceGroupOutput, Sequence,
@@ -67,14 +69,21 @@ class SingleStepOutputProcessor(SequenceGroupOutputProcessor):
     that is currently difficult to schedule multiple steps ahead of time.
     """
 
-    def __init__(self, scheduler_config: SchedulerConfig,
-                 detokenizer: Detokenizer, scheduler: List[Scheduler],
-                 seq_counter: Counter, stop_checker: StopChecker):
+    def __init__(
+        self,
+        scheduler_config: SchedulerConfig,
+        detokenizer: Detokenizer,
+        scheduler: List[Scheduler],
+        seq_counter: Counter,
+        stop_checker: StopChecker,
+        detokenization_pipeline: Optional[DetokenizationPipeline] = None,
+    ):
         self.scheduler_config = scheduler_config
         self.detokenizer = detokenizer
         self.scheduler = scheduler
         self.seq_counter = seq_counter
         self.stop_checker = stop_checker
+        self.detokenization_pipeline = detokenization_pipeline
 
     def process_outputs(self, sequence_group: SequenceGroup,
                         outputs: List[SequenceGroupOutput],
@@ -121,6 +130,17 @@ class SingleStepOutputProcessor(SequenceGroupOutputProcessor):
             seq = seq_group.seqs[0]
             if not is_async:
                 seq.append_token_id(sample.output_token, sample.logprobs)
+            if (sampling_params.detokenize and self.detokenizer
+                    and self.detokenization_pipeline is not None):
+                # Detokenize along with the other sequences of the step; the
+                # stop strings are checked once done.
+                self.stop_checker.maybe_stop_sequence_before_detokenization(
+                    seq, sampling_params, lora_req=seq_group.lora_request)
+                self.detokenization_pipeline.add(seq_group, seq)
+                if seq.is_finished():
+                    for scheduler in self.scheduler:
+                        scheduler.free_seq(seq)
+                return
             if sampling_params.detokenize and self.detokenizer:
                 new_char_count = self.detokenizer.decode_sequence_inplace(
                     seq, sampling_params)
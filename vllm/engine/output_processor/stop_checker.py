@@ -1,10 +1,16 @@
 from typing import Callable, Optional
 
+from vllm.engine.output_processor.stop_string_matcher import (
+    get_stop_string_matcher, get_token_stop_string_matcher)
 from vllm.lora.request import LoRARequest
 from vllm.sampling_params import SamplingParams
 from vllm.sequence import Sequence, SequenceStatus
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 
+# With fewer stop strings, a str.find per stop string is faster than the
+# StopStringMatcher.
+_MIN_STOP_STRINGS_FOR_MATCHER = 6
+
 
 class StopChecker:
     """LLMEngine helper class which separates out the logic involving stop
@@ -41,6 +47,7 @@ class StopChecker:
         # Check if the minimum number of tokens has been generated yet;
         # skip the stop string/token checks if not
         if seq.get_output_len() < sampling_params.min_tokens:
+            self._skip_stop_strings(seq, new_char_count, sampling_params)
             return
 
         # Check if the sequence has generated the EOS token.
@@ -67,8 +74,12 @@ class StopChecker:
             return
 
         # Check if any stop strings are matched.
-        stop_str = self._check_stop_strings(seq, new_char_count,
-                                            sampling_params)
+        if sampling_params.detokenize:
+            stop_str = self._check_stop_strings(seq, new_char_count,
+                                                sampling_params)
+        else:
+            stop_str = self._check_stop_strings_in_token_ids(
+                seq, sampling_params)
         if stop_str is not None:
             seq.status = SequenceStatus.FINISHED_STOPPED
             seq.stop_reason = stop_str
@@ -84,6 +95,104 @@ class StopChecker:
             seq.status = SequenceStatus.FINISHED_LENGTH_CAPPED
             return
 
+    def maybe_stop_sequence_before_detokenization(
+        self,
+        seq: Sequence,
+        sampling_params: SamplingParams,
+        lora_req: Optional[LoRARequest] = None,
+    ) -> None:
+        """Stop the finished sequences on the stop conditions which do not
+        depend on the output text: the eos token, the stop tokens, the
+        max_model_len and max_tokens.
+
+        Used when the new token is detokenized later, in which case
+        maybe_stop_sequence_after_detokenization completes the checks.
+        """
+        if seq.get_output_len() < sampling_params.min_tokens:
+            return
+
+        last_token_id = seq.get_last_token_id()
+        if ((not sampling_params.ignore_eos)
+                and last_token_id == seq.eos_token_id):
+            seq.status = SequenceStatus.FINISHED_STOPPED
+            return
+
+        if last_token_id in (sampling_params.stop_token_ids or ()):
+            seq.status = SequenceStatus.FINISHED_STOPPED
+            seq.stop_reason = last_token_id
+            return
+
+        if seq.get_len() > self._get_max_model_len(lora_req):
+            seq.status = SequenceStatus.FINISHED_LENGTH_CAPPED
+            return
+
+        if seq.get_output_len() == sampling_params.max_tokens:
+            seq.status = SequenceStatus.FINISHED_LENGTH_CAPPED
+            return
+
+    def maybe_stop_sequence_after_detokenization(
+        self,
+        seq: Sequence,
+        new_char_count: int,
+        sampling_params: SamplingParams,
+    ) -> None:
+        """Complete the checks of maybe_stop_sequence_before_detokenization
+        once the new token is detokenized: remove the text of the eos or stop
+        token, and stop the sequences which emitted a stop string.
+
+        new_char_count is the number of chars added to the
+            sequence's output text for the newly generated token
+        """
+        if seq.get_output_len() < sampling_params.min_tokens:
+            self._skip_stop_strings(seq, new_char_count, sampling_params)
+            return
+
+        if seq.status == SequenceStatus.FINISHED_STOPPED:
+            # Stopped by the eos token or a stop token.
+            if new_char_count and (
+                    not sampling_params.include_stop_str_in_output):
+                seq.output_text = seq.output_text[:-new_char_count]
+            return
+
+        # A stop string takes precedence over the length limits, as in
+        # maybe_stop_sequence.
+        stop_str = self._check_stop_strings(seq, new_char_count,
+                                            sampling_params)
+        if stop_str is not None:
+            seq.status = SequenceStatus.FINISHED_STOPPED
+            seq.stop_reason = stop_str
+
+    def _check_stop_strings_in_token_ids(
+            self, seq: Sequence,
+            sampling_params: SamplingParams) -> Optional[str]:
+        """Check if any stop strings end in the text of the last token, for
+        the sequences which are not detokenized.
+
+        Returns the stop string if matched or else None.
+        """
+        if not sampling_params.stop:
+            return None
+
+        matcher = get_token_stop_string_matcher(
+            self.get_tokenizer_for_seq(seq), tuple(sampling_params.stop),
+            sampling_params.skip_special_tokens)
+        index = matcher.find(seq.get_token_ids(), seq.get_prompt_len())
+        return None if index is None else sampling_params.stop[index]
+
+    @staticmethod
+    def _skip_stop_strings(seq: Sequence, new_char_count: int,
+                           sampling_params: SamplingParams) -> None:
+        """Feed the new chars to the stop string matcher of the sequence
+        without checking for stop strings."""
+        if (not new_char_count or len(sampling_params.stop)
+                < _MIN_STOP_STRINGS_FOR_MATCHER):
+            return
+
+        matcher = get_stop_string_matcher(tuple(sampling_params.stop))
+        seq.stop_string_state = matcher.advance(seq.stop_string_state,
+                                                seq.output_text,
+                                                new_char_count)
+
     @staticmethod
     def _check_stop_strings(seq: Sequence, new_char_count: int,
                             sampling_params: SamplingParams) -> Optional[str]:
@@ -95,23 +204,34 @@ class StopChecker:
         if not new_char_count or not sampling_params.stop:
             return None
 
-        for stop_str in sampling_params.stop:
-            stop_string_len = len(stop_str)
-            # Avoid searching already-searched text.
-            stop_index = seq.output_text.find(
-                stop_str, -new_char_count - stop_string_len)
-            if stop_index == -1:
-                continue
-
-            if sampling_params.include_stop_str_in_output:
-                # Truncate to end of stop string.
-                stop_index += stop_string_len
-                if stop_index >= len(seq.output_text):
-                    # No truncation required.
-                    return stop_str
-
-            # Truncate the output text to either the beginning
-            # or end of the stop string.
-            seq.output_text = seq.output_text[:stop_index]
-            return stop_str
-        return None
+        if len(sampling_params.stop) < _MIN_STOP_STRINGS_FOR_MATCHER:
+            for stop_str in sampling_params.stop:
+                # Avoid searching already-searched text.
+                stop_index = seq.output_text.find(
+                    stop_str, -new_char_count - len(stop_str))
+                if stop_index != -1:
+                    break
+            else:
+                return None
+        else:
+            # Only the new chars are fed to the matcher, which keeps its
+            # state over the output text in the sequence.
+            matcher = get_stop_string_matcher(tuple(sampling_params.stop))
+            seq.stop_string_state, match = matcher.find(
+                seq.stop_string_state, seq.output_text, new_char_count)
+            if match is None:
+                return None
+            index, stop_index = match
+            stop_str = sampling_params.stop[index]
+
+        if sampling_params.include_stop_str_in_output:
+            # Truncate to end of stop string.
+            stop_index += len(stop_str)
+            if stop_index >= len(seq.output_text):
+                # No truncation required.
+                return stop_str
+
+        # Truncate the output text to either the beginning
+        # or end of the stop string.
+        seq.output_text = seq.output_text[:stop_index]
+        return stop_str
@@ -0,0 +1,256 @@
+from bisect import bisect_left, bisect_right
+from collections import deque
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, Optional, Set, Tuple
+
+from vllm.transformers_utils.detokenizer import get_token_strings
+from vllm.transformers_utils.tokenizer import AnyTokenizer
+
+
+class StopStringMatcher:
+    """Aho-Corasick automaton which finds the stop strings of a request in
+    the output text of a sequence, in a single pass over the new characters
+    of each step whatever the number of stop strings.
+
+    The state of the automaton after the output text is kept by the sequence,
+    in Sequence.stop_string_state, so that each character is only fed once.
+    The StopChecker only uses it for requests with several stop strings, as a
+    str.find per stop string is faster for a few of them.
+    """
+
+    def __init__(self, stop: Tuple[str, ...]):
+        self.stop = stop
+        # The trie of the stop strings. The state 0 is the root.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # The indices of the stop strings which end at each state, including
+        # through the failure links.
+        self._outputs: List[Tuple[int, ...]] = [()]
+        for i, stop_str in enumerate(stop):
+            state = 0
+            for char in stop_str:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append(())
+                state = next_state
+            self._outputs[state] += (i, )
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._outputs[next_state] += self._outputs[fail]
+
+        self._alphabet = frozenset(char for transitions in self._goto
+                                   for char in transitions)
+        # The transitions of the automaton, completed with the failure links
+        # as the characters are seen.
+        self._delta: List[Dict[str, int]] = [
+            dict(transitions) for transitions in self._goto
+        ]
+
+    def _next_state(self, state: int, char: str) -> int:
+        if char not in self._alphabet:
+            return 0
+        next_state = self._delta[state].get(char)
+        if next_state is None:
+            next_state = 0 if state == 0 else self._next_state(
+                self._fail[state], char)
+            self._delta[state][char] = next_state
+        return next_state
+
+    def advance(self, state: int, text: str, new_char_count: int) -> int:
+        """Feed the last new_char_count characters of text from state, and
+        return the new state."""
+        for char in text[len(text) - new_char_count:]:
+            state = self._next_state(state, char)
+        return state
+
+    def find(self, state: int, text: str,
+             new_char_count: int) -> Tuple[int, Optional[Tuple[int, int]]]:
+        """Feed the last new_char_count characters of text from state, and
+        find the stop strings which end in them or at the last character
+        before them.
+
+        Returns the new state and, if any stop string was found, the index of
+        the first of them in the stop strings, with the position of its first
+        occurrence in text, as found by
+        text.find(stop_str, -new_char_count - len(stop_str)).
+        """
+        alphabet = self._alphabet
+        delta = self._delta
+        outputs = self._outputs
+        # stop string index -> end of its first occurrence
+        ends: Optional[Dict[int, int]] = None
+        position = len(text) - new_char_count
+        if outputs[state]:
+            ends = dict.fromkeys(outputs[state], position)
+        for char in text[position:]:
+            position += 1
+            if char not in alphabet:
+                state = 0
+                continue
+            next_state = delta[state].get(char)
+            state = (self._next_state(state, char)
+                     if next_state is None else next_state)
+            if outputs[state]:
+                if ends is None:
+                    ends = {}
+                for i in outputs[state]:
+                    ends.setdefault(i, position)
+        if ends is None:
+            return state, None
+        i = min(ends)
+        return state, (i, ends[i] - len(self.stop[i]))
+
+
+@lru_cache(maxsize=1024)
+def get_stop_string_matcher(stop: Tuple[str, ...]) -> StopStringMatcher:
+    return StopStringMatcher(stop)
+
+
+class _TokenTexts:
+    """The text that each token of the vocab of a tokenizer adds to the
+    output text, as cached by TokenStrings, and the token ids sorted by their
+    texts."""
+
+    def __init__(self, tokenizer: AnyTokenizer, skip_special_tokens: bool):
+        self.texts = get_token_strings(tokenizer).get_vocab_texts(
+            skip_special_tokens)
+
+        self.sorted_ids = sorted(range(len(self.texts)),
+                                 key=self.texts.__getitem__)
+        self.sorted_texts = [self.texts[i] for i in self.sorted_ids]
+
+        # All the texts, to search them at once.
+        self._joined_texts = "\0".join(self.texts)
+        self._starts = list(
+            accumulate((len(text) + 1 for text in self.texts[:-1]),
+                       initial=0))
+
+    def get_text(self, token_id: int) -> str:
+        # The vocab of the model can be larger than that of the tokenizer.
+        return self.texts[token_id] if token_id < len(self.texts) else ""
+
+    def get_ids_containing(self, text: str) -> Set[int]:
+        if "\0" in text:
+            return {
+                token_id
+                for token_id, token_text in enumerate(self.texts)
+                if text in token_text
+            }
+        token_ids = set()
+        position = self._joined_texts.find(text)
+        while position != -1:
+            token_id = bisect_right(self._starts, position) - 1
+            token_ids.add(token_id)
+            # Search from the text of the next token.
+            if token_id + 1 == len(self._starts):
+                break
+            position = self._joined_texts.find(text,
+                                               self._starts[token_id + 1])
+        return token_ids
+
+    def get_ids_with_prefix(self, prefix: str) -> List[int]:
+        start = bisect_left(self.sorted_texts, prefix)
+        # All the texts which start with the prefix are below this one.
+        end = bisect_left(self.sorted_texts,
+                          prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        return self.sorted_ids[start:end]
+
+
+@lru_cache(maxsize=16)
+def get_token_texts(tokenizer: AnyTokenizer,
+                    skip_special_tokens: bool) -> _TokenTexts:
+    return _TokenTexts(tokenizer, skip_special_tokens)
+
+
+class TokenStopStringMatcher:
+    """Finds the stop strings of a request in the output token ids of a
+    sequence, without its output text, for the requests which are not
+    detokenized.
+
+    A stop string is found if it ends in the text of the last token, whatever
+    the tokenization of the stop string: the tokens whose text contains a
+    stop string, and those whose text starts with the end of a stop string,
+    are precomputed for the vocab of the tokenizer. From such a last token,
+    the rest of the stop string is matched against the texts of the previous
+    tokens, backwards.
+
+    The text of a sequence is taken as the concatenation of the texts of its
+    tokens, each decoded on its own. A stop string is thus not found if it
+    contains a character whose bytes are split between several byte-level
+    tokens, nor in the tokens whose text depends on the previous ones, and
+    never for the tokenizers without cached token texts, i.e. the Mistral
+    ones.
+
+    Decoding the vocab takes long, so that of the tokenizer of the model is
+    decoded when the engine is created, with get_token_texts.
+    """
+
+    def __init__(self, tokenizer: AnyTokenizer, stop: Tuple[str, ...],
+                 skip_special_tokens: bool):
+        self.stop = stop
+        self._token_texts = get_token_texts(tokenizer, skip_special_tokens)
+        # For each stop string, the ids of the tokens whose text contains it,
+        # and token id -> lengths of the start of the stop string which is
+        # left before the token, for the tokens whose text starts with the end
+        # of the stop string.
+        self._contained: List[Set[int]] = []
+        self._partial: List[Dict[int, List[int]]] = []
+        for stop_str in stop:
+            self._contained.append(
+                self._token_texts.get_ids_containing(stop_str))
+            partial: Dict[int, List[int]] = {}
+            for length in range(1, len(stop_str)):
+                for token_id in self._token_texts.get_ids_with_prefix(
+                        stop_str[length:]):
+                    partial.setdefault(token_id, []).append(length)
+            self._partial.append(partial)
+
+    def find(self, token_ids: List[int],
+             num_prompt_tokens: int) -> Optional[int]:
+        """Returns the index of the first of the stop strings which ends in
+        the text of the last of token_ids, if any, not looking into the first
+        num_prompt_tokens tokens."""
+        last_token_id = token_ids[-1]
+        for i, stop_str in enumerate(self.stop):
+            if last_token_id in self._contained[i]:
+                return i
+            for length in self._partial[i].get(last_token_id, ()):
+                if self._ends_with(token_ids, num_prompt_tokens,
+                                   stop_str[:length]):
+                    return i
+        return None
+
+    def _ends_with(self, token_ids: List[int], num_prompt_tokens: int,
+                   text: str) -> bool:
+        """Whether the texts of the tokens before the last one end with
+        text."""
+        get_text = self._token_texts.get_text
+        for position in range(len(token_ids) - 2, num_prompt_tokens - 1, -1):
+            token_text = get_text(token_ids[position])
+            if len(token_text) >= len(text):
+                return token_text.endswith(text)
+            if not text.endswith(token_text):
+                return False
+            text = text[:len(text) - len(token_text)]
+        return False
+
+
+@lru_cache(maxsize=1024)
+def get_token_stop_string_matcher(
+        tokenizer: AnyTokenizer, stop: Tuple[str, ...],
+        skip_special_tokens: bool) -> TokenStopStringMatcher:
+    return TokenStopStringMatcher(tokenizer, stop, skip_special_tokens)
@@ -11,7 +11,9 @@ from argparse import Namespace
 from contextlib import asynccontextmanager
 from functools import partial
 from http import HTTPStatus
-from typing import AsyncIterator, Set
+from multiprocessing.process import BaseProcess
+from typing import (AsyncContextManager, AsyncIterator, Callable, List,
+                    Optional, Set)
 
 import uvloop
 from fastapi import APIRouter, FastAPI, Request
@@ -61,6 +63,7 @@ from vllm.utils import FlexibleArgumentParser, get_open_zmq_ipc_path
 from vllm.version import __version__ as VLLM_VERSION
 
 TIMEOUT_KEEP_ALIVE = 5  # seconds
+PROCESS_POLL_INTERVAL = 1.  # seconds
 
 prometheus_multiproc_dir: tempfile.TemporaryDirectory
 
@@ -105,7 +108,11 @@ async def build_async_engine_client(
     engine_args = AsyncEngineArgs.from_cli_args(args)
 
     async with build_async_engine_client_from_engine_args(
-            engine_args, args.disable_frontend_multiprocessing) as engine:
+            engine_args,
+            args.disable_frontend_multiprocessing,
+            num_clients=args.api_server_count,
+            start_other_clients=partial(start_api_server_processes,
+                                        args)) as engine:
         yield engine
 
 
@@ -113,12 +120,19 @@ async def build_async_engine_client(
 async def build_async_engine_client_from_engine_args(
     engine_args: AsyncEngineArgs,
     disable_frontend_multiprocessing: bool = False,
+    num_clients: int = 1,
+    start_other_clients: Optional[Callable[[str, int],
+                                           List[BaseProcess]]] = None,
 ) -> AsyncIterator[EngineClient]:
     """
     Create EngineClient, either:
         - in-process using the AsyncLLMEngine Directly
         - multiprocess using AsyncLLMEngine RPC
 
+    With num_clients > 1, the multiprocess engine is shared with the other
+    clients, which start_other_clients starts in their own processes from the
+    IPC path of the engine and the number of clients.
+
     Returns the Client or None if the creation failed.
     """
 
@@ -126,6 +140,10 @@ async def build_async_engine_client_from_engine_args(
     # TODO: fill out feature matrix.
     if (MQLLMEngineClient.is_unsupported_config(engine_args)
             or disable_frontend_multiprocessing):
+        if num_clients > 1:
+            raise ValueError(
+                "Multiple clients require the multiprocessing frontend, "
+                "which does not support this configuration.")
         engine_config = engine_args.create_engine_config()
         uses_ray = getattr(AsyncLLMEngine._get_executor_cls(engine_config),
                            "uses_ray", False)
@@ -174,7 +192,7 @@ async def build_async_engine_client_from_engine_args(
         engine_process = context.Process(target=run_mp_engine,
                                          args=(engine_args,
                                                UsageContext.OPENAI_API_SERVER,
-                                               ipc_path))
+                                               ipc_path, num_clients))
         engine_process.start()
         logger.info("Started engine process with PID %d", engine_process.pid)
 
@@ -182,9 +200,16 @@ async def build_async_engine_client_from_engine_args(
         # NOTE: Actually, this is not true yet. We still need to support
         # embedding models via RPC (see TODO above)
         engine_config = engine_args.create_engine_config()
-        mp_engine_client = MQLLMEngineClient(ipc_path, engine_config)
+        mp_engine_client = MQLLMEngineClient(
+            ipc_path, engine_config, 0 if num_clients > 1 else None)
 
+        # The other clients of the engine, with indices 1 to num_clients - 1.
+        client_processes: List[BaseProcess] = []
         try:
+            if num_clients > 1:
+                assert start_other_clients is not None
+                client_processes = start_other_clients(ipc_path, num_clients)
+
             while True:
                 try:
                     await mp_engine_client.setup()
@@ -193,9 +218,30 @@ async def build_async_engine_client_from_engine_args(
                     if not engine_process.is_alive():
                         raise RuntimeError(
                             "Engine process failed to start") from None
-
-            yield mp_engine_client  # type: ignore[misc]
+                    # The engine waits for every client before it starts.
+                    if not all(p.is_alive() for p in client_processes):
+                        raise RuntimeError(
+                            "API server process failed to start") from None
+
+            # Serving on without one of the clients would leave its share of
+            # the connections to the port unanswered.
+            watch_task: Optional[asyncio.Task] = None
+            if client_processes:
+                watch_task = asyncio.create_task(
+                    shutdown_on_process_exit(client_processes))
+            try:
+                yield mp_engine_client  # type: ignore[misc]
+            finally:
+                if watch_task is not None:
+                    watch_task.cancel()
         finally:
+            for client_process in client_processes:
+                client_process.terminate()
+            for client_process in client_processes:
+                client_process.join(4)
+                if client_process.exitcode is None:
+                    client_process.kill()
+
             # Ensure rpc server process was terminated
             engine_process.terminate()
 
@@ -528,6 +574,16 @@ async def run_server(args, **uvicorn_kwargs) -> None:
     logger.info("vLLM API server version %s", VLLM_VERSION)
     logger.info("args: %s", args)
 
+    await serve_with_engine_client(args, build_async_engine_client(args),
+                                   **uvicorn_kwargs)
+
+
+async def serve_with_engine_client(
+        args: Namespace,
+        engine_client_context: AsyncContextManager[EngineClient],
+        **uvicorn_kwargs) -> None:
+    """Serves the API with the engine client that engine_client_context
+    builds once the server socket is bound."""
     if args.tool_parser_plugin and len(args.tool_parser_plugin) > 3:
         ToolParserManager.import_tool_parser(args.tool_parser_plugin)
 
@@ -540,8 +596,7 @@ async def run_server(args, **uvicorn_kwargs) -> None:
     # workaround to make sure that we bind the port before the engine is set up.
     # This avoids race conditions with ray.
     # see https://github.com/vllm-project/vllm/issues/8204
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.bind(("", args.port))
+    sock = create_server_socket(args)
 
     def signal_handler(*_) -> None:
         # Interrupt server on sigterm while initializing
@@ -549,7 +604,7 @@ async def run_server(args, **uvicorn_kwargs) -> None:
 
     signal.signal(signal.SIGTERM, signal_handler)
 
-    async with build_async_engine_client(args) as engine_client:
+    async with engine_client_context as engine_client:
         app = build_app(args)
 
         model_config = await engine_client.get_model_config()
@@ -573,6 +628,81 @@ async def run_server(args, **uvicorn_kwargs) -> None:
     await shutdown_task
 
 
+def create_server_socket(args: Namespace) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if args.api_server_count > 1:
+        # The API server processes accept the connections on the same port.
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("", args.port))
+    return sock
+
+
+def start_api_server_processes(args: Namespace, ipc_path: str,
+                               num_clients: int) -> List[BaseProcess]:
+    """Starts the API server processes other than the current one, which
+    serve on the same port as clients of the engine at ipc_path."""
+    context = multiprocessing.get_context("spawn")
+    processes: List[BaseProcess] = []
+    for client_index in range(1, num_clients):
+        process = context.Process(target=run_api_server_process,
+                                  args=(args, ipc_path, client_index))
+        process.start()
+        logger.info("Started API server process %d with PID %d", client_index,
+                    process.pid)
+        processes.append(process)
+    return processes
+
+
+def run_api_server_process(args: Namespace, ipc_path: str,
+                           client_index: int) -> None:
+    uvloop.run(
+        serve_with_engine_client(
+            args, build_engine_client_from_ipc_path(args, ipc_path,
+                                                    client_index)))
+
+
+@asynccontextmanager
+async def build_engine_client_from_ipc_path(
+        args: Namespace, ipc_path: str,
+        client_index: int) -> AsyncIterator[EngineClient]:
+    """Connects as the client with client_index to the engine at ipc_path,
+    which the first API server process started. Shuts this process down if
+    the first API server process exits."""
+    parent_process = multiprocessing.parent_process()
+    assert parent_process is not None
+
+    engine_config = AsyncEngineArgs.from_cli_args(args).create_engine_config()
+    engine_client = MQLLMEngineClient(ipc_path, engine_config, client_index)
+    try:
+        while True:
+            try:
+                await engine_client.setup()
+                break
+            except TimeoutError:
+                if not parent_process.is_alive():
+                    raise RuntimeError(
+                        "First API server process exited") from None
+
+        watch_task = asyncio.create_task(
+            shutdown_on_process_exit([parent_process]))
+        try:
+            yield engine_client
+        finally:
+            watch_task.cancel()
+    finally:
+        engine_client.close()
+
+
+async def shutdown_on_process_exit(processes: List[BaseProcess]) -> None:
+    """Shuts this API server process down once one of the processes exits, as
+    the processes serving the same engine do not outlive each other."""
+    while all(process.is_alive() for process in processes):
+        await asyncio.sleep(PROCESS_POLL_INTERVAL)
+    logger.error("Process %s exited, shutting down the API server.",
+                 next(p.name for p in processes if not p.is_alive()))
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
 if __name__ == "__main__":
     # NOTE(simon):
     # This section should be in sync with vllm/scripts.py for CLI entrypoints.
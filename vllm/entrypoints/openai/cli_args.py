@@ -183,6 +183,13 @@ def make_arg_parser(parser: FlexibleArgumentParser) -> FlexibleArgumentParser:
         action="store_true",
         help="If specified, will run the OpenAI frontend server in the same "
         "process as the model serving engine.")
+    parser.add_argument(
+        "--api-server-count",
+        type=int,
+        default=1,
+        help="Number of OpenAI frontend server processes, which share the "
+        "port and the model serving engine. More processes parallelize the "
+        "tokenization, detokenization and HTTP handling of the requests.")
 
     parser.add_argument(
         "--enable-auto-tool-choice",
@@ -245,6 +252,12 @@ def validate_parsed_serve_args(args: argparse.Namespace):
         raise TypeError("Error: --enable-auto-tool-choice requires "
                         "--tool-call-parser")
 
+    if args.api_server_count < 1:
+        raise ValueError("Error: --api-server-count must be at least 1")
+    if args.api_server_count > 1 and args.disable_frontend_multiprocessing:
+        raise ValueError("Error: --api-server-count > 1 is not supported "
+                         "with --disable-frontend-multiprocessing")
+
 
 def create_parser_for_docs() -> FlexibleArgumentParser:
     parser_for_docs = FlexibleArgumentParser(
@@ -284,6 +284,18 @@ class ChatCompletionRequest(OpenAIBaseModel):
             "The priority of the request (lower means earlier handling; "
             "default: 0). Any priority other than 0 will raise an error "
             "if the served model does not use priority scheduling."))
+    ttft_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "Target time to first token of the request, in seconds. Requests "
+            "closer to missing their target are scheduled first when the "
+            "served model uses the slo scheduling policy."))
+    tpot_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "Target time per output token after the first one, in seconds. "
+            "Requests closer to missing their target are scheduled first "
+            "when the served model uses the slo scheduling policy."))
 
     # doc: end-chat-completion-extra-params
 
@@ -358,7 +370,9 @@ class ChatCompletionRequest(OpenAIBaseModel):
             output_kind=RequestOutputKind.DELTA if self.stream \
                 else RequestOutputKind.FINAL_ONLY,
             guided_decoding=guided_decoding,
-            logit_bias=self.logit_bias)
+            logit_bias=self.logit_bias,
+            ttft_slo=self.ttft_slo,
+            tpot_slo=self.tpot_slo)
 
     def _get_guided_json_from_tool(
             self) -> Optional[Union[str, dict, BaseModel]]:
@@ -582,6 +596,18 @@ class CompletionRequest(OpenAIBaseModel):
             "The priority of the request (lower means earlier handling; "
             "default: 0). Any priority other than 0 will raise an error "
             "if the served model does not use priority scheduling."))
+    ttft_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "Target time to first token of the request, in seconds. Requests "
+            "closer to missing their target are scheduled first when the "
+            "served model uses the slo scheduling policy."))
+    tpot_slo: Optional[float] = Field(
+        default=None,
+        description=(
+            "Target time per output token after the first one, in seconds. "
+            "Requests closer to missing their target are scheduled first "
+            "when the served model uses the slo scheduling policy."))
 
     # doc: end-completion-extra-params
 
@@ -653,7 +679,9 @@ class CompletionRequest(OpenAIBaseModel):
                 else RequestOutputKind.FINAL_ONLY,
             guided_decoding=guided_decoding,
             logit_bias=self.logit_bias,
-            allowed_token_ids=self.allowed_token_ids)
+            allowed_token_ids=self.allowed_token_ids,
+            ttft_slo=self.ttft_slo,
+            tpot_slo=self.tpot_slo)
 
     @model_validator(mode="before")
     @classmethod
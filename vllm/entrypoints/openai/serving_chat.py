@@ -1,8 +1,8 @@
 import asyncio
 import json
 import time
-from typing import (AsyncGenerator, AsyncIterator, Callable, Dict, Final, List,
-                    Optional)
+from typing import (AsyncGenerator, AsyncIterator, Callable, Final, List,
+                    Mapping, Optional)
 from typing import Sequence as GenericSequence
 from typing import Union
 
@@ -760,25 +760,30 @@ class OpenAIServingChat(OpenAIServing):
         return response
 
     def _get_top_logprobs(
-            self, logprobs: Dict[int, Logprob], top_logprobs: Optional[int],
+            self, logprobs: Mapping[int, Logprob], top_logprobs: Optional[int],
             tokenizer: AnyTokenizer) -> List[ChatCompletionLogProb]:
+        if not top_logprobs:
+            return []
+        token_ids, logprob_values, decoded_tokens = self._get_logprobs_lists(
+            logprobs)
         return [
             ChatCompletionLogProb(token=(token := self._get_decoded_token(
-                p[1],
-                p[0],
+                decoded_token,
+                token_id,
                 tokenizer,
                 return_as_token_id=self.return_tokens_as_token_ids)),
-                                  logprob=max(p[1].logprob, -9999.0),
+                                  logprob=max(logprob, -9999.0),
                                   bytes=list(
                                       token.encode("utf-8", errors="replace")))
-            for i, p in enumerate(logprobs.items())
-            if top_logprobs and i < top_logprobs
+            for token_id, logprob, decoded_token in zip(
+                token_ids[:top_logprobs], logprob_values[:top_logprobs],
+                decoded_tokens[:top_logprobs])
         ]
 
     def _create_chat_logprobs(
         self,
         token_ids: GenericSequence[int],
-        top_logprobs: GenericSequence[Optional[Dict[int, Logprob]]],
+        top_logprobs: GenericSequence[Optional[Mapping[int, Logprob]]],
         tokenizer: AnyTokenizer,
         num_output_top_logprobs: Optional[int] = None,
     ) -> ChatCompletionLogProbs:
@@ -798,18 +803,21 @@ class OpenAIServingChat(OpenAIServing):
                         bytes=list(token.encode("utf-8", errors="replace")),
                     ))
             else:
-                step_token = step_top_logprobs[token_id]
-                step_decoded = step_token.decoded_token
+                (step_token_ids, step_logprobs,
+                 step_decoded_tokens) = self._get_logprobs_lists(
+                     step_top_logprobs)
+                step_index = step_token_ids.index(token_id)
+                step_decoded = step_decoded_tokens[step_index]
 
                 logprobs_content.append(
                     ChatCompletionLogProbsContent(
                         token=self._get_decoded_token(
-                            step_token,
+                            step_decoded,
                             token_id,
                             tokenizer,
                             self.return_tokens_as_token_ids,
                         ),
-                        logprob=max(step_token.logprob, -9999.0),
+                        logprob=max(step_logprobs[step_index], -9999.0),
                         bytes=None if step_decoded is None else list(
                             step_decoded.encode("utf-8", errors="replace")),
                         top_logprobs=self._get_top_logprobs(
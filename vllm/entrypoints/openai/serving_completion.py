@@ -1,7 +1,7 @@
 import asyncio
 import time
 from typing import (AsyncGenerator, AsyncIterator, Callable, Dict, List,
-                    Optional)
+                    Mapping, Optional)
 from typing import Sequence as GenericSequence
 from typing import Tuple, Union, cast
 
@@ -277,7 +277,7 @@ class OpenAIServingCompletion(OpenAIServing):
                     num_prompt_tokens[prompt_idx] = len(res.prompt_token_ids)
 
                 delta_token_ids: GenericSequence[int]
-                out_logprobs: Optional[GenericSequence[Optional[Dict[
+                out_logprobs: Optional[GenericSequence[Optional[Mapping[
                     int, Logprob]]]]
 
                 for output in res.outputs:
@@ -407,8 +407,8 @@ class OpenAIServingCompletion(OpenAIServing):
             prompt_text = final_res.prompt
 
             token_ids: GenericSequence[int]
-            out_logprobs: Optional[GenericSequence[Optional[Dict[int,
-                                                                 Logprob]]]]
+            out_logprobs: Optional[GenericSequence[Optional[Mapping[
+                int, Logprob]]]]
 
             for output in final_res.outputs:
                 assert request.max_tokens is not None
@@ -481,7 +481,7 @@ class OpenAIServingCompletion(OpenAIServing):
     def _create_completion_logprobs(
         self,
         token_ids: GenericSequence[int],
-        top_logprobs: GenericSequence[Optional[Dict[int, Logprob]]],
+        top_logprobs: GenericSequence[Optional[Mapping[int, Logprob]]],
         num_output_top_logprobs: int,
         tokenizer: AnyTokenizer,
         initial_text_offset: int = 0,
@@ -505,15 +505,18 @@ class OpenAIServingCompletion(OpenAIServing):
                 out_token_logprobs.append(None)
                 out_top_logprobs.append(None)
             else:
-                step_token = step_top_logprobs[token_id]
+                (step_token_ids, step_logprobs,
+                 step_decoded_tokens) = self._get_logprobs_lists(
+                     step_top_logprobs)
+                step_index = step_token_ids.index(token_id)
 
                 token = self._get_decoded_token(
-                    step_token,
+                    step_decoded_tokens[step_index],
                     token_id,
                     tokenizer,
                     return_as_token_id=self.return_tokens_as_token_ids,
                 )
-                token_logprob = max(step_token.logprob, -9999.0)
+                token_logprob = max(step_logprobs[step_index], -9999.0)
 
                 out_tokens.append(token)
                 out_token_logprobs.append(token_logprob)
@@ -522,17 +525,20 @@ class OpenAIServingCompletion(OpenAIServing):
                 # logprobs, as defined in the openai API
                 # (cf. https://github.com/openai/openai-openapi/blob/
                 # 893ba52242dbd5387a97b96444ee1c742cfce9bd/openapi.yaml#L7153)
+                num_top_logprobs = num_output_top_logprobs + 1
                 out_top_logprobs.append({
                     # Convert float("-inf") to the
                     # JSON-serializable float that OpenAI uses
                     self._get_decoded_token(
-                        top_lp[1],
-                        top_lp[0],
+                        top_decoded_token,
+                        top_token_id,
                         tokenizer,
                         return_as_token_id=self.return_tokens_as_token_ids):
-                    max(top_lp[1].logprob, -9999.0)
-                    for i, top_lp in enumerate(step_top_logprobs.items())
-                    if num_output_top_logprobs >= i
+                    max(top_logprob, -9999.0)
+                    for top_token_id, top_logprob, top_decoded_token in zip(
+                        step_token_ids[:num_top_logprobs],
+                        step_logprobs[:num_top_logprobs],
+                        step_decoded_tokens[:num_top_logprobs])
                 })
 
             if len(out_text_offset) == 0:
@@ -2,7 +2,8 @@ import json
 import pathlib
 from dataclasses import dataclass
 from http import HTTPStatus
-from typing import Iterable, Iterator, List, Optional, Tuple, TypedDict, Union
+from typing import (Iterable, Iterator, List, Mapping, Optional, Tuple,
+                    TypedDict, Union)
 
 from pydantic import Field
 from typing_extensions import Annotated
@@ -30,7 +31,7 @@ from vllm.lora.request import LoRARequest
 from vllm.pooling_params import PoolingParams
 from vllm.prompt_adapter.request import PromptAdapterRequest
 from vllm.sampling_params import BeamSearchParams, SamplingParams
-from vllm.sequence import Logprob
+from vllm.sequence import Logprob, PackedLogprobs
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 from vllm.utils import AtomicCounter
 
@@ -399,15 +400,29 @@ class OpenAIServing:
         )
 
     @staticmethod
-    def _get_decoded_token(logprob: Logprob,
+    def _get_logprobs_lists(
+        logprobs: Mapping[int, Logprob]
+    ) -> Tuple[List[int], List[float], List[Optional[str]]]:
+        """The token ids, logprobs and decoded tokens of the logprobs of a
+        position, without creating a Logprob per token if they are packed.
+        """
+        if isinstance(logprobs, PackedLogprobs):
+            return (logprobs.token_ids, logprobs.logprobs,
+                    logprobs.decoded_tokens)
+        values = logprobs.values()
+        return (list(logprobs), [logprob.logprob for logprob in values],
+                [logprob.decoded_token for logprob in values])
+
+    @staticmethod
+    def _get_decoded_token(decoded_token: Optional[str],
                            token_id: int,
                            tokenizer: AnyTokenizer,
                            return_as_token_id: bool = False) -> str:
         if return_as_token_id:
             return f"token_id:{token_id}"
 
-        if logprob.decoded_token is not None:
-            return logprob.decoded_token
+        if decoded_token is not None:
+            return decoded_token
         return tokenizer.decode(token_id)
 
     async def _check_load_lora_adapter_request(
@@ -17,6 +17,8 @@ from vllm.prompt_adapter.request import PromptAdapterRequest
 from vllm.sequence import ExecuteModelRequest
 from vllm.utils import (GiB_bytes, get_distributed_init_method, get_open_port,
                         get_vllm_instance_id, make_async)
+from vllm.worker.seq_group_metadata_delta import (
+    SequenceGroupMetadataDivergenceError, SequenceGroupMetadataEncoder)
 from vllm.worker.worker_base import WorkerWrapperBase
 
 logger = init_logger(__name__)
@@ -79,6 +81,13 @@ class CPUExecutor(ExecutorBase):
         result_handler = ResultHandler()
         self.parallel_worker_tasks: Optional[Union[Any, Awaitable[Any]]] = None
         self.workers = []
+        # The driver worker gets the requests pickled when it runs in another
+        # process, so only the deltas of the sequence group metadata are sent
+        # to it.
+        self.seq_group_metadata_encoder: Optional[
+            SequenceGroupMetadataEncoder] = None
+        if is_async and self.scheduler_config.send_delta_data:
+            self.seq_group_metadata_encoder = SequenceGroupMetadataEncoder()
 
         if is_async:
             self.workers = [
@@ -226,9 +235,22 @@ class CPUExecutor(ExecutorBase):
                 "start_worker_execution_loop",
                 async_run_remote_workers_only=True,
             )
-        output = self.driver_method_invoker(self.driver_worker,
-                                            "execute_model", execute_model_req)
-        return output
+        encoder = self.seq_group_metadata_encoder
+        if encoder is None:
+            return self.driver_method_invoker(self.driver_worker,
+                                              "execute_model",
+                                              execute_model_req)
+        try:
+            return self.driver_method_invoker(
+                self.driver_worker, "execute_model",
+                encoder.encode(execute_model_req))
+        except SequenceGroupMetadataDivergenceError as e:
+            logger.warning("Resending the full sequence group metadata: %s",
+                           e)
+            encoder.reset()
+            return self.driver_method_invoker(
+                self.driver_worker, "execute_model",
+                encoder.encode(execute_model_req))
 
     def stop_remote_worker_execution_loop(self) -> None:
         if self.parallel_worker_tasks is None:
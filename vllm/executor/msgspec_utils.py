@@ -1,11 +1,11 @@
 from array import array
 from typing import Any, Type
 
-from vllm.sequence import VLLM_TOKEN_ID_ARRAY_TYPE
+from vllm.sequence import VLLM_TOKEN_ID_ARRAY_TYPE, PackedLogprobs
 
 
 def encode_hook(obj: Any) -> Any:
-    """Custom msgspec enc hook that supports array types.
+    """Custom msgspec enc hook that supports array types and packed logprobs.
 
     See https://jcristharif.com/msgspec/api.html#msgspec.msgpack.Encoder
     """
@@ -14,6 +14,9 @@ def encode_hook(obj: Any) -> Any:
             f"vLLM array type should use '{VLLM_TOKEN_ID_ARRAY_TYPE}' type. "
             f"Given array has a type code of {obj.typecode}.")
         return obj.tobytes()
+    if isinstance(obj, PackedLogprobs):
+        # Decoded as the Dict[int, Logprob] of SequenceOutput.logprobs.
+        return obj.to_dict()
 
 
 def decode_hook(type: Type, obj: Any) -> Any:
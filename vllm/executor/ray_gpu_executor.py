@@ -17,6 +17,8 @@ from vllm.sequence import ExecuteModelRequest
 from vllm.utils import (_run_task_with_lock, get_distributed_init_method,
                         get_ip, get_open_port, get_vllm_instance_id,
                         make_async)
+from vllm.worker.seq_group_metadata_delta import (
+    SequenceGroupMetadataDivergenceError, SequenceGroupMetadataEncoder)
 
 if ray is not None:
     from ray.util.scheduling_strategies import PlacementGroupSchedulingStrategy
@@ -67,6 +69,13 @@ class RayGPUExecutor(DistributedGPUExecutor):
         self.input_encoder = msgspec.msgpack.Encoder(enc_hook=encode_hook)
         self.output_decoder = msgspec.msgpack.Decoder(
             Optional[List[SamplerOutput]])
+        # The SPMD workers get the requests serialized, so only the deltas of
+        # the sequence group metadata are sent to them.
+        self.seq_group_metadata_encoder: Optional[
+            SequenceGroupMetadataEncoder] = None
+        if (self.use_ray_spmd_worker
+                and self.scheduler_config.send_delta_data):
+            self.seq_group_metadata_encoder = SequenceGroupMetadataEncoder()
 
     def shutdown(self) -> None:
         if hasattr(self, "forward_dag") and self.forward_dag is not None:
@@ -334,11 +343,34 @@ class RayGPUExecutor(DistributedGPUExecutor):
         if self.forward_dag is None:
             self.forward_dag = self._compiled_ray_dag(enable_asyncio=False)
 
-        serialized_data = self.input_encoder.encode(execute_model_req)
-        outputs = ray.get(self.forward_dag.execute(serialized_data))
+        serialized_data = self._encode_execute_model_req(execute_model_req)
+        try:
+            outputs = ray.get(self.forward_dag.execute(serialized_data))
+        except SequenceGroupMetadataDivergenceError as e:
+            logger.warning("Resending the full sequence group metadata: %s",
+                           e)
+            serialized_data = self._encode_execute_model_req(
+                execute_model_req, resync=True)
+            outputs = ray.get(self.forward_dag.execute(serialized_data))
         output = self.output_decoder.decode(outputs[0])
         return output
 
+    def _encode_execute_model_req(self,
+                                  execute_model_req: ExecuteModelRequest,
+                                  resync: bool = False) -> bytes:
+        """Serializes the request for the SPMD workers.
+
+        Args:
+            resync: Whether to send the full sequence group metadata of all
+                the requests, after the workers dropped their caches.
+        """
+        encoder = self.seq_group_metadata_encoder
+        if encoder is not None:
+            if resync:
+                encoder.reset()
+            execute_model_req = encoder.encode(execute_model_req)
+        return self.input_encoder.encode(execute_model_req)
+
     def _run_workers(
         self,
         method: str,
@@ -525,9 +557,17 @@ class RayGPUExecutorAsync(RayGPUExecutor, DistributedGPUExecutorAsync):
         if self.forward_dag is None:
             self.forward_dag = self._compiled_ray_dag(enable_asyncio=True)
 
-        serialized_data = self.input_encoder.encode(execute_model_req)
-        dag_future = await self.forward_dag.execute_async(serialized_data)
-        outputs = await dag_future
+        serialized_data = self._encode_execute_model_req(execute_model_req)
+        try:
+            dag_future = await self.forward_dag.execute_async(serialized_data)
+            outputs = await dag_future
+        except SequenceGroupMetadataDivergenceError as e:
+            logger.warning("Resending the full sequence group metadata: %s",
+                           e)
+            serialized_data = self._encode_execute_model_req(
+                execute_model_req, resync=True)
+            dag_future = await self.forward_dag.execute_async(serialized_data)
+            outputs = await dag_future
         return self.output_decoder.decode(outputs[0])
 
     async def _driver_execute_model_async(
@@ -4,9 +4,12 @@ import warnings
 from dataclasses import dataclass
 from importlib.util import find_spec
 from math import inf
-from typing import Dict, Iterator, List, Optional, Tuple, Union
+from typing import Dict, Iterator, List, Optional
+from typing import Sequence as GenericSequence
+from typing import Tuple, Union
 
 import msgspec
+import numpy as np
 import torch
 import torch.nn as nn
 
@@ -17,7 +20,8 @@ from vllm.model_executor.sampling_metadata import (SamplingMetadata,
 from vllm.sampling_params import SamplingType
 from vllm.sequence import (VLLM_INVALID_TOKEN_ID,
                            CompletionSequenceGroupOutput, Logprob,
-                           PromptLogprobs, SampleLogprobs, SequenceOutput)
+                           PackedLogprobs, PromptLogprobs, SampleLogprobs,
+                           SequenceOutput)
 from vllm.spec_decode.metrics import SpecDecodeWorkerMetrics
 
 if envs.VLLM_USE_FLASHINFER_SAMPLER and find_spec("flashinfer"):
@@ -117,6 +121,11 @@ class SamplerOutput(
     # block/sync across workers, cpu-gpu sync time and sampling time.
     model_execute_time: Optional[float] = None
 
+    # Number of KV cache blocks swapped in or out by the swaps completed
+    # since the previous step, and the time they took in seconds.
+    num_swapped_blocks: Optional[int] = None
+    swap_time: Optional[float] = None
+
     def __getitem__(self, idx: int) -> CompletionSequenceGroupOutput:
         return self.outputs[idx]
 
@@ -1024,145 +1033,181 @@ def get_logprobs(
         ranks = ranks.to('cpu')
 
     # Find prompt/sample logprobs.
-    prompt_logprobs_per_seq_group: List[Optional[PromptLogprobs]] = []
-    sample_logprobs_per_seq_group: List[SampleLogprobs] = []
+    packer = _LogprobsPacker()
+    prompt_logprob_rows: List[Optional[range]] = []
+    sample_logprob_rows: List[Union[range, SampleLogprobs]] = []
     top_logprob_idx = 0
     selected_logprobs_idx = 0
 
     for seq_group, sample_result in zip(sampling_metadata.seq_groups,
                                         sample_results):
-        (prompt_logprobs, top_logprob_idx,
+        (prompt_rows, top_logprob_idx,
          selected_logprobs_idx) = _get_prompt_logprob_if_needed(
-             seq_group, selected_logprobs, ranks, top_token_ids, top_logprobs,
-             selected_logprobs_idx, top_logprob_idx)
-        prompt_logprobs_per_seq_group.append(prompt_logprobs)
+             seq_group, packer, selected_logprobs_idx, top_logprob_idx)
+        prompt_logprob_rows.append(prompt_rows)
 
-        (sampled_logprobs, top_logprob_idx,
+        (sampled_rows, top_logprob_idx,
          selected_logprobs_idx) = _get_sampled_logprob_if_needed(
-             seq_group, sample_result, selected_logprobs, ranks, top_token_ids,
-             top_logprobs, selected_logprobs_idx, top_logprob_idx)
-        sample_logprobs_per_seq_group.append(sampled_logprobs)
-
+             seq_group, sample_result, packer, selected_logprobs_idx,
+             top_logprob_idx)
+        sample_logprob_rows.append(sampled_rows)
+
+    packed_logprobs = packer.pack(next_token_ids, selected_logprobs, ranks,
+                                  top_token_ids, top_logprobs)
+    prompt_logprobs_per_seq_group: List[Optional[PromptLogprobs]] = [
+        None if rows is None else [packed_logprobs[row] for row in rows]
+        for rows in prompt_logprob_rows
+    ]
+    sample_logprobs_per_seq_group: List[SampleLogprobs] = [
+        [packed_logprobs[row]
+         for row in rows] if isinstance(rows, range) else rows
+        for rows in sample_logprob_rows
+    ]
     return prompt_logprobs_per_seq_group, sample_logprobs_per_seq_group
 
 
+class _LogprobsPacker:
+    """Collects the positions whose logprobs are requested, to pack them all
+    at once into :class:`PackedLogprobs`.
+
+    The logprobs of a position are those of its token, i.e. the next prompt
+    token or the sampled token, then those of its top tokens other than it,
+    with the logprob and rank of its top entry if it is one of them, as in a
+    dict of the token and the top tokens updated in this order.
+    """
+
+    def __init__(self):
+        # The row of each position in the selected logprobs and ranks.
+        self.selected_rows: List[int] = []
+        # The row of each position in the top logprobs, and the number of
+        # top logprobs that it requests.
+        self.top_rows: List[int] = []
+        self.num_logprobs: List[int] = []
+
+    def add(self, selected_rows: range, top_rows: GenericSequence[int],
+            num_logprobs: int) -> range:
+        """Add positions, and return their indices in the packed logprobs.
+        """
+        start = len(self.selected_rows)
+        self.selected_rows.extend(selected_rows)
+        self.top_rows.extend(top_rows)
+        self.num_logprobs.extend([num_logprobs] * len(selected_rows))
+        return range(start, len(self.selected_rows))
+
+    def pack(self, next_token_ids: List[int],
+             selected_logprobs: Optional[torch.Tensor],
+             ranks: Optional[torch.Tensor],
+             top_token_ids: Optional[torch.Tensor],
+             top_logprobs: Optional[torch.Tensor]) -> List[PackedLogprobs]:
+        if not self.selected_rows:
+            return []
+        assert selected_logprobs is not None and ranks is not None
+        selected_rows = np.array(self.selected_rows)
+        token_ids = np.array(next_token_ids)[selected_rows]
+        logprobs = selected_logprobs.numpy()[selected_rows][:, None]
+        token_ranks = ranks.numpy()[selected_rows][:, None]
+        num_logprobs = np.array(self.num_logprobs)
+        lengths = np.ones_like(num_logprobs)
+
+        max_num_logprobs = int(num_logprobs.max())
+        if max_num_logprobs > 0:
+            assert top_token_ids is not None and top_logprobs is not None
+            top_rows = np.array(self.top_rows)
+            top_ids = top_token_ids.numpy()[top_rows, :max_num_logprobs]
+            top_lps = top_logprobs.numpy()[top_rows, :max_num_logprobs]
+            is_requested = (np.arange(max_num_logprobs) <
+                            num_logprobs[:, None])
+            is_token = (top_ids == token_ids[:, None]) & is_requested
+            in_top = is_token.any(axis=1)
+            top_index = is_token.argmax(axis=1)
+            logprobs = np.where(
+                in_top[:, None],
+                top_lps[np.arange(len(top_lps)), top_index][:, None],
+                logprobs)
+            token_ranks = np.where(in_top[:, None], top_index[:, None] + 1,
+                                   token_ranks)
+            # Move the token and the top tokens which are not requested to
+            # the end, to be cut off. The top tokens are sorted by rank.
+            order = np.argsort(is_token | ~is_requested,
+                               axis=1,
+                               kind="stable")
+            token_ids = np.concatenate(
+                [token_ids[:, None],
+                 np.take_along_axis(top_ids, order, axis=1)],
+                axis=1)
+            logprobs = np.concatenate(
+                [logprobs, np.take_along_axis(top_lps, order, axis=1)],
+                axis=1)
+            token_ranks = np.concatenate([token_ranks, order + 1], axis=1)
+            lengths += num_logprobs - in_top
+        else:
+            token_ids = token_ids[:, None]
+
+        return [
+            PackedLogprobs(ids[:length], lps[:length], rks[:length])
+            for ids, lps, rks, length in zip(
+                token_ids.tolist(), logprobs.tolist(), token_ranks.tolist(),
+                lengths.tolist())
+        ]
+
+
 def _get_prompt_logprob_if_needed(
     seq_group: SequenceGroupToSample,
-    selected_logprobs: torch.Tensor,
-    ranks: torch.Tensor,
-    top_token_ids: torch.Tensor,
-    top_logprobs: torch.Tensor,
+    packer: _LogprobsPacker,
     selected_logprobs_idx: int,
     top_logprob_idx: int,
-):
-    """Compute the prompt logprob from a sequence group if needed."""
+) -> Tuple[Optional[range], int, int]:
+    """Add the prompt logprobs of a sequence group to the packer if needed,
+    and return their indices in the packed logprobs."""
     sampling_params = seq_group.sampling_params
     is_prompt = seq_group.is_prompt
 
     # Find prompt logprobs
-    prompt_logprobs: Optional[PromptLogprobs] = None
+    prompt_rows: Optional[range] = None
     if is_prompt and sampling_params.prompt_logprobs is not None:
-        prompt_logprobs = []
-        num_logprobs = sampling_params.prompt_logprobs
-        next_prompt_tokens = _get_next_prompt_tokens(seq_group)
-        # Pre-select indexes and create a list. It is faster than calling .item
-        # repetitively.
-        selected_logprob_items = selected_logprobs[
-            selected_logprobs_idx:selected_logprobs_idx +
-            len(next_prompt_tokens)].tolist()
-        rank_items = ranks[selected_logprobs_idx:selected_logprobs_idx +
-                           len(next_prompt_tokens)].tolist()
-
-        for idx, token_id in enumerate(next_prompt_tokens):
-            # Calculate the prompt logprob of the real prompt tokens.
-            # {token_id: (logprob, rank_from_vocab)}
-            prompt_logprobs_dict: Dict[int, Tuple[float, int]] = {
-                token_id: (selected_logprob_items[idx], rank_items[idx])
-            }
-
-            # Add top K prompt logprobs along with its rank.
-            if num_logprobs > 0:
-                top_ids = top_token_ids[
-                    top_logprob_idx, :num_logprobs].tolist()
-                top_probs = top_logprobs[
-                    top_logprob_idx, :num_logprobs].tolist()
-                # Top K is already sorted by rank, so we can use 1 ~
-                # num_logprobs + 1 for rank.
-                top_ranks = range(1, num_logprobs + 1)
-                prompt_logprobs_dict.update({
-                    top_id: (top_prob, rank)
-                    for top_id, top_prob, rank in zip(top_ids, top_probs,
-                                                      top_ranks)
-                })
-            prompt_logprobs.append({
-                token_id: Logprob(*logprob_and_rank)
-                for token_id, logprob_and_rank in prompt_logprobs_dict.items()
-            })
-            # + 1 to go to the next prompt token.
-            top_logprob_idx += 1
-
+        num_prompt_tokens = len(_get_next_prompt_tokens(seq_group))
+        # The top logprobs of each prompt token are in their own row.
+        prompt_rows = packer.add(
+            range(selected_logprobs_idx,
+                  selected_logprobs_idx + num_prompt_tokens),
+            range(top_logprob_idx, top_logprob_idx + num_prompt_tokens),
+            sampling_params.prompt_logprobs)
         # + len(next_prompt_tokens) to go to the next prompt.
-        selected_logprobs_idx += len(next_prompt_tokens)
-    return prompt_logprobs, top_logprob_idx, selected_logprobs_idx
+        top_logprob_idx += num_prompt_tokens
+        selected_logprobs_idx += num_prompt_tokens
+    return prompt_rows, top_logprob_idx, selected_logprobs_idx
 
 
 def _get_sampled_logprob_if_needed(
     seq_group: SequenceGroupToSample,
     sample_result: Tuple[List[int], List[int]],
-    selected_logprobs: torch.Tensor,
-    ranks: torch.Tensor,
-    top_token_ids: torch.Tensor,
-    top_logprobs: torch.Tensor,
+    packer: _LogprobsPacker,
     selected_logprobs_idx: int,
     top_logprob_idx: int,
-):
-    """Compute the sample logprob if needed."""
+) -> Tuple[Union[range, SampleLogprobs], int, int]:
+    """Add the sample logprobs of a sequence group to the packer if needed,
+    and return their indices in the packed logprobs, or dummy logprobs if
+    they are not requested."""
     seq_ids = seq_group.seq_ids
     num_logprobs = seq_group.sampling_params.logprobs
-    sampled_logprobs: SampleLogprobs = []
+    sampled_logprobs: Union[range, SampleLogprobs] = []
     next_token_ids, parent_seq_ids = sample_result
 
     if seq_group.do_sample:
         assert len(next_token_ids) > 0
         if num_logprobs is None:
-            for next_token_id in next_token_ids:
-                # Use a dummy logprob
-                sampled_logprobs.append({next_token_id: Logprob(inf)})
+            # Use a dummy logprob
+            sampled_logprobs = [{
+                next_token_id: Logprob(inf)
+            } for next_token_id in next_token_ids]
         else:
-            # Pre-select items from tensor. tolist() is faster than repetitive
-            # `.item()` calls.
-            selected_logprob_items = selected_logprobs[
-                selected_logprobs_idx:selected_logprobs_idx +
-                len(next_token_ids)].tolist()
-            rank_items = ranks[selected_logprobs_idx:selected_logprobs_idx +
-                               len(next_token_ids)].tolist()
-            for idx, (next_token_id, parent_id) in enumerate(
-                    zip(next_token_ids, parent_seq_ids)):
-                # Get the logprob of a sampled token.
-                sampled_logprobs_dict = {
-                    next_token_id:
-                    (selected_logprob_items[idx], rank_items[idx])
-                }
-                if num_logprobs is not None and num_logprobs > 0:
-                    # Get top K logprobs.
-                    top_ids = top_token_ids[top_logprob_idx +
-                                            parent_id, :num_logprobs].tolist()
-                    top_probs = top_logprobs[
-                        top_logprob_idx + parent_id, :num_logprobs].tolist()
-                    # Top K is already sorted by rank, so we can use 1 ~
-                    # num_logprobs + 1 for rank.
-                    top_ranks = range(1, num_logprobs + 1)
-                    sampled_logprobs_dict.update({
-                        top_id: (top_prob, rank)
-                        for top_id, top_prob, rank in zip(
-                            top_ids, top_probs, top_ranks)
-                    })
-
-                sampled_logprobs.append({
-                    token_id: Logprob(*logprob_and_rank)
-                    for token_id, logprob_and_rank in
-                    sampled_logprobs_dict.items()
-                })
+            # The top logprobs of a sampled token are in the row of its
+            # parent sequence.
+            sampled_logprobs = packer.add(
+                range(selected_logprobs_idx,
+                      selected_logprobs_idx + len(next_token_ids)),
+                [top_logprob_idx + parent_id for parent_id in parent_seq_ids],
+                num_logprobs)
 
         # NOTE: This part of code is not intuitive. `selected_logprobs` include
         # logprobs for the current step, which has len(next_token_ids) tokens
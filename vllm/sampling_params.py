@@ -135,7 +135,9 @@ class SamplingParams(
             Must be in [0, 1]. Set to 0 to disable this.
         seed: Random seed to use for the generation.
         stop: List of strings that stop the generation when they are generated.
-            The returned output will not contain the stop strings.
+            The returned output will not contain the stop strings. Without
+            detokenization, the stop strings are found in the texts of the
+            output tokens.
         stop_token_ids: List of tokens that stop the generation when they are
             generated. The returned output will contain the stop tokens unless
             the stop tokens are special tokens.
@@ -171,6 +173,10 @@ class SamplingParams(
         allowed_token_ids: If provided, the engine will construct a logits
             processor which only retains scores for the given token ids.
             Defaults to None.
+        ttft_slo: Target time to first token of the request, in seconds.
+            Only applicable with the "slo" scheduling policy.
+        tpot_slo: Target time per output token after the first one, in
+            seconds. Only applicable with the "slo" scheduling policy.
     """
 
     n: int = 1
@@ -213,6 +219,8 @@ class SamplingParams(
     guided_decoding: Optional[GuidedDecodingParams] = None
     logit_bias: Optional[Dict[int, float]] = None
     allowed_token_ids: Optional[List[int]] = None
+    ttft_slo: Optional[float] = None
+    tpot_slo: Optional[float] = None
 
     @staticmethod
     def from_optional(
@@ -244,6 +252,8 @@ class SamplingParams(
         guided_decoding: Optional[GuidedDecodingParams] = None,
         logit_bias: Optional[Union[Dict[int, float], Dict[str, float]]] = None,
         allowed_token_ids: Optional[List[int]] = None,
+        ttft_slo: Optional[float] = None,
+        tpot_slo: Optional[float] = None,
     ) -> "SamplingParams":
         if logit_bias is not None:
             logit_bias = {
@@ -282,6 +292,8 @@ class SamplingParams(
             guided_decoding=guided_decoding,
             logit_bias=logit_bias,
             allowed_token_ids=allowed_token_ids,
+            ttft_slo=ttft_slo,
+            tpot_slo=tpot_slo,
         )
 
     def __post_init__(self) -> None:
@@ -390,10 +402,12 @@ class SamplingParams(
         assert isinstance(self.stop, list)
         if any(not stop_str for stop_str in self.stop):
             raise ValueError("stop cannot contain an empty string.")
-        if self.stop and not self.detokenize:
+        if self.ttft_slo is not None and self.ttft_slo <= 0:
             raise ValueError(
-                "stop strings are only supported when detokenize is True. "
-                "Set detokenize=True to use stop.")
+                f"ttft_slo must be positive, got {self.ttft_slo}.")
+        if self.tpot_slo is not None and self.tpot_slo <= 0:
+            raise ValueError(
+                f"tpot_slo must be positive, got {self.tpot_slo}.")
         if self.best_of != self._real_n and self.output_kind == (
                 RequestOutputKind.DELTA):
             raise ValueError("best_of must equal n to use output_kind=DELTA")
@@ -1,16 +1,19 @@
 """Sequence and its related classes."""
 import copy
 import enum
+import zlib
 from abc import ABC, abstractmethod
 from array import array
 from collections import defaultdict
 from dataclasses import dataclass
 from functools import cached_property, reduce
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional
+from typing import (TYPE_CHECKING, Any, Callable, Dict, ItemsView, Iterator,
+                    List, Mapping, Optional)
 from typing import Sequence as GenericSequence
-from typing import Set, Tuple, Union, cast
+from typing import Set, Tuple, Union, ValuesView, cast
 
 import msgspec
+import numpy as np
 import torch
 
 from vllm.inputs.parse import is_encoder_decoder_inputs
@@ -19,6 +22,7 @@ from vllm.pooling_params import PoolingParams
 from vllm.prompt_adapter.request import PromptAdapterRequest
 from vllm.sampling_params import SamplingParams
 from vllm.spec_decode.metrics import SpecDecodeWorkerMetrics
+from vllm.utils import hash_block_token_ids
 
 if TYPE_CHECKING:
     from vllm.inputs import SingletonInputs
@@ -34,6 +38,15 @@ def array_full(token_id: int, count: int):
     return array(VLLM_TOKEN_ID_ARRAY_TYPE, [token_id]) * count
 
 
+def token_ids_checksum(token_ids: array, checksum: int = 0) -> int:
+    """CRC-32 of the buffer of the token ids, continuing from `checksum`.
+
+    The checksum of the concatenation of two arrays is the checksum of the
+    second one, continuing from the checksum of the first one.
+    """
+    return zlib.crc32(token_ids, checksum)
+
+
 # We use dataclass for now because it is used for
 # openai server output, and msgspec is not serializable.
 # TODO(sang): Fix it.
@@ -51,11 +64,86 @@ class Logprob:
     decoded_token: Optional[str] = None
 
 
+class PackedLogprobs(Mapping[int, Logprob]):
+    """The logprobs of a position, as parallel lists of the token ids, their
+    logprobs, ranks and decoded tokens, in the order of a dict of them.
+
+    The sampler packs the logprobs of a step with numpy, without a
+    :class:`Logprob` per token. The detokenizer, the output of the
+    multiprocessing engine and the OpenAI server use the lists. Reading the
+    mapping creates a :class:`Logprob` per entry read: it is a copy, and
+    the decoded tokens are only set in :attr:`decoded_tokens`.
+    """
+
+    __slots__ = ("token_ids", "logprobs", "ranks", "decoded_tokens")
+
+    def __init__(self,
+                 token_ids: List[int],
+                 logprobs: List[float],
+                 ranks: List[Optional[int]],
+                 decoded_tokens: Optional[List[Optional[str]]] = None):
+        self.token_ids = token_ids
+        self.logprobs = logprobs
+        self.ranks = ranks
+        self.decoded_tokens: List[Optional[str]] = (
+            [None] * len(token_ids)
+            if decoded_tokens is None else decoded_tokens)
+
+    def _get(self, index: int) -> Logprob:
+        return Logprob(self.logprobs[index], self.ranks[index],
+                       self.decoded_tokens[index])
+
+    def __getitem__(self, token_id: int) -> Logprob:
+        try:
+            return self._get(self.token_ids.index(token_id))
+        except ValueError:
+            raise KeyError(token_id) from None
+
+    def __contains__(self, token_id: object) -> bool:
+        return token_id in self.token_ids
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.token_ids)
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    def items(self) -> ItemsView[int, Logprob]:
+        return _PackedLogprobsItemsView(self)
+
+    def values(self) -> ValuesView[Logprob]:
+        return _PackedLogprobsValuesView(self)
+
+    def to_dict(self) -> Dict[int, Logprob]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"PackedLogprobs({self.to_dict()})"
+
+
+class _PackedLogprobsItemsView(ItemsView[int, Logprob]):
+    _mapping: PackedLogprobs
+
+    def __iter__(self) -> Iterator[Tuple[int, Logprob]]:
+        packed = self._mapping
+        for index, token_id in enumerate(packed.token_ids):
+            yield token_id, packed._get(index)
+
+
+class _PackedLogprobsValuesView(ValuesView[Logprob]):
+    _mapping: PackedLogprobs
+
+    def __iter__(self) -> Iterator[Logprob]:
+        packed = self._mapping
+        for index in range(len(packed.token_ids)):
+            yield packed._get(index)
+
+
 # {token_id -> logprob} per each sequence group. None if the corresponding
 # sequence group doesn't require prompt logprob.
-PromptLogprobs = List[Optional[Dict[int, Logprob]]]
+PromptLogprobs = List[Optional[Mapping[int, Logprob]]]
 # {token_id -> logprob} for each sequence group.
-SampleLogprobs = List[Dict[int, Logprob]]
+SampleLogprobs = List[Mapping[int, Logprob]]
 
 
 class SequenceStatus(enum.IntEnum):
@@ -139,6 +227,9 @@ class SequenceDataDelta(
     new_num_computed_tokens: int
     # Overwriting existing `stage`.
     new_stage: SequenceStage
+    # The checksum of all the token ids after appending the new ones. See
+    # `token_ids_checksum`.
+    checksum: int
 
 
 class SequenceData(msgspec.Struct,
@@ -170,10 +261,6 @@ class SequenceData(msgspec.Struct,
     _stage: SequenceStage = SequenceStage.PREFILL
     _cached_all_token_ids: List[int] = msgspec.field(default_factory=list)
 
-    # It is used to get delta input. It is reset when `get_delta_and_reset`
-    # is called.
-    _new_appended_tokens: List[int] = msgspec.field(default_factory=list)
-
     # It is used to compute mrope_position_ids.
     _mrope_position_delta: Optional[int] = None
 
@@ -282,7 +369,6 @@ class SequenceData(msgspec.Struct,
 
     def append_token_id(self, token_id: int, logprob: float) -> None:
         self._output_token_ids.append(token_id)
-        self._new_appended_tokens.append(token_id)
         self._cached_all_token_ids.append(token_id)
         self._cumulative_logprob += logprob
 
@@ -298,6 +384,27 @@ class SequenceData(msgspec.Struct,
     def get_token_ids(self) -> List[int]:
         return self._cached_all_token_ids
 
+    def get_token_ids_slice(self, start: int, end: int) -> np.ndarray:
+        """Return the token ids in [start, end) as a numpy array, copied
+        directly from the buffers of the token arrays.
+
+        The buffers are only viewed for the duration of the copy, since an
+        array cannot be appended to while its buffer is exported.
+        """
+        prompt_len = len(self._prompt_token_ids)
+        prompt_token_ids = np.frombuffer(self._prompt_token_ids,
+                                         dtype=VLLM_TOKEN_ID_ARRAY_TYPE)
+        if end <= prompt_len:
+            return prompt_token_ids[start:end].astype(np.int64)
+        output_token_ids = np.frombuffer(self._output_token_ids,
+                                         dtype=VLLM_TOKEN_ID_ARRAY_TYPE)
+        if start >= prompt_len:
+            return output_token_ids[start - prompt_len:end -
+                                    prompt_len].astype(np.int64)
+        return np.concatenate(
+            (prompt_token_ids[start:], output_token_ids[:end - prompt_len]),
+            dtype=np.int64)
+
     def get_prefix_token_ids(
             self, num_tokens: int
     ) -> Tuple[Tuple[int, ...], Optional[Tuple[int, ...]]]:
@@ -329,7 +436,6 @@ class SequenceData(msgspec.Struct,
         """
         self._num_computed_tokens = 0
         self._stage = SequenceStage.PREFILL
-        self._new_appended_tokens = []
 
     def get_num_uncomputed_tokens(self) -> int:
         """Return the number of prefill tokens that are not computed."""
@@ -349,13 +455,17 @@ class SequenceData(msgspec.Struct,
     def get_output_token_ids(self) -> Tuple[int, ...]:
         return self.output_token_ids
 
-    def get_delta_and_reset(self) -> SequenceDataDelta:
-        delta = SequenceDataDelta(self._new_appended_tokens,
-                                  self._cumulative_logprob,
-                                  self.get_num_computed_tokens(), self.stage)
-        # Reset delta state.
-        self._new_appended_tokens = []
-        return delta
+    def get_delta(self, num_output_tokens: int,
+                  checksum: int) -> SequenceDataDelta:
+        """Return the delta from the state in which the sequence had
+        `num_output_tokens` output tokens, and its token ids had the given
+        checksum.
+        """
+        new_output_token_ids = self._output_token_ids[num_output_tokens:]
+        return SequenceDataDelta(
+            new_output_token_ids.tolist(), self._cumulative_logprob,
+            self.get_num_computed_tokens(), self.stage,
+            token_ids_checksum(new_output_token_ids, checksum))
 
     def apply_delta(self, delta: SequenceDataDelta):
         self._num_computed_tokens = delta.new_num_computed_tokens
@@ -376,6 +486,124 @@ class SequenceData(msgspec.Struct,
                 f"get_num_computed_tokens={self.get_num_computed_tokens()}")
 
 
+class SequenceStore:
+    """Struct-of-arrays store of the scalars of the sequences that the engine
+    reads every step: their status, stage, number of computed tokens, prompt
+    and output lengths, and the offsets of their incremental detokenization.
+
+    Each :class:`Sequence` owns a slot of the store, and its accessors of
+    these scalars are views of the slot. The status is only kept here; the
+    other scalars mirror the :class:`SequenceData` of the sequence, which is
+    sent to the workers, and are updated along with it by the
+    :class:`Sequence`. The scheduler and the block manager read the scalars
+    of many sequences at once as numpy arrays, given an integer array of
+    slots, as does the batched detokenization with the offsets.
+
+    The columns are :class:`array` rather than numpy arrays, so that the
+    per-sequence accessors get Python ints without boxing numpy scalars.
+    The bulk reads index transient numpy views of the columns: the results
+    are copies, which do not keep the columns from growing. The store is
+    not thread-safe: only the engine thread may access it, since a view
+    taken by another thread while a slot is allocated fails to grow them.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._status = array("b", bytes(capacity))
+        self._stage = array("b", bytes(capacity))
+        self._num_computed_tokens = array("q", bytes(8 * capacity))
+        self._prompt_len = array("q", bytes(8 * capacity))
+        self._output_len = array("q", bytes(8 * capacity))
+        self._prefix_offset = array("q", bytes(8 * capacity))
+        self._read_offset = array("q", bytes(8 * capacity))
+        self._free_slots: List[int] = list(range(capacity - 1, -1, -1))
+
+    def __deepcopy__(self, memo) -> "SequenceStore":
+        # Shared by all the sequences, including the forked ones.
+        return self
+
+    def __reduce__(self):
+        # The sequences are moved to the store of the other process.
+        return get_sequence_store, ()
+
+    def allocate(self, status: "SequenceStatus", data: SequenceData) -> int:
+        if not self._free_slots:
+            capacity = len(self._status)
+            for column in (self._status, self._stage,
+                           self._num_computed_tokens, self._prompt_len,
+                           self._output_len, self._prefix_offset,
+                           self._read_offset):
+                column.extend(array(column.typecode, bytes(
+                    column.itemsize * capacity)))
+            self._free_slots = list(range(2 * capacity - 1, capacity - 1, -1))
+        slot = self._free_slots.pop()
+        self._status[slot] = status
+        self._prefix_offset[slot] = 0
+        self._read_offset[slot] = 0
+        self.sync(slot, data)
+        return slot
+
+    def free(self, slot: int) -> None:
+        self._free_slots.append(slot)
+
+    def sync(self, slot: int, data: SequenceData) -> None:
+        """Mirrors the scalars of the data of the sequence in the slot."""
+        self._stage[slot] = data.stage.value
+        self._num_computed_tokens[slot] = data.get_num_computed_tokens()
+        self._prompt_len[slot] = data.get_prompt_len()
+        self._output_len[slot] = data.get_output_len()
+
+    def get_statuses(self, slots: np.ndarray) -> np.ndarray:
+        return np.frombuffer(self._status, dtype=np.int8)[slots]
+
+    def get_lens(self, slots: np.ndarray) -> np.ndarray:
+        return (np.frombuffer(self._prompt_len, dtype=np.int64)[slots] +
+                np.frombuffer(self._output_len, dtype=np.int64)[slots])
+
+    def get_num_computed_tokens(self, slots: np.ndarray) -> np.ndarray:
+        return np.frombuffer(self._num_computed_tokens,
+                             dtype=np.int64)[slots]
+
+    def get_detokenization_offsets(
+            self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return (np.frombuffer(self._prefix_offset, dtype=np.int64)[slots],
+                np.frombuffer(self._read_offset, dtype=np.int64)[slots])
+
+    def set_detokenization_offsets(self, slots: np.ndarray,
+                                   prefix_offsets: np.ndarray,
+                                   read_offsets: np.ndarray) -> None:
+        np.frombuffer(self._prefix_offset, dtype=np.int64)[slots] = (
+            prefix_offsets)
+        np.frombuffer(self._read_offset, dtype=np.int64)[slots] = read_offsets
+
+    def is_prefill(self, slots: np.ndarray) -> np.ndarray:
+        return (np.frombuffer(self._stage, dtype=np.int8)[slots] ==
+                _PREFILL_STAGE)
+
+    def is_finished(self, slots: np.ndarray) -> np.ndarray:
+        return self.get_statuses(slots) > SequenceStatus.SWAPPED
+
+    def get_num_new_tokens(self, slots: np.ndarray) -> np.ndarray:
+        """Vectorized :meth:`Sequence.get_num_new_tokens`."""
+        return np.where(
+            self.is_prefill(slots),
+            self.get_lens(slots) - self.get_num_computed_tokens(slots), 1)
+
+
+_sequence_store = SequenceStore()
+
+
+def get_sequence_store() -> SequenceStore:
+    """The store of the sequences of this process."""
+    return _sequence_store
+
+
+# The statuses by value.
+_SEQUENCE_STATUSES = tuple(SequenceStatus)
+assert all(status.value == i for i, status in enumerate(_SEQUENCE_STATUSES))
+_PREFILL_STAGE = SequenceStage.PREFILL.value
+_DECODE_STAGE = SequenceStage.DECODE.value
+
+
 class Sequence:
     """Stores the data, status, and block information of a sequence.
 
@@ -450,18 +678,81 @@ class Sequence:
         self.output_logprobs: SampleLogprobs = []
         self.output_text = ""
 
-        self.status = SequenceStatus.WAITING
+        self._store = get_sequence_store()
+        self.slot = self._store.allocate(SequenceStatus.WAITING, self.data)
         self.stop_reason: Union[int, str, None] = None
 
         # These are used to keep track of delta outputs
         self._last_output_token_ids_offset: int = 0
         self._last_output_text_offset: int = 0
 
-        # Used for incremental detokenization
-        self.prefix_offset = 0
-        self.read_offset = 0
+        # Used for incremental detokenization, with the prefix_offset and
+        # read_offset in the store.
         # Input + output tokens
         self.tokens: Optional[List[str]] = None
+        # State of the stop string matcher after the output text
+        self.stop_string_state = 0
+
+        # Chained content hashes of the full blocks, extended incrementally
+        # as tokens are appended. Tokens are only ever appended to a
+        # sequence, so the chain stays valid across preemptions.
+        self._block_hashes: List[int] = []
+
+    def __del__(self) -> None:
+        # The slot is not allocated if __init__ raised.
+        if "slot" in self.__dict__:
+            self._store.free(self.slot)
+
+    def __deepcopy__(self, memo) -> "Sequence":
+        new_seq = Sequence.__new__(Sequence)
+        memo[id(self)] = new_seq
+        state = self.__dict__.copy()
+        del state["slot"]
+        new_seq.__dict__.update(copy.deepcopy(state, memo))
+        new_seq.slot = self._store.allocate(self.status, new_seq.data)
+        new_seq.prefix_offset = self.prefix_offset
+        new_seq.read_offset = self.read_offset
+        return new_seq
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The slot is reallocated in the store of the other process.
+        state = self.__dict__.copy()
+        del state["slot"]
+        state["_status"] = self.status
+        state["_offsets"] = (self.prefix_offset, self.read_offset)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        status = state.pop("_status")
+        prefix_offset, read_offset = state.pop("_offsets")
+        self.__dict__.update(state)
+        self.slot = self._store.allocate(status, self.data)
+        self.prefix_offset = prefix_offset
+        self.read_offset = read_offset
+
+    @property
+    def status(self) -> SequenceStatus:
+        return _SEQUENCE_STATUSES[self._store._status[self.slot]]
+
+    @status.setter
+    def status(self, status: SequenceStatus) -> None:
+        self._store._status[self.slot] = status
+
+    @property
+    def prefix_offset(self) -> int:
+        return self._store._prefix_offset[self.slot]
+
+    @prefix_offset.setter
+    def prefix_offset(self, prefix_offset: int) -> None:
+        self._store._prefix_offset[self.slot] = prefix_offset
+
+    @property
+    def read_offset(self) -> int:
+        return self._store._read_offset[self.slot]
+
+    @read_offset.setter
+    def read_offset(self, read_offset: int) -> None:
+        self._store._read_offset[self.slot] = read_offset
 
     @property
     def n_blocks(self) -> int:
@@ -557,15 +848,54 @@ class Sequence:
 
         return self.data._cached_all_token_ids[-num_new_tokens:]
 
+    def get_block_hashes(self) -> List[int]:
+        """Returns the chained content hashes of the full blocks of the
+        sequence, as computed by `PrefixCachingBlock.hash_block_tokens`.
+
+        Only the blocks filled since the last call are hashed, directly over
+        the token arrays of the sequence data.
+        """
+        num_full_blocks = self.get_len() // self.block_size
+        block_hashes = self._block_hashes
+        if len(block_hashes) == num_full_blocks:
+            return block_hashes
+
+        prompt_token_ids = self.data.prompt_token_ids_array
+        output_token_ids = self.data.output_token_ids_array
+        prompt_len = len(prompt_token_ids)
+        prev_block_hash = block_hashes[-1] if block_hashes else None
+        with memoryview(prompt_token_ids) as prompt_view, \
+                memoryview(output_token_ids) as output_view:
+            for block_idx in range(len(block_hashes), num_full_blocks):
+                start = block_idx * self.block_size
+                end = start + self.block_size
+                if end <= prompt_len:
+                    token_ids = prompt_view[start:end]
+                elif start >= prompt_len:
+                    token_ids = output_view[start - prompt_len:end -
+                                            prompt_len]
+                else:
+                    # The block straddles the prompt and the output.
+                    token_ids = (prompt_token_ids[start:] +
+                                 output_token_ids[:end - prompt_len])
+                prev_block_hash = hash_block_token_ids(
+                    prev_block_hash, token_ids)
+                block_hashes.append(prev_block_hash)
+        return block_hashes
+
     def hash_of_block(self, logical_idx: int) -> int:
         # TODO This can produce incorrect hash when block size > prompt size
-
-        # Compute the number of tokens in the sequence
-        # TODO: The current hashing function is O(L^2). We should optimize
-        # this in the future.
-        num_tokens = self.num_hashed_tokens_of_block(logical_idx)
-        hashed_tokens = self.data.get_prefix_token_ids(num_tokens)
-        return hash((hashed_tokens, self.lora_int_id))
+        num_full_blocks = self.get_len() // self.block_size
+        if logical_idx < num_full_blocks:
+            block_hash = self.get_block_hashes()[logical_idx]
+        else:
+            # Partial trailing block, hashed from the previous full block.
+            prev_block_hash = (self.get_block_hashes()[logical_idx - 1]
+                               if logical_idx > 0 else None)
+            block_hash = hash_block_token_ids(
+                prev_block_hash,
+                self.get_token_ids()[logical_idx * self.block_size:])
+        return hash((block_hash, self.lora_int_id))
 
     def num_hashed_tokens_of_block(self, logical_idx: int):
         return logical_idx * self.block_size + self.block_size
@@ -573,21 +903,34 @@ class Sequence:
     def reset_state_for_recompute(self):
         """Reset the sequence states for recomputation."""
         self.data.reset_state_for_recompute()
+        store = self._store
+        store._num_computed_tokens[self.slot] = 0
+        store._stage[self.slot] = _PREFILL_STAGE
 
-    def append_token_id(self, token_id: int, logprobs: Dict[int,
-                                                            Logprob]) -> None:
+    def append_token_id(self, token_id: int,
+                        logprobs: Mapping[int, Logprob]) -> None:
         assert token_id in logprobs
         self.output_logprobs.append(logprobs)
         self.data.append_token_id(token_id, logprobs[token_id].logprob)
+        self._store._output_len[self.slot] += 1
+
+    def update_num_computed_tokens(self, num_new_computed_tokens: int):
+        """Update number of tokens computed so far."""
+        data = self.data
+        data.update_num_computed_tokens(num_new_computed_tokens)
+        store = self._store
+        store._num_computed_tokens[self.slot] = data._num_computed_tokens
+        store._stage[self.slot] = data._stage.value
 
     def get_len(self) -> int:
-        return self.data.get_len()
+        store = self._store
+        return store._prompt_len[self.slot] + store._output_len[self.slot]
 
     def get_prompt_len(self) -> int:
-        return self.data.get_prompt_len()
+        return self._store._prompt_len[self.slot]
 
     def get_output_len(self) -> int:
-        return self.data.get_output_len()
+        return self._store._output_len[self.slot]
 
     def get_token_ids(self) -> List[int]:
         return self.data.get_token_ids()
@@ -605,7 +948,7 @@ class Sequence:
         return self.data.cumulative_logprob
 
     def is_finished(self) -> bool:
-        return SequenceStatus.is_finished(self.status)
+        return self._store._status[self.slot] > SequenceStatus.SWAPPED
 
     def fork(self, new_seq_id: int) -> "Sequence":
         new_seq = copy.deepcopy(self)
@@ -619,12 +962,15 @@ class Sequence:
             The new number of tokens to be computed. I.e., 1 for decode, or
             the remaining prompt size for prefill.
         """
-        if self.data.stage == SequenceStage.DECODE:
+        store = self._store
+        slot = self.slot
+        if store._stage[slot] == _DECODE_STAGE:
             return 1
-        return self.data.get_num_uncomputed_tokens()
+        return (store._prompt_len[slot] + store._output_len[slot] -
+                store._num_computed_tokens[slot])
 
     def is_prefill(self) -> bool:
-        return self.data.stage == SequenceStage.PREFILL
+        return self._store._stage[self.slot] == _PREFILL_STAGE
 
     def __repr__(self) -> str:
         return (f"Sequence(seq_id={self.seq_id}, "
@@ -872,7 +1218,7 @@ class SequenceGroup:
         """Update number of tokens computed so far."""
         for seq in self.seqs:
             if not seq.is_finished():
-                seq.data.update_num_computed_tokens(num_new_computed_tokens)
+                seq.update_num_computed_tokens(num_new_computed_tokens)
 
     def get_num_uncomputed_tokens(self) -> int:
         num_uncomputed_tokens = 0
@@ -946,8 +1292,9 @@ class SequenceGroupMetadataDelta(
         omit_defaults=True):  # type: ignore[call-arg]
     """Delta of SequenceGroupMetadata.
 
-    After sending the first SequenceGroupMetadata, vLLM scheduler
-    only sends delta to reduce the data payload size.
+    After sending the first SequenceGroupMetadata to workers in other
+    processes, executors only send delta to reduce the data payload size.
+    See `vllm.worker.seq_group_metadata_delta`.
     """
     seq_data_delta: Dict[int, SequenceDataDelta]
     request_id: str
@@ -1062,13 +1409,23 @@ class SequenceGroupMetadata(
 
     def apply_delta(self,
                     sequence_group_metadata_delta: SequenceGroupMetadataDelta):
-        for id, delta in sequence_group_metadata_delta.seq_data_delta.items():
+        seq_data_delta = sequence_group_metadata_delta.seq_data_delta
+        # Drop the sequences that are no longer running, e.g., the finished
+        # beams.
+        self.seq_data = {
+            id: self.seq_data[id]
+            for id in seq_data_delta
+        }
+        for id, delta in seq_data_delta.items():
             self.seq_data[id].apply_delta(delta)
         assert self.request_id == sequence_group_metadata_delta.request_id
         self.block_tables = sequence_group_metadata_delta.block_tables
         self.token_chunk_size = sequence_group_metadata_delta.token_chunk_size
         self.do_sample = sequence_group_metadata_delta.do_sample
         self.is_prompt = sequence_group_metadata_delta.is_prompt
+        self.computed_block_nums = (
+            sequence_group_metadata_delta.computed_block_nums)
+        self.state = sequence_group_metadata_delta.state
 
     def finish_step(self) -> None:
         assert self.state is not None
@@ -1092,7 +1449,7 @@ class SequenceOutput(
     """
     parent_seq_id: int
     output_token: int
-    logprobs: Dict[int, Logprob]
+    logprobs: Mapping[int, Logprob]
 
     def __repr__(self) -> str:
         return (f"SequenceOutput(parent_seq_id={self.parent_seq_id}, "
@@ -1354,6 +1711,16 @@ class ExecuteModelRequest(
     last_sampled_token_ids: Optional[torch.Tensor] = None
     # Async callback
     async_callback: Optional[Callable] = None
+    # Blocks to save to the disk prefix cache. GPU block -> disk slot.
+    blocks_to_save_to_disk: List[Tuple[int, int]] = msgspec.field(
+        default_factory=list)
+    # Blocks to load from the disk prefix cache. Disk slot -> GPU block.
+    blocks_to_load_from_disk: List[Tuple[int, int]] = msgspec.field(
+        default_factory=list)
+    # The version of each entry of seq_group_metadata_list, if it is sent
+    # as a delta against the metadata that the worker cached. The full
+    # metadata has version 0, and each delta increments it.
+    seq_group_metadata_versions: Optional[List[int]] = None
 
     @property
     def is_first_multi_step(self) -> bool:
@@ -1400,4 +1767,6 @@ class ExecuteModelRequest(
             finished_requests_ids=self.finished_requests_ids,
             last_sampled_token_ids=self.last_sampled_token_ids.clone()
             if self.last_sampled_token_ids is not None else None,
-            async_callback=self.async_callback)
+            async_callback=self.async_callback,
+            blocks_to_save_to_disk=self.blocks_to_save_to_disk.copy(),
+            blocks_to_load_from_disk=self.blocks_to_load_from_disk.copy())
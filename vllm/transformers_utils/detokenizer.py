@@ -1,7 +1,12 @@
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
 
-from vllm.sequence import (VLLM_INVALID_TOKEN_ID, Logprob, SamplingParams,
-                           Sequence, SequenceGroup)
+import numpy as np
+from transformers import PreTrainedTokenizer, PreTrainedTokenizerFast
+
+from vllm.sequence import (VLLM_INVALID_TOKEN_ID, Logprob, PackedLogprobs,
+                           SamplingParams, Sequence, SequenceGroup,
+                           get_sequence_store)
 
 from .tokenizer import AnyTokenizer
 from .tokenizer_group import BaseTokenizerGroup
@@ -41,6 +46,7 @@ class Detokenizer:
         all_token_ids = seq.get_token_ids()
         prompt_token_ids = all_token_ids[:-1]
         tokenizer = self.get_tokenizer_for_seq(seq)
+        token_strings = get_token_strings(tokenizer)
         prefix_offset = 0
         read_offset = 0
         next_iter_prefix_offset = 0
@@ -57,15 +63,28 @@ class Detokenizer:
             token_position = token_position_in_logprob + position_offset
             if not prompt_logprobs_for_token:
                 continue
-            for token_id, sample_logprob in prompt_logprobs_for_token.items():
-                if (sample_logprob.decoded_token is None
+            # Only the last prompt ids are detokenized, on the first
+            # iteration.
+            context_token_ids = prompt_token_ids[
+                max(token_position - _CONTEXT_LEN, 0):token_position]
+            use_cached_text = token_strings.can_use_cached_text(
+                prev_tokens, prefix_offset, read_offset)
+            token_ids, decoded_tokens = _get_decoded_tokens(
+                prompt_logprobs_for_token)
+            for index, token_id in enumerate(token_ids):
+                if (decoded_tokens[index] is None
                         and token_id != VLLM_INVALID_TOKEN_ID):
-                    prompt_token_ids_with_token = (
-                        prompt_token_ids[:token_position] + [token_id])
+                    if (use_cached_text
+                            and token_id != all_token_ids[token_position]):
+                        text = token_strings.get_text(
+                            token_id, prms.skip_special_tokens)
+                        if text is not None:
+                            decoded_tokens[index] = text
+                            continue
                     (new_tokens, new_text, new_prefix_offset,
                      new_read_offset) = detokenize_incrementally(
                          tokenizer=tokenizer,
-                         all_input_ids=prompt_token_ids_with_token,
+                         all_input_ids=context_token_ids + [token_id],
                          prev_tokens=prev_tokens,
                          prefix_offset=prefix_offset,
                          read_offset=read_offset,
@@ -74,7 +93,7 @@ class Detokenizer:
                          spaces_between_special_tokens,
                      )
 
-                    sample_logprob.decoded_token = new_text
+                    decoded_tokens[index] = new_text
 
                     # Use the offsets & prev tokens corresponding to
                     # real tokens to ensure detokenization is consistent
@@ -83,6 +102,7 @@ class Detokenizer:
                         next_iter_prefix_offset = new_prefix_offset
                         next_iter_read_offset = new_read_offset
                         next_iter_tokens = new_tokens
+            _set_decoded_tokens(prompt_logprobs_for_token, decoded_tokens)
 
             # Advance to the next token position.
             prefix_offset = next_iter_prefix_offset
@@ -103,6 +123,17 @@ class Detokenizer:
         Returns:
             The number of characters added to the output text.
         """
+        (new_char_count, seq.prefix_offset,
+         seq.read_offset) = self._decode_sequence(seq, prms, seq.prefix_offset,
+                                                  seq.read_offset)
+        return new_char_count
+
+    def _decode_sequence(self, seq: Sequence, prms: SamplingParams,
+                         prefix_offset: int,
+                         read_offset: int) -> Tuple[int, int, int]:
+        """As decode_sequence_inplace, with the detokenization offsets of the
+        sequence given and returned along with the number of characters added
+        to the output text."""
         all_input_ids = seq.get_token_ids()
         token_id_generated_this_iteration = all_input_ids[-1]
         tokenizer = self.get_tokenizer_for_seq(seq)
@@ -111,20 +142,20 @@ class Detokenizer:
         # Do it here so that we don't have to repeat this
         # computation for each logprob.
         if seq.tokens is None:
-            (seq.tokens, seq.prefix_offset,
-             seq.read_offset) = convert_prompt_ids_to_tokens(
+            (seq.tokens, prefix_offset,
+             read_offset) = convert_prompt_ids_to_tokens(
                  tokenizer=tokenizer,
                  prompt_ids=all_input_ids[:-1],
                  skip_special_tokens=prms.skip_special_tokens,
              )
 
-        (new_tokens, new_decoded_token_text, prefix_offset,
-         read_offset) = detokenize_incrementally(
+        (new_tokens, new_decoded_token_text, new_prefix_offset,
+         new_read_offset) = detokenize_incrementally(
              tokenizer=tokenizer,
              all_input_ids=all_input_ids,
              prev_tokens=seq.tokens,
-             prefix_offset=seq.prefix_offset,
-             read_offset=seq.read_offset,
+             prefix_offset=prefix_offset,
+             read_offset=read_offset,
              skip_special_tokens=prms.skip_special_tokens,
              spaces_between_special_tokens=prms.spaces_between_special_tokens,
          )
@@ -132,35 +163,124 @@ class Detokenizer:
         # Decode logprobs
         logprobs = seq.output_logprobs[-1]
         if logprobs:
-            previous_tokens = all_input_ids[:-1]
-            for token_id, sample_logprob in logprobs.items():
+            previous_tokens = all_input_ids[-_CONTEXT_LEN - 1:-1]
+            token_strings = get_token_strings(tokenizer)
+            use_cached_text = token_strings.can_use_cached_text(
+                seq.tokens, prefix_offset, read_offset)
+            token_ids, decoded_tokens = _get_decoded_tokens(logprobs)
+            for index, token_id in enumerate(token_ids):
                 # If the token was generated this iteration,
                 # use the provided text.
                 if token_id == token_id_generated_this_iteration:
-                    sample_logprob.decoded_token = new_decoded_token_text
+                    decoded_tokens[index] = new_decoded_token_text
                     continue
 
-                if (sample_logprob.decoded_token is None
+                if (decoded_tokens[index] is None
                         and token_id != VLLM_INVALID_TOKEN_ID):
+                    text = (token_strings.get_text(
+                        token_id, prms.skip_special_tokens)
+                            if use_cached_text else None)
+                    if text is not None:
+                        decoded_tokens[index] = text
+                        continue
                     all_input_ids_with_logprob = previous_tokens + [token_id]
                     (_, new_text, _, _) = detokenize_incrementally(
                         tokenizer=tokenizer,
                         all_input_ids=all_input_ids_with_logprob,
                         prev_tokens=seq.tokens,
-                        prefix_offset=seq.prefix_offset,
-                        read_offset=seq.read_offset,
+                        prefix_offset=prefix_offset,
+                        read_offset=read_offset,
                         skip_special_tokens=prms.skip_special_tokens,
                         spaces_between_special_tokens=prms.
                         spaces_between_special_tokens,
                     )
-                    sample_logprob.decoded_token = new_text
+                    decoded_tokens[index] = new_text
+            _set_decoded_tokens(logprobs, decoded_tokens)
 
         seq.tokens.extend(new_tokens)
-        seq.prefix_offset = prefix_offset
-        seq.read_offset = read_offset
         seq.output_text += new_decoded_token_text
 
-        return len(new_decoded_token_text)
+        return len(new_decoded_token_text), new_prefix_offset, new_read_offset
+
+    def decode_sequences_inplace(self, seqs: List[Sequence],
+                                 params: List[SamplingParams]) -> List[int]:
+        """Decodes the new tokens of several sequences. In-place operation.
+
+        The sequences with a fast tokenizer and without logprobs are decoded
+        together, with a single batch decode of the tokenizer per tokenizer
+        and skip_special_tokens. Their detokenization offsets are indices in
+        their token ids, kept in the sequence store, and no tokens are kept.
+        The other sequences are decoded one by one as with
+        decode_sequence_inplace.
+
+        Args:
+            seqs: The sequences to decode, each with a single new token.
+            params: The sampling parameters of each sequence.
+
+        Returns:
+            The number of characters added to the output text of each
+            sequence.
+        """
+        store = get_sequence_store()
+        slots = np.fromiter((seq.slot for seq in seqs),
+                            dtype=np.int64,
+                            count=len(seqs))
+        prefix_offsets, read_offsets = store.get_detokenization_offsets(slots)
+        new_char_counts = self.decode_sequences(seqs, params, prefix_offsets,
+                                                read_offsets)
+        store.set_detokenization_offsets(slots, prefix_offsets, read_offsets)
+        return new_char_counts
+
+    def decode_sequences(self, seqs: List[Sequence],
+                         params: List[SamplingParams],
+                         prefix_offsets: np.ndarray,
+                         read_offsets: np.ndarray) -> List[int]:
+        """As decode_sequences_inplace, with the detokenization offsets of the
+        sequences given as arrays, which are updated in place, rather than
+        kept in the sequence store. Does not access the store, and may thus
+        run in another thread than the one allocating the sequences.
+        """
+        new_char_counts = [0] * len(seqs)
+        # (tokenizer, skip_special_tokens) -> indices of the sequences
+        batches: Dict[Tuple[PreTrainedTokenizerFast, bool], List[int]] = {}
+        for i, (seq, prms) in enumerate(zip(seqs, params)):
+            tokenizer = self.get_tokenizer_for_seq(seq)
+            if (prms.logprobs is None and seq.tokens is None
+                    and isinstance(tokenizer, PreTrainedTokenizerFast)):
+                batches.setdefault((tokenizer, prms.skip_special_tokens),
+                                   []).append(i)
+            else:
+                (new_char_counts[i], prefix_offsets[i],
+                 read_offsets[i]) = self._decode_sequence(
+                     seq, prms, int(prefix_offsets[i]), int(read_offsets[i]))
+
+        for (tokenizer, skip_special_tokens), indices in batches.items():
+            (batch_char_counts, prefix_offsets[indices],
+             read_offsets[indices]) = _decode_batch_inplace(
+                 tokenizer, [seqs[i] for i in indices], skip_special_tokens,
+                 prefix_offsets[indices], read_offsets[indices])
+            for i, new_char_count in zip(indices, batch_char_counts):
+                new_char_counts[i] = new_char_count
+        return new_char_counts
+
+
+def _get_decoded_tokens(
+    logprobs: Mapping[int, Logprob]
+) -> Tuple[List[int], List[Optional[str]]]:
+    """The token ids of logprobs and their decoded tokens, which are set in
+    place for packed logprobs, and by _set_decoded_tokens otherwise."""
+    if isinstance(logprobs, PackedLogprobs):
+        return logprobs.token_ids, logprobs.decoded_tokens
+    return list(logprobs), [
+        logprob.decoded_token for logprob in logprobs.values()
+    ]
+
+
+def _set_decoded_tokens(logprobs: Mapping[int, Logprob],
+                        decoded_tokens: List[Optional[str]]) -> None:
+    if not isinstance(logprobs, PackedLogprobs):
+        for logprob, decoded_token in zip(logprobs.values(), decoded_tokens):
+            logprob.decoded_token = decoded_token
 
 
 def _replace_none_with_empty(tokens: List[Optional[str]]):
@@ -182,11 +302,13 @@ def _convert_tokens_to_string_with_added_encoders(
     # even when the loop body is very simple.
     sub_texts: List[str] = []
     current_sub_text: List[str] = []
-    all_special_tokens = set(tokenizer.all_special_tokens)
+    token_strings = get_token_strings(tokenizer)
+    all_special_tokens = token_strings.all_special_tokens
+    added_vocab = token_strings.added_vocab
     for token in output_tokens:
         if skip_special_tokens and token in all_special_tokens:
             continue
-        if token in tokenizer.get_added_vocab():
+        if token in added_vocab:
             if current_sub_text:
                 sub_text = tokenizer.convert_tokens_to_string(current_sub_text)
                 sub_texts.append(sub_text)
@@ -207,6 +329,105 @@ def _convert_tokens_to_string_with_added_encoders(
 # tokenizers (bigger = more conservative).
 INITIAL_INCREMENTAL_DETOKENIZATION_OFFSET = 5
 
+# The number of previous ids that convert_prompt_ids_to_tokens converts.
+_CONTEXT_LEN = INITIAL_INCREMENTAL_DETOKENIZATION_OFFSET + 2
+
+# The maximum number of token ids whose strings are cached per tokenizer.
+_TOKEN_STRINGS_CACHE_SIZE = 1 << 16
+
+
+class TokenStrings:
+    """Bounded caches of the strings of the token ids of a tokenizer, and of
+    its special tokens and added vocab, for the decoding of the logprobs.
+
+    The text of a logprob token is that which detokenize_incrementally adds
+    after the previous tokens. When all of them were already added to the
+    text, it does not depend on them, and is cached per token id: it is
+    decoded once after a fixed prefix, so that, e.g., the leading space of
+    sentencepiece tokens is kept. This is not done for the slow tokenizers
+    with added vocab, whose text depends on whether the previous token is
+    an added one, nor for the special tokens of slow tokenizers.
+    """
+
+    def __init__(self, tokenizer: AnyTokenizer):
+        self.tokenizer = tokenizer
+        self.vocab_size = len(tokenizer)
+        self.all_special_tokens: FrozenSet[str] = frozenset(
+            tokenizer.all_special_tokens)
+        self.added_vocab: Dict[str, int] = tokenizer.get_added_vocab()
+        self.use_added_encoders = (not tokenizer.is_fast
+                                   and bool(self.added_vocab))
+        # The Mistral tokenizers can not decode a text prefix without BOS.
+        self.has_cached_text = (not self.use_added_encoders and isinstance(
+            tokenizer, (PreTrainedTokenizer, PreTrainedTokenizerFast)))
+        self._prefix_tokens: Optional[List[str]] = None
+        self._prefix_text = ""
+        self.get_tokens = lru_cache(maxsize=_TOKEN_STRINGS_CACHE_SIZE)(
+            self._get_tokens)
+        self.get_text = lru_cache(maxsize=_TOKEN_STRINGS_CACHE_SIZE)(
+            self._get_text)
+
+    def _get_tokens(self, token_id: int,
+                    skip_special_tokens: bool) -> Tuple[str, ...]:
+        """The tokens of a token id, as converted by
+        detokenize_incrementally."""
+        # If the token id is out of bounds, its text is empty.
+        if not 0 <= token_id < self.vocab_size:
+            return ("", )
+        # Put token_id in a list so skip_special_tokens is respected
+        tokens = self.tokenizer.convert_ids_to_tokens(
+            [token_id], skip_special_tokens=skip_special_tokens)
+        if isinstance(tokens, str):
+            return (tokens, )
+        return tuple(tokens)
+
+    def _get_text(self, token_id: int,
+                  skip_special_tokens: bool) -> Optional[str]:
+        """The text which a token id adds after tokens which were all added
+        to the text, or None if it depends on them."""
+        tokens = self._get_tokens(token_id, skip_special_tokens)
+        # The slow tokenizers may add a space before a special token,
+        # depending on the previous token.
+        if (not self.tokenizer.is_fast
+                and any(token in self.all_special_tokens
+                        for token in tokens)):
+            return None
+        if self._prefix_tokens is None:
+            prefix = "abcdef"
+            self._prefix_tokens = self.tokenizer.convert_ids_to_tokens(
+                self.tokenizer(prefix, add_special_tokens=False).input_ids)
+            self._prefix_text = self.tokenizer.convert_tokens_to_string(
+                self._prefix_tokens)
+        text = self.tokenizer.convert_tokens_to_string(self._prefix_tokens +
+                                                       list(tokens))
+        if len(text) <= len(self._prefix_text) or text.endswith("�"):
+            return ""
+        return text[len(self._prefix_text):]
+
+    def get_vocab_texts(self, skip_special_tokens: bool) -> List[str]:
+        """The texts of all the token ids, as cached by get_text, with "" for
+        those whose text depends on the previous tokens, and for all of them
+        if the texts are not cached."""
+        if not self.has_cached_text:
+            return [""] * self.vocab_size
+        texts = []
+        for token_id in range(self.vocab_size):
+            text = self._get_text(token_id, skip_special_tokens)
+            texts.append("" if text is None else text)
+        return texts
+
+    def can_use_cached_text(self, prev_tokens: Optional[List[str]],
+                            prefix_offset: int, read_offset: int) -> bool:
+        """Whether the text of a token after prev_tokens is that cached by
+        get_text."""
+        return (self.has_cached_text and prev_tokens is not None
+                and prefix_offset < read_offset == len(prev_tokens))
+
+
+@lru_cache(maxsize=16)
+def get_token_strings(tokenizer: AnyTokenizer) -> TokenStrings:
+    return TokenStrings(tokenizer)
+
 
 def convert_prompt_ids_to_tokens(
     tokenizer: AnyTokenizer,
@@ -279,15 +500,9 @@ def detokenize_incrementally(
              skip_special_tokens=skip_special_tokens)
     assert prev_tokens is not None
 
-    # If the new token id is out of bounds, return an empty string.
-    if 0 <= new_token_id < len(tokenizer):
-        # Put new_token_id in a list so skip_special_tokens is respected
-        new_tokens = tokenizer.convert_ids_to_tokens(
-            [new_token_id], skip_special_tokens=skip_special_tokens)
-        if isinstance(new_tokens, str):
-            new_tokens = [new_tokens]
-    else:
-        new_tokens = [""]
+    new_tokens = list(
+        get_token_strings(tokenizer).get_tokens(new_token_id,
+                                                skip_special_tokens))
     output_tokens = prev_tokens + new_tokens
 
     # If this is the first iteration, return all tokens.
@@ -297,7 +512,7 @@ def detokenize_incrementally(
     # The prefix text is necessary only to defeat cleanup algorithms in
     # the decode which decide to add a space or not depending on the
     # surrounding ids.
-    if tokenizer.is_fast or not tokenizer.get_added_vocab():
+    if not get_token_strings(tokenizer).use_added_encoders:
         prefix_text = tokenizer.convert_tokens_to_string(
             output_tokens[prefix_offset:read_offset])
         new_text = tokenizer.convert_tokens_to_string(
@@ -325,3 +540,57 @@ def detokenize_incrementally(
 
     new_text = new_text[len(prefix_text):]
     return new_tokens, new_text, read_offset, len(output_tokens)
+
+
+def _decode_batch_inplace(
+        tokenizer: PreTrainedTokenizerFast, seqs: List[Sequence],
+        skip_special_tokens: bool, prefix_offsets: np.ndarray,
+        read_offsets: np.ndarray) -> Tuple[List[int], np.ndarray, np.ndarray]:
+    """Decodes the new token of each sequence, as detokenize_incrementally,
+    with the prefix and new texts of all the sequences decoded in one call
+    to the backend tokenizer, and the offsets in the token ids given and
+    returned as arrays."""
+    all_token_ids = [seq.get_token_ids() for seq in seqs]
+    lens = np.fromiter(map(len, all_token_ids),
+                       dtype=np.int64,
+                       count=len(seqs))
+
+    # The first iteration of a sequence starts after its prompt, which is
+    # all of its tokens but the new one.
+    is_first_iter = read_offsets == 0
+    prefix_offsets = np.where(
+        is_first_iter,
+        np.maximum(lens - 1 - INITIAL_INCREMENTAL_DETOKENIZATION_OFFSET, 0),
+        prefix_offsets)
+    read_offsets = np.where(is_first_iter, lens - 1, read_offsets)
+
+    batch: List[List[int]] = []
+    for token_ids, prefix_offset, read_offset in zip(all_token_ids,
+                                                     prefix_offsets.tolist(),
+                                                     read_offsets.tolist()):
+        batch.append(token_ids[prefix_offset:read_offset])
+        batch.append(token_ids[prefix_offset:])
+    texts = tokenizer.backend_tokenizer.decode_batch(
+        batch, skip_special_tokens=skip_special_tokens)
+
+    new_char_counts = [0] * len(seqs)
+    is_decoded = np.zeros(len(seqs), dtype=bool)
+    for i, seq in enumerate(seqs):
+        prefix_text = texts[2 * i]
+        new_text = texts[2 * i + 1]
+        # As in detokenize_incrementally, the new token is held back while
+        # it may end with an unfinished utf-8 byte sequence.
+        if len(new_text) <= len(prefix_text) or new_text.endswith("�"):
+            new_text = ""
+        else:
+            new_text = new_text[len(prefix_text):]
+            seq.output_text += new_text
+            new_char_counts[i] = len(new_text)
+            is_decoded[i] = True
+        sample_logprob = seq.output_logprobs[-1].get(all_token_ids[i][-1])
+        if sample_logprob is not None:
+            sample_logprob.decoded_token = new_text
+
+    return (new_char_counts,
+            np.where(is_decoded, read_offsets, prefix_offsets),
+            np.where(is_decoded, lens, read_offsets))
@@ -16,6 +16,7 @@ import threading
 import uuid
 import warnings
 import weakref
+from array import array
 from asyncio import FIRST_COMPLETED, ensure_future
 from collections.abc import Mapping
 from functools import lru_cache, partial, wraps
@@ -618,6 +619,40 @@ def chunk_list(lst: List[T], chunk_size: int):
         yield lst[i:i + chunk_size]
 
 
+# Block hashes are persisted by the disk prefix cache, so they must be stable
+# across processes and fit in a signed 64-bit integer.
+_BLOCK_HASH_MASK = (1 << 63) - 1
+
+# xxhash is a dependency of vLLM (see requirements-common.txt). Without it,
+# e.g. in an environment installed without the requirements, blocks are
+# hashed with the slower built-in tuple hash, which yields different hashes:
+# BLOCK_HASH_ALGORITHM is part of the key of the disk prefix cache directory,
+# so that the blocks saved with one algorithm are not looked up with the
+# other.
+try:
+    import xxhash
+    BLOCK_HASH_ALGORITHM = "xxh3_64"
+except ImportError:
+    xxhash = None
+    BLOCK_HASH_ALGORITHM = "tuple"
+
+
+def hash_block_token_ids(prev_block_hash: Optional[int],
+                         token_ids: Union[array, memoryview, List[int]]) -> int:
+    """Computes the hash of a full block of token ids, chained from the hash
+    of the previous block (None for the first block of a sequence).
+
+    Uses xxHash over the raw token buffer when available, which avoids
+    building a tuple of Python ints per block.
+    """
+    seed = 0 if prev_block_hash is None else prev_block_hash + 1
+    if xxhash is not None:
+        if isinstance(token_ids, list):
+            token_ids = array("l", token_ids)
+        return xxhash.xxh3_64_intdigest(token_ids, seed) & _BLOCK_HASH_MASK
+    return hash((seed, *token_ids)) & _BLOCK_HASH_MASK
+
+
 def cdiv(a: int, b: int) -> int:
     """Ceiling division."""
     return -(a // -b)
@@ -863,7 +898,7 @@ def make_tensor_with_pad(
 
 
 def async_tensor_h2d(
-    data: list,
+    data: Union[list, np.ndarray],
     dtype: torch.dtype,
     target_device: Union[str, torch.device],
     pin_memory: bool,
@@ -1,10 +1,18 @@
 """CacheEngine class for managing the KV cache."""
-from typing import List
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set, Tuple, Type
 
+import numpy as np
 import torch
 
 from vllm.attention import get_attn_backend
+from vllm.attention.backends.abstract import AttentionBackend
 from vllm.config import CacheConfig, DeviceConfig, ModelConfig, ParallelConfig
+from vllm.core.block.disk_prefix_cache import (
+    get_disk_prefix_cache_data_file, reset_disk_prefix_cache_index)
+from vllm.distributed import get_tensor_model_parallel_rank
 from vllm.logger import init_logger
 from vllm.utils import (STR_DTYPE_TO_TORCH_DTYPE, get_dtype_size,
                         is_pin_memory_available)
@@ -12,6 +20,159 @@ from vllm.utils import (STR_DTYPE_TO_TORCH_DTYPE, get_dtype_size,
 logger = init_logger(__name__)
 
 
+class DiskKVCache:
+    """Stores KV cache blocks in a memory-mapped file on local disk.
+
+    The file holds `num_blocks` slots, each with the content of one block of
+    every layer. Which content hash a slot holds is tracked by the scheduler
+    (see `vllm.core.block.disk_prefix_cache.DiskPrefixCache`); this class
+    only copies blocks between the KV cache and the slots.
+
+    Saves are written in the background: `save()` only gathers the blocks
+    into a host buffer, in the stream order of the KV cache operations, and a
+    thread writes them to the file and flushes it. `wait_for_saves()` must be
+    called at the end of the step, as the scheduler commits the saves of a
+    step to its index before the next one, assuming that they are on disk.
+
+    Args:
+        cache_dir (str): The directory of the disk prefix cache.
+        rank (int): The tensor parallel rank of the worker.
+        num_blocks (int): The number of slots.
+        kv_cache (List[torch.Tensor]): The per-layer KV cache tensors.
+        attn_backend (Type[AttentionBackend]): The backend that laid out the
+            KV cache tensors.
+        block_size (int): The size of a block in number of tokens.
+        num_kv_heads (int): The number of KV heads of this worker.
+        head_size (int): The size of an attention head.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        rank: int,
+        num_blocks: int,
+        kv_cache: List[torch.Tensor],
+        attn_backend: Type[AttentionBackend],
+        block_size: int,
+        num_kv_heads: int,
+        head_size: int,
+    ) -> None:
+        self.kv_cache = kv_cache
+        self.block_dim = self._get_block_dim(attn_backend, block_size,
+                                             num_kv_heads, head_size)
+        # Shape of a single block of a layer, without the block dimension.
+        self.block_shape = (kv_cache[0].shape[:self.block_dim] +
+                            kv_cache[0].shape[self.block_dim + 1:])
+        self.dtype = kv_cache[0].dtype
+        block_bytes = (kv_cache[0].select(self.block_dim, 0).numel() *
+                       kv_cache[0].element_size())
+
+        os.makedirs(cache_dir, exist_ok=True)
+        path = get_disk_prefix_cache_data_file(cache_dir, rank)
+        num_bytes = num_blocks * len(kv_cache) * block_bytes
+        if (not os.path.exists(path)
+                or os.path.getsize(path) != num_bytes):
+            # The slots of a new file hold no content yet, so the index of
+            # the scheduler is dropped as well. This relies on the workers
+            # being initialized before the scheduler.
+            reset_disk_prefix_cache_index(cache_dir)
+            mode = "w+"
+        else:
+            mode = "r+"
+        self._data = np.memmap(path,
+                               dtype=np.uint8,
+                               mode=mode,
+                               shape=(num_blocks, len(kv_cache), block_bytes))
+        self.slots = torch.from_numpy(self._data)
+        self._pin_memory = is_pin_memory_available()
+        self._writer = ThreadPoolExecutor(max_workers=1,
+                                          thread_name_prefix="disk_kv_cache")
+        self._pending_saves: List[Future] = []
+        self._pending_slots: Set[int] = set()
+
+    @staticmethod
+    def _get_block_dim(attn_backend: Type[AttentionBackend],
+                       block_size: int, num_kv_heads: int,
+                       head_size: int) -> int:
+        # The dimension indexed by block number is the only one that changes
+        # with the number of blocks.
+        shape_1 = attn_backend.get_kv_cache_shape(1, block_size, num_kv_heads,
+                                                  head_size)
+        shape_2 = attn_backend.get_kv_cache_shape(2, block_size, num_kv_heads,
+                                                  head_size)
+        block_dims = [
+            dim for dim, (size_1, size_2) in enumerate(zip(shape_1, shape_2))
+            if size_1 != size_2
+        ]
+        assert len(block_dims) == 1, (
+            "Cannot find the block dimension of the KV cache.")
+        return block_dims[0]
+
+    def save(self, block_to_slot: torch.Tensor) -> None:
+        """Copies blocks of the KV cache to disk slots.
+
+        Args:
+            block_to_slot (torch.Tensor): A [num_copies, 2] tensor of
+                (block number, slot) pairs.
+        """
+        block_to_slot = block_to_slot.cpu()
+        slots = block_to_slot[:, 1]
+        device = self.kv_cache[0].device
+        buffer = torch.empty((len(self.kv_cache), len(slots),
+                              self._data.shape[-1]),
+                             dtype=torch.uint8,
+                             pin_memory=self._pin_memory
+                             and device.type != "cpu")
+        for layer, layer_cache in enumerate(self.kv_cache):
+            blocks = layer_cache.index_select(self.block_dim,
+                                              block_to_slot[:, 0].to(device))
+            blocks = blocks.movedim(self.block_dim, 0).contiguous()
+            buffer[layer].copy_(blocks.view(len(slots), -1).view(torch.uint8),
+                                non_blocking=True)
+        copied: Optional[torch.cuda.Event] = None
+        if device.type == "cuda":
+            copied = torch.cuda.Event()
+            copied.record()
+        self._pending_saves.append(
+            self._writer.submit(self._write, buffer, slots, copied))
+        self._pending_slots.update(slots.tolist())
+
+    def _write(self, buffer: torch.Tensor, slots: torch.Tensor,
+               copied: Optional[torch.cuda.Event]) -> None:
+        if copied is not None:
+            copied.synchronize()
+        for layer in range(len(self.kv_cache)):
+            self.slots[slots, layer] = buffer[layer]
+        # The data must reach the disk before the scheduler marks the slots
+        # valid in its index.
+        self._data.flush()
+
+    def wait_for_saves(self) -> None:
+        """Waits until the saves issued so far are written and flushed."""
+        for future in self._pending_saves:
+            future.result()
+        self._pending_saves = []
+        self._pending_slots.clear()
+
+    def load(self, slot_to_block: torch.Tensor) -> None:
+        """Copies disk slots to blocks of the KV cache.
+
+        Args:
+            slot_to_block (torch.Tensor): A [num_copies, 2] tensor of
+                (slot, block number) pairs.
+        """
+        slot_to_block = slot_to_block.cpu()
+        slots = slot_to_block[:, 0]
+        if not self._pending_slots.isdisjoint(slots.tolist()):
+            self.wait_for_saves()
+        for layer, layer_cache in enumerate(self.kv_cache):
+            blocks = self.slots[slots, layer].view(self.dtype).view(
+                len(slots), *self.block_shape).movedim(0, self.block_dim)
+            layer_cache.index_copy_(
+                self.block_dim, slot_to_block[:, 1].to(layer_cache.device),
+                blocks.to(layer_cache.device))
+
+
 class CacheEngine:
     """Manages the KV cache.
 
@@ -63,6 +224,21 @@ class CacheEngine:
             self.num_gpu_blocks, self.device_config.device_type)
         self.cpu_cache = self._allocate_kv_cache(self.num_cpu_blocks, "cpu")
 
+        self.disk_cache: Optional[DiskKVCache] = None
+        if cache_config.num_disk_prefix_cache_blocks:
+            assert cache_config.disk_prefix_cache_dir is not None
+            self.disk_cache = DiskKVCache(
+                cache_config.disk_prefix_cache_dir,
+                get_tensor_model_parallel_rank(),
+                cache_config.num_disk_prefix_cache_blocks, self.gpu_cache,
+                self.attn_backend, self.block_size, self.num_kv_heads,
+                self.head_size)
+
+        # CUDA events around the swaps that were not reported yet, with their
+        # number of blocks. Events measure the swaps without synchronizing.
+        self._swap_timings: List[Tuple[int, torch.cuda.Event,
+                                       torch.cuda.Event]] = []
+
     def _allocate_kv_cache(
         self,
         num_blocks: int,
@@ -84,19 +260,61 @@ class CacheEngine:
                             device=device))
         return kv_cache
 
+    @contextmanager
+    def _time_swap(self, num_blocks: int) -> Iterator[None]:
+        if self.device_config.device_type != "cuda":
+            yield
+            return
+        start = torch.cuda.Event(enable_timing=True)
+        end = torch.cuda.Event(enable_timing=True)
+        start.record()
+        yield
+        end.record()
+        self._swap_timings.append((num_blocks, start, end))
+
     def swap_in(self, src_to_dst: torch.Tensor) -> None:
-        for i in range(self.num_attention_layers):
-            self.attn_backend.swap_blocks(self.cpu_cache[i], self.gpu_cache[i],
-                                          src_to_dst)
+        with self._time_swap(src_to_dst.size(0)):
+            for i in range(self.num_attention_layers):
+                self.attn_backend.swap_blocks(self.cpu_cache[i],
+                                              self.gpu_cache[i], src_to_dst)
 
     def swap_out(self, src_to_dst: torch.Tensor) -> None:
-        for i in range(self.num_attention_layers):
-            self.attn_backend.swap_blocks(self.gpu_cache[i], self.cpu_cache[i],
-                                          src_to_dst)
+        with self._time_swap(src_to_dst.size(0)):
+            for i in range(self.num_attention_layers):
+                self.attn_backend.swap_blocks(self.gpu_cache[i],
+                                              self.cpu_cache[i], src_to_dst)
+
+    def get_and_reset_swap_time(self) -> Tuple[int, float]:
+        """Returns the number of blocks and the time in seconds of the swaps
+        completed since the last call. Swaps still in flight are reported by a
+        later call."""
+        num_blocks, seconds = 0, 0.0
+        pending = []
+        for timing in self._swap_timings:
+            swap_num_blocks, start, end = timing
+            if end.query():
+                num_blocks += swap_num_blocks
+                seconds += start.elapsed_time(end) / 1000
+            else:
+                pending.append(timing)
+        self._swap_timings = pending
+        return num_blocks, seconds
 
     def copy(self, src_to_dsts: torch.Tensor) -> None:
         self.attn_backend.copy_blocks(self.gpu_cache, src_to_dsts)
 
+    def save_to_disk(self, src_to_dst: torch.Tensor) -> None:
+        assert self.disk_cache is not None
+        self.disk_cache.save(src_to_dst)
+
+    def load_from_disk(self, src_to_dst: torch.Tensor) -> None:
+        assert self.disk_cache is not None
+        self.disk_cache.load(src_to_dst)
+
+    def wait_for_disk_saves(self) -> None:
+        if self.disk_cache is not None:
+            self.disk_cache.wait_for_saves()
+
     @staticmethod
     def get_cache_block_size(
         cache_config: CacheConfig,
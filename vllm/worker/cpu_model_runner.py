@@ -3,6 +3,7 @@ import weakref
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, Union
 
+import numpy as np
 import torch
 from torch import nn
 
@@ -187,8 +188,8 @@ class ModelInputForCPUBuilder(ModelRunnerInputBuilderBase[ModelInputForCPU]):
     ) -> Tuple[torch.Tensor, torch.Tensor, AttentionMetadata, List[int],
                BatchedTensorInputs]:
         assert len(seq_group_metadata_list) > 0
-        input_tokens: List[int] = []
-        input_positions: List[int] = []
+        input_tokens: List[np.ndarray] = []
+        input_positions: List[np.ndarray] = []
         input_mrope_positions: List[List[int]] = [[] for _ in range(3)]
 
         slot_mapping: List[int] = []
@@ -202,12 +203,12 @@ class ModelInputForCPUBuilder(ModelRunnerInputBuilderBase[ModelInputForCPU]):
             seq_id = seq_ids[0]
 
             seq_data = seq_group_metadata.seq_data[seq_id]
-            prompt_tokens = seq_data.get_token_ids()
             computed_len = seq_data.get_num_computed_tokens()
-            seq_len = len(prompt_tokens)
+            seq_len = seq_data.get_len()
 
             seq_lens.append(seq_len)  # Prompt token num
-            input_tokens.extend(prompt_tokens)  # Token ids
+            input_tokens.append(seq_data.get_token_ids_slice(0,
+                                                             seq_len))
 
             mrope_positions = None
             if (mm_data := seq_group_metadata.multi_modal_data):
@@ -223,7 +224,8 @@ class ModelInputForCPUBuilder(ModelRunnerInputBuilderBase[ModelInputForCPU]):
                 for idx in range(3):
                     input_mrope_positions[idx].extend(mrope_positions[idx])
             else:
-                input_positions.extend(list(range(computed_len, seq_len)))
+                input_positions.append(
+                    np.arange(computed_len, seq_len, dtype=np.int64))
 
             # Compute the slot mapping.
             block_table = seq_group_metadata.block_tables[seq_id]
@@ -252,15 +254,19 @@ class ModelInputForCPUBuilder(ModelRunnerInputBuilderBase[ModelInputForCPU]):
         else:
             input_mrope_positions = None  # type: ignore
 
+        input_tokens = np.concatenate(input_tokens)  # type: ignore
         num_prompt_tokens = len(input_tokens)
 
-        input_tokens = torch.tensor(input_tokens,
-                                    dtype=torch.long,
-                                    device=self.device)  # type: ignore
-        input_positions = torch.tensor(input_positions
-                                       or input_mrope_positions,
-                                       dtype=torch.long,
-                                       device=self.device)  # type: ignore
+        input_tokens = torch.from_numpy(input_tokens).to(
+            self.device)  # type: ignore
+        if input_positions is not None:
+            input_positions = torch.from_numpy(
+                np.concatenate(input_positions)).to(
+                    self.device)  # type: ignore
+        else:
+            input_positions = torch.tensor(input_mrope_positions,
+                                           dtype=torch.long,
+                                           device=self.device)  # type: ignore
         slot_mapping = torch.tensor(slot_mapping,
                                     dtype=torch.long,
                                     device=self.device)  # type: ignore
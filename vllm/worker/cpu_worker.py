@@ -10,11 +10,13 @@ from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoRAConfig,
                          ModelConfig, ParallelConfig, PromptAdapterConfig,
                          SchedulerConfig)
 from vllm.distributed import (ensure_model_parallel_initialized,
+                              get_tensor_model_parallel_rank,
                               init_distributed_environment)
 from vllm.logger import init_logger
 from vllm.model_executor import set_random_seed
 from vllm.sequence import ExecuteModelRequest
 from vllm.utils import STR_DTYPE_TO_TORCH_DTYPE
+from vllm.worker.cache_engine import DiskKVCache
 from vllm.worker.cpu_enc_dec_model_runner import CPUEncoderDecoderModelRunner
 from vllm.worker.cpu_model_runner import CPUModelRunner
 from vllm.worker.worker_base import (LocalOrDistributedWorkerBase,
@@ -66,6 +68,16 @@ class CPUCacheEngine:
         # Initialize the cache.
         self.cpu_cache = self._allocate_kv_cache(self.num_cpu_blocks)
 
+        self.disk_cache: Optional[DiskKVCache] = None
+        if cache_config.num_disk_prefix_cache_blocks:
+            assert cache_config.disk_prefix_cache_dir is not None
+            self.disk_cache = DiskKVCache(
+                cache_config.disk_prefix_cache_dir,
+                get_tensor_model_parallel_rank(),
+                cache_config.num_disk_prefix_cache_blocks, self.cpu_cache,
+                self.attn_backend, self.block_size, self.num_heads,
+                self.head_size)
+
     def _allocate_kv_cache(
         self,
         num_blocks: int,
@@ -88,6 +100,18 @@ class CPUCacheEngine:
     def copy(self, src_to_dsts: Dict[int, List[int]]) -> None:
         self.attn_backend.copy_blocks(self.cpu_cache, src_to_dsts)
 
+    def save_to_disk(self, src_to_dst: torch.Tensor) -> None:
+        assert self.disk_cache is not None
+        self.disk_cache.save(src_to_dst)
+
+    def load_from_disk(self, src_to_dst: torch.Tensor) -> None:
+        assert self.disk_cache is not None
+        self.disk_cache.load(src_to_dst)
+
+    def wait_for_disk_saves(self) -> None:
+        if self.disk_cache is not None:
+            self.disk_cache.wait_for_saves()
+
     @staticmethod
     def get_cache_block_size(
         block_size: int,
@@ -319,11 +343,24 @@ class CPUWorker(LoraNotSupportedWorkerBase, LocalOrDistributedWorkerBase):
         self,
         worker_input: WorkerInput,
     ) -> None:
+        # Saves to disk go first, as the saved blocks may be the destination
+        # of a load of the same step.
+        if (worker_input.blocks_to_save_to_disk is not None
+                and worker_input.blocks_to_save_to_disk.numel() > 0):
+            self.cache_engine[worker_input.virtual_engine].save_to_disk(
+                worker_input.blocks_to_save_to_disk)
+        if (worker_input.blocks_to_load_from_disk is not None
+                and worker_input.blocks_to_load_from_disk.numel() > 0):
+            self.cache_engine[worker_input.virtual_engine].load_from_disk(
+                worker_input.blocks_to_load_from_disk)
         if (worker_input.blocks_to_copy is not None
                 and worker_input.blocks_to_copy.numel() > 0):
             self.cache_engine[worker_input.virtual_engine].copy(
                 worker_input.blocks_to_copy)
 
+    def wait_for_disk_saves(self, virtual_engine: int) -> None:
+        self.cache_engine[virtual_engine].wait_for_disk_saves()
+
     @torch.inference_mode()
     def prepare_worker_input(
             self, execute_model_req: ExecuteModelRequest) -> WorkerInput:
@@ -334,12 +371,22 @@ class CPUWorker(LoraNotSupportedWorkerBase, LocalOrDistributedWorkerBase):
         blocks_to_copy = torch.tensor(execute_model_req.blocks_to_copy,
                                       device="cpu",
                                       dtype=torch.int64).view(-1, 2)
+        blocks_to_save_to_disk = torch.tensor(
+            execute_model_req.blocks_to_save_to_disk,
+            device="cpu",
+            dtype=torch.int64).view(-1, 2)
+        blocks_to_load_from_disk = torch.tensor(
+            execute_model_req.blocks_to_load_from_disk,
+            device="cpu",
+            dtype=torch.int64).view(-1, 2)
         assert len(execute_model_req.blocks_to_swap_in) == 0
         assert len(execute_model_req.blocks_to_swap_out) == 0
         return WorkerInput(
             num_seq_groups=num_seq_groups,
             blocks_to_copy=blocks_to_copy,
             virtual_engine=virtual_engine,
+            blocks_to_save_to_disk=blocks_to_save_to_disk,
+            blocks_to_load_from_disk=blocks_to_load_from_disk,
         )
 
     def init_distributed_environment(self) -> None:
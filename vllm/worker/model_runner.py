@@ -75,6 +75,9 @@ _BATCH_SIZES_TO_CAPTURE = [1, 2, 4] + [
     _BATCH_SIZE_ALIGNMENT * i for i in range(1, 1025)
 ]
 _NUM_WARMUP_ITERS = 2
+# The input tokens and positions of a sequence before they are computed. It is
+# shared, and never written to.
+_EMPTY_INT64_ARRAY = np.empty(0, dtype=np.int64)
 
 TModelInputForGPU = TypeVar('TModelInputForGPU', bound="ModelInputForGPU")
 
@@ -187,8 +190,8 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         """Intermediate data for the current sequence group."""
 
         def simple_reinit(self):
-            self.input_tokens[0].clear()  # type: ignore
-            self.input_positions[0].clear()  # type: ignore
+            self.input_tokens[0] = _EMPTY_INT64_ARRAY  # type: ignore
+            self.input_positions[0] = _EMPTY_INT64_ARRAY  # type: ignore
             self.mrope_input_positions = None  # type: ignore
             self.seq_lens[0] = 0  # type: ignore
             self.orig_seq_lens[0] = 0  # type: ignore
@@ -213,8 +216,8 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
             n_seqs: int = 0,
 
             # Input tokens and positions.
-            input_tokens: Optional[List[List[int]]] = None,
-            input_positions: Optional[List[List[int]]] = None,
+            input_tokens: Optional[List[np.ndarray]] = None,
+            input_positions: Optional[List[np.ndarray]] = None,
             mrope_input_positions: Optional[List[List[List[int]]]] = None,
 
             # The sequence length (may be capped to the sliding window).
@@ -270,13 +273,14 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
                         self.input_tokens = input_tokens
                     else:
                         for seq_id in range(len(self.seq_ids)):
-                            self.input_tokens[seq_id].clear()
+                            self.input_tokens[seq_id] = _EMPTY_INT64_ARRAY
 
                     if input_positions:
                         self.input_positions = input_positions
                     else:
                         for seq_id in range(len(self.seq_ids)):
-                            self.input_positions[seq_id].clear()
+                            self.input_positions[
+                                seq_id] = _EMPTY_INT64_ARRAY
 
                     self.mrope_input_positions = None
 
@@ -370,8 +374,8 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         def __post_init__(self):
             self.n_seqs = len(self.seq_ids)
 
-            self.input_tokens = [[] for _ in range(self.n_seqs)]
-            self.input_positions = [[] for _ in range(self.n_seqs)]
+            self.input_tokens = [_EMPTY_INT64_ARRAY] * self.n_seqs
+            self.input_positions = [_EMPTY_INT64_ARRAY] * self.n_seqs
             self.mrope_input_positions = None
             self.seq_lens = [0] * self.n_seqs
             self.orig_seq_lens = [0] * self.n_seqs
@@ -482,14 +486,17 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         else:
             context_len = seq_data.get_num_computed_tokens()
 
-        # Compute tokens.
-        tokens = seq_data.get_token_ids()[context_len:seq_len]
+        # Compute tokens, copied from the token arrays without going through
+        # Python ints.
+        tokens = seq_data.get_token_ids_slice(context_len, seq_len)
 
         inter_data.seq_lens[seq_idx] = seq_len
         inter_data.orig_seq_lens[seq_idx] = seq_len
         inter_data.context_lens[seq_idx] = context_len
-        inter_data.input_tokens[seq_idx].extend(tokens)
-        inter_data.input_positions[seq_idx].extend(range(context_len, seq_len))
+        inter_data.input_tokens[seq_idx] = tokens
+        inter_data.input_positions[seq_idx] = np.arange(context_len,
+                                                        seq_len,
+                                                        dtype=np.int64)
         inter_data.query_lens[seq_idx] = seq_len - context_len
 
         if seq_data.mrope_position_delta is not None:
@@ -773,12 +780,12 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         create on-device tensors.
         """
         # Combine and flatten intermediate data.
-        input_tokens = []
-        for inter_data in self.inter_data_list:
-            for cur_input_tokens in inter_data.input_tokens:
-                input_tokens.extend(cur_input_tokens)
+        input_tokens = _concatenate_int64_arrays([
+            cur_input_tokens for inter_data in self.inter_data_list
+            for cur_input_tokens in inter_data.input_tokens
+        ])
 
-        if not input_tokens:
+        if input_tokens.size == 0:
             # This may happen when all prefill requests hit
             # prefix caching and there is no decode request.
             return self.model_input_cls()
@@ -793,17 +800,17 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
                     if msections is None:
                         for _seq_input_positions in inter_data.input_positions:
                             mrope_input_positions[idx].extend(
-                                _seq_input_positions)
+                                _seq_input_positions.tolist())
                     else:
                         for _seq_mrope_input_positions in msections:
                             mrope_input_positions[idx].extend(
                                 _seq_mrope_input_positions[idx])
             input_positions = None
         else:
-            input_positions = []
-            for inter_data in self.inter_data_list:
-                for cur_input_positions in inter_data.input_positions:
-                    input_positions.extend(cur_input_positions)
+            input_positions = _concatenate_int64_arrays([
+                cur_input_positions for inter_data in self.inter_data_list
+                for cur_input_positions in inter_data.input_positions
+            ])
 
         seq_lens = []
         query_lens = []
@@ -839,8 +846,8 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
             batch_size += cuda_graph_pad_size
 
         # Tokens and positions.
-        if cuda_graph_pad_size:
-            input_tokens.extend(itertools.repeat(0, cuda_graph_pad_size))
+        if cuda_graph_pad_size > 0:
+            input_tokens = np.pad(input_tokens, (0, cuda_graph_pad_size))
         assert self.runner.device is not None
         input_tokens_tensor = async_tensor_h2d(input_tokens, torch.long,
                                                self.runner.device,
@@ -854,7 +861,9 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
                                                       self.runner.device,
                                                       self.runner.pin_memory)
         else:
-            input_positions.extend(itertools.repeat(0, cuda_graph_pad_size))
+            if cuda_graph_pad_size > 0:
+                input_positions = np.pad(input_positions,
+                                         (0, cuda_graph_pad_size))
             input_positions_tensor = async_tensor_h2d(input_positions,
                                                       torch.long,
                                                       self.runner.device,
@@ -1922,3 +1931,10 @@ def _get_max_graph_batch_size(max_num_seqs: int) -> int:
         return padded_size
     assert padded_size > _BATCH_SIZES_TO_CAPTURE[-1]
     return _BATCH_SIZES_TO_CAPTURE[-1]
+
+
+def _concatenate_int64_arrays(arrays: List[np.ndarray]) -> np.ndarray:
+    """Concatenates the per-sequence input arrays, which may be none."""
+    if not arrays:
+        return _EMPTY_INT64_ARRAY
+    return np.concatenate(arrays)
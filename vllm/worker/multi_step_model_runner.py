@@ -866,6 +866,14 @@ def _pythonize_sampler_output(
 
                 if any_logprobs_are_requested:
                     seq_output.logprobs = group_sample_logprobs[tdx]
+                elif not isinstance(seq_output.logprobs, dict):
+                    # The packed logprobs of a previous step are not reused.
+                    seq_output.logprobs = {
+                        next_token_id:
+                        Logprob(logprob=float('inf'),
+                                rank=None,
+                                decoded_token=None)
+                    }
                 else:
                     logprobs = next(iter(seq_output.logprobs.values()))
                     seq_output.logprobs.clear()
@@ -418,8 +418,8 @@ class OpenVINOWorker(LoraNotSupportedWorkerBase):
             assert len(execute_model_req.blocks_to_swap_in) == 0
             assert len(execute_model_req.blocks_to_swap_out) == 0
         else:
-            self.cache_swap_in(blocks_to_swap_in)
             self.cache_swap_out(blocks_to_swap_out)
+            self.cache_swap_in(blocks_to_swap_in)
 
         self.cache_copy(blocks_to_copy)
 
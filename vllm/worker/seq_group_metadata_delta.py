@@ -0,0 +1,220 @@
+"""Delta transfer of the sequence group metadata to workers in other
+processes.
+
+The full SequenceGroupMetadata of a request carries all its token ids, so
+serializing it on every step costs time linear in the total length of the
+batch. Instead, the executor sends the full metadata of a request once, then
+only the changes since the previous step: the new output token ids and the
+overwritten scalars. The workers keep the metadata of each request in a cache
+and apply the deltas to it.
+
+Each message of a request has a version, and the delta of each sequence
+carries a checksum of all its token ids, so that a worker detects a cache that
+diverged from the engine, e.g., after a lost message, instead of running the
+model on the wrong tokens. It then drops its cache and raises
+SequenceGroupMetadataDivergenceError, and the executor resends the step with
+the full metadata.
+"""
+from array import array
+from typing import Dict, List, Optional, Tuple, Union
+
+from vllm.sequence import (VLLM_TOKEN_ID_ARRAY_TYPE, ExecuteModelRequest,
+                           SequenceData, SequenceGroupMetadata,
+                           SequenceGroupMetadataDelta, token_ids_checksum)
+
+
+class SequenceGroupMetadataDivergenceError(RuntimeError):
+    """Raised by a worker whose cached sequence group metadata diverged from
+    the deltas that it received."""
+
+
+def _get_checksum(seq_data: SequenceData) -> int:
+    return token_ids_checksum(
+        seq_data.output_token_ids_array,
+        token_ids_checksum(seq_data.prompt_token_ids_array))
+
+
+class _SentSeqGroup:
+    """The state of a request in the caches of the workers, as known by the
+    executor."""
+
+    def __init__(self, seq_group_metadata: SequenceGroupMetadata):
+        self.version = 0
+        # seq_id -> (number of output tokens, checksum of the token ids)
+        self.seqs: Dict[int, Tuple[int, int]] = {
+            seq_id: (seq_data.get_output_len(), _get_checksum(seq_data))
+            for seq_id, seq_data in seq_group_metadata.seq_data.items()
+        }
+
+    def can_send_delta(self,
+                       seq_group_metadata: SequenceGroupMetadata) -> bool:
+        for seq_id, seq_data in seq_group_metadata.seq_data.items():
+            seq = self.seqs.get(seq_id)
+            # A new sequence, e.g., a forked beam.
+            if seq is None or seq_data.get_output_len() < seq[0]:
+                return False
+        return True
+
+
+class SequenceGroupMetadataEncoder:
+    """Executor side of the delta transfer: replaces the full metadata of the
+    requests that the workers already cached by deltas."""
+
+    def __init__(self) -> None:
+        # request_id -> what the workers cached
+        self._sent: Dict[str, _SentSeqGroup] = {}
+
+    def reset(self) -> None:
+        """Forgets the caches of the workers, so that the full metadata of
+        all the requests is sent again."""
+        self._sent.clear()
+
+    def encode(self,
+               execute_model_req: ExecuteModelRequest) -> ExecuteModelRequest:
+        """Returns a copy of the request to send to the workers, in which the
+        metadata of the requests sent before are deltas."""
+        seq_group_metadata_list: List[Union[SequenceGroupMetadata,
+                                            SequenceGroupMetadataDelta]] = []
+        versions: List[int] = []
+        for seq_group_metadata in execute_model_req.seq_group_metadata_list:
+            assert isinstance(seq_group_metadata, SequenceGroupMetadata)
+            request_id = seq_group_metadata.request_id
+            sent = self._sent.get(request_id)
+            if sent is None or not sent.can_send_delta(seq_group_metadata):
+                self._sent[request_id] = _SentSeqGroup(seq_group_metadata)
+                seq_group_metadata_list.append(seq_group_metadata)
+                versions.append(0)
+                continue
+
+            seq_data_delta = {}
+            seqs = {}
+            for seq_id, seq_data in seq_group_metadata.seq_data.items():
+                num_output_tokens, checksum = sent.seqs[seq_id]
+                delta = seq_data.get_delta(num_output_tokens, checksum)
+                seq_data_delta[seq_id] = delta
+                seqs[seq_id] = (seq_data.get_output_len(), delta.checksum)
+            sent.seqs = seqs
+            sent.version += 1
+            seq_group_metadata_list.append(
+                SequenceGroupMetadataDelta(
+                    seq_data_delta,
+                    request_id,
+                    seq_group_metadata.block_tables,
+                    seq_group_metadata.is_prompt,
+                    do_sample=seq_group_metadata.do_sample,
+                    token_chunk_size=seq_group_metadata.token_chunk_size,
+                    computed_block_nums=seq_group_metadata.
+                    computed_block_nums,
+                    state=seq_group_metadata.state,
+                ))
+            versions.append(sent.version)
+
+        for finished_id in execute_model_req.finished_requests_ids:
+            self._sent.pop(finished_id, None)
+
+        encoded_req = execute_model_req.clone(seq_group_metadata_list)
+        encoded_req.seq_group_metadata_versions = versions
+        return encoded_req
+
+
+class _CachedSeqGroup:
+    """The metadata of a request in the cache of a worker."""
+
+    def __init__(self, seq_group_metadata: SequenceGroupMetadata):
+        self.metadata = seq_group_metadata
+        self.version = 0
+        # seq_id -> checksum of the token ids
+        self.checksums: Dict[int, int] = {
+            seq_id: _get_checksum(seq_data)
+            for seq_id, seq_data in seq_group_metadata.seq_data.items()
+        }
+
+
+class SequenceGroupMetadataDecoder:
+    """Worker side of the delta transfer: a versioned cache of the metadata of
+    the requests, to which the deltas are applied."""
+
+    def __init__(self) -> None:
+        # request_id -> cached metadata
+        self._cache: Dict[str, _CachedSeqGroup] = {}
+
+    def decode(self, execute_model_req: ExecuteModelRequest) -> None:
+        """Replaces the deltas in the request by the full metadata, in place.
+
+        Raises:
+            SequenceGroupMetadataDivergenceError: If a delta does not apply to
+                the cached metadata. The cache is then cleared, and nothing is
+                applied.
+        """
+        versions = execute_model_req.seq_group_metadata_versions
+        if versions is None:
+            # The full metadata, passed in the same process.
+            return
+        seq_group_metadata_list = execute_model_req.seq_group_metadata_list
+        assert len(versions) == len(seq_group_metadata_list)
+
+        # Validate all the deltas before applying any, so that a resent step
+        # applies to the same cache.
+        checksums: List[Optional[Dict[int, int]]] = []
+        diverged_request_ids = []
+        for metadata_or_delta, version in zip(seq_group_metadata_list,
+                                              versions):
+            if version == 0:
+                assert isinstance(metadata_or_delta, SequenceGroupMetadata)
+                checksums.append(None)
+                continue
+            assert isinstance(metadata_or_delta, SequenceGroupMetadataDelta)
+            new_checksums = self._validate(metadata_or_delta, version)
+            if new_checksums is None:
+                diverged_request_ids.append(metadata_or_delta.request_id)
+            checksums.append(new_checksums)
+
+        if diverged_request_ids:
+            self._cache.clear()
+            raise SequenceGroupMetadataDivergenceError(
+                "The cached sequence group metadata of requests "
+                f"{diverged_request_ids} diverged from the engine.")
+
+        new_seq_group_metadata_list = []
+        for metadata_or_delta, new_checksums in zip(seq_group_metadata_list,
+                                                    checksums):
+            request_id = metadata_or_delta.request_id
+            if new_checksums is None:
+                assert isinstance(metadata_or_delta, SequenceGroupMetadata)
+                cached = _CachedSeqGroup(metadata_or_delta)
+                self._cache[request_id] = cached
+            else:
+                assert isinstance(metadata_or_delta,
+                                  SequenceGroupMetadataDelta)
+                cached = self._cache[request_id]
+                cached.metadata.apply_delta(metadata_or_delta)
+                cached.version += 1
+                cached.checksums = new_checksums
+            new_seq_group_metadata_list.append(cached.metadata)
+
+        for finished_id in execute_model_req.finished_requests_ids:
+            self._cache.pop(finished_id, None)
+
+        execute_model_req.seq_group_metadata_list = (
+            new_seq_group_metadata_list)
+        execute_model_req.seq_group_metadata_versions = None
+
+    def _validate(self, delta: SequenceGroupMetadataDelta,
+                  version: int) -> Optional[Dict[int, int]]:
+        """Returns the checksums of the sequences after applying the delta,
+        or None if it does not apply to the cached metadata."""
+        cached = self._cache.get(delta.request_id)
+        if cached is None or cached.version != version - 1:
+            return None
+        new_checksums = {}
+        for seq_id, seq_data_delta in delta.seq_data_delta.items():
+            checksum = cached.checksums.get(seq_id)
+            if checksum is None:
+                return None
+            checksum = token_ids_checksum(
+                array(VLLM_TOKEN_ID_ARRAY_TYPE,
+                      seq_data_delta.new_output_token_ids), checksum)
+            if checksum != seq_data_delta.checksum:
+                return None
+            new_checksums[seq_id] = checksum
+        return new_checksums
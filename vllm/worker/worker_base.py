@@ -3,6 +3,7 @@ import importlib
 import os
 import time
 from abc import ABC, abstractmethod
+from functools import cached_property
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, Union
 
 import torch
@@ -19,6 +20,7 @@ from vllm.utils import (enable_trace_function_call_for_thread,
 from vllm.worker.model_runner_base import (BroadcastableModelInput,
                                            ModelRunnerBase,
                                            ModelRunnerInputBase)
+from vllm.worker.seq_group_metadata_delta import SequenceGroupMetadataDecoder
 
 logger = init_logger(__name__)
 
@@ -132,6 +134,8 @@ class WorkerInput:
     blocks_to_copy: Optional[torch.Tensor] = None
     virtual_engine: int = 0
     num_steps: int = 1
+    blocks_to_save_to_disk: Optional[torch.Tensor] = None
+    blocks_to_load_from_disk: Optional[torch.Tensor] = None
 
     @classmethod
     def from_broadcasted_tensor_dict(
@@ -149,6 +153,9 @@ class WorkerInput:
             blocks_to_copy=tensor_dict.pop("blocks_to_copy"),
             virtual_engine=tensor_dict["virtual_engine"],
             num_steps=tensor_dict.pop("num_steps"),
+            blocks_to_save_to_disk=tensor_dict.pop("blocks_to_save_to_disk"),
+            blocks_to_load_from_disk=tensor_dict.pop(
+                "blocks_to_load_from_disk"),
         )
 
     def as_broadcastable_tensor_dict(
@@ -163,6 +170,8 @@ class WorkerInput:
             "blocks_to_copy": self.blocks_to_copy,
             "virtual_engine": self.virtual_engine,
             "num_steps": self.num_steps,
+            "blocks_to_save_to_disk": self.blocks_to_save_to_disk,
+            "blocks_to_load_from_disk": self.blocks_to_load_from_disk,
         }
 
         return tensor_dict
@@ -221,6 +230,29 @@ class LocalOrDistributedWorkerBase(WorkerBase):
         """
         raise NotImplementedError
 
+    def get_and_reset_swap_time(
+            self, virtual_engine: int) -> Optional[Tuple[int, float]]:
+        """
+        Returns the number of blocks and the time in seconds of the KV cache
+        swaps completed since the last call, or None if the worker does not
+        measure them.
+        """
+        return None
+
+    def wait_for_disk_saves(self, virtual_engine: int) -> None:
+        """
+        Waits until the KV cache blocks saved to the disk prefix cache in
+        this step are written and flushed, which the scheduler assumes when
+        it commits them at the next step.
+        """
+        pass
+
+    @cached_property
+    def seq_group_metadata_decoder(self) -> SequenceGroupMetadataDecoder:
+        """The cache of the sequence group metadata, to which the deltas sent
+        by the executor are applied."""
+        return SequenceGroupMetadataDecoder()
+
     def _get_worker_input_from_broadcast(
         self
     ) -> Optional[Tuple[BroadcastableModelInput, WorkerInput, Dict[
@@ -246,6 +278,7 @@ class LocalOrDistributedWorkerBase(WorkerBase):
     ) -> Tuple[BroadcastableModelInput, WorkerInput, Dict[str, torch.Tensor]]:
         """ Get the driver input and broadcast it to other workers.  """
         assert self.is_driver_worker
+        self.seq_group_metadata_decoder.decode(execute_model_req)
 
         worker_input: WorkerInput = self.prepare_worker_input(
             execute_model_req=execute_model_req)
@@ -311,6 +344,7 @@ class LocalOrDistributedWorkerBase(WorkerBase):
 
         # If there is no input, we don't need to execute the model.
         if worker_input.num_seq_groups == 0:
+            self.wait_for_disk_saves(worker_input.virtual_engine)
             return []
 
         intermediate_tensors = None
@@ -332,8 +366,11 @@ class LocalOrDistributedWorkerBase(WorkerBase):
             num_steps=num_steps,
             **kwargs,
         )
+        # The saves to disk were written during the forward pass.
+        self.wait_for_disk_saves(worker_input.virtual_engine)
 
         model_execute_time = time.perf_counter() - start_time
+        swap_time = self.get_and_reset_swap_time(worker_input.virtual_engine)
         if not get_pp_group().is_last_rank:
             # output is IntermediateTensors
             if (self.observability_config is not None
@@ -349,6 +386,8 @@ class LocalOrDistributedWorkerBase(WorkerBase):
             for o in output:
                 o.model_execute_time = (orig_model_execute_time +
                                         model_execute_time)
+        if swap_time is not None and swap_time[0] > 0 and output:
+            output[0].num_swapped_blocks, output[0].swap_time = swap_time
 
         # output is List[SamplerOutput]
         return output
@@ -366,6 +405,7 @@ class LocalOrDistributedWorkerBase(WorkerBase):
         assert execute_model_req is not None, (
             "_execute_model_spmd() requires each worker to take in an "
             "ExecuteModelRequest")
+        self.seq_group_metadata_decoder.decode(execute_model_req)
         worker_input: WorkerInput = self.prepare_worker_input(
             execute_model_req=execute_model_req)
         model_input: ModelRunnerInputBase = (
@@ -376,17 +416,20 @@ class LocalOrDistributedWorkerBase(WorkerBase):
 
         # If there is no input, we don't need to execute the model.
         if worker_input.num_seq_groups == 0:
+            self.wait_for_disk_saves(worker_input.virtual_engine)
             return []
 
         kwargs = extract_previous_hidden_states(execute_model_req)
 
-        return self.model_runner.execute_model(
+        output = self.model_runner.execute_model(
             model_input=model_input,
             kv_caches=self.kv_cache[worker_input.virtual_engine]
             if self.kv_cache is not None else None,
             intermediate_tensors=intermediate_tensors,
             **kwargs,
         )
+        self.wait_for_disk_saves(worker_input.virtual_engine)
+        return output
 
 
 class WorkerWrapperBase: